@@ -1,21 +1,44 @@
 import sys
 import os
+import ast
+import codecs
 import copy
 import configparser
+import hashlib
+import heapq
+import itertools
+import json
 import logging
+import math
+import re
+import stat
+import tempfile
+import threading
+import time
+from bisect import bisect_left, bisect_right
+from collections import Counter, OrderedDict
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from contextlib import contextmanager
 from pathlib import Path
 from lxml import etree as ET
 import subprocess # <-- ADDED IMPORT
 import sys  
 
+try:
+    import numpy as np # Optional: vectorizes the formula tools, which fall back to plain Python without it
+except ImportError:
+    np = None
+
 from PySide6.QtWidgets import (
     QApplication, QMainWindow, QWidget, QVBoxLayout, QHBoxLayout, QFrame,
     QSplitter, QTabWidget, QListWidget, QListWidgetItem, QLineEdit,
     QPushButton, QLabel, QScrollArea, QSizePolicy, QSpacerItem, QGridLayout,
-    QFileDialog, QMessageBox, QInputDialog, QCompleter, QMenuBar, QStatusBar, QDialog, QMenu 
+    QFileDialog, QMessageBox, QInputDialog, QCompleter, QMenuBar, QStatusBar, QDialog, QMenu,
+    QTableView, QHeaderView, QCheckBox, QComboBox, QDialogButtonBox, QAbstractItemView, QSpinBox,
+    QPlainTextEdit, QStyledItemDelegate, QTreeView, QToolButton, QProgressBar
 )
-from PySide6.QtCore import QMargins, Qt, QStringListModel, Signal, QPoint 
-from PySide6.QtGui import QAction, QPalette, QColor, QShortcut, QKeySequence, QIcon
+from PySide6.QtCore import QMargins, Qt, QStringListModel, Signal, QPoint, QTimer, QAbstractTableModel, QAbstractListModel, QAbstractItemModel, QModelIndex, QObject, QEvent, QEventLoop
+from PySide6.QtGui import QAction, QPalette, QColor, QFont, QShortcut, QKeySequence, QIcon, QUndoStack, QUndoCommand
 
 # --- Constants ---
 TAG_ABILITIES = "abilities"
@@ -29,6 +52,9 @@ TAG_VARIANTS = "variants"
 TAG_VARIANT = "variant"
 TAG_PARTS = "parts" # Child of recycling_parts
 TAG_ABILITY_REF = "a" # Child of base_abilities
+ITEM_LIST_SECTIONS = ((TAG_BASE_ABILITIES, TAG_ABILITY_REF), (TAG_RECYCLING_PARTS, TAG_PARTS), (TAG_VARIANTS, TAG_VARIANT)) # (section, row tag) of item details
+
+FIELD_SEPARATOR = "." # 'property.attribute' field notation used by the grid and batch tools
 
 # --- Logging Setup ---
 # Basic configuration - logs to console
@@ -36,14 +62,113 @@ TAG_ABILITY_REF = "a" # Child of base_abilities
 logging.basicConfig(level=logging.DEBUG, # Change to logging.INFO for less verbose output
                     format='%(asctime)s - %(levelname)s - %(filename)s:%(lineno)d - %(message)s')
 
+# --- Pooled Detail Rows (rebindable widgets for the details pane) ---
+class RowPool:
+    """Reusable rows of one details section.
+
+    A populate pass rebinds rows in order (reset(), acquire().bind(...) per element,
+    trim()): rows are only created when a section shows more than it ever did, and
+    the surplus is hidden rather than deleted. Rows connect their signals once and
+    act on whatever element they are currently bound to.
+    """
+    def __init__(self, layout, factory, place=None):
+        self.layout = layout
+        self.factory = factory
+        self.place = place or (lambda row, index: layout.insertWidget(index, row)) # Box layout of rows only
+        self.rows = []
+        self.used = 0
+
+    def reset(self):
+        self.used = 0
+
+    def acquire(self):
+        if self.used == len(self.rows):
+            row = self.factory()
+            row.pool = self
+            self.place(row, self.used)
+            self.rows.append(row)
+        row = self.rows[self.used]
+        self.used += 1
+        row.setVisible(True)
+        return row
+
+    def trim(self):
+        """Unbinds and hides the rows the last pass did not use."""
+        for row in self.rows[self.used:]:
+            row.unbind()
+            row.setVisible(False)
+
+    def release(self, row):
+        """Returns a row whose element was removed to the hidden spare end (box layouts)."""
+        index = self.rows.index(row)
+        if index < self.used: self.used -= 1
+        del self.rows[index]
+        self.rows.append(row)
+        row.unbind()
+        row.setVisible(False)
+        self.layout.removeWidget(row)
+        self.place(row, len(self.rows) - 1)
+
+
+def bound_slot(row, action):
+    """Slot running action() only while the pooled row is bound to an element (returns nothing to Qt)."""
+    def slot(*_):
+        if row.element is not None:
+            action()
+    return slot
+
+
+class FieldRow:
+    """Label + line edit for one attribute of the bound element (pooled in a grid or box layout)."""
+    def __init__(self, editor, on_edited):
+        self.editor = editor
+        self.element = None
+        self.key = None
+        self._completion_path = None
+        self.label = QLabel()
+        self.label.setTextInteractionFlags(Qt.TextInteractionFlag.TextSelectableByMouse | Qt.TextInteractionFlag.TextSelectableByKeyboard)
+        self.input = QLineEdit()
+        self.input.editingFinished.connect(bound_slot(self, lambda: on_edited(self)))
+
+    @staticmethod
+    def grid_placer(layout):
+        return lambda row, index: (layout.addWidget(row.label, index, 0), layout.addWidget(row.input, index, 1))
+
+    @staticmethod
+    def box_placer(layout):
+        return lambda row, index: (layout.insertWidget(2 * index, row.label), layout.insertWidget(2 * index + 1, row.input))
+
+    def bind(self, element, key, completion_path):
+        self.element = element
+        self.key = key
+        self.label.setText(f"{key}:")
+        self.input.setText(element.get(key, ""))
+        self.input.setObjectName(f"input_attr_{key}")
+        if completion_path != self._completion_path:
+            self._completion_path = completion_path
+            self.editor._attach_field_completer(self.input, completion_path)
+
+    def unbind(self):
+        self.element = None
+
+    def setVisible(self, visible):
+        self.label.setVisible(visible)
+        self.input.setVisible(visible)
+
+
+def place_after_rows(grid, pool, widget, offset=0):
+    """Moves a trailing grid widget (e.g. an add button) just below the pool's used rows."""
+    grid.removeWidget(widget)
+    grid.addWidget(widget, pool.used + offset, 0, 1, 2, Qt.AlignmentFlag.AlignLeft)
+
+
 # --- Custom Widget for Generic Properties (like in Abilities) ---
 class PropertyWidget(QWidget):
-    # Assuming PropertyWidget doesn't need major changes based on the initial analysis
-    # Keep its internal logic as it was, but ensure consistency
+    # Pooled by the editor: built once, then bind() points it at another property element
     def __init__(self, element, file_path, editor_instance, parent=None):
         super().__init__(parent)
-        self.element = element
-        self.file_path = file_path
+        self.element = None
+        self.file_path = None
         self.editor = editor_instance
         self._local_populating = False # Use a local flag if needed
 
@@ -52,7 +177,7 @@ class PropertyWidget(QWidget):
         self.main_layout.setContentsMargins(0, 0, 0, 0) # Remove outer margins
 
         # --- 1. Property Name Label ---
-        self.name_label = QLabel(f"{element.tag}:")
+        self.name_label = QLabel()
         self.name_label.setTextInteractionFlags(Qt.TextInteractionFlag.TextSelectableByMouse | Qt.TextInteractionFlag.TextSelectableByKeyboard)
         self.name_label.setFixedWidth(160) # Fixed width for alignment
         self.main_layout.addWidget(self.name_label)
@@ -64,11 +189,9 @@ class PropertyWidget(QWidget):
         self.attributes_layout.setAlignment(Qt.AlignmentFlag.AlignLeft) # Keep attributes close on the left
         self.main_layout.addWidget(self.attributes_container) # Add container to main layout
 
-        self.attribute_widgets = {} # Dictionary to store QLineEdit widgets
-
-        # Add widgets for existing attributes
-        for key, value in sorted(element.attrib.items()):
-            self._add_attribute_widgets_to_layout(key, value)
+        self.attribute_rows = RowPool(self.attributes_layout,
+                                      lambda: FieldRow(self.editor, lambda row: self.attribute_changed(row.key, row.input.text())),
+                                      FieldRow.box_placer(self.attributes_layout))
 
         # --- 3. Stretchable Spacer BEFORE buttons ---
         self.main_layout.addStretch(1)
@@ -83,110 +206,3903 @@ class PropertyWidget(QWidget):
         # --- 5. "X" Button (Remove Property) ---
         self.remove_button = QPushButton("X")
         self.remove_button.setFixedWidth(30)
-        self.remove_button.setToolTip(f"Remove the entire property '{element.tag}'")
         self.remove_button.clicked.connect(self.remove_self)
         self.main_layout.addWidget(self.remove_button)
 
-    def _add_attribute_widgets_to_layout(self, key, value):
-        """Helper to add label and input for an attribute to the layout."""
+        if element is not None:
+            self.bind(element, file_path)
+
+    def bind(self, element, file_path):
+        """Shows another property element, reusing the attribute widgets."""
         self._local_populating = True
         try:
-            logging.debug(f"PropertyWidget: Adding attribute widgets for '{key}' = '{value}' in <{self.element.tag}>")
-            attr_label = QLabel(f"{key}:")
-            attr_label.setTextInteractionFlags(Qt.TextInteractionFlag.TextSelectableByMouse | Qt.TextInteractionFlag.TextSelectableByKeyboard)
-            attr_input = QLineEdit(value)
-            attr_input.setObjectName(f"prop_input_{self.element.tag}_{key}") # Unique object name
-
-            # Add widgets to the *attributes* layout FIRST
-            self.attributes_layout.addWidget(attr_label)
-            self.attributes_layout.addWidget(attr_input)
-            self.attribute_widgets[key] = attr_input # Track the widget
-
-            # Attach QCompleter AFTER adding to layout
-            # Use a consistent pattern like the main editor's _attach_completer
-            if key == 'type':
-                 self.editor._attach_completer(attr_input, self.editor.property_attr_type_model, "Property Type")
-            elif key == 'always_random':
-                 self.editor._attach_completer(attr_input, self.editor.boolean_value_model, "Property Always Random")
-            # Add other elif for specific attributes if needed
-
-            # Connect signal
-            attr_input.editingFinished.connect(lambda k=key, i=attr_input: self.attribute_changed(k, i.text()))
+            self.element = element
+            self.file_path = file_path
+            self.name_label.setText(f"{element.tag}:")
+            self.remove_button.setToolTip(f"Remove the entire property '{element.tag}'")
+            self.attribute_rows.reset()
+            for key in sorted(element.attrib.keys()):
+                self._add_attribute_widgets_to_layout(key)
+            self.attribute_rows.trim()
         finally:
             self._local_populating = False
 
+    def unbind(self):
+        self.element = None
+        for row in self.attribute_rows.rows: row.unbind()
+
+    def _add_attribute_widgets_to_layout(self, key):
+        """Helper to bind the next label/input pair to an attribute of this property."""
+        # logging.debug(f"PropertyWidget: Binding attribute widgets for '{key}' in <{self.element.tag}>")
+        self.attribute_rows.acquire().bind(self.element, key, f"{self._entry_type()}/*@{key}")
+
+    def _entry_type(self):
+        """'ability' or 'item', from the entry this property belongs to (for completion field paths)."""
+        parent = self.element.getparent()
+        return parent.tag if parent is not None and parent.tag == TAG_ITEM else TAG_ABILITY
+
     def attribute_changed(self, key, new_value):
-        if self.editor._populating_details or self._local_populating: return # Check both flags
+        if self.editor._populating_details or self._local_populating or self.element is None: return # Check both flags
         old_value = self.element.get(key)
         if old_value != new_value:
             logging.info(f"Property Attr '{key}' changed from '{old_value}' to '{new_value}' for <{self.element.tag}> in file {os.path.basename(self.file_path)}")
-            self.element.set(key, new_value)
-            self.editor.mark_file_modified(self.file_path)
+            self.editor.edit_attribute(self.element, key, new_value, f"Change {self.element.tag}.{key}")
 
     def add_attribute(self):
         """Adds a new attribute to this specific property (element)."""
-        if self.editor._populating_details or self._local_populating: return
-
-        dialog = QInputDialog(self.editor)
-        dialog.setWindowTitle("Add Property Attribute")
-        dialog.setLabelText("Name of new attribute:")
-        line_edit = dialog.findChild(QLineEdit)
-        if line_edit:
-            # Attach model with known property attribute names
-            self.editor._attach_completer(line_edit, self.editor.property_attribute_name_model, "New Property Attribute Name")
-
-        if dialog.exec() == QDialog.DialogCode.Accepted:
-            attr_name = dialog.textValue().strip().replace(" ", "_") # Basic cleanup
-            if attr_name and attr_name not in self.element.attrib:
-                default_value = "" # Can set a default like "0" or "false"
-                logging.info(f"Adding attribute '{attr_name}' to <{self.element.tag}> with default value '{default_value}'")
-                self.element.set(attr_name, default_value)
-                self.editor.mark_file_modified(self.file_path)
-
-                # Dynamically add widgets to the UI
-                self._add_attribute_widgets_to_layout(attr_name, default_value)
-
-                # Update the editor's global set and model for property attribute names
-                if attr_name not in self.editor.all_property_attribute_names:
-                    self.editor.all_property_attribute_names.add(attr_name)
-                    self.editor._update_single_completer_model(
-                        self.editor.property_attribute_name_model,
-                        self.editor.all_property_attribute_names,
-                        "property_attribute_name"
-                    )
-
-            elif attr_name in self.element.attrib:
-                QMessageBox.warning(self, "Error", f"Attribute '{attr_name}' already exists for this property.")
-            elif not attr_name:
-                 QMessageBox.warning(self, "Error", "Attribute name cannot be empty.")
+        if self.editor._populating_details or self._local_populating or self.element is None: return
+        attr_name = self.editor.add_property_attribute(self.element, self._entry_type())
+        if attr_name:
+            # Dynamically add widgets to the UI
+            self._local_populating = True
+            try:
+                self._add_attribute_widgets_to_layout(attr_name)
+            finally:
+                self._local_populating = False
+            # (The completion index picks up the new attribute name from the change bus)
 
     def remove_self(self):
         """Removes this entire property (PropertyWidget) and its corresponding XML element."""
-        if self.editor._populating_details or self._local_populating: return
+        if self.editor._populating_details or self._local_populating or self.element is None: return
+        if self.editor.remove_property(self.element, self.file_path):
+            # Hand the row back to the pool (hidden for reuse)
+            # Note: Not refreshing the whole panel to avoid recreating everything.
+            self.pool.release(self)
 
-        confirm = QMessageBox.question(self, "Remove Property", f"Are you sure you want to remove the entire property '{self.element.tag}'?")
-        if confirm == QMessageBox.StandardButton.Yes:
-            # Find parent element using the editor's helper
-            parent_element = self.editor.get_parent_element(self.element, self.file_path)
-            if parent_element is not None:
+
+class BaseAbilityRow(QWidget):
+    """Pooled row for a <base_abilities> -> <a> element."""
+    def __init__(self, editor, parent=None):
+        super().__init__(parent)
+        self.editor = editor
+        self.element = None
+        layout = QHBoxLayout(self)
+        layout.setContentsMargins(0, 0, 0, 0)
+
+        self.ab_input = QLineEdit()
+        self.ab_input.setPlaceholderText("Ability Name")
+        self.remove_button = QPushButton("X")
+        self.remove_button.setFixedWidth(30)
+        self.remove_button.setToolTip("Remove this base ability reference")
+        layout.addWidget(self.ab_input)
+        layout.addWidget(self.remove_button)
+        editor._attach_field_completer(self.ab_input, f"{TAG_ITEM}/{TAG_BASE_ABILITIES}/{TAG_ABILITY_REF}#text", "Base Ability Name")
+
+        # Connected once; the handlers act on the currently bound element
+        self.ab_input.editingFinished.connect(
+            bound_slot(self, lambda: editor.base_ability_text_changed(self.element, self.ab_input.text())))
+        self.remove_button.clicked.connect(
+            bound_slot(self, lambda: editor.remove_list_widget(self, self.element, TAG_BASE_ABILITIES, self.pool, "Base Ability")))
+
+    def bind(self, ab_element):
+        self.element = ab_element
+        self.ab_input.setText(ab_element.text.strip() if ab_element.text else "")
+
+    def unbind(self):
+        self.element = None
+
+
+class RecyclingPartRow(QWidget):
+    """Pooled row for a <recycling_parts> -> <parts> element."""
+    def __init__(self, editor, parent=None):
+        super().__init__(parent)
+        self.editor = editor
+        self.element = None
+        layout = QHBoxLayout(self)
+        layout.setContentsMargins(0, 0, 0, 0)
+        layout.setSpacing(5)
+
+        self.count_input = QLineEdit()
+        self.count_input.setFixedWidth(50)
+        self.count_input.setPlaceholderText("Qty")
+        self.name_input = QLineEdit()
+        self.name_input.setPlaceholderText("Part Item Name")
+        self.remove_button = QPushButton("X")
+        self.remove_button.setFixedWidth(30)
+        self.remove_button.setToolTip("Remove this recycling part")
+        layout.addWidget(QLabel("Count:"))
+        layout.addWidget(self.count_input)
+        layout.addWidget(QLabel(" Name:")) # Add space for visual separation
+        layout.addWidget(self.name_input)
+        layout.addStretch(1) # Push button to the right
+        layout.addWidget(self.remove_button)
+        editor._attach_field_completer(self.name_input, f"{TAG_ITEM}/{TAG_RECYCLING_PARTS}/{TAG_PARTS}#text", "Recycling Part Name")
+
+        self.count_input.editingFinished.connect(
+            bound_slot(self, lambda: editor.part_attribute_changed(self.element, 'count', self.count_input.text())))
+        self.name_input.editingFinished.connect(
+            bound_slot(self, lambda: editor.part_text_changed(self.element, self.name_input.text())))
+        self.remove_button.clicked.connect(
+            bound_slot(self, lambda: editor.remove_list_widget(self, self.element, TAG_RECYCLING_PARTS, self.pool, "Recycling Part")))
+
+    def bind(self, part_element):
+        self.element = part_element
+        self.count_input.setText(part_element.get('count', '1')) # Default to 1 if count missing
+        self.name_input.setText(part_element.text.strip() if part_element.text else "")
+
+    def unbind(self):
+        self.element = None
+
+
+class NestedVariantRow(QWidget):
+    """Pooled row for an element nested in a <variant> (e.g. <item>, <ability>)."""
+    def __init__(self, editor, parent=None):
+        super().__init__(parent)
+        self.editor = editor
+        self.element = None
+        self.variant_element = None
+        self._completion_path = None
+        layout = QHBoxLayout(self)
+        layout.setContentsMargins(0, 0, 0, 0)
+        layout.setSpacing(5)
+
+        self.tag_label = QLabel()
+        self.tag_label.setFixedWidth(50) # Adjust width as needed
+        self.tag_label.setTextInteractionFlags(Qt.TextInteractionFlag.TextSelectableByMouse | Qt.TextInteractionFlag.TextSelectableByKeyboard)
+        self.text_input = QLineEdit()
+        self.remove_button = QPushButton("x") # Smaller button
+        self.remove_button.setFixedWidth(25)
+        layout.addWidget(self.tag_label)
+        layout.addWidget(self.text_input)
+        layout.addWidget(self.remove_button)
+
+        self.text_input.editingFinished.connect(
+            bound_slot(self, lambda: editor.nested_variant_item_text_changed(self.element, self.text_input.text())))
+        self.remove_button.clicked.connect(
+            bound_slot(self, lambda: editor.remove_nested_variant_item(self, self.element, self.variant_element)))
+
+    def bind(self, child_element, variant_element):
+        self.element = child_element
+        self.variant_element = variant_element
+        child_tag = child_element.tag
+        self.tag_label.setText(f"{child_tag}:")
+        self.text_input.setText(child_element.text.strip() if child_element.text else "")
+        self.remove_button.setToolTip(f"Remove this <{child_tag}> element")
+        path = f"{self.editor.VARIANT_FIELD_PATH}/{child_tag.lower()}#text"
+        if path != self._completion_path:
+            self._completion_path = path
+            self.editor._attach_field_completer(self.text_input, path, f"Nested Variant Element '{child_tag}'")
+
+    def unbind(self):
+        self.element = None
+        self.variant_element = None
+
+
+def variant_summary(var_element):
+    """One-line description of a <variant>: its attributes and nested element count."""
+    summary = ", ".join(f"{key}={value}" for key, value in var_element.attrib.items()) or "(no attributes)"
+    nested_count = sum(1 for child in var_element if isinstance(child.tag, str))
+    if nested_count: summary += f"  [{nested_count} nested]"
+    return summary
+
+
+class VariantRow(QWidget):
+    """Pooled row for a <variants> -> <variant> element.
+
+    Collapsed, it is a one-line header (expand arrow, attribute summary, remove button).
+    The attribute and nested-element editors are built the first time any variant
+    bound to this row is expanded, and only bound while it is expanded.
+    """
+    SUMMARY_LENGTH = 120 # Characters of "key=value, ..." shown in the header
+
+    def __init__(self, editor, parent=None):
+        super().__init__(parent)
+        self.editor = editor
+        self.element = None
+        self.expanded = False
+        self.body = None # Attribute and nested-element editors, built on the first expand
+        self.setObjectName(f"VariantRow_{id(self)}")
+        # Use a border for visual separation of variants
+        self.setStyleSheet(f"QWidget#VariantRow_{id(self)} {{ border: 1px solid gray; margin-bottom: 5px; }}")
+
+        self.row_layout = QVBoxLayout(self)
+        self.row_layout.setContentsMargins(5, 5, 5, 5)
+        self.row_layout.setSpacing(5)
+
+        # --- Header: expand arrow, summary, remove button for the whole variant ---
+        header_layout = QHBoxLayout()
+        header_layout.setContentsMargins(0, 0, 0, 0)
+        self.expand_button = QToolButton()
+        self.expand_button.setArrowType(Qt.ArrowType.RightArrow)
+        self.expand_button.setAutoRaise(True)
+        self.expand_button.setCheckable(True)
+        self.expand_button.setToolTip("Show or hide the attributes and nested elements of this variant")
+        self.expand_button.clicked.connect(bound_slot(self, lambda: self.set_expanded(self.expand_button.isChecked(), remember=True)))
+        self.summary_label = QLabel()
+        self.summary_label.setTextFormat(Qt.TextFormat.PlainText)
+        self.remove_button = QPushButton("X")
+        self.remove_button.setFixedWidth(30)
+        self.remove_button.setSizePolicy(QSizePolicy.Policy.Fixed, QSizePolicy.Policy.Fixed)
+        self.remove_button.setToolTip("Remove this entire variant")
+        self.remove_button.clicked.connect(
+            bound_slot(self, lambda: editor.remove_list_widget(self, self.element, TAG_VARIANTS, self.pool, "Variant")))
+        header_layout.addWidget(self.expand_button)
+        header_layout.addWidget(self.summary_label, 1)
+        header_layout.addWidget(self.remove_button)
+        self.row_layout.addLayout(header_layout)
+
+    def _build_body(self):
+        editor = self.editor
+        self.body = QWidget()
+        details_layout = QVBoxLayout(self.body)
+        details_layout.setContentsMargins(20, 0, 0, 0) # Indent under the header
+        details_layout.setSpacing(5)
+
+        # --- Variant Attributes ---
+        self.attributes_layout = QGridLayout()
+        self.attributes_layout.setContentsMargins(0, 0, 0, 5)
+        details_layout.addLayout(self.attributes_layout)
+        self.attribute_rows = RowPool(self.attributes_layout,
+                                      lambda: FieldRow(editor, self._attribute_edited),
+                                      FieldRow.grid_placer(self.attributes_layout))
+        self.no_attr_label = QLabel("<i>No attributes defined for this variant.</i>")
+        self.add_attr_button = QPushButton(QIcon.fromTheme("list-add"), "+ Variant Attribute")
+        self.add_attr_button.setToolTip("Add a new attribute to this specific variant")
+        self.add_attr_button.clicked.connect(bound_slot(self, lambda: editor.add_variant_attribute(self)))
+        self.attributes_layout.addWidget(self.no_attr_label, 0, 0, 1, 2)
+        self.attributes_layout.addWidget(self.add_attr_button, 1, 0, 1, 2, Qt.AlignmentFlag.AlignLeft)
+
+        # --- Nested Elements (e.g., <item>, <ability>) ---
+        nested_container = QWidget() # Container for nested items + add button
+        nested_container_layout = QVBoxLayout(nested_container)
+        nested_container_layout.setContentsMargins(15, 5, 0, 5) # Indent nested items
+        nested_container_layout.setSpacing(3)
+        details_layout.addWidget(nested_container)
+        nested_items_layout = QVBoxLayout() # Layout *just* for the nested item rows
+        nested_items_layout.setContentsMargins(0, 0, 0, 0)
+        nested_items_layout.setSpacing(1)
+        nested_container_layout.addLayout(nested_items_layout)
+        self.nested_rows = RowPool(nested_items_layout, lambda: NestedVariantRow(editor))
+        self.no_nested_label = QLabel("<i>No nested elements (e.g., <item>, <ability>) found.</i>")
+        nested_container_layout.addWidget(self.no_nested_label)
+        self.add_nested_button = QPushButton(QIcon.fromTheme("list-add"), "+ Nested Element")
+        self.add_nested_button.setToolTip("Add a new element (e.g., <item>, <ability>) inside this variant")
+        self.add_nested_button.clicked.connect(bound_slot(self, lambda: editor.add_nested_variant_item(self)))
+        nested_container_layout.addWidget(self.add_nested_button, alignment=Qt.AlignmentFlag.AlignLeft)
+
+        self.row_layout.addWidget(self.body)
+
+    def bind(self, var_element, expanded=False, summary=None):
+        self.element = var_element
+        self.update_summary(summary)
+        self.set_expanded(expanded)
+
+    def unbind(self):
+        self.element = None
+        self._unbind_body()
+
+    def set_expanded(self, expanded, remember=False):
+        """Shows (binding its editors) or hides the body; remember=True records it for the item."""
+        self.expanded = expanded
+        self.expand_button.setChecked(expanded)
+        self.expand_button.setArrowType(Qt.ArrowType.DownArrow if expanded else Qt.ArrowType.RightArrow)
+        if expanded:
+            if self.body is None: self._build_body()
+            self._bind_body()
+        else:
+            self._unbind_body()
+        if self.body is not None: self.body.setVisible(expanded)
+        if remember: self.editor.variant_expanded_changed(self.element, expanded)
+
+    def _bind_body(self):
+        var_element = self.element
+        self.attribute_rows.reset()
+        for key in sorted(var_element.attrib.keys()):
+            self.attribute_rows.acquire().bind(var_element, key, f"{self.editor.VARIANT_FIELD_PATH}@{key}")
+        self.attribute_rows.trim()
+        self._place_attribute_controls()
+
+        self.nested_rows.reset()
+        for child_node in var_element: # Iterate through all children
+            if ET.iselement(child_node): # Process only elements
+                self.nested_rows.acquire().bind(child_node, var_element)
+        self.nested_rows.trim()
+        self.no_nested_label.setVisible(not self.nested_rows.used)
+
+    def _unbind_body(self):
+        if self.body is None: return
+        for row in self.attribute_rows.rows: row.unbind()
+        for row in self.nested_rows.rows: row.unbind()
+
+    def update_summary(self, summary=None):
+        """Header text: the variant's attributes and how many nested elements it has."""
+        if summary is None: summary = variant_summary(self.element)
+        self.summary_label.setToolTip(summary if len(summary) > self.SUMMARY_LENGTH else "")
+        self.summary_label.setText(summary if len(summary) <= self.SUMMARY_LENGTH else summary[:self.SUMMARY_LENGTH - 3] + "...")
+
+    def _attribute_edited(self, row):
+        self.editor.variant_attribute_changed(row.element, row.key, row.input.text())
+        self.update_summary()
+
+    def _place_attribute_controls(self):
+        has_attributes = bool(self.attribute_rows.used)
+        self.no_attr_label.setVisible(not has_attributes)
+        if not has_attributes: place_after_rows(self.attributes_layout, self.attribute_rows, self.no_attr_label)
+        place_after_rows(self.attributes_layout, self.attribute_rows, self.add_attr_button, 0 if has_attributes else 1)
+
+    def add_attribute_row(self, key):
+        """Shows one more attribute (just added to the bound variant) above the add button."""
+        self.attribute_rows.acquire().bind(self.element, key, f"{self.editor.VARIANT_FIELD_PATH}@{key}")
+        self._place_attribute_controls()
+        self.update_summary()
+
+    def add_nested_row(self, child_element):
+        self.nested_rows.acquire().bind(child_element, self.element)
+        self.no_nested_label.setVisible(False)
+        self.update_summary()
+
+
+# --- Details View-Models (read ahead of binding, prefetched while idle) ---
+class EntryDetails:
+    """What the details pane binds for one entry, read from its element in one pass.
+
+    populate_details only binds rows from it, so an entry prepared ahead of time
+    (see DetailsPrefetcher) is shown without walking its subtree again.
+    """
+    __slots__ = ("element", "tags_text", "attribute_keys", "sections", "variant_summaries", "properties", "completion_paths")
+
+    def __init__(self, entry_type, element, property_skip_tags):
+        self.element = element
+        tags_element = element.find(TAG_TAGS)
+        self.tags_text = tags_element.text.strip() if tags_element is not None and tags_element.text else ""
+        self.attribute_keys = []
+        self.sections = {}          # {section tag: [child elements]} (items)
+        self.variant_summaries = []
+        self.properties = []        # Property child elements (abilities)
+        if entry_type == TAG_ITEM:
+            self.attribute_keys = sorted(key for key in element.attrib.keys() if key != 'name') # Name is shown in the common field
+            for section_tag, child_tag in ITEM_LIST_SECTIONS:
+                section_node = element.find(section_tag)
+                self.sections[section_tag] = section_node.findall(child_tag) if section_node is not None else []
+            self.variant_summaries = [variant_summary(variant) for variant in self.sections[TAG_VARIANTS]]
+            self.completion_paths = [f"{TAG_ITEM}@{key}" for key in self.attribute_keys]
+        else:
+            self.properties = [child for child in element if ET.iselement(child) and child.tag not in property_skip_tags]
+            self.completion_paths = sorted({f"{TAG_ABILITY}/*@{key}" for child in self.properties for key in child.attrib.keys()})
+
+
+class DetailsPrefetcher(QObject):
+    """Keeps EntryDetails for recent and neighbouring entries in a small LRU.
+
+    schedule() queues entries (list neighbours of the selection, recent history)
+    that are not cached yet. A zero-interval timer, which only fires when the event
+    queue is empty, prepares one of them per tick, so keyboard input is never
+    delayed by more than one entry. Edits evict the entries they touched.
+    """
+    CACHE_SIZE = 32
+    HISTORY_SIZE = 8
+
+    def __init__(self, build, parent=None):
+        super().__init__(parent)
+        self.build = build # build(entry_type, name, warm) -> EntryDetails, or None if the entry is gone
+        self._cache = OrderedDict() # {(entry_type, name): EntryDetails}
+        self._queue = []
+        self.history = [] # Recently shown (entry_type, name), newest last
+        self._timer = QTimer(self)
+        self._timer.setInterval(0)
+        self._timer.timeout.connect(self._prefetch_next)
+
+    def get(self, entry_type, name, element):
+        """Cached details of an entry (if still for this element), else builds them now."""
+        key = (entry_type, name)
+        if key in self.history: self.history.remove(key)
+        self.history = (self.history + [key])[-self.HISTORY_SIZE:]
+        details = self._cache.get(key)
+        if details is not None and details.element is element:
+            self._cache.move_to_end(key)
+            return details
+        details = self.build(entry_type, name, False)
+        if details is not None: self._store(key, details)
+        return details
+
+    def _store(self, key, details):
+        self._cache[key] = details
+        self._cache.move_to_end(key)
+        while len(self._cache) > self.CACHE_SIZE:
+            self._cache.popitem(last=False)
+
+    def schedule(self, keys):
+        """Queues entries to prepare while idle (replacing the previous queue)."""
+        self._queue = [key for key in dict.fromkeys(keys) if key not in self._cache]
+        if self._queue: self._timer.start()
+
+    def _prefetch_next(self):
+        if not self._queue:
+            self._timer.stop()
+            return
+        key = self._queue.pop(0)
+        if key not in self._cache:
+            details = self.build(key[0], key[1], True)
+            if details is not None: self._store(key, details)
+
+    def evict(self, elements):
+        """Drops cached details of the given entry elements."""
+        stale = [key for key, details in self._cache.items() if any(details.element is element for element in elements)]
+        for key in stale: del self._cache[key]
+
+    def clear(self):
+        self._cache.clear()
+        self._queue = []
+        self._timer.stop()
+
+
+# --- Field Helpers (attribute or 'property.attribute' of an entry) ---
+def split_field(field):
+    """Splits 'property.attribute' into (property, attribute). Plain attribute names give (None, name)."""
+    if FIELD_SEPARATOR in field:
+        prop, attr = field.rsplit(FIELD_SEPARATOR, 1)
+        return prop, attr
+    return None, field
+
+def get_field_value(element, field):
+    """Returns the value of an entry field, or None if the attribute/property is missing."""
+    prop, attr = split_field(field)
+    if prop is None:
+        return element.get(attr)
+    prop_element = element.find(prop)
+    return prop_element.get(attr) if prop_element is not None else None
+
+
+# --- Undo/Redo (element-level diffs) ---
+# Every change to a loaded tree is one of these primitive ops. They are small tuples
+# holding the touched element plus old/new values, never copies of the tree:
+#   (OP_SET_ATTR,   element, key, old, new)         None means "attribute absent"
+#   (OP_SET_TEXT,   element, old, new)
+#   (OP_SET_TAG,    element, old, new)
+#   (OP_SET_ATTRIB, element, old_items, new_items)  whole attribute list, keeps order on renames
+#   (OP_INSERT,     parent, index, child)
+#   (OP_REMOVE,     parent, index, child)
+OP_SET_ATTR = "attr"
+OP_SET_TEXT = "text"
+OP_SET_TAG = "tag"
+OP_SET_ATTRIB = "attrib"
+OP_INSERT = "insert"
+OP_REMOVE = "remove"
+
+def apply_xml_op(op):
+    kind = op[0]
+    if kind == OP_SET_ATTR:
+        _, element, key, _old, new = op
+        if new is None:
+            element.attrib.pop(key, None)
+        else:
+            element.set(key, new)
+    elif kind == OP_SET_TEXT:
+        op[1].text = op[3]
+    elif kind == OP_SET_TAG:
+        op[1].tag = op[3]
+    elif kind == OP_SET_ATTRIB:
+        element = op[1]
+        element.attrib.clear()
+        for key, value in op[3]: element.set(key, value)
+    elif kind == OP_INSERT:
+        op[1].insert(op[2], op[3])
+    elif kind == OP_REMOVE:
+        op[1].remove(op[3])
+
+def invert_xml_op(op):
+    kind = op[0]
+    if kind == OP_SET_ATTR:
+        return (kind, op[1], op[2], op[4], op[3])
+    if kind in (OP_SET_TEXT, OP_SET_TAG, OP_SET_ATTRIB):
+        return (kind, op[1], op[3], op[2])
+    return (OP_REMOVE if kind == OP_INSERT else OP_INSERT, op[1], op[2], op[3])
+
+
+class XmlEditBatch:
+    """Applies XML changes immediately and records them as reversible ops.
+
+    One batch becomes one undo step, however many elements it touched. With a
+    ChangeBus, each op is announced before it is applied (see ChangeBus).
+    """
+    def __init__(self, bus=None):
+        self.bus = bus
+        self.ops = []
+
+    def __len__(self):
+        return len(self.ops)
+
+    def _record(self, op):
+        if self.bus is not None: self.bus.about_to_apply.emit(op)
+        apply_xml_op(op)
+        self.ops.append(op)
+        return True
+
+    def set_attr(self, element, key, value):
+        old = element.get(key)
+        if old == value: return False
+        return self._record((OP_SET_ATTR, element, key, old, value))
+
+    def set_text(self, element, text):
+        if element.text == text: return False
+        return self._record((OP_SET_TEXT, element, element.text, text))
+
+    def set_tag(self, element, tag):
+        if element.tag == tag: return False
+        return self._record((OP_SET_TAG, element, element.tag, tag))
+
+    def set_attrib(self, element, items):
+        old_items = tuple(element.attrib.items())
+        items = tuple(items)
+        if old_items == items: return False
+        return self._record((OP_SET_ATTRIB, element, old_items, items))
+
+    def insert(self, parent, index, child):
+        return self._record((OP_INSERT, parent, index, child))
+
+    def sub_element(self, parent, tag, attrib=None, text=None):
+        """Like ET.SubElement, but undoable."""
+        child = ET.Element(tag)
+        for key, value in (attrib or {}).items(): child.set(key, value)
+        if text is not None: child.text = text
+        self.insert(parent, len(parent), child)
+        return child
+
+    def remove(self, child, parent=None):
+        """Removes child from parent (default: its current parent). Raises ValueError if it is not a child."""
+        if parent is None: parent = child.getparent()
+        if parent is None: raise ValueError("Element has no parent")
+        return self._record((OP_REMOVE, parent, parent.index(child), child))
+
+    def rollback(self):
+        """Reverts the applied ops (e.g. after an error part-way through) and announces the abort."""
+        for op in reversed(self.ops): apply_xml_op(invert_xml_op(op))
+        self.ops = []
+        if self.bus is not None: self.bus.aborted.emit()
+
+
+class XmlEditCommand(QUndoCommand):
+    """Undo stack entry for one committed XmlEditBatch."""
+    def __init__(self, editor, description, ops, op_files, selection):
+        super().__init__(description)
+        self.editor = editor
+        self.ops = tuple(ops)
+        self.op_files = tuple(op_files) # Loaded file each op changed, None if not found (see _files_of_ops)
+        self.file_paths = frozenset(fp for fp in self.op_files if fp)
+        self.selection = selection # (entry_type, name) shown when the edit was made
+        self._skip_redo = True # The batch already changed the tree; the redo() from push() is a no-op
+
+    def drop_file(self, file_path):
+        """Forgets the ops that changed file_path (its tree was replaced). A command left without
+        ops is made obsolete, so the stack drops it when reached instead of undoing nothing."""
+        kept = [(op, fp) for op, fp in zip(self.ops, self.op_files) if fp != file_path]
+        if len(kept) == len(self.ops): return
+        self.ops = tuple(op for op, _fp in kept)
+        self.op_files = tuple(fp for _op, fp in kept)
+        self.file_paths = frozenset(fp for fp in self.op_files if fp)
+        if not self.ops: self.setObsolete(True)
+
+    def redo(self):
+        if self._skip_redo:
+            self._skip_redo = False
+            return
+        self._replay(self.ops, 1)
+
+    def undo(self):
+        self._replay([invert_xml_op(op) for op in reversed(self.ops)], -1)
+
+    def _replay(self, ops, step):
+        bus = self.editor.change_bus
+        for op in ops:
+            bus.about_to_apply.emit(op)
+            apply_xml_op(op)
+        bus.applied.emit(ops)
+        # QUndoStack moves its index after undo()/redo() returned
+        self.editor._after_history_change(self, ops, self.editor.undo_stack.index() + step)
+
+
+def entry_type_of(element, parent):
+    """TAG_ABILITY/TAG_ITEM if element is an entry directly under its container, else None."""
+    if parent is None: return None
+    if element.tag == TAG_ABILITY and parent.tag == TAG_ABILITIES: return TAG_ABILITY
+    if element.tag == TAG_ITEM and parent.tag == TAG_ITEMS: return TAG_ITEM
+    return None
+
+def enclosing_entry(element):
+    """Returns (entry_type, entry_element) of the ability/item containing element (or being it), or None."""
+    while element is not None:
+        parent = element.getparent()
+        entry_type = entry_type_of(element, parent)
+        if entry_type: return entry_type, element
+        element = parent
+    return None
+
+def is_within(element, root):
+    """True if element is root or inside it. (A removed element still reports its old document's root as getroottree().getroot().)"""
+    while element is not None:
+        if element is root: return True
+        element = element.getparent()
+    return False
+
+def entries_within(element):
+    """Yields (entry_type, entry_element) for entries inside element (e.g. a removed <items> container)."""
+    if not isinstance(element.tag, str): return
+    for child in element.iter(TAG_ABILITY, TAG_ITEM):
+        entry_type = entry_type_of(child, child.getparent())
+        if entry_type and child is not element: yield entry_type, child
+
+
+class ChangeBus(QObject):
+    """Central publish point for changes to the loaded trees.
+
+    about_to_apply(op) is emitted right before each primitive op changes a tree (edits,
+    undo and redo alike), applied(ops) once after a committed batch or undo/redo step,
+    aborted() after a batch was rolled back instead of committed (subscribers drop what
+    they gathered from its about_to_apply), and reset() after the indexes were rebuilt
+    from scratch (load, full reindex). Indexes subscribe here instead of being patched
+    by each edit handler.
+    """
+    about_to_apply = Signal(object)
+    applied = Signal(object)
+    aborted = Signal()
+    reset = Signal()
+
+
+class SortedStringListModel(QAbstractListModel):
+    """Completion model over a sorted list of unique strings.
+
+    Single values are inserted/removed at their bisect position with
+    beginInsertRows/beginRemoveRows, so attached completers keep their state and
+    an edit costs O(log n) to locate instead of a full re-sort and reset.
+    """
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self._values = []
+
+    def rowCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else len(self._values)
+
+    def data(self, index, role=Qt.ItemDataRole.DisplayRole):
+        if index.isValid() and role in (Qt.ItemDataRole.DisplayRole, Qt.ItemDataRole.EditRole):
+            return self._values[index.row()]
+        return None
+
+    def stringList(self):
+        return list(self._values)
+
+    def set_values(self, values):
+        """Replaces all rows in one reset (bulk load). values must be unique."""
+        self.beginResetModel()
+        self._values = sorted(values)
+        self.endResetModel()
+
+    def insert_value(self, value):
+        row = bisect_left(self._values, value)
+        if row < len(self._values) and self._values[row] == value: return False
+        self.beginInsertRows(QModelIndex(), row, row)
+        self._values.insert(row, value)
+        self.endInsertRows()
+        return True
+
+    def remove_value(self, value):
+        row = bisect_left(self._values, value)
+        if row >= len(self._values) or self._values[row] != value: return False
+        self.beginRemoveRows(QModelIndex(), row, row)
+        del self._values[row]
+        self.endRemoveRows()
+        return True
+
+
+# --- Completion Registry (field path -> completion domain) ---
+# Path syntax: '<entry type>[/<child tag>...]' then an optional selector:
+#   '@attr' = value of that attribute, '@*' = attribute names, '#text' = stripped text,
+#   '#tags' = comma separated text, none = the element's tag. A '*' step matches any child
+#   tag without a path of its own. A domain may be a tuple: the loader fills all of them and
+#   fields attach to the first. [Completions] in the config adds or overrides paths.
+COMPLETION_FIELDS = {
+    "ability@name": "ability_names",
+    "ability/tags#tags": "tags",
+    "ability/*": "prop_names",
+    "ability/*@*": "prop_attr_names",
+    "ability/*@type": "prop_attr_types",
+    "ability/*@always_random": "booleans",
+    "item@name": "item_names",
+    "item@*": "item_attr_names",
+    "item@category": "item_categories",
+    "item@ability_mode": "ability_modes",
+    "item@equip_template": "equip_templates",
+    "item@equip_slot": "equip_slots",
+    "item@hold_slot": "hold_slots",
+    "item@hand": "hands",
+    "item@sound_identification": "sound_ids",
+    "item@draw_event": "events",
+    "item@holster_event": "events",
+    "item@draw_act": "anim_actions",
+    "item@draw_deact": "anim_actions",
+    "item@holster_act": "anim_actions",
+    "item@holster_deact": "anim_actions",
+    "item@localisation_key_name": "loc_keys",
+    "item@localisation_key_description": "loc_keys",
+    "item@icon_path": "icon_paths",
+    "item@enhancement_slots": "enhancement_slots",
+    "item@weapon": "booleans",
+    "item@lethal": "booleans",
+    "item@quest": "booleans",
+    "item@indestructible": "booleans",
+    "item/tags#tags": "tags",
+    "item/base_abilities/a#text": "ability_names",
+    "item/recycling_parts/parts#text": ("item_names", "recycling_parts"), # Parts are items
+    "item/variants/variant@*": "variant_attr_names",
+    "item/variants/variant@category": "item_categories",
+    "item/variants/variant@ability_mode": "ability_modes",
+    "item/variants/variant@equip_template": "equip_templates",
+    "item/variants/variant@equip_slot": "equip_slots",
+    "item/variants/variant@hold_slot": "hold_slots",
+    "item/variants/variant@required_build": "booleans",
+    "item/variants/variant/*": "variant_nested_tags",
+    "item/variants/variant/item": "variant_nested_tags",
+    "item/variants/variant/item#text": "item_names",
+    "item/variants/variant/ability": "variant_nested_tags",
+    "item/variants/variant/ability#text": "ability_names",
+    "item/*": "prop_names",
+    "item/*@*": "prop_attr_names",
+    "item/*@type": "prop_attr_types",
+    "item/*@always_random": "booleans",
+}
+
+class CompletionFieldNode:
+    """One element step of the compiled registry: what it contributes and where its children go."""
+    __slots__ = ('tag_domains', 'attr_name_domains', 'attr_domains', 'text_domains', 'list_domains', 'children', 'other')
+
+    def __init__(self):
+        self.tag_domains = ()
+        self.attr_name_domains = ()
+        self.attr_domains = {} # {attribute: domains}
+        self.text_domains = ()
+        self.list_domains = ()
+        self.children = {}     # {tag: CompletionFieldNode}
+        self.other = None      # Node for '*' (children without a node of their own)
+
+def completion_domains(domain):
+    return tuple(domain) if isinstance(domain, (tuple, list)) else (domain,)
+
+def completion_field_key(path):
+    """Registry key of a field path: element steps match tags case-insensitively, attribute names keep their case."""
+    element_path, selector = re.match(r'([^@#]*)(.*)', path).groups()
+    return element_path.lower() + selector
+
+
+class EditorConfigParser(configparser.ConfigParser):
+    """ConfigParser for editor_config.ini: setting names stay case-insensitive (stored lowercase,
+    as before), while [Completions] field paths (containing '/', '@' or '#') keep their case."""
+    def optionxform(self, optionstr):
+        return optionstr if any(c in optionstr for c in '/@#') else optionstr.lower()
+
+def compile_completion_fields(fields, skip_domains=(), structural_tags=None):
+    """Turns {path: domain} into {entry type: CompletionFieldNode}, leaving out skip_domains.
+
+    structural_tags ({entry type: tags}) get nodes even without a path, so '*' never
+    treats them as generic properties.
+    """
+    schema = {}
+    def node_for(steps):
+        steps = [step.lower() for step in steps]
+        node = schema.setdefault(steps[0], CompletionFieldNode())
+        for step in steps[1:]:
+            if step == '*':
+                if node.other is None: node.other = CompletionFieldNode()
+                node = node.other
+            else:
+                node = node.children.setdefault(step, CompletionFieldNode())
+        return node
+    for entry_type, tags in (structural_tags or {}).items():
+        for tag in tags: node_for([entry_type, tag])
+    for path, domain in fields.items():
+        domains = tuple(d for d in completion_domains(domain) if d not in skip_domains)
+        if not domains: continue
+        element_path, selector = re.match(r'([^@#]+)(.*)', path).groups()
+        node = node_for(element_path.split('/'))
+        if selector == '@*': node.attr_name_domains += domains
+        elif selector.startswith('@'): node.attr_domains[selector[1:]] = node.attr_domains.get(selector[1:], ()) + domains
+        elif selector == '#text': node.text_domains += domains
+        elif selector == '#tags': node.list_domains += domains
+        elif not selector: node.tag_domains += domains
+        else: logging.warning(f"Ignoring completion field '{path}': unknown selector '{selector}'.")
+    return schema
+
+def collect_completions(node, element):
+    """Yields (domain, value) for element and its descendants per the compiled node (one dict lookup per attribute/child)."""
+    for domain in node.tag_domains: yield domain, element.tag
+    if node.attr_name_domains or node.attr_domains:
+        for key, value in element.attrib.items():
+            for domain in node.attr_name_domains: yield domain, key
+            if value:
+                for domain in node.attr_domains.get(key, ()): yield domain, value
+    if (node.text_domains or node.list_domains) and element.text:
+        text = element.text.strip()
+        if text:
+            for domain in node.text_domains: yield domain, text
+            for domain in node.list_domains: yield from ((domain, t.strip()) for t in text.split(',') if t.strip())
+    if node.children or node.other is not None:
+        children, other = node.children, node.other
+        for child in element:
+            if not isinstance(child.tag, str): continue # Comments / PIs
+            child_node = children.get(child.tag) or children.get(child.tag.lower(), other) # Steps are lowercase
+            if child_node is not None: yield from collect_completions(child_node, child)
+
+def entry_containers_of(root):
+    """<abilities> then <items> containers under root, in the order iter_root_entries walks them."""
+    return root.findall(f'.//{TAG_ABILITIES}') + root.findall(f'.//{TAG_ITEMS}')
+
+def iter_root_entries(root):
+    """Yields (entry_type, element) for every ability/item under root, duplicates included."""
+    for abilities_node in root.findall(f'.//{TAG_ABILITIES}'):
+        for ability in abilities_node.findall(TAG_ABILITY): yield TAG_ABILITY, ability
+    for items_node in root.findall(f'.//{TAG_ITEMS}'):
+        for item in items_node.findall(TAG_ITEM): yield TAG_ITEM, item
+
+def collect_root_entries(root):
+    """[(entry_type, name, element)] of iter_root_entries(root); read on the loading threads."""
+    return [(entry_type, element.get('name'), element) for entry_type, element in iter_root_entries(root)]
+
+
+class CompletionIndex:
+    """Reference-counted completion values per domain, with list models updated incrementally.
+
+    A value stays suggested while at least one entry contributes it. Entries are
+    re-counted when an op touches them: contributions are retracted before the first
+    op of a batch reaches an entry and re-added after the batch, so only net changes
+    reach the counts and a model row is inserted/removed only when a count crosses zero.
+    Models are filled lazily: counts are always kept, but a model only receives rows
+    once materialize() is called for it (the first time a completer needs it).
+    """
+    def __init__(self, models, collect):
+        self.models = models      # {domain: SortedStringListModel}
+        self.collect = collect    # collect(entry_type, element) -> iterable of (domain, value)
+        self.counts = {domain: {} for domain in models} # {domain: {value: refcount}}
+        self.materialized = set() # Domains whose model mirrors the counts
+        for domain, model in models.items():
+            model.setObjectName(domain) # Lets completers map a model back to its domain
+        self._pending = Counter() # Net (domain, value) deltas of the running batch
+        self._touched = {}        # {entry element: entry_type} retracted in the running batch
+
+    def values(self, domain):
+        return self.counts[domain].keys()
+
+    def add_domain(self, domain, model):
+        self.models[domain] = model
+        self.counts[domain] = {}
+        model.setObjectName(domain)
+
+    def count(self, entries):
+        """Returns {domain: {value: count}} for (entry_type, element) pairs without touching the index.
+
+        Reads only the trees it is given, so loader threads call it for their own file.
+        """
+        counts = {domain: {} for domain in self.models}
+        for entry_type, element in entries:
+            for domain, value in self.collect(entry_type, element):
+                domain_counts = counts[domain]
+                domain_counts[value] = domain_counts.get(value, 0) + 1
+        return counts
+
+    def rebuild(self, entries):
+        """Counts all (entry_type, element) pairs from scratch and refills every model once."""
+        self.load([self.count(entries)])
+
+    def load(self, parts):
+        """Replaces the index with the sum of count() results and refills every model in use once."""
+        self.set_counts(self.merge(parts))
+
+    def merge(self, parts):
+        """Returns the sum of count() results without touching the index (any thread)."""
+        counts = {domain: {} for domain in self.models}
+        for part in parts:
+            for domain, part_counts in part.items():
+                domain_counts = counts[domain]
+                if not domain_counts:
+                    domain_counts.update(part_counts)
+                    continue
+                for value, n in part_counts.items():
+                    domain_counts[value] = domain_counts.get(value, 0) + n
+        return counts
+
+    def set_counts(self, counts):
+        """Replaces the index with merged counts and refills every model in use once (GUI thread)."""
+        self.counts = counts
+        self._pending.clear()
+        self._touched.clear()
+        for domain in self.materialized:
+            self.models[domain].set_values(counts[domain]) # One reset per model in use
+        logging.debug(f"Completion index loaded: {sum(len(c) for c in counts.values())} values in {len(counts)} domains.")
+
+    def clear(self):
+        self.rebuild(())
+
+    def materialize(self, model):
+        """Fills the model from the counts on first use; later changes then reach it incrementally."""
+        domain = model.objectName()
+        if domain in self.models and domain not in self.materialized:
+            self.materialized.add(domain)
+            model.set_values(self.counts[domain])
+            logging.debug(f"Completion model '{domain}' materialized with {model.rowCount()} values.")
+        return model
+
+    def before_op(self, op):
+        """Retracts the contributions of every entry the op is about to change (once per batch)."""
+        kind = op[0]
+        if kind == OP_INSERT:
+            affected = [enclosing_entry(op[1])]
+        elif kind == OP_REMOVE:
+            affected = [enclosing_entry(op[3])]
+            affected.extend(entries_within(op[3]))
+        else:
+            affected = [enclosing_entry(op[1])]
+        for found in affected:
+            if found is None or found[1] in self._touched: continue
+            entry_type, entry = found
+            self._touched[entry] = entry_type
+            self._pending.subtract(self.collect(entry_type, entry))
+
+    def after_ops(self, ops, live_roots):
+        """Re-adds contributions of touched and inserted entries still in a loaded tree, then applies net deltas."""
+        touched = self._touched
+        changed = 0
+        try:
+            for op in ops:
+                if op[0] == OP_INSERT:
+                    entry_type = entry_type_of(op[3], op[1])
+                    if entry_type: touched.setdefault(op[3], entry_type)
+                    for entry_type, entry in entries_within(op[3]): touched.setdefault(entry, entry_type)
+            for entry, entry_type in touched.items():
+                if entry_type_of(entry, entry.getparent()) and entry.getroottree().getroot() in live_roots:
+                    self._pending.update(self.collect(entry_type, entry))
+            for (domain, value), delta in self._pending.items():
+                if delta:
+                    self._adjust(domain, value, delta)
+                    changed += 1
+        finally: # The next batch starts clean even if this one failed
+            self.abort()
+        return changed
+
+    def abort(self):
+        """Forgets what was gathered for the running batch; change_bus.aborted subscriber for batches rolled back."""
+        self._pending.clear()
+        self._touched = {}
+
+    def _adjust(self, domain, value, delta):
+        domain_counts = self.counts[domain]
+        old = domain_counts.get(value, 0)
+        new = max(0, old + delta)
+        if new:
+            domain_counts[value] = new
+        else:
+            domain_counts.pop(value, None)
+        if domain not in self.materialized:
+            return
+        if not old and new:
+            self.models[domain].insert_value(value)
+        elif old and not new:
+            self.models[domain].remove_value(value)
+
+
+# --- Ranked Completion (prefix, word, contains, fuzzy) ---
+COMPLETION_TOKEN_RE = re.compile(r'[A-Z]+(?![a-z])|[A-Z]?[a-z]+|[0-9]+') # Words incl. camelCase parts
+
+class CompletionEngine:
+    """Ranked matcher over a set of strings, kept in sync with a SortedStringListModel.
+
+    Tiers, best first: whole-value prefix, word prefix (words split on '_', '/', '.',
+    camelCase, digits), contains, fuzzy (characters in order). Prefix and word
+    lookups are bisect ranges over sorted casefolded keys / (word, value) pairs, so
+    they stay O(log n + k). Contains and fuzzy are scans that stop at budget_ms;
+    a query that extends a fully scanned cached query only rescans that query's
+    contains matches, which is the common case while typing.
+    """
+    def __init__(self, max_results=100, budget_ms=15, cache_size=64):
+        self.max_results = max_results
+        self.budget_ms = budget_ms
+        self._keys = []   # Sorted [(casefolded value, value)]
+        self._words = []  # Sorted [(casefolded word, value)]
+        self._cache = OrderedDict() # {casefolded query: (results, contains matches or None if cut short)}
+        self.cache_size = cache_size
+
+    @staticmethod
+    def _words_of(value):
+        return {word.casefold() for word in COMPLETION_TOKEN_RE.findall(value)}
+
+    def reset(self, values):
+        self._keys = sorted((value.casefold(), value) for value in values)
+        self._words = sorted((word, value) for value in values for word in self._words_of(value))
+        self._cache.clear()
+
+    def add(self, value):
+        key = (value.casefold(), value)
+        self._keys.insert(bisect_left(self._keys, key), key)
+        for word in self._words_of(value):
+            pair = (word, value)
+            self._words.insert(bisect_left(self._words, pair), pair)
+        self._cache.clear()
+
+    def remove(self, value):
+        key = (value.casefold(), value)
+        row = bisect_left(self._keys, key)
+        if row < len(self._keys) and self._keys[row] == key: del self._keys[row]
+        for word in self._words_of(value):
+            pair = (word, value)
+            row = bisect_left(self._words, pair)
+            if row < len(self._words) and self._words[row] == pair: del self._words[row]
+        self._cache.clear()
+
+    def query(self, text):
+        """Returns up to max_results values for text, best matches first."""
+        needle = text.casefold()
+        if not needle:
+            return [value for _, value in self._keys[:self.max_results]]
+        cached = self._cache.get(needle)
+        if cached is not None:
+            self._cache.move_to_end(needle)
+            return cached[0]
+
+        deadline = time.perf_counter() + self.budget_ms / 1000
+        limit = self.max_results
+        results, seen = [], set()
+        # 1. Whole-value prefix
+        end_key = (needle + '\uffff',)
+        for key in self._keys[bisect_left(self._keys, (needle,)):]:
+            if key >= end_key or len(results) >= limit: break
+            results.append(key[1]); seen.add(key[1])
+        # 2. Word prefix (shorter values first); a short needle can hit most words, so it stops at the budget
+        if len(results) < limit:
+            word_hits = set()
+            for i in range(bisect_left(self._words, (needle,)), len(self._words)):
+                word, value = self._words[i]
+                if not word.startswith(needle): break
+                if value not in seen: word_hits.add(value)
+                if not i & 255 and time.perf_counter() > deadline: break
+            for value in heapq.nsmallest(limit - len(results), word_hits, key=lambda v: (len(v), v.casefold())):
+                results.append(value); seen.add(value)
+        # 3. Contains, refining the longest fully scanned cached query this one extends
+        contains, complete = [], False
+        if len(results) < limit:
+            contains, complete = self._scan_contains(needle, deadline) # Cut short: rank what the budget allowed
+            extra = (value for _, value in contains if value not in seen)
+            for value in heapq.nsmallest(limit - len(results), extra, key=lambda v: (len(v), v.casefold())):
+                results.append(value); seen.add(value)
+        # 4. Fuzzy (characters in order), tightest span first
+        if len(results) < limit and len(needle) > 1 and time.perf_counter() < deadline:
+            results.extend(self._scan_fuzzy(needle, seen, limit - len(results), deadline))
+
+        self._cache[needle] = (results, contains if complete else None)
+        if len(self._cache) > self.cache_size: self._cache.popitem(last=False)
+        return results
+
+    def _scan_contains(self, needle, deadline):
+        """Returns ([(key, value) containing needle], whether the scan finished within the budget)."""
+        source = self._keys
+        for length in range(len(needle) - 1, 0, -1):
+            cached = self._cache.get(needle[:length])
+            if cached is not None and cached[1] is not None:
+                source = cached[1]
+                break
+        hits = []
+        for i, key in enumerate(source):
+            if needle in key[0]: hits.append(key)
+            if not i & 255 and time.perf_counter() > deadline:
+                return hits, False
+        return hits, True
+
+    def _scan_fuzzy(self, needle, seen, limit, deadline):
+        scored = []
+        for i, (key, value) in enumerate(self._keys):
+            if not i & 255 and time.perf_counter() > deadline: break
+            if value in seen: continue
+            pos = start = key.find(needle[0])
+            if pos < 0: continue
+            for char in needle[1:]:
+                pos = key.find(char, pos + 1)
+                if pos < 0: break
+            else:
+                scored.append((pos - start, len(value), key, value))
+        scored.sort()
+        return [value for *_, value in scored[:limit]]
+
+
+class RankedCompleter(QCompleter):
+    """QCompleter whose popup shows CompletionEngine results instead of Qt's linear filter.
+
+    The source model is mirrored into the engine through its row signals; each new
+    completion prefix (splitPath is called for it) refills a small result model.
+    """
+    def __init__(self, source_model, parent=None):
+        super().__init__(parent)
+        self.engine = CompletionEngine()
+        self._source = source_model
+        self._results = QStringListModel(self)
+        self.setModel(self._results)
+        self.setCaseSensitivity(Qt.CaseSensitivity.CaseInsensitive)
+        self.setCompletionMode(QCompleter.CompletionMode.UnfilteredPopupCompletion) # Results are pre-ranked
+        self.setMaxVisibleItems(12)
+        source_model.modelReset.connect(self._source_reset)
+        source_model.rowsInserted.connect(self._source_rows_inserted)
+        source_model.rowsAboutToBeRemoved.connect(self._source_rows_removed)
+        self._source_reset()
+
+    def _source_reset(self):
+        self.engine.reset(self._source.stringList())
+
+    def _source_rows_inserted(self, parent, first, last):
+        for row in range(first, last + 1):
+            self.engine.add(self._source.index(row).data())
+
+    def _source_rows_removed(self, parent, first, last):
+        for row in range(first, last + 1):
+            self.engine.remove(self._source.index(row).data())
+
+    def splitPath(self, path):
+        self._results.setStringList(self.engine.query(path))
+        return [path]
+
+
+class CompleterPool(QObject):
+    """Shares one QCompleter per completion model across all line edits using it.
+
+    attach() only tags the line edit with its model; the completer is built (and its
+    model materialized) the first time such a field receives focus, and handed to
+    whichever line edit currently has focus.
+    """
+    MODEL_PROPERTY = "completion_model"
+
+    def __init__(self, prepare=None, parent=None):
+        super().__init__(parent)
+        self.prepare = prepare # prepare(model) -> model, called once before a completer is built
+        self._models = {}      # {model name: model}
+        self._completers = {}  # {model name: QCompleter}
+
+    def attach(self, line_edit, model):
+        name = model.objectName()
+        self._models[name] = model
+        if line_edit.property(self.MODEL_PROPERTY) != name:
+            self._unbind(line_edit) # Field was switched to another model
+        line_edit.setProperty(self.MODEL_PROPERTY, name)
+        line_edit.installEventFilter(self)
+        if line_edit.hasFocus():
+            line_edit.setCompleter(self.completer_for(name))
+
+    def detach(self, line_edit):
+        """Drops a line edit's completion model (e.g. a pooled field rebound to a field without one)."""
+        if line_edit.property(self.MODEL_PROPERTY):
+            line_edit.setProperty(self.MODEL_PROPERTY, "")
+            self._unbind(line_edit)
+
+    @staticmethod
+    def _unbind(line_edit):
+        """Takes the pooled completer off a line edit if it is bound to it.
+
+        QLineEdit.setCompleter() detaches the old completer from whatever widget it
+        serves, so a shared completer serving another (focused) field is left alone;
+        the field's stale pointer is replaced on its next focus (see eventFilter).
+        """
+        completer = line_edit.completer()
+        if completer is not None and completer.widget() is line_edit:
+            line_edit.setCompleter(None)
+
+    def warm(self, model):
+        """Builds a model's completer ahead of the first focus (idle-time prefetch)."""
+        self._models[model.objectName()] = model
+        self.completer_for(model.objectName())
+
+    def completer_for(self, name):
+        completer = self._completers.get(name)
+        if completer is None:
+            model = self._models[name]
+            if self.prepare: model = self.prepare(model)
+            if isinstance(model, SortedStringListModel):
+                completer = RankedCompleter(model, self) # Owned by the pool, not by any line edit
+            else: # Small static lists: Qt's own contains filter is plenty
+                completer = QCompleter(model, self)
+                completer.setCaseSensitivity(Qt.CaseSensitivity.CaseInsensitive)
+                completer.setFilterMode(Qt.MatchFlag.MatchContains) # Contains matching
+                completer.setCompletionMode(QCompleter.CompletionMode.PopupCompletion) # Standard popup
+            self._completers[name] = completer
+        return completer
+
+    def eventFilter(self, obj, event):
+        if event.type() == QEvent.Type.FocusIn:
+            name = obj.property(self.MODEL_PROPERTY)
+            if name in self._models:
+                completer = self.completer_for(name)
+                if obj.completer() is not completer:
+                    obj.setCompleter(completer) # QLineEdit.focusInEvent then binds it to this field
+            elif obj.completer() is not None:
+                obj.setCompleter(None) # Stale after detach(); its completer serves the field losing focus
+        return False
+
+
+# --- Formula Helpers (used by numeric scaling) ---
+if np is not None:
+    FORMULA_FUNCTIONS = {
+        'abs': np.abs, 'round': np.round, 'floor': np.floor, 'ceil': np.ceil, 'sqrt': np.sqrt,
+        'log': np.log, 'exp': np.exp, 'min': np.minimum, 'max': np.maximum, 'clip': np.clip, 'where': np.where,
+    }
+else:
+    FORMULA_FUNCTIONS = {
+        'abs': abs, 'round': round, 'floor': math.floor, 'ceil': math.ceil, 'sqrt': math.sqrt,
+        'log': math.log, 'exp': math.exp, 'min': min, 'max': max,
+        'clip': lambda v, lo, hi: min(max(v, lo), hi), 'where': lambda c, a, b: a if c else b,
+    }
+
+FORMULA_NODES = (ast.Expression, ast.BinOp, ast.UnaryOp, ast.BoolOp, ast.Compare, ast.IfExp, ast.Call,
+                 ast.Name, ast.Load, ast.Constant, ast.operator, ast.unaryop, ast.boolop, ast.cmpop)
+
+def compile_formula(expression, variables=("x",)):
+    """Compiles a numeric formula like 'x * 1.15', allowing only the given variables and FORMULA_FUNCTIONS.
+
+    The syntax tree is checked node by node: numbers, operators, comparisons, 'a if c
+    else b' and calls of the formula functions, nothing else (no attributes, lambdas,
+    comprehensions or strings). Integer literals become floats, so constant parts like
+    9**9**9 overflow at once instead of computing huge integers; direct function
+    arguments (round(x, 2)) stay integers.
+    """
+    try:
+        tree = ast.parse(expression, "<formula>", "eval")
+    except SyntaxError as e:
+        raise ValueError(f"Invalid formula: {e.msg}") from e
+    allowed = set(variables) | set(FORMULA_FUNCTIONS)
+    unknown, int_arguments = set(), set()
+    for node in ast.walk(tree):
+        if not isinstance(node, FORMULA_NODES):
+            raise ValueError(f"Not allowed in a formula: {type(node).__name__}")
+        if isinstance(node, ast.Name):
+            if node.id not in allowed: unknown.add(node.id)
+        elif isinstance(node, ast.Constant):
+            if not isinstance(node.value, (int, float)): raise ValueError(f"Not a number: {node.value!r}")
+        elif isinstance(node, ast.Call):
+            if not isinstance(node.func, ast.Name) or node.func.id not in FORMULA_FUNCTIONS:
+                raise ValueError("Only the formula functions can be called: " + ", ".join(sorted(FORMULA_FUNCTIONS)))
+            int_arguments.update(id(arg) for arg in node.args if isinstance(arg, ast.Constant))
+    if unknown:
+        raise ValueError(f"Unknown name(s) in formula: {', '.join(sorted(unknown))}")
+    for node in ast.walk(tree):
+        if isinstance(node, ast.Constant) and type(node.value) is int and id(node) not in int_arguments:
+            node.value = float(node.value)
+    return compile(tree, "<formula>", "eval")
+
+def evaluate_formula(code, values, **variables):
+    """Evaluates a compiled formula for all values at once ('x'), vectorized when NumPy is available.
+
+    Extra variables are scalars or lists aligned with values (e.g. t=[1, 2, 3] for tiers).
+    """
+    if np is not None:
+        x = np.asarray(values, dtype=float)
+        arrays = {k: np.asarray(v, dtype=float) if isinstance(v, (list, tuple)) else v for k, v in variables.items()}
+        namespace = dict(FORMULA_FUNCTIONS, x=x, **arrays)
+        result = eval(code, {"__builtins__": {}}, namespace)
+        return np.broadcast_to(np.asarray(result, dtype=float), x.shape).tolist()
+    results = []
+    for i, value in enumerate(values):
+        scalars = {k: v[i] if isinstance(v, (list, tuple)) else v for k, v in variables.items()}
+        namespace = dict(FORMULA_FUNCTIONS, x=value, **scalars)
+        results.append(float(eval(code, {"__builtins__": {}}, namespace)))
+    return results
+
+def parse_formula_rules(text, variables=("x",)):
+    """Parses 'field = formula' lines (blank lines and # comments ignored) into [(field, code)]."""
+    rules = []
+    for line_number, line in enumerate(text.splitlines(), 1):
+        line = line.split("#", 1)[0].strip()
+        if not line: continue
+        field, sep, expression = line.partition("=")
+        field = field.strip()
+        if not sep or not field or not expression.strip():
+            raise ValueError(f"Line {line_number}: expected 'field = formula'.")
+        if field == 'name':
+            raise ValueError(f"Line {line_number}: the 'name' attribute is set by the naming pattern.")
+        try:
+            rules.append((field, compile_formula(expression.strip(), variables)))
+        except ValueError as e:
+            raise ValueError(f"Line {line_number}: {e}") from e
+    return rules
+
+def parse_number(text):
+    """Parses a numeric XML value. Raises ValueError for non-numbers, including nan and inf."""
+    value = float(text)
+    if not math.isfinite(value): raise ValueError(f"Not a finite number: {text}")
+    return value
+
+def format_number(value, decimals=-1):
+    """Formats a float for XML: integers without decimals, others rounded to decimals if given, else shortest repr."""
+    if decimals is not None and decimals >= 0:
+        value = round(float(value), decimals)
+    if float(value).is_integer():
+        return str(int(value))
+    if decimals is not None and decimals >= 0:
+        return f"{value:.{decimals}f}"
+    return repr(float(value))
+
+
+# --- Entry Query (filter used by the grid view and batch tools) ---
+class EntryQuery:
+    """Whitespace-separated filter, every term must match:
+        tag:Tier3       entry has the tag 'Tier3'
+        file:items      file name contains 'items'
+        has:price       entry has the attribute/property 'price'
+        price=100       field equals value (abilities: attack_power.max=1.5)
+        anything else   entry name contains the text
+    """
+    def __init__(self, text=""):
+        self.text = (text or "").strip()
+        self.terms = []
+        for term in self.text.split():
+            lower = term.lower()
+            if lower.startswith("tag:"):
+                self.terms.append(("tag", lower[4:]))
+            elif lower.startswith("file:"):
+                self.terms.append(("file", lower[5:]))
+            elif lower.startswith("has:"):
+                self.terms.append(("has", term[4:]))
+            elif "=" in term:
+                key, value = term.split("=", 1)
+                self.terms.append(("eq", (key, value)))
+            else:
+                self.terms.append(("name", lower))
+
+    def is_empty(self):
+        return not self.terms
+
+    def matches(self, name, element, file_path):
+        for kind, arg in self.terms:
+            if kind == "name":
+                if arg not in name.lower(): return False
+            elif kind == "tag":
+                tags_element = element.find(TAG_TAGS)
+                tags_text = tags_element.text if tags_element is not None and tags_element.text else ""
+                if arg not in {t.strip().lower() for t in tags_text.split(',')}: return False
+            elif kind == "file":
+                if arg not in os.path.basename(file_path).lower(): return False
+            elif kind == "has":
+                if get_field_value(element, arg) is None and element.find(arg) is None: return False
+            elif kind == "eq":
+                key, value = arg
+                if get_field_value(element, key) != value: return False
+        return True
+
+
+# --- Grid View (entries x fields) ---
+class EntryGridModel(QAbstractTableModel):
+    """Sparse table over entries: rows are entry names, columns are field names.
+
+    Nothing is copied out of the XML tree. Cells are read from the lxml elements
+    on demand, so only the cells the view actually paints are materialized.
+    """
+    ROW_CACHE_SIZE = 512 # Ability rows whose {property tag: element} lookup is kept
+
+    def __init__(self, editor, entry_type, parent=None):
+        super().__init__(parent)
+        self.editor = editor
+        self.entry_type = entry_type
+        self.names = []
+        self.columns = []
+        self._row_cache = OrderedDict()
+
+    def reset_contents(self, names, columns):
+        self.beginResetModel()
+        self.names = names
+        self.columns = columns
+        self._row_cache.clear()
+        self.endResetModel()
+
+    def _data_map(self):
+        return self.editor.abilities_map if self.entry_type == TAG_ABILITY else self.editor.items_map
+
+    def _property_element(self, name, element, prop_tag):
+        """Finds a property child, caching the per-row tag lookup for recently painted rows."""
+        children = self._row_cache.get(name)
+        if children is None:
+            children = {}
+            for child in element:
+                if ET.iselement(child) and child.tag not in children:
+                    children[child.tag] = child
+            self._row_cache[name] = children
+            if len(self._row_cache) > self.ROW_CACHE_SIZE:
+                self._row_cache.popitem(last=False)
+        else:
+            self._row_cache.move_to_end(name)
+        return children.get(prop_tag)
+
+    def _value(self, name, column):
+        entry = self._data_map().get(name)
+        if entry is None: return None
+        element = entry['element']
+        prop, attr = split_field(self.columns[column])
+        if prop is None:
+            return element.get(attr)
+        prop_element = self._property_element(name, element, prop)
+        return prop_element.get(attr) if prop_element is not None else None
+
+    def rowCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else len(self.names)
+
+    def columnCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else len(self.columns)
+
+    def data(self, index, role=Qt.ItemDataRole.DisplayRole):
+        if not index.isValid(): return None
+        if role in (Qt.ItemDataRole.DisplayRole, Qt.ItemDataRole.EditRole):
+            value = self._value(self.names[index.row()], index.column())
+            return value if value is not None else ""
+        return None
+
+    def headerData(self, section, orientation, role=Qt.ItemDataRole.DisplayRole):
+        if role != Qt.ItemDataRole.DisplayRole: return None
+        if orientation == Qt.Orientation.Horizontal:
+            return self.columns[section] if section < len(self.columns) else None
+        return self.names[section] if section < len(self.names) else None
+
+    def flags(self, index):
+        if not index.isValid(): return Qt.ItemFlag.NoItemFlags
+        return Qt.ItemFlag.ItemIsEnabled | Qt.ItemFlag.ItemIsSelectable | Qt.ItemFlag.ItemIsEditable
+
+    def setData(self, index, value, role=Qt.ItemDataRole.EditRole):
+        if role != Qt.ItemDataRole.EditRole or not index.isValid(): return False
+        name = self.names[index.row()]
+        entry = self._data_map().get(name)
+        if entry is None: return False
+        new_value = str(value).strip()
+        old_value = self._value(name, index.column())
+        if old_value == new_value or (old_value is None and not new_value):
+            return False # No change, and don't create empty fields
+        self.editor.set_entry_field(entry['element'], entry['filepath'], self.columns[index.column()], new_value)
+        self._row_cache.pop(name, None) # A property element may have been created
+        self.editor._refresh_details_if_showing([entry['element']])
+        self.dataChanged.emit(index, index, [Qt.ItemDataRole.DisplayRole, Qt.ItemDataRole.EditRole])
+        return True
+
+    def sort(self, column, order=Qt.SortOrder.AscendingOrder):
+        """Sorts rows by a column, numerically where values are numbers. Missing values go last."""
+        if not (0 <= column < len(self.columns)): return
+        def sort_key(name):
+            value = self._value(name, column)
+            if value is None: return None
+            try: return (0, float(value), "")
+            except ValueError: return (1, 0.0, value.lower())
+        keyed = [(sort_key(name), name) for name in self.names]
+        present = sorted((pair for pair in keyed if pair[0] is not None),
+                         key=lambda pair: pair[0], reverse=(order == Qt.SortOrder.DescendingOrder))
+        missing = [name for key, name in keyed if key is None] # Kept last (in list order) either way
+        self.beginResetModel()
+        self.names = [name for _, name in present] + missing
+        self.endResetModel()
+
+
+class EntryGridDialog(QDialog):
+    """Spreadsheet-like window for editing one field across many entries."""
+    def __init__(self, editor, entry_type, parent=None):
+        super().__init__(parent)
+        self.editor = editor
+        self.entry_type = entry_type
+        self.setWindowTitle(f"Grid View - {'Abilities' if entry_type == TAG_ABILITY else 'Items'}")
+        self.resize(1100, 650)
+        layout = QVBoxLayout(self)
+
+        filter_layout = QHBoxLayout()
+        self.query_input = QLineEdit()
+        self.query_input.setPlaceholderText("Query, e.g. tag:Tier3 category=steelsword sword (Enter to apply)")
+        self.column_filter_input = QLineEdit()
+        self.column_filter_input.setPlaceholderText("Filter columns...")
+        self.column_filter_input.setFixedWidth(200)
+        self.use_list_filter_checkbox = QCheckBox("Only entries shown in list")
+        self.use_list_filter_checkbox.setChecked(True)
+        self.refresh_button = QPushButton(QIcon.fromTheme("view-refresh"), "Refresh")
+        filter_layout.addWidget(self.query_input)
+        filter_layout.addWidget(self.column_filter_input)
+        filter_layout.addWidget(self.use_list_filter_checkbox)
+        filter_layout.addWidget(self.refresh_button)
+        layout.addLayout(filter_layout)
+
+        self.model = EntryGridModel(editor, entry_type, self)
+        self.table_view = QTableView()
+        self.table_view.setModel(self.model)
+        # Fixed row heights and no content-based resizing keep scrolling O(visible cells)
+        self.table_view.verticalHeader().setSectionResizeMode(QHeaderView.ResizeMode.Fixed)
+        self.table_view.verticalHeader().setDefaultSectionSize(22)
+        self.table_view.horizontalHeader().setSectionResizeMode(QHeaderView.ResizeMode.Interactive)
+        self.table_view.horizontalHeader().setDefaultSectionSize(120)
+        self.table_view.horizontalHeader().setSortIndicator(-1, Qt.SortOrder.AscendingOrder)
+        self.table_view.setSortingEnabled(True)
+        self.table_view.setWordWrap(False)
+        layout.addWidget(self.table_view)
+
+        self.summary_label = QLabel()
+        layout.addWidget(self.summary_label)
+
+        self.query_input.returnPressed.connect(self.rebuild)
+        self.column_filter_input.returnPressed.connect(self.rebuild)
+        self.use_list_filter_checkbox.toggled.connect(self.rebuild)
+        self.refresh_button.clicked.connect(self.rebuild)
+        self.table_view.verticalHeader().sectionDoubleClicked.connect(self._select_row_in_editor)
+
+        self.rebuild()
+
+    def rebuild(self):
+        """Recomputes rows (list filter + query) and columns (union of fields of those rows)."""
+        query = EntryQuery(self.query_input.text())
+        data_map = self.editor.abilities_map if self.entry_type == TAG_ABILITY else self.editor.items_map
+        if self.use_list_filter_checkbox.isChecked():
+            list_widget = self.editor.ability_list if self.entry_type == TAG_ABILITY else self.editor.item_list
+            candidate_names = [list_widget.item(i).text() for i in range(list_widget.count()) if not list_widget.item(i).isHidden()]
+        else:
+            candidate_names = sorted(data_map.keys())
+
+        names = []
+        column_set = set()
+        for name in candidate_names:
+            entry = data_map.get(name)
+            if entry is None: continue
+            if not query.matches(name, entry['element'], entry['filepath']): continue
+            names.append(name)
+            column_set.update(self.editor._entry_field_names(self.entry_type, entry['element']))
+
+        column_filter = self.column_filter_input.text().strip().lower()
+        columns = sorted(c for c in column_set if column_filter in c.lower())
+        self.model.reset_contents(names, columns)
+        self.summary_label.setText(f"{len(names)} entries x {len(columns)} fields. Double-click a row header to open the entry.")
+        logging.debug(f"Grid view rebuilt: {len(names)} rows, {len(columns)} columns.")
+
+    def _select_row_in_editor(self, row):
+        if 0 <= row < len(self.model.names):
+            self.editor.select_entry(self.entry_type, self.model.names[row])
+
+
+# --- Ability Property Table (alternative to PropertyWidget rows for large abilities) ---
+class AbilityPropertyModel(QAbstractTableModel):
+    """Property children of one ability: a row per property, a column per attribute.
+
+    The common attributes come first, then any other attribute the ability's properties
+    use. Like EntryGridModel, cells are read from the lxml elements on demand. An empty
+    cell means the attribute is absent; clearing a cell removes the attribute.
+    """
+    COMMON_ATTRIBUTES = ("type", "min", "max", "always_random")
+
+    def __init__(self, editor, parent=None):
+        super().__init__(parent)
+        self.editor = editor
+        self.elements = []
+        self.file_path = None
+        self.columns = list(self.COMMON_ATTRIBUTES)
+
+    def reset_contents(self, elements, file_path):
+        self.beginResetModel()
+        self.elements = elements
+        self.file_path = file_path
+        self.columns = self._columns_for(elements)
+        self.endResetModel()
+
+    def _columns_for(self, elements):
+        extra = {key for element in elements for key in element.attrib.keys()}.difference(self.COMMON_ATTRIBUTES)
+        return list(self.COMMON_ATTRIBUTES) + sorted(extra)
+
+    def key_for(self, column):
+        """Attribute shown in a column (None for the property tag column)."""
+        return self.columns[column - 1] if 0 < column <= len(self.columns) else None
+
+    def refresh_columns(self):
+        """Picks up attribute names added to (or removed from) the shown properties."""
+        columns = self._columns_for(self.elements)
+        if columns != self.columns:
+            self.beginResetModel()
+            self.columns = columns
+            self.endResetModel()
+
+    def append_element(self, element):
+        row = len(self.elements)
+        self.beginInsertRows(QModelIndex(), row, row)
+        self.elements.append(element)
+        self.endInsertRows()
+        self.refresh_columns()
+
+    def remove_element(self, element):
+        for row, shown in enumerate(self.elements):
+            if shown is element:
+                self.beginRemoveRows(QModelIndex(), row, row)
+                del self.elements[row]
+                self.endRemoveRows()
+                break
+        self.refresh_columns()
+
+    def rowCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else len(self.elements)
+
+    def columnCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else len(self.columns) + 1
+
+    def data(self, index, role=Qt.ItemDataRole.DisplayRole):
+        if not index.isValid(): return None
+        if role in (Qt.ItemDataRole.DisplayRole, Qt.ItemDataRole.EditRole):
+            element = self.elements[index.row()]
+            key = self.key_for(index.column())
+            return element.tag if key is None else element.get(key, "")
+        return None
+
+    def headerData(self, section, orientation, role=Qt.ItemDataRole.DisplayRole):
+        if role != Qt.ItemDataRole.DisplayRole or orientation != Qt.Orientation.Horizontal: return None
+        return "property" if section == 0 else self.key_for(section)
+
+    def flags(self, index):
+        if not index.isValid(): return Qt.ItemFlag.NoItemFlags
+        flags = Qt.ItemFlag.ItemIsEnabled | Qt.ItemFlag.ItemIsSelectable
+        return flags if index.column() == 0 else flags | Qt.ItemFlag.ItemIsEditable
+
+    def setData(self, index, value, role=Qt.ItemDataRole.EditRole):
+        if role != Qt.ItemDataRole.EditRole or not index.isValid(): return False
+        key = self.key_for(index.column())
+        if key is None: return False
+        element = self.elements[index.row()]
+        new_value = str(value).strip()
+        old_value = element.get(key)
+        if old_value == new_value or (old_value is None and not new_value):
+            return False
+        if new_value:
+            self.editor.edit_attribute(element, key, new_value, f"Change {element.tag}.{key}")
+        else:
+            self.editor.edit_attribute(element, key, None, f"Remove attribute {element.tag}.{key}")
+        self.dataChanged.emit(index, index, [Qt.ItemDataRole.DisplayRole, Qt.ItemDataRole.EditRole])
+        return True
+
+
+class AbilityPropertyDelegate(QStyledItemDelegate):
+    """Edits a property table cell in a line edit completing that attribute's known values.
+
+    The view only asks for an editor when a cell is being edited, so a large ability costs
+    one line edit instead of one per attribute.
+    """
+    def __init__(self, editor, parent=None):
+        super().__init__(parent)
+        self.editor = editor
+
+    def createEditor(self, parent, option, index):
+        line_edit = QLineEdit(parent)
+        key = index.model().key_for(index.column())
+        self.editor._attach_field_completer(line_edit, f"{TAG_ABILITY}/*@{key}", f"Property Attribute '{key}'")
+        return line_edit
+
+
+# --- Raw XML Tree (lazy model over the whole lxml tree) ---
+def is_valid_xml_name(name):
+    """True if name can be used as an element tag or attribute name."""
+    try:
+        ET.Element(name).set(name, "")
+        return True
+    except ValueError:
+        return False
+
+
+class XmlTreeNode:
+    """Row of XmlTreeModel: a child node of its parent's element, or (key set) one of its attributes."""
+    __slots__ = ("element", "key", "parent", "row", "attributes", "children", "total")
+
+    def __init__(self, element, parent, row, key=None):
+        self.element = element
+        self.key = key
+        self.parent = parent
+        self.row = row
+        self.attributes = None # Attribute rows, created on the first fetch
+        self.children = []     # Child node rows fetched so far (a prefix of the element's children)
+        self.total = 0         # len(element) when last fetched/synced
+
+
+class XmlTreeModel(QAbstractItemModel):
+    """Lazy tree over one loaded file: elements (plus comments/PIs), their attributes and text.
+
+    Rows exist only for parents the view expanded: canFetchMore/fetchMore add the
+    attributes and up to FETCH_BATCH children at a time, so opening a huge file
+    builds a single node. Edits go through the editor's undo stack; after every
+    committed batch or undo/redo step, fetched parents the ops touched are synced
+    with their element (rows inserted/removed in place, expansion kept elsewhere).
+    """
+    FETCH_BATCH = 256
+    COLUMNS = ("Node", "Value")
+    READ_ONLY_FLAGS = Qt.ItemFlag.ItemIsEnabled | Qt.ItemFlag.ItemIsSelectable # Combined once: views ask for flags per row
+    EDITABLE_FLAGS = READ_ONLY_FLAGS | Qt.ItemFlag.ItemIsEditable
+
+    def __init__(self, editor, parent=None):
+        super().__init__(parent)
+        self.editor = editor
+        self.file_path = None
+        self._root = XmlTreeNode(None, None, 0)
+        self._root.attributes = []
+        self._nodes = {} # {element: fetched node}
+        self._changing = False # No nested fetching while rows change (views fetch from row signals)
+        editor.change_bus.applied.connect(self._on_ops_applied)
+
+    def set_file(self, file_path):
+        self.beginResetModel()
+        self.file_path = file_path
+        self._root.children = []
+        self._nodes = {}
+        data = self.editor.loaded_files.get(file_path)
+        if data is not None:
+            node = XmlTreeNode(data['root'], self._root, 0)
+            self._root.children.append(node)
+            self._nodes[node.element] = node
+        self.endResetModel()
+
+    # --- Structure ---
+    def _node(self, index):
+        return index.internalPointer() if index.isValid() else self._root
+
+    def _index_of(self, node, column=0):
+        return QModelIndex() if node is self._root else self.createIndex(node.row, column, node)
+
+    def index(self, row, column, parent=QModelIndex()):
+        node = self._node(parent)
+        if node.key is not None or node.attributes is None or not (0 <= column < len(self.COLUMNS)):
+            return QModelIndex()
+        if row < len(node.attributes):
+            return self.createIndex(row, column, node.attributes[row])
+        row_in_children = row - len(node.attributes)
+        if 0 <= row_in_children < len(node.children):
+            return self.createIndex(row, column, node.children[row_in_children])
+        return QModelIndex()
+
+    def parent(self, index=QModelIndex()):
+        if not index.isValid(): return QModelIndex()
+        return self._index_of(index.internalPointer().parent)
+
+    def rowCount(self, parent=QModelIndex()):
+        if parent.column() > 0: return 0
+        node = self._node(parent)
+        if node.key is not None or node.attributes is None: return 0
+        return len(node.attributes) + len(node.children)
+
+    def columnCount(self, parent=QModelIndex()):
+        return len(self.COLUMNS)
+
+    def hasChildren(self, parent=QModelIndex()):
+        node = self._node(parent)
+        if node is self._root: return bool(node.children)
+        if node.key is not None or not isinstance(node.element.tag, str): return False
+        return len(node.element) > 0 or len(node.element.attrib) > 0
+
+    def canFetchMore(self, parent):
+        node = self._node(parent)
+        if self._changing or node is self._root or node.key is not None or not isinstance(node.element.tag, str): return False
+        return node.attributes is None or len(node.children) < node.total
+
+    def fetchMore(self, parent):
+        self._fetch(self._node(parent), self.FETCH_BATCH)
+
+    def _fetch(self, node, count):
+        """Adds the attribute rows (first time) and up to count more child rows to a node."""
+        changing, self._changing = self._changing, True
+        try:
+            parent_index = self._index_of(node)
+            if node.attributes is None:
+                keys = list(node.element.attrib.keys())
+                node.total = len(node.element)
+                if keys: self.beginInsertRows(parent_index, 0, len(keys) - 1)
+                node.attributes = [XmlTreeNode(node.element, node, row, key) for row, key in enumerate(keys)]
+                if keys: self.endInsertRows()
+            start = len(node.children)
+            new_children = []
+            child = node.children[-1].element.getnext() if node.children else next(iter(node.element), None)
+            while child is not None and len(new_children) < min(count, node.total - start):
+                new_children.append(child)
+                child = child.getnext()
+            if not new_children: return
+            first_row = len(node.attributes) + start
+            self.beginInsertRows(parent_index, first_row, first_row + len(new_children) - 1)
+            for row, child in enumerate(new_children, first_row):
+                child_node = XmlTreeNode(child, node, row)
+                node.children.append(child_node)
+                self._nodes[child] = child_node
+            self.endInsertRows()
+        finally:
+            self._changing = changing
+
+    def index_for_element(self, element):
+        """Fetches the rows down to element (in this model's file) and returns its index."""
+        path = []
+        while element is not None and element not in self._nodes:
+            path.append(element)
+            element = element.getparent()
+        if element is None: return QModelIndex()
+        node = self._nodes[element]
+        for element in reversed(path):
+            if node.attributes is None or element not in self._nodes:
+                self._fetch(node, node.element.index(element) + 1 - len(node.children))
+            node = self._nodes.get(element)
+            if node is None: return QModelIndex()
+        return self._index_of(node)
+
+    # --- Data ---
+    @staticmethod
+    def _label(element):
+        if element.tag is ET.Comment: return "<!-- -->"
+        if element.tag is ET.ProcessingInstruction: return f"<?{element.target}?>"
+        if not isinstance(element.tag, str): return str(element)
+        return element.tag
+
+    def data(self, index, role=Qt.ItemDataRole.DisplayRole):
+        if not index.isValid(): return None
+        node = index.internalPointer()
+        if role in (Qt.ItemDataRole.DisplayRole, Qt.ItemDataRole.EditRole):
+            if node.key is not None:
+                if index.column() == 1: return node.element.get(node.key, "")
+                return node.key if role == Qt.ItemDataRole.EditRole else f"@{node.key}"
+            if index.column() == 0:
+                return node.element.tag if role == Qt.ItemDataRole.EditRole else self._label(node.element)
+            return (node.element.text or "").strip() # Indentation-only text is not shown
+        if role == Qt.ItemDataRole.ToolTipRole and node.key is None:
+            return node.element.getroottree().getpath(node.element)
+        if role == Qt.ItemDataRole.ForegroundRole and node.key is not None and index.column() == 0:
+            return QColor(Qt.GlobalColor.darkCyan)
+        return None
+
+    def headerData(self, section, orientation, role=Qt.ItemDataRole.DisplayRole):
+        if role == Qt.ItemDataRole.DisplayRole and orientation == Qt.Orientation.Horizontal:
+            return self.COLUMNS[section]
+        return None
+
+    def flags(self, index):
+        if not index.isValid(): return Qt.ItemFlag.NoItemFlags
+        node = index.internalPointer()
+        if node.key is not None or node.element.tag is ET.Comment:
+            return self.EDITABLE_FLAGS
+        if isinstance(node.element.tag, str) and (index.column() == 1 or node.parent is not self._root):
+            return self.EDITABLE_FLAGS # Tag of the root element stays fixed
+        return self.READ_ONLY_FLAGS
+
+    def setData(self, index, value, role=Qt.ItemDataRole.EditRole):
+        if role != Qt.ItemDataRole.EditRole or not index.isValid(): return False
+        node = index.internalPointer()
+        element = node.element
+        value = str(value)
+        batch = self.editor.begin_edit()
+        if node.key is not None and index.column() == 1:
+            batch.set_attr(element, node.key, value)
+            description = f"Change {element.tag}.{node.key}"
+        elif node.key is not None:
+            new_key = value.strip()
+            if new_key == node.key: return False
+            if not is_valid_xml_name(new_key) or new_key in element.attrib:
+                QMessageBox.warning(self.editor, "Invalid Name", f"'{new_key}' is not a valid new attribute name for <{element.tag}>.")
+                return False
+            batch.set_attrib(element, [(new_key if key == node.key else key, val) for key, val in element.attrib.items()])
+            description = f"Rename attribute {element.tag}.{node.key} to '{new_key}'"
+        elif index.column() == 0:
+            new_tag = value.strip()
+            if not is_valid_xml_name(new_tag):
+                QMessageBox.warning(self.editor, "Invalid Name", f"'{new_tag}' is not a valid element name.")
+                return False
+            batch.set_tag(element, new_tag)
+            description = f"Rename <{element.tag}> to <{new_tag}>"
+        else:
+            if value.strip() == (element.text or "").strip(): return False
+            batch.set_text(element, value if value.strip() else None)
+            description = f"Change text of <{self._label(element)}>"
+        if not self.editor.commit_edit(batch, description): return False
+        entry = enclosing_entry(element)
+        if entry is not None:
+            self.editor._refresh_details_if_showing([entry[1]])
+        return True
+
+    # --- Following tree changes ---
+    def _on_ops_applied(self, ops):
+        """change_bus.applied subscriber: syncs the fetched nodes of the elements the ops touched."""
+        touched = []
+        for op in ops:
+            node = self._nodes.get(op[1]) # Parent for inserts/removes
+            if node is not None and all(node is not seen for seen in touched):
+                touched.append(node)
+        self._changing = True
+        try:
+            for node in touched:
+                if node.parent is not None and node.element in self._nodes: # Not dropped by an earlier sync
+                    self._sync(node)
+        finally:
+            self._changing = False
+
+    def _forget(self, node):
+        self._nodes.pop(node.element, None)
+        for child in node.children:
+            self._forget(child)
+
+    def _renumber(self, node, first=0):
+        for row in range(first, len(node.children)):
+            node.children[row].row = len(node.attributes) + row
+
+    def _sync(self, node):
+        """Brings one fetched node's rows in line with its element."""
+        index = self._index_of(node)
+        self.dataChanged.emit(index, self._index_of(node, 1))
+        if node.attributes is None: return # Not expanded yet; fetched fresh later
+        element = node.element
+
+        keys = list(element.attrib.keys())
+        if keys == [attribute.key for attribute in node.attributes]:
+            if keys: self.dataChanged.emit(self.index(0, 1, index), self.index(len(keys) - 1, 1, index))
+        else:
+            if node.attributes:
+                self.beginRemoveRows(index, 0, len(node.attributes) - 1)
+                node.attributes = []
+                self._renumber(node)
+                self.endRemoveRows()
+            if keys:
+                self.beginInsertRows(index, 0, len(keys) - 1)
+                node.attributes = [XmlTreeNode(element, node, row, key) for row, key in enumerate(keys)]
+                self._renumber(node)
+                self.endInsertRows()
+
+        # Child rows: drop nodes whose element left (or moved within) the parent, then add new ones
+        current = list(element)
+        position = {child: i for i, child in enumerate(current)}
+        complete = len(node.children) >= node.total
+        kept, last = [], -1
+        for child_node in node.children:
+            i = position.get(child_node.element, -1)
+            if i > last:
+                kept.append(child_node)
+                last = i
+        if len(kept) != len(node.children):
+            keep = {id(child_node) for child_node in kept}
+            for row in reversed(range(len(node.children))):
+                if id(node.children[row]) not in keep:
+                    first_row = len(node.attributes) + row
+                    self.beginRemoveRows(index, first_row, first_row)
+                    self._forget(node.children.pop(row))
+                    self._renumber(node, row)
+                    self.endRemoveRows()
+        row = 0
+        for child in current:
+            if row < len(node.children) and node.children[row].element is child:
+                row += 1
+                continue
+            if row >= len(node.children) and not complete: break # Beyond the fetched prefix
+            first_row = len(node.attributes) + row
+            self.beginInsertRows(index, first_row, first_row)
+            child_node = XmlTreeNode(child, node, first_row)
+            node.children.insert(row, child_node)
+            self._nodes[child] = child_node
+            self._renumber(node, row)
+            self.endInsertRows()
+            row += 1
+        node.total = len(current)
+
+
+class XmlTreeDialog(QDialog):
+    """Raw view of a whole loaded file, for data the detail sections do not cover."""
+    def __init__(self, editor, parent=None):
+        super().__init__(parent)
+        self.editor = editor
+        self.setWindowTitle("XML Tree")
+        self.resize(900, 700)
+        layout = QVBoxLayout(self)
+
+        top_layout = QHBoxLayout()
+        top_layout.addWidget(QLabel("File:"))
+        self.file_combo = QComboBox()
+        self.file_combo.setSizePolicy(QSizePolicy.Policy.Expanding, QSizePolicy.Policy.Fixed)
+        self.show_current_button = QPushButton(QIcon.fromTheme("go-jump"), "Show Current Entry")
+        self.show_current_button.setToolTip("Expand the tree to the entry selected in the main window")
+        top_layout.addWidget(self.file_combo)
+        top_layout.addWidget(self.show_current_button)
+        layout.addLayout(top_layout)
+
+        self.model = XmlTreeModel(editor, self)
+        self.tree_view = QTreeView()
+        self.tree_view.setModel(self.model)
+        self.tree_view.setUniformRowHeights(True) # Row geometry without measuring every row
+        self.tree_view.header().setSectionResizeMode(QHeaderView.ResizeMode.Interactive)
+        self.tree_view.header().setDefaultSectionSize(300)
+        self.tree_view.setEditTriggers(QAbstractItemView.EditTrigger.DoubleClicked | QAbstractItemView.EditTrigger.EditKeyPressed)
+        layout.addWidget(self.tree_view)
+        layout.addWidget(QLabel("Double-click (or F2) a tag, attribute name, value or text to edit it. Changes can be undone in the main window."))
+
+        self.file_combo.currentIndexChanged.connect(self._file_changed)
+        self.show_current_button.clicked.connect(self.show_current_entry)
+        editor.change_bus.reset.connect(self.reload_files)
+        self.reload_files()
+        self.show_current_entry()
+
+    def reload_files(self):
+        """Lists the loaded files, keeping the shown one if it is still loaded."""
+        shown = self.model.file_path
+        self.file_combo.blockSignals(True)
+        self.file_combo.clear()
+        for file_path in sorted(self.editor.loaded_files):
+            self.file_combo.addItem(os.path.basename(file_path), file_path)
+            self.file_combo.setItemData(self.file_combo.count() - 1, file_path, Qt.ItemDataRole.ToolTipRole)
+        self.file_combo.blockSignals(False)
+        row = self.file_combo.findData(shown)
+        self.file_combo.setCurrentIndex(max(row, 0))
+        self._file_changed() # Trees were replaced on reload, so always rebuild the model
+
+    def _file_changed(self, *_):
+        self.model.set_file(self.file_combo.currentData())
+        self.tree_view.expand(self.model.index(0, 0))
+
+    def show_current_entry(self):
+        element = self.editor.current_selection_element
+        if element is None: return
+        row = self.file_combo.findData(self.editor.current_selection_filepath)
+        if row < 0: return
+        if row != self.file_combo.currentIndex():
+            self.file_combo.setCurrentIndex(row)
+        index = self.model.index_for_element(element)
+        if index.isValid():
+            self.tree_view.setCurrentIndex(index)
+            self.tree_view.expand(index)
+            self.tree_view.scrollTo(index, QAbstractItemView.ScrollHint.PositionAtCenter)
+
+
+# --- Workspace Snapshots (copy-on-write versions for background readers) ---
+ENTRY_MARK = 'wxe-entry' # Tag of the empty elements standing for entries in a FileSnapshot's frame
+
+class FileSnapshot:
+    """One loaded file frozen at an edit generation, copied on write.
+
+    Taking one copies nothing: it reads the live tree, and before_change() (see
+    SnapshotStore) copies an entry right before an edit first changes it, as
+    EntryBaseline does. The first edit outside entries (adding or removing one,
+    changing a container) freezes the rest of the file instead, its frame: a copy
+    with a placeholder for each entry. A file edited while a job holds its snapshot
+    so costs its edited entries and its frame, never a copy of the whole file.
+
+    write() serializes the snapshot on a job thread. Edits to an entry wait while it
+    writes one entry, edits outside entries while it freezes the frame. entries is
+    for the GUI thread, or a job thread inside reading(); unchanged entries are the
+    live elements, so treat them as read-only.
+    """
+    __slots__ = ("file_path", "generation", "source", "_copies", "_frame", "_layout", "_members", "_lock", "_frame_lock")
+
+    def __init__(self, file_path, source_tree, generation):
+        self.file_path = file_path
+        self.generation = generation   # file_generations value when taken (None = not edited since load)
+        self.source = source_tree      # Live tree it was taken from; compared by identity on the GUI thread only
+        self._copies = {}              # {live entry element: copy taken before it first changed}
+        self._frame = None             # Frame tree once frozen (see _freeze_frame)
+        self._layout = None            # [(entry_type, live entry element, pretty print level or None)] in document order
+        self._members = None           # Set of the layout's entry elements
+        self._lock = threading.Lock()  # Held while a job reads a live entry; edits to entries wait for it
+        self._frame_lock = threading.Lock() # Held while the frame is frozen; edits outside entries wait for it
+
+    def before_change(self, op):
+        """Copies what the op is about to change, unless already copied (GUI thread)."""
+        element = op[1]
+        entry = enclosing_entry(element)
+        frame_op = entry is None or (op[0] == OP_SET_TAG and entry[1] is element) # Renaming a tag changes what is an entry
+        if frame_op:
+            with self._frame_lock:
+                if self._frame is None: self._freeze_frame()
+        elif entry[1] in self._copies:
+            return
+        with self._lock:
+            if entry is not None: self._copy_entry(entry[1])
+            if frame_op and op[0] == OP_REMOVE: self._copy_entry(op[3]) # Edits to it once detached are not seen here
+
+    def _copy_entry(self, element):
+        if element in self._copies: return
+        if self._members is not None and element not in self._members: return # Added after the snapshot
+        self._copies[element] = copy.deepcopy(element)
+
+    def _freeze_frame(self):
+        """Copies the live tree without its entries, each replaced by an empty ENTRY_MARK
+        element with its tail, and notes the entries' order."""
+        root = self.source.getroot()
+        containers = set(entry_containers_of(root))
+        path = set() # Containers and their ancestors: copied without their entries
+        for element in containers:
+            while element is not None and element not in path:
+                path.add(element)
+                element = element.getparent()
+        layout = []
+
+        def copy_frame(element, parent_copy, depth, formatted):
+            if parent_copy is None: clone = ET.Element(element.tag, element.attrib, nsmap=element.nsmap)
+            else: clone = ET.SubElement(parent_copy, element.tag, element.attrib)
+            clone.text, clone.tail = element.text, element.tail
+            # Pretty printing stops at elements with text among their children, as in libxml2
+            formatted = formatted and not (element.text or any(child.tail or isinstance(child, ET._Entity) for child in element))
+            for child in element:
+                entry_type = entry_type_of(child, element) if element in containers else None
+                if child in path:
+                    copy_frame(child, clone, depth + 1, formatted)
+                elif entry_type:
+                    ET.SubElement(clone, ENTRY_MARK).tail = child.tail
+                    layout.append((entry_type, child, depth + 1 if formatted else None))
+                else:
+                    clone.append(copy.deepcopy(child))
+            return clone
+
+        frame = copy_frame(root, None, 0, True)
+        for sibling in reversed(list(root.itersiblings(preceding=True))): frame.addprevious(copy.deepcopy(sibling))
+        for sibling in reversed(list(root.itersiblings())): frame.addnext(copy.deepcopy(sibling))
+        self._frame = frame.getroottree()
+        self._layout = layout
+        self._members = {element for _entry_type, element, _level in layout}
+
+    @contextmanager
+    def reading(self):
+        """Keeps edits to the file waiting while a job thread reads the snapshot in the block."""
+        with self._frame_lock, self._lock:
+            yield self
+
+    def write(self, out):
+        """Serializes the snapshot as a whole-file save writes it (pretty printed) to out, as
+        UTF-8 without declaration, the frame's pieces and the entries one by one (job thread)."""
+        with self._frame_lock:
+            if self._frame is None: self._freeze_frame()
+        data = ET.tostring(self._frame, encoding='utf-8', pretty_print=True, doctype=self.source.docinfo.doctype or None)
+        view = memoryview(data)
+        position = 0
+        marker = b'<' + ENTRY_MARK.encode()
+        for _entry_type, live, level in self._layout:
+            start = data.index(marker, position)
+            out.write(view[position:start])
+            with self._lock:
+                markup = entry_markup(self._copies.get(live, live), level)
+            out.write(markup)
+            position = data.index(b'/>', start) + 2
+        out.write(view[position:])
+
+    @property
+    def entries(self):
+        """collect_root_entries() of the file as frozen."""
+        if self._layout is None: # Entries are where they were: the live ones unless copied
+            live_entries = ((entry_type, element) for entry_type, _name, element in collect_root_entries(self.source.getroot()))
+        else:
+            live_entries = ((entry_type, element) for entry_type, element, _level in self._layout)
+        frozen = [(entry_type, self._copies.get(element, element)) for entry_type, element in live_entries]
+        return [(entry_type, element.get('name'), element) for entry_type, element in frozen]
+
+
+def entry_markup(element, level=None):
+    """UTF-8 markup of an entry as serializing its whole document writes it: pretty printed
+    at its depth (level) if the document's pretty printing reaches it, else as is."""
+    if level is None: return ET.tostring(element, encoding='utf-8', with_tail=False)
+    def wrapped(inner): # Nested level deep, so libxml2 indents the entry's children as in the document
+        for _ in range(level):
+            outer = ET.Element('w')
+            outer.append(inner)
+            inner = outer
+        return ET.tostring(inner, encoding='utf-8', pretty_print=True)
+    margins = _ENTRY_MARGINS.get(level)
+    if margins is None:
+        skeleton = wrapped(ET.Element('e'))
+        start = skeleton.index(b'<e/>')
+        margins = _ENTRY_MARGINS[level] = (start, len(skeleton) - start - len(b'<e/>'))
+    entry = copy.deepcopy(element)
+    entry.tail = None
+    data = wrapped(entry)
+    return data[margins[0]:len(data) - margins[1]]
+
+_ENTRY_MARGINS = {} # {level: lengths of the markup entry_markup() cuts off before and after the entry}
+
+
+class WorkspaceSnapshot:
+    """Immutable view of the workspace at one version: its files and the ability/item index.
+
+    The index is built on first use, by whichever thread asks, with the same rule as
+    loading (the first file containing a name wins) and has the shape of the editor's
+    maps: {name: {'filepath': str, 'element': element}}. Elements of a file not frozen
+    yet are live ones: job threads read them inside that FileSnapshot's reading().
+    """
+    def __init__(self, version, files):
+        self.version = version
+        self.files = files             # {filepath: FileSnapshot}, in load order
+        self._maps = None
+
+    def _index(self):
+        if self._maps is None:
+            maps = {TAG_ABILITY: {}, TAG_ITEM: {}}
+            for file_path, file_snapshot in self.files.items():
+                with file_snapshot.reading():
+                    entries = file_snapshot.entries
+                for entry_type, name, element in entries:
+                    if name and name not in maps[entry_type]:
+                        maps[entry_type][name] = {'filepath': file_path, 'element': element}
+            self._maps = maps # Two threads racing here build equal maps; either one is kept
+        return self._maps
+
+    @property
+    def abilities_map(self):
+        return self._index()[TAG_ABILITY]
+
+    @property
+    def items_map(self):
+        return self._index()[TAG_ITEM]
+
+
+class SnapshotStore:
+    """Hands out WorkspaceSnapshots (GUI thread only) and keeps them frozen.
+
+    Taking a snapshot of the files asked for copies nothing. before_change() (a
+    change_bus.about_to_apply subscriber) has the held FileSnapshots of a file copy
+    what an edit is about to change. Jobs release() their snapshot when done, after
+    which edits no longer cost its files anything.
+    """
+    def __init__(self):
+        self.version = 0
+        self._held = {} # {live root element: [FileSnapshots of that file jobs still use]}
+
+    def take(self, loaded_files, file_generations, file_paths=None):
+        """WorkspaceSnapshot of the given loaded files (all if None)."""
+        self.version += 1
+        files = {}
+        for file_path in loaded_files if file_paths is None else file_paths:
+            data = loaded_files.get(file_path)
+            if data is None or file_path in files: continue
+            file_snapshot = files[file_path] = FileSnapshot(file_path, data['tree'], file_generations.get(file_path))
+            self._held.setdefault(data['root'], []).append(file_snapshot)
+        return WorkspaceSnapshot(self.version, files)
+
+    def before_change(self, op):
+        """change_bus.about_to_apply subscriber: lets the held snapshots of the file the op changes copy what it changes."""
+        if not self._held: return
+        for file_snapshot in self._held.get(op[1].getroottree().getroot(), ()): file_snapshot.before_change(op)
+
+    def release(self, workspace):
+        """A job is done with workspace: its files need not be frozen any more."""
+        for file_snapshot in workspace.files.values():
+            root = file_snapshot.source.getroot()
+            held = self._held.get(root, [])
+            if file_snapshot in held:
+                held.remove(file_snapshot)
+                if not held: del self._held[root]
+
+
+# --- Entry Baselines (entries as loaded or last saved: change markers and revert) ---
+ENTRY_MODIFIED = "modified"
+ENTRY_NEW = "new"
+ENTRY_DELETED = "deleted"
+ENTRY_MARKER_COLORS = {ENTRY_MODIFIED: QColor(240, 180, 60), ENTRY_NEW: QColor(120, 210, 120), ENTRY_DELETED: QColor(150, 150, 150)}
+
+def entry_digest(element):
+    """Content hash of an entry: its markup without the tail."""
+    return hashlib.blake2b(ET.tostring(element, with_tail=False), digest_size=16).digest()
+
+def revert_entry_element(batch, element, original):
+    """Adds the ops making element equal to original (a detached copy) to batch; element itself is kept."""
+    old_items, items = tuple(element.attrib.items()), tuple(original.attrib.items())
+    if [key for key, _ in old_items] == [key for key, _ in items]: # Same keys: per-attribute ops keep renames cheap
+        for key, value in items: batch.set_attr(element, key, value)
+    else:
+        batch.set_attrib(element, items)
+    batch.set_text(element, original.text)
+    if [ET.tostring(child) for child in element] != [ET.tostring(child) for child in original]:
+        for child in reversed(element): batch.remove(child, element)
+        for index, child in enumerate(original): batch.insert(element, index, copy.deepcopy(child))
+
+
+class EntryBaseline:
+    """One file's entries as loaded or last saved, to tell which were changed and to revert them.
+
+    entries maps (entry_type, name) to the baseline element, the first of that name in
+    the file. Those are live elements: before_change() copies one right before an edit
+    first changes or removes it (copy-on-write), so loading costs no serializing or
+    hashing and only edited entries take memory. A baseline element without a copy
+    is still as it was.
+    """
+    __slots__ = ("entries", "copies", "_keys")
+
+    def __init__(self, entries):
+        self.entries = {}
+        for entry_type, name, element in entries:
+            if name: self.entries.setdefault((entry_type, name), element)
+        self.copies = {} # {baseline element: [copy, digest or None, (container, previous sibling) when last removed]}
+        self._keys = None
+
+    def key_of(self, element):
+        """(entry_type, name) element is the baseline entry of, or None."""
+        if self._keys is None: self._keys = {element: key for key, element in self.entries.items()}
+        return self._keys.get(element)
+
+    def before_change(self, element, removed_from=None):
+        """Copies a baseline element before its first change; removed_from is (container, previous sibling) if it is being removed."""
+        if self.key_of(element) is None: return
+        record = self.copies.get(element)
+        if record is None: record = self.copies[element] = [copy.deepcopy(element), None, None]
+        if removed_from is not None: record[2] = removed_from
+
+    def original(self, element):
+        """The baseline content of a baseline element (its copy, or itself if unchanged)."""
+        record = self.copies.get(element)
+        return element if record is None else record[0]
+
+    def digest(self, element):
+        """entry_digest() of a baseline element's baseline content."""
+        record = self.copies.get(element)
+        if record is None: return entry_digest(element)
+        if record[1] is None: record[1] = entry_digest(record[0])
+        return record[1]
+
+    def status(self, key, live):
+        """ENTRY_MODIFIED, ENTRY_NEW, ENTRY_DELETED or None (unchanged) of the entry named by key,
+        live being the file's current element of that name, or None."""
+        element = self.entries.get(key)
+        if element is None: return ENTRY_NEW if live is not None else None
+        if live is None: return ENTRY_DELETED
+        if live is element and element not in self.copies: return None
+        return ENTRY_MODIFIED if entry_digest(live) != self.digest(element) else None
+
+    def changed_keys(self):
+        """Keys of the baseline entries edited, removed or renamed since the baseline."""
+        return [self.key_of(element) for element in self.copies]
+
+
+class EntryListDelegate(QStyledItemDelegate):
+    """Paints ability/item list rows by their change status (WitcherXMLEditor.entry_status):
+    modified entries bold, new ones green, deleted ones (rows holding their file path) struck through.
+    Only painted rows are looked up, so long lists cost nothing extra."""
+    def __init__(self, editor, entry_type, parent=None):
+        super().__init__(parent)
+        self.editor = editor
+        self.entry_type = entry_type
+
+    def initStyleOption(self, option, index):
+        super().initStyleOption(option, index)
+        if index.data(Qt.ItemDataRole.UserRole): status = ENTRY_DELETED
+        else: status = self.editor.entry_status(self.entry_type, index.data())
+        if status is None: return
+        palette = QPalette(option.palette)
+        palette.setColor(QPalette.ColorRole.Text, ENTRY_MARKER_COLORS[status])
+        option.palette = palette
+        font = QFont(option.font)
+        font.setBold(status == ENTRY_MODIFIED)
+        font.setStrikeOut(status == ENTRY_DELETED)
+        option.font = font
+
+
+# --- Minimal-Diff Saving (splice edited entries into the file's own text) ---
+# Markup of an XML text: comments, CDATA, PIs and DOCTYPE (group 2 is None) or tags:
+# group 1 '/' for end tags, group 2 the name, group 3 the attributes (ends with '/' if self-closing).
+XML_MARKUP = re.compile(r'<!--.*?-->|<!\[CDATA\[.*?\]\]>|<\?.*?\?>|<!DOCTYPE(?:[^\[>]|\[.*?\])*>'
+                        r'|<(/?)([^\s/>!?]+)((?:[^>"\']|"[^"]*"|\'[^\']*\')*)>', re.S)
+XML_DECLARED_ENCODING = re.compile(rb'<\?xml[^>]*?encoding\s*=\s*["\']([A-Za-z0-9._-]+)["\']')
+XML_DECLARATION = re.compile(r'<\?xml\s[^>]*\?>[ \t]*(?:\r?\n)?') # With the line break after it
+
+def decode_xml_bytes(data):
+    """Returns (text, encoding, bom) of an XML file's bytes, so that bom + text.encode(encoding) gives them back."""
+    for bom, encoding in ((codecs.BOM_UTF8, 'utf-8'), (codecs.BOM_UTF16_LE, 'utf-16-le'), (codecs.BOM_UTF16_BE, 'utf-16-be')):
+        if data.startswith(bom): return data[len(bom):].decode(encoding), encoding, bom
+    if data.startswith(b'<\x00'): return data.decode('utf-16-le'), 'utf-16-le', b''
+    if data.startswith(b'\x00<'): return data.decode('utf-16-be'), 'utf-16-be', b''
+    match = XML_DECLARED_ENCODING.match(data)
+    encoding = match.group(1).decode('ascii').lower() if match else 'utf-8'
+    return data.decode(encoding), encoding, b''
+
+def xml_declaration(text):
+    """The <?xml ...?> declaration text starts with (and the line break after it), or ''."""
+    match = XML_DECLARATION.match(text)
+    return match.group(0) if match else ''
+
+def declare_encoding(declaration, label):
+    """declaration with its encoding set to label, keeping its quoting; '' stays ''."""
+    if not declaration: return declaration
+    declared, count = re.subn(r'(encoding\s*=\s*)(["\'])[^"\']*\2', lambda m: f'{m.group(1)}{m.group(2)}{label}{m.group(2)}', declaration, count=1)
+    if count: return declared
+    return re.sub(r'(version\s*=\s*(["\'])[^"\']*\2)', lambda m: f'{m.group(1)} encoding={m.group(2)}{label}{m.group(2)}', declaration, count=1)
+
+def scan_entry_spans(text):
+    """Finds the entry containers and entries of an XML text without building a tree.
+
+    Returns (containers, entries) in iter_root_entries order: containers as
+    [(start, content_start)] (content_start None if self-closing) and entries as
+    [(container index, start, end)], offsets into text.
+    """
+    stack = [] # [(name, container doc index or None, entry doc index or None)]
+    doc_containers, doc_entries = [], []
+    for match in XML_MARKUP.finditer(text):
+        name = match.group(2)
+        if name is None: continue
+        if match.group(1): # End tag
+            _name, _container, entry = stack.pop()
+            if entry is not None: doc_entries[entry][2] = match.end()
+            continue
+        self_closing = match.group(3).endswith('/')
+        parent = stack[-1] if stack else None
+        container = entry = None
+        if parent is not None and name in (TAG_ABILITIES, TAG_ITEMS): # Like root.findall('.//abilities')
+            container = len(doc_containers)
+            doc_containers.append((name, match.start(), None if self_closing else match.end()))
+        elif parent is not None and parent[1] is not None and \
+                (name, parent[0]) in ((TAG_ABILITY, TAG_ABILITIES), (TAG_ITEM, TAG_ITEMS)):
+            entry = len(doc_entries)
+            doc_entries.append([parent[1], match.start(), match.end()])
+        if not self_closing: stack.append((name, container, entry))
+    # Abilities containers first, then items containers, as iter_root_entries walks them
+    order = sorted(range(len(doc_containers)), key=lambda i: (doc_containers[i][0] != TAG_ABILITIES, i))
+    position = {doc_index: i for i, doc_index in enumerate(order)}
+    containers = [doc_containers[i][1:] for i in order]
+    entries = sorted(((position[c], start, end) for c, start, end in doc_entries), key=lambda e: (e[0], e[1]))
+    return containers, entries
+
+def shift_spans(spans, delta):
+    """scan_entry_spans result with every offset moved by delta."""
+    if not delta: return spans
+    containers, entries = spans
+    return ([(start + delta, None if content is None else content + delta) for start, content in containers],
+            [(container, start + delta, end + delta) for container, start, end in entries])
+
+def line_indent(text, pos):
+    """Whitespace between the start of pos's line and pos, or None if anything else precedes pos there."""
+    line_start = text.rfind('\n', 0, pos) + 1
+    indent = text[line_start:pos]
+    return indent if not indent.strip(' \t') else None
+
+def indent_unit(text):
+    """One level of indentation as used by the text (that of its first indented tag line), default a tab."""
+    match = re.search(r'\n([ \t]+)<', text)
+    if not match: return '\t'
+    whitespace = match.group(1)
+    return '\t' if whitespace[0] == '\t' else whitespace
+
+def format_entry(element, indent, unit, newline):
+    """Serializes a detached entry for splicing. Entries with elements the editor created
+    (no source line, so no formatting whitespace) are re-indented to the entry's depth."""
+    if indent is not None and any(child.sourceline is None for child in element.iter()):
+        level, rest = divmod(len(indent), len(unit))
+        if not rest and indent == unit * level: ET.indent(element, space=unit, level=level)
+    text = ET.tostring(element, encoding='unicode', with_tail=False)
+    return text.replace('\n', newline) if newline != '\n' else text
+
+def format_start_tag(element, self_closing):
+    """Start tag of a detached shallow copy of an element, for splicing over its old one."""
+    text = ET.tostring(element, encoding='unicode', with_tail=False)
+    return text if self_closing else text[:-2] + '>'
+
+def element_path(element):
+    """Indices among element children (comments, PIs and entities skipped) from the root down to element; () for the root."""
+    path = []
+    parent = element.getparent()
+    while parent is not None:
+        path.append(sum(1 for sibling in element.itersiblings(preceding=True) if isinstance(sibling.tag, str)))
+        element, parent = parent, parent.getparent()
+    return tuple(reversed(path))
+
+def find_start_tags(text, paths):
+    """{path: start tag match} for the element_path()s of elements in an XML text, scanning only as far as needed."""
+    wanted, found = set(paths), {}
+    if not wanted: return found
+    open_paths, child_counts = [], [0]
+    for match in XML_MARKUP.finditer(text):
+        if match.group(2) is None: continue
+        if match.group(1): # End tag
+            open_paths.pop()
+            child_counts.pop()
+            continue
+        path = open_paths[-1] + (child_counts[-1],) if open_paths else ()
+        if open_paths: child_counts[-1] += 1
+        if path in wanted:
+            found[path] = match
+            if len(found) == len(wanted): break
+        if not match.group(3).endswith('/'):
+            open_paths.append(path)
+            child_counts.append(0)
+    return found
+
+def merge_entry_comments(original, edited):
+    """Carries an edited entry's attributes and texts over to the original one parsed with its
+    comments, which the editor's trees drop. Returns original, or None if the two differ in elements."""
+    stripped = copy.deepcopy(original)
+    ET.strip_tags(stripped, ET.Comment) # Merges the comments' tails into the texts, as parsing without comments does
+    triples = list(zip(original.iter(ET.Element), stripped.iter(), edited.iter()))
+    if len(triples) != sum(1 for _ in edited.iter()) or len(triples) != sum(1 for _ in stripped.iter()) or \
+            any(o.tag != e.tag for o, _s, e in triples):
+        return None
+    for o, s, e in triples:
+        if list(s.attrib.items()) != list(e.attrib.items()):
+            o.attrib.clear()
+            o.attrib.update(e.attrib.items())
+        if s.text != e.text: # Comments inside the changed text go with it
+            o.text = e.text
+            for child in list(o):
+                if isinstance(child.tag, str): break
+                o.remove(child)
+        if o is not original and s.tail != e.tail:
+            o.tail = e.tail
+            sibling = o.getnext()
+            while sibling is not None and not isinstance(sibling.tag, str):
+                next_sibling = sibling.getnext()
+                o.getparent().remove(sibling)
+                sibling = next_sibling
+    return original
+
+
+class FileSource:
+    """Text of a loaded file as last read or written, and the entries it holds.
+
+    encoding, bom, declaration (the <?xml ...?> text starts with, '' if none) and
+    newline are those of the file; saves write it back with them. text is None
+    after a save wrote the whole tree, until the next save reads the file again.
+
+    entries/containers are the live elements, in iter_root_entries order, whose
+    markup the text holds; layout is the entry count of each container and spans
+    their offsets (scan_entry_spans, found on a job thread when first needed).
+    Edits mark entries dirty ({entry element: serial}) and restructured when they
+    add or remove entries; attribute changes of other elements (not inside a
+    container) mark them retagged ({element: serial}, their start tag is
+    spliced). Anything else they
+    change sets rewrite (the serial), which makes the next save rewrite the whole file.
+    """
+    __slots__ = ("text", "encoding", "bom", "declaration", "newline", "spans", "entries", "containers", "layout",
+                 "dirty", "retagged", "restructured", "rewrite", "_index")
+
+    def __init__(self, data, root, spans=None):
+        self.text, self.encoding, self.bom = decode_xml_bytes(data)
+        self.declaration = xml_declaration(self.text)
+        self.newline = '\r\n' if '\r\n' in self.text else '\n'
+        self.spans = spans
+        self.containers = entry_containers_of(root)
+        self.entries = []
+        self.layout = []
+        for container in self.containers:
+            entries = [child for child in container if entry_type_of(child, container)]
+            self.entries.extend(entries)
+            self.layout.append(len(entries))
+        self.dirty = {}
+        self.retagged = {}
+        self.restructured = None
+        self.rewrite = None
+        self._index = None
+
+    def update(self, text, encoding, bom, declaration, newline, spans, plan):
+        """Takes over what a save wrote from plan (see save_xml_file); edits made after the plan stay marked."""
+        self.text, self.encoding, self.bom, self.spans = text, encoding, bom, spans
+        self.declaration, self.newline = declaration, newline
+        self.entries, self.containers, self.layout = plan.entries, plan.containers, plan.new_layout
+        self.dirty = {entry: serial for entry, serial in self.dirty.items() if serial > plan.serial}
+        self.retagged = {element: serial for element, serial in self.retagged.items() if serial > plan.serial}
+        if self.restructured is not None and self.restructured <= plan.serial: self.restructured = None
+        if self.rewrite is not None and self.rewrite <= plan.serial: self.rewrite = None
+        self._index = None
+
+    def is_utf8(self):
+        """True if the file is UTF-8 without BOM."""
+        return self.encoding == 'utf-8' and not self.bom
+
+    def index(self):
+        """{entry element: position in entries}."""
+        if self._index is None: self._index = {element: i for i, element in enumerate(self.entries)}
+        return self._index
+
+    def entry_containers(self):
+        """Container index of every entry in entries."""
+        return [container for container, count in enumerate(self.layout) for _ in range(count)]
+
+
+class MinimalSavePlan:
+    """What changed in one file since its FileSource, taken on the GUI thread at save time.
+
+    changes is None if the file must be rewritten whole, else a list splice_entries applies:
+      ('replace', entry index, detached copy)     dirty entry
+      ('delete', entry index)                     entry no longer in its container
+      ('insert', container index, after, copy)    new entry after entry index 'after' (None = first)
+      ('retag', element path, shallow copy)       new start tag of an element outside entries (see element_path)
+    entries/containers/new_layout describe the file as saved, origins the source
+    entry index of each of its entries (None if inserted; origins None: unchanged
+    entries), serial is the latest edit it includes. The file is written in its own
+    encoding, BOM and declaration unless to_utf8 is set.
+    """
+    __slots__ = ("source", "file_path", "text", "encoding", "bom", "declaration", "newline", "spans", "layout", "changes",
+                 "entries", "containers", "new_layout", "origins", "serial", "to_utf8")
+
+    def __init__(self, source, file_path, serial):
+        self.source = source
+        self.file_path = file_path # Where the text is, if source.text is None
+        self.text, self.encoding, self.bom = source.text, source.encoding, source.bom
+        self.declaration, self.newline = source.declaration, source.newline
+        self.spans = source.spans
+        self.layout = source.layout
+        self.changes = None
+        self.entries, self.containers, self.new_layout = [], [], []
+        self.origins = None
+        self.serial = serial
+        self.to_utf8 = False # Write UTF-8 without BOM instead of the file's own encoding
+
+
+def splice_entries(plan):
+    """Applies a MinimalSavePlan's changes to its text (job thread). Returns the new text and
+    its spans (shifted, not rescanned), or None if the text does not hold the entries the plan expects."""
+    text = plan.text
+    if plan.spans is not None:
+        containers, entries = plan.spans
+    else:
+        containers, entries = scan_entry_spans(text)
+        layout = [0] * len(containers)
+        for container, _start, _end in entries: layout[container] += 1
+        if layout != plan.layout: return None
+    newline = '\r\n' if '\r\n' in text else '\n'
+    unit = indent_unit(text)
+    splices = [] # (start, end, replacement, sequence, offset and length of the entry markup in replacement)
+    tags = find_start_tags(text, [change[1] for change in plan.changes if change[0] == 'retag'])
+    for sequence, change in enumerate(plan.changes):
+        kind = change[0]
+        if kind == 'replace':
+            _, start, end = entries[change[1]]
+            element = change[2]
+            if '<!--' in text[start:end]: # Keep the entry's own comments where its elements are unchanged
+                merged = merge_entry_comments(ET.fromstring(text[start:end]), element)
+                if merged is not None: element = merged
+            fragment = format_entry(element, line_indent(text, start), unit, newline)
+            splices.append((start, end, fragment, sequence, (0, len(fragment))))
+        elif kind == 'delete':
+            _, start, end = entries[change[1]]
+            indent = line_indent(text, start)
+            line_end = re.match(r'[ \t]*(\r?\n)?', text[end:end + 256])
+            if indent is not None and line_end.group(1): # Entry on lines of its own: drop them whole
+                start -= len(indent)
+                end += line_end.end()
+            splices.append((start, end, '', sequence, None))
+        elif kind == 'retag':
+            tag = tags.get(change[1])
+            if tag is None or tag.group(2) != change[2].tag: return None
+            fragment = format_start_tag(change[2], tag.group(3).endswith('/'))
+            splices.append((tag.start(), tag.end(), fragment, sequence, None))
+        else: # insert
+            _, container, after, element = change
+            if after is not None:
+                position = entries[after][2]
+                indent = line_indent(text, entries[after][1])
+            else:
+                container_start, position = containers[container]
+                if position is None: return None # <items/>: nowhere to insert
+                container_indent = line_indent(text, container_start)
+                indent = container_indent + unit if container_indent is not None else None
+            lead = newline + (indent or '')
+            fragment = format_entry(element, indent, unit, newline)
+            splices.append((position, position, lead + fragment, sequence, (len(lead), len(fragment))))
+    splices.sort(key=lambda splice: (splice[0], splice[3]))
+    pieces, position, delta = [], 0, 0
+    starts, ends, deltas, new_spans = [], [], [], {} # deltas[k]: shift after splices[:k + 1]; new_spans: {sequence: (start, end)}
+    for start, end, replacement, sequence, markup in splices:
+        if start < position: return None # Overlapping changes: the plan does not fit the text
+        pieces.append(text[position:start])
+        pieces.append(replacement)
+        if markup: new_spans[sequence] = (start + delta + markup[0], start + delta + markup[0] + markup[1])
+        delta += len(replacement) - (end - start)
+        starts.append(start)
+        ends.append(end)
+        deltas.append(delta)
+        position = end
+    pieces.append(text[position:])
+
+    def shift_entry(pos): # By the splices ending at or before an untouched entry
+        k = bisect_right(ends, pos)
+        return pos + (deltas[k - 1] if k else 0)
+    def shift_container(pos): # By the splices starting before a container tag (not inserts right after it)
+        k = bisect_left(starts, pos)
+        return pos + (deltas[k - 1] if k else 0)
+    new_containers = [(shift_container(start), None if content is None else shift_container(content)) for start, content in containers]
+    replaced = {change[1]: sequence for sequence, change in enumerate(plan.changes) if change[0] == 'replace'}
+    new_entries = []
+    if plan.origins is None: # Same entries, some replaced: shift the runs between those, container by container
+        order, k, low = sorted(replaced), 0, 0 # Entries are in text order within a container only
+        for count in plan.layout:
+            high = low + count
+            previous = low
+            delta = shift_entry(entries[low][1]) - entries[low][1] if count else 0
+            while k < len(order) and order[k] < high:
+                i = order[k]
+                new_entries.extend([(container, s + delta, e + delta) for container, s, e in entries[previous:i]])
+                new_start, new_end = new_spans[replaced[i]]
+                new_entries.append((entries[i][0], new_start, new_end))
+                delta += (new_end - new_start) - (entries[i][2] - entries[i][1])
+                previous, k = i + 1, k + 1
+            new_entries.extend([(container, s + delta, e + delta) for container, s, e in entries[previous:high]])
+            low = high
+        return ''.join(pieces), (new_containers, new_entries)
+    inserts = iter(sequence for sequence, change in enumerate(plan.changes) if change[0] == 'insert')
+    new_containers_of = (container for container, count in enumerate(plan.new_layout) for _ in range(count))
+    for origin, container in zip(plan.origins, new_containers_of):
+        if origin is None: span = new_spans[next(inserts)]
+        elif origin in replaced: span = new_spans[replaced[origin]]
+        else:
+            _, start, end = entries[origin]
+            new_start = shift_entry(start)
+            span = (new_start, new_start + end - start)
+        new_entries.append((container, *span))
+    return ''.join(pieces), (new_containers, new_entries)
+
+def save_xml_file(file_snapshot, plan, file_path, report=None, expected=None):
+    """Writes one file of a save (job thread), atomically.
+
+    With a plan: the file's text with the plan's changes spliced in, or else the
+    whole snapshot, in the file's own encoding, BOM, declaration and line endings
+    (UTF-8 if the plan says so). Without one: the snapshot as UTF-16. Output is
+    encoded and written a chunk at a time; report(done, total) follows a streamed
+    snapshot. Raises ExternalChangeError instead if the file no longer matches the
+    DiskStamp expected. Returns ((text, encoding, bom, declaration, newline, spans)
+    for the FileSource or None without a plan, DiskStamp of the written file); text
+    and spans are None if the snapshot was written.
+    """
+    if expected is not None and expected.changed(file_path): raise ExternalChangeError(file_path)
+    if plan is None:
+        declaration = "<?xml version='1.0' encoding='UTF-16'?>\n"
+        with atomic_file(file_path) as out:
+            out = DigestWriter(out)
+            out.write(codecs.BOM_UTF16_LE)
+            stream_xml_data(file_snapshot, out, declaration, 'utf-16-le', report=report)
+        return None, DiskStamp.of(file_path, out.digest)
+    spliced = None
+    if plan.changes is not None:
+        if plan.text is None: plan.text = decode_xml_bytes(Path(plan.file_path).read_bytes())[0] # Last save streamed it
+        spliced = splice_entries(plan)
+    encoding, bom, declaration = plan.encoding, plan.bom, plan.declaration
+    if plan.to_utf8 and (encoding, bom) != ('utf-8', b''):
+        encoding, bom, declaration = 'utf-8', b'', declare_encoding(declaration, 'UTF-8')
+    text = spans = None
+    with atomic_file(file_path) as out:
+        out = DigestWriter(out)
+        out.write(bom)
+        if spliced is None:
+            stream_xml_data(file_snapshot, out, declaration, encoding, plan.newline, report)
+        else:
+            text, spans = spliced
+            if declaration != plan.declaration: # Entries were spliced after the old declaration
+                text = declaration + text[len(plan.declaration):]
+                spans = shift_spans(spans, len(declaration) - len(plan.declaration))
+            write_encoded(out, text, encoding)
+    return (text, encoding, bom, declaration, plan.newline, spans), DiskStamp.of(file_path, out.digest)
+
+
+# --- File Writing (safe to run on job threads) ---
+STREAM_CHUNK = 1 << 20 # Characters/bytes encoded and written at a time
+
+def write_encoded(out, text, encoding):
+    """Writes text to the binary file out in encoding, a chunk at a time (no full-size bytes copy)."""
+    encoder = codecs.getincrementalencoder(encoding)('xmlcharrefreplace')
+    for start in range(0, len(text), STREAM_CHUNK):
+        out.write(encoder.encode(text[start:start + STREAM_CHUNK]))
+    out.write(encoder.encode('', final=True))
+
+def stream_xml_data(file_snapshot, out, declaration, encoding, newline='\n', report=None):
+    """Writes a FileSnapshot to the binary file out after declaration, in encoding and with
+    the given line endings.
+
+    The snapshot is serialized piece by piece (see FileSnapshot.write); those are
+    decoded and re-encoded STREAM_CHUNK bytes at a time, so memory stays bounded
+    however big the file. report(done, total) is called with the bytes written,
+    total being the size of the file the snapshot was loaded from (an estimate).
+    """
+    try:
+        total = os.path.getsize(file_snapshot.file_path)
+    except OSError:
+        total = 0
+    writer = TranscodingWriter(out, encoding, newline, report, total)
+    writer.write_text(declaration)
+    file_snapshot.write(writer)
+    writer.flush(final=True)
+
+class TranscodingWriter:
+    """File-like sink for UTF-8 XML: writes it to the binary file out in encoding and
+    with the given line endings, STREAM_CHUNK bytes at a time (see stream_xml_data)."""
+    __slots__ = ("out", "newline", "report", "total", "done", "_decoder", "_encoder", "_pending", "_size")
+
+    def __init__(self, out, encoding, newline='\n', report=None, total=0):
+        self.out = out
+        self.newline = newline
+        self.report = report
+        self.total = total
+        self.done = 0
+        self._decoder = codecs.getincrementaldecoder('utf-8')()
+        self._encoder = codecs.getincrementalencoder(encoding)('xmlcharrefreplace')
+        self._pending = []
+        self._size = 0
+
+    def write(self, data):
+        self._pending.append(data)
+        self._size += len(data)
+        if self._size >= STREAM_CHUNK: self.flush()
+
+    def write_text(self, text, final=False):
+        """Writes text as is (line endings included)."""
+        data = self._encoder.encode(text, final)
+        self.out.write(data)
+        self.done += len(data)
+
+    def flush(self, final=False):
+        """Writes the UTF-8 collected so far (and ends the output if final)."""
+        data, self._pending, self._size = b''.join(self._pending), [], 0
+        text = self._decoder.decode(data, final)
+        if self.newline != '\n': text = text.replace('\n', self.newline)
+        self.write_text(text, final)
+        if self.report: self.report(self.done, max(self.total, self.done))
+
+@contextmanager
+def atomic_file(file_path):
+    """Binary file to write the new content of file_path to. It is a temporary file next to
+    the target, flushed to disk and renamed over the target when the block ends, so the
+    file is always either the old or the new version, never half written. If the block
+    raises, the target is left alone.
+    """
+    target = Path(file_path)
+    target.parent.mkdir(parents=True, exist_ok=True) # Ensure parent directory exists
+    fd, temp_path = tempfile.mkstemp(dir=target.parent, prefix=f".{target.name}.", suffix=".tmp")
+    try:
+        with os.fdopen(fd, 'wb') as temp_file:
+            yield temp_file
+            temp_file.flush()
+            os.fsync(temp_file.fileno())
+        if target.exists(): os.chmod(temp_path, stat.S_IMODE(target.stat().st_mode)) # mkstemp creates it owner-only
+        os.replace(temp_path, target)
+    except BaseException:
+        try:
+            os.unlink(temp_path)
+        except OSError:
+            pass
+        raise
+
+
+# --- Edit Journal (write-ahead log of unsaved edits, replayed after a crash) ---
+# One JSON line per committed batch or undo/redo step: {"n": seq, "ops": [op, ...]}, op being
+# [file, kind, path, ...] with file relative to the workspace folder and path the child
+# indices from the file's root element to the op's element, both taken right before the op
+# was applied. Replayed in order onto the files as last saved, the ops redo the edits:
+#   [file, "a", path, key, value]        set an attribute (value None: remove it)
+#   [file, "x", path, text]              set the text
+#   [file, "g", path, tag]               set the tag
+#   [file, "A", path, items]             replace all attributes
+#   [file, "i", path, index, xml, tail]  insert the element serialized in xml under path
+#   [file, "r", path, index]             remove the child at index
+# {"saved": file, "upto": seq} lines record that file was saved with the ops up to seq.
+JOURNAL_VERSION = 1
+JOURNAL_FLUSH_DELAY = 0.2      # Seconds of edits one fsync covers
+JOURNAL_INDEXED_CHILDREN = 64  # Parents with more children keep a child -> position map
+
+def journal_path(base_path, folder):
+    """Journal file of a workspace folder, under base_path/recovery."""
+    digest = hashlib.sha1(str(folder).encode('utf-8')).hexdigest()[:16]
+    return Path(base_path) / "recovery" / f"{digest}.journal"
+
+def replay_journal_op(batch, root, op):
+    """Applies one journaled op (without its file) to the tree of root through an XmlEditBatch.
+
+    Raises LookupError/ValueError/ET.XMLSyntaxError if the tree does not match the op.
+    """
+    kind, path = op[0], op[1]
+    element = root
+    for index in path: element = element[index]
+    if kind == "a": batch.set_attr(element, op[2], op[3])
+    elif kind == "x": batch.set_text(element, op[2])
+    elif kind == "g": batch.set_tag(element, op[2])
+    elif kind == "A": batch.set_attrib(element, (tuple(item) for item in op[2]))
+    elif kind == "i":
+        child = ET.fromstring(f"<journal>{op[3]}</journal>")[0] # Wrapped: comments and PIs are no documents
+        child.tail = op[4]
+        batch.insert(element, op[2], child)
+    elif kind == "r": batch.remove(element[op[2]], element)
+    else: raise ValueError(f"Unknown journal op '{kind}'")
+
+
+class EditJournal:
+    """Append-only journal of the edits made to a workspace since its files were saved.
+
+    before_op/after_ops subscribe to the change bus: ops are encoded on the GUI thread
+    and each batch is appended with a single write, while a background thread fsyncs
+    at most every JOURNAL_FLUSH_DELAY seconds. The file is only created, replacing a
+    journal left behind, when the first edit is recorded, so recoverable_ops() can
+    still read that one after the workspace was loaded. Writing errors are logged
+    once and disable the journal; editing never fails because of it.
+    """
+    def __init__(self, file_path, folder, file_roots):
+        self.file_path = Path(file_path)
+        self.folder = str(folder)
+        self.file_roots = file_roots  # Callable returning {root element: file path} of the loaded files
+        self.seq = 0                  # Number of the last batch recorded
+        self.failed = False
+        self._fd = None
+        self._lock = threading.Lock() # Guards _fd between the GUI and the flush thread
+        self._dirty = threading.Event()
+        self._stopped = False
+        self._pending = []            # Encoded ops of the batch being applied
+        self._keys = None             # {root element: file key} while a batch is applied
+        self._positions = {}          # {parent: {child: index}} of parents with many children
+        threading.Thread(target=self._flush_loop, name="EditJournal", daemon=True).start()
+
+    def _key(self, file_path):
+        try:
+            return Path(file_path).relative_to(self.folder).as_posix()
+        except ValueError: # Saved outside the folder
+            return str(file_path)
+
+    def _position(self, parent, child):
+        positions = self._positions.get(parent)
+        if positions is None:
+            if len(parent) < JOURNAL_INDEXED_CHILDREN: return parent.index(child)
+            positions = self._positions[parent] = {c: i for i, c in enumerate(parent)}
+        return positions[child]
+
+    def _locate(self, element):
+        """(root element, child index path) of element."""
+        path = []
+        parent = element.getparent()
+        while parent is not None:
+            path.append(self._position(parent, element))
+            element, parent = parent, parent.getparent()
+        path.reverse()
+        return element, path
+
+    def before_op(self, op):
+        """change_bus.about_to_apply subscriber: encodes the op against the tree it is about to change."""
+        if self.failed: return
+        if self._keys is None:
+            self._keys = {root: self._key(fp) for root, fp in self.file_roots().items()}
+        kind, element = op[0], op[1]
+        root, path = self._locate(element)
+        key = self._keys.get(root)
+        if key is None: return # Detached element; its state is journaled when it is inserted
+        if kind == OP_SET_ATTR: encoded = [key, "a", path, op[2], op[4]]
+        elif kind == OP_SET_TEXT: encoded = [key, "x", path, op[3]]
+        elif kind == OP_SET_TAG: encoded = [key, "g", path, op[3]]
+        elif kind == OP_SET_ATTRIB: encoded = [key, "A", path, op[3]]
+        elif kind == OP_INSERT:
+            child = op[3]
+            encoded = [key, "i", path, op[2], ET.tostring(child, encoding='unicode', with_tail=False), child.tail]
+        else: # Index of the child now; an undone insert's op holds the index it was inserted at
+            encoded = [key, "r", path, self._position(element, op[3])]
+        if kind in (OP_INSERT, OP_REMOVE): self._positions.pop(element, None)
+        self._pending.append(encoded)
+
+    def after_ops(self, ops):
+        """change_bus.applied subscriber: appends the batch's ops as one record."""
+        self._keys = None
+        if not self._pending: return
+        self.seq += 1
+        record = {"n": self.seq, "ops": self._pending}
+        self._pending = []
+        self._write(record)
+
+    def abort(self):
+        """change_bus.aborted subscriber: drops the ops of a batch that was rolled back."""
+        self._keys = None
+        self._pending = []
+
+    def mark_saved(self, file_paths, upto):
+        """Records that the files were saved with the edits of records up to upto."""
+        if self._fd is None: return # Nothing journaled since the journal was last cleared
+        for file_path in file_paths:
+            self._write({"saved": self._key(file_path), "upto": upto})
+
+    def reset_positions(self):
+        """Drops the cached child positions (e.g. when the workspace's trees were replaced)."""
+        self._positions.clear()
+
+    def _write(self, record):
+        if self.failed: return
+        line = memoryview((json.dumps(record, ensure_ascii=False, separators=(',', ':')) + "\n").encode('utf-8'))
+        try:
+            with self._lock:
+                if self._fd is None:
+                    self.file_path.parent.mkdir(parents=True, exist_ok=True)
+                    self._fd = os.open(self.file_path, os.O_WRONLY | os.O_CREAT | os.O_TRUNC | getattr(os, 'O_BINARY', 0), 0o644)
+                    header = json.dumps({"journal": JOURNAL_VERSION, "folder": self.folder}, ensure_ascii=False) + "\n"
+                    line = memoryview(header.encode('utf-8') + line)
+                while line: line = line[os.write(self._fd, line):]
+        except OSError as e:
+            logging.error(f"Edit journal {self.file_path} cannot be written, unsaved edits will not be recoverable: {e}")
+            self.failed = True
+            return
+        self._dirty.set()
+
+    def _flush_loop(self):
+        while True:
+            self._dirty.wait()
+            if self._stopped: return
+            time.sleep(JOURNAL_FLUSH_DELAY) # Lets the edits of the next moments share the fsync
+            self._dirty.clear()
+            with self._lock: # fsync a duplicate, so writes need not wait for the disk
+                fd = os.dup(self._fd) if self._fd is not None else None
+            if fd is None: continue
+            try:
+                os.fsync(fd)
+            except OSError as e:
+                logging.warning(f"Could not flush edit journal {self.file_path}: {e}")
+            finally:
+                os.close(fd)
+
+    def clear(self):
+        """Deletes the journal file (nothing unsaved anymore); the next edit starts a new one."""
+        with self._lock:
+            if self._fd is not None:
+                os.close(self._fd)
+                self._fd = None
+        try:
+            self.file_path.unlink()
+        except FileNotFoundError:
+            pass
+        except OSError as e:
+            logging.warning(f"Could not delete edit journal {self.file_path}: {e}")
+
+    def close(self):
+        """Deletes the journal file and stops the flush thread (the workspace was saved or discarded)."""
+        self.clear()
+        self._stopped = True
+        self._dirty.set()
+
+    def recoverable_ops(self):
+        """[(file_path, op without file)] of a journal left by an earlier session, in order.
+
+        Ops of files saved later in that session are left out. A torn last line (the
+        crash happened while it was written) ends the journal; a journal of another
+        format or folder reads as empty.
+        """
+        try:
+            lines = self.file_path.read_bytes().split(b"\n")
+        except FileNotFoundError:
+            return []
+        except OSError as e:
+            logging.warning(f"Could not read edit journal {self.file_path}: {e}")
+            return []
+        records, saved = [], {}
+        try:
+            header = json.loads(lines[0])
+            if header.get("journal") != JOURNAL_VERSION or header.get("folder") != self.folder: return []
+            for line in lines[1:]:
                 try:
-                    logging.info(f"Removing property element <{self.element.tag}> from parent <{parent_element.tag}> in file {os.path.basename(self.file_path)}")
-                    parent_element.remove(self.element)
-                    self.editor.mark_file_modified(self.file_path)
-                    # Deleting the widget will remove it from the layout
-                    self.deleteLater()
-                    logging.info(f"Removed property widget and element: {self.element.tag}")
-                    # Note: Not refreshing the whole panel to avoid recreating everything.
-                    # Could emit a signal if other UI parts need to react.
+                    record = json.loads(line)
                 except ValueError:
-                    logging.error(f"Element {self.element.tag} not found in parent during remove_self.", exc_info=True)
-                    self.deleteLater() # Still remove widget even on XML error
-                except Exception as e:
-                    logging.error(f"Error removing property widget/element: {e}", exc_info=True)
-                    self.deleteLater()
-            else:
-                logging.error(f"Could not find parent element for <{self.element.tag}> to remove.")
-                self.deleteLater() # Remove widget even if XML parent not found
+                    break
+                if "saved" in record: saved[record["saved"]] = max(saved.get(record["saved"], 0), record["upto"])
+                else: records.append(record)
+            return [(str(Path(self.folder) / op[0]), op[1:])
+                    for record in records for op in record["ops"] if record["n"] > saved.get(op[0], 0)]
+        except (ValueError, TypeError, KeyError, AttributeError, IndexError) as e:
+            logging.warning(f"Edit journal {self.file_path} is damaged, nothing recovered: {e}")
+            return []
+
+
+# --- External Changes (files changed on disk since they were loaded or saved) ---
+def content_digest(data=None):
+    """Hash object for file contents (fed data, if given)."""
+    digest = hashlib.blake2b(digest_size=16)
+    if data is not None: digest.update(data)
+    return digest
+
+def file_digest(file_path):
+    """content_digest() of a file's bytes, read a chunk at a time."""
+    digest = content_digest()
+    with open(file_path, 'rb') as f:
+        for chunk in iter(lambda: f.read(STREAM_CHUNK), b''): digest.update(chunk)
+    return digest.digest()
+
+
+class DigestWriter:
+    """Binary file wrapper that hashes (content_digest) what is written through it."""
+    __slots__ = ("out", "_digest")
+
+    def __init__(self, out):
+        self.out = out
+        self._digest = content_digest()
+
+    def write(self, data):
+        self._digest.update(data)
+        return self.out.write(data)
+
+    @property
+    def digest(self):
+        return self._digest.digest()
+
+
+class DiskStamp:
+    """A file on disk as the editor last read or wrote it: modification time, size and content hash.
+
+    changed() compares the stat first, so checking a file before a save costs one stat;
+    the file is only read and hashed if its stat differs with the same size (e.g. it
+    was touched or copied back unchanged).
+    """
+    __slots__ = ("mtime_ns", "size", "digest")
+
+    def __init__(self, mtime_ns, size, digest):
+        self.mtime_ns = mtime_ns
+        self.size = size
+        self.digest = digest
+
+    @classmethod
+    def of(cls, file_path, digest):
+        """Stamp of a file just read or written, whose content hashed to digest."""
+        st = os.stat(file_path)
+        return cls(st.st_mtime_ns, st.st_size, digest)
+
+    @classmethod
+    def of_data(cls, file_path, data):
+        """Stamp of a file whose content data was just read."""
+        return cls.of(file_path, content_digest(data).digest())
+
+    def changed(self, file_path):
+        """True if the file on disk no longer has the stamped content. A deleted file counts as unchanged (saving recreates it)."""
+        try:
+            st = os.stat(file_path)
+        except FileNotFoundError:
+            logging.warning(f"{file_path} was deleted on disk; saving recreates it.")
+            return False
+        if st.st_mtime_ns == self.mtime_ns and st.st_size == self.size: return False
+        if st.st_size != self.size: return True
+        if file_digest(file_path) != self.digest: return True
+        self.mtime_ns = st.st_mtime_ns # Same content: check the new stat next time
+        return False
+
+
+class ExternalChangeError(Exception):
+    """A file was changed on disk by another program since the editor loaded or saved it."""
+    def __init__(self, file_path):
+        super().__init__(f"{os.path.basename(file_path)} was changed on disk by another program; it was not overwritten.")
+        self.file_path = file_path
+
+
+# --- Background Jobs (scheduler on a thread pool, progress, cancellation) ---
+class JobCancelled(Exception):
+    """Raised inside a job function by CancelToken.check() once the job was cancelled."""
+
+
+class CancelToken:
+    """Thread-safe cancellation flag handed to every job function."""
+    def __init__(self):
+        self._event = threading.Event()
+
+    def cancel(self):
+        self._event.set()
+
+    @property
+    def cancelled(self):
+        return self._event.is_set()
+
+    def check(self):
+        """Raises JobCancelled if cancellation was requested; call it between units of work."""
+        if self._event.is_set(): raise JobCancelled()
+
+
+class Job:
+    """One unit of background work. func(job) runs on a pool thread; everything else is GUI thread state.
+
+    The function reports progress through job.report() and polls job.token.check().
+    on_done(job) runs on the GUI thread once the job is finished, failed or cancelled
+    (job.state, job.result and job.error tell which). The result is released after
+    on_done ran, so finished jobs kept for the jobs panel do not hold on to it.
+    """
+    QUEUED, RUNNING, DONE, FAILED, CANCELLED = "Queued", "Running", "Done", "Failed", "Cancelled"
+    PRIORITY_NAMES = {0: "High", 1: "Normal", 2: "Low"}
+
+    def __init__(self, job_id, title, func, priority, key, on_done, notify):
+        self.id = job_id
+        self.title = title
+        self.func = func
+        self.priority = priority
+        self.key = key          # Jobs sharing a key run one after another (e.g. all saves)
+        self.on_done = on_done
+        self.token = CancelToken()
+        self.state = Job.QUEUED
+        self.done = 0
+        self.total = 0          # 0 = unknown (busy indicator)
+        self.message = ""
+        self.result = None
+        self.error = None
+        self._notify = notify   # Thread-safe progress signal of the scheduler
+        self._last_report = 0.0
+
+    @property
+    def finished(self):
+        return self.state in (Job.DONE, Job.FAILED, Job.CANCELLED)
+
+    def report(self, done, total=None, message=None):
+        """Progress from the job function (any thread); forwarded to the GUI at most every REPORT_INTERVAL."""
+        self.done = done
+        if total is not None: self.total = total
+        if message is not None: self.message = message
+        now = time.monotonic()
+        if now - self._last_report >= JobScheduler.REPORT_INTERVAL or (self.total and done >= self.total):
+            self._last_report = now
+            self._notify(self)
+
+
+class JobScheduler(QObject):
+    """Runs Jobs on a small thread pool, highest priority (lowest number) first, FIFO within a priority.
+
+    Job functions must not touch widgets or the loaded trees the GUI edits; they get
+    their inputs up front (paths, WorkspaceSnapshots) and hand results to on_done, which runs
+    on the GUI thread. Progress and completion cross threads as queued signals.
+    """
+    PRIORITY_HIGH, PRIORITY_NORMAL, PRIORITY_LOW = 0, 1, 2
+    REPORT_INTERVAL = 0.05 # Seconds between progress signals of one job
+    KEEP_FINISHED = 50     # Finished jobs listed in the jobs panel; older ones are forgotten
+
+    job_added = Signal(object)
+    job_changed = Signal(object)   # State or progress
+    job_finished = Signal(object)
+    jobs_pruned = Signal()         # Old finished jobs were dropped from self.jobs
+    _progressed = Signal(object)             # From pool threads
+    _completed = Signal(object, object, object) # job, result, error (from pool threads)
+
+    def __init__(self, max_workers=2, parent=None):
+        super().__init__(parent)
+        self.max_workers = max_workers
+        self.jobs = []          # Active jobs and the last KEEP_FINISHED finished ones, oldest first
+        self._queue = []        # Heap of (priority, id, job)
+        self._running = set()
+        self._ids = itertools.count(1)
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="job")
+        self._progressed.connect(self.job_changed, Qt.ConnectionType.QueuedConnection)
+        self._completed.connect(self._finish, Qt.ConnectionType.QueuedConnection)
+
+    def submit(self, title, func, priority=PRIORITY_NORMAL, key=None, on_done=None):
+        """Queues func(job) and returns the Job."""
+        job = Job(next(self._ids), title, func, priority, key, on_done, self._progressed.emit)
+        self.jobs.append(job)
+        heapq.heappush(self._queue, (priority, job.id, job))
+        logging.info(f"Job #{job.id} queued: {title}")
+        self.job_added.emit(job)
+        self._dispatch()
+        return job
+
+    def cancel(self, job):
+        """Requests cancellation; queued jobs end right away, running ones at their next check()."""
+        if job.finished: return
+        job.token.cancel()
+        if job.state == Job.QUEUED:
+            self._queue = [queued for queued in self._queue if queued[2] is not job]
+            heapq.heapify(self._queue)
+            self._finish(job, None, JobCancelled())
+        else:
+            job.message = "Cancelling..."
+            self.job_changed.emit(job)
+
+    def cancel_all(self, key=None):
+        for job in list(self.jobs):
+            if not job.finished and (key is None or job.key == key): self.cancel(job)
+
+    def active_jobs(self):
+        return [job for job in self.jobs if not job.finished]
+
+    def clear_finished(self):
+        self.jobs = self.active_jobs()
+        self.jobs_pruned.emit()
+
+    def wait(self, job):
+        """Runs a local event loop until the job is finished (the window keeps repainting meanwhile)."""
+        if job is None or job.finished: return
+        loop = QEventLoop()
+        def quit_if_done(finished_job):
+            if finished_job is job: loop.quit()
+        self.job_finished.connect(quit_if_done)
+        loop.exec()
+        self.job_finished.disconnect(quit_if_done)
+
+    def shutdown(self):
+        """Cancels everything and waits for running job functions to return."""
+        self.cancel_all()
+        self._executor.shutdown(wait=True)
+
+    def _dispatch(self):
+        busy_keys = {job.key for job in self._running if job.key is not None}
+        deferred = []
+        while self._queue and len(self._running) < self.max_workers:
+            entry = heapq.heappop(self._queue)
+            job = entry[2]
+            if job.key is not None and job.key in busy_keys:
+                deferred.append(entry)
+                continue
+            job.state = Job.RUNNING
+            self._running.add(job)
+            if job.key is not None: busy_keys.add(job.key)
+            self.job_changed.emit(job)
+            self._executor.submit(self._run, job)
+        for entry in deferred: heapq.heappush(self._queue, entry)
+
+    def _run(self, job): # Pool thread
+        result, error = None, None
+        try:
+            job.token.check()
+            result = job.func(job)
+        except JobCancelled as e:
+            error = e
+        except Exception as e:
+            logging.error(f"Job #{job.id} '{job.title}' failed: {e}", exc_info=True)
+            error = e
+        self._completed.emit(job, result, error)
+
+    def _finish(self, job, result, error):
+        self._running.discard(job)
+        job.result, job.error = result, error
+        if isinstance(error, JobCancelled) or job.token.cancelled: job.state = Job.CANCELLED # Partial results stay in job.result
+        elif error is not None: job.state = Job.FAILED
+        else: job.state = Job.DONE
+        logging.info(f"Job #{job.id} {job.state.lower()}: {job.title}")
+        job.func = None
+        if job.on_done:
+            try:
+                job.on_done(job)
+            except Exception as e:
+                logging.error(f"Completion of job #{job.id} '{job.title}' failed: {e}", exc_info=True)
+            job.on_done = job.result = None # E.g. a load's parsed trees, now owned by the editor
+        self._prune_finished()
+        self.job_changed.emit(job)
+        self.job_finished.emit(job)
+        self._dispatch()
+
+    def _prune_finished(self):
+        finished = [job for job in self.jobs if job.finished]
+        if len(finished) > self.KEEP_FINISHED:
+            forgotten = set(finished[:len(finished) - self.KEEP_FINISHED])
+            self.jobs = [job for job in self.jobs if job not in forgotten]
+            self.jobs_pruned.emit()
+
+
+class JobListModel(QAbstractTableModel):
+    """Jobs of a JobScheduler, newest first, for the jobs panel."""
+    COLUMNS = ("Job", "Priority", "State", "Progress")
+
+    def __init__(self, scheduler, parent=None):
+        super().__init__(parent)
+        self.scheduler = scheduler
+        self.jobs = []
+        scheduler.job_added.connect(self.reload)
+        scheduler.jobs_pruned.connect(self.reload)
+        scheduler.job_changed.connect(self._job_changed)
+        self.reload()
+
+    def reload(self, *_):
+        self.beginResetModel()
+        self.jobs = list(reversed(self.scheduler.jobs))
+        self.endResetModel()
+
+    def _job_changed(self, job):
+        if job in self.jobs:
+            row = self.jobs.index(job)
+            self.dataChanged.emit(self.index(row, 0), self.index(row, len(self.COLUMNS) - 1))
+
+    def rowCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else len(self.jobs)
+
+    def columnCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else len(self.COLUMNS)
+
+    def headerData(self, section, orientation, role=Qt.ItemDataRole.DisplayRole):
+        if role == Qt.ItemDataRole.DisplayRole and orientation == Qt.Orientation.Horizontal:
+            return self.COLUMNS[section]
+        return None
+
+    def data(self, index, role=Qt.ItemDataRole.DisplayRole):
+        if not index.isValid(): return None
+        job = self.jobs[index.row()]
+        if role == Qt.ItemDataRole.ToolTipRole:
+            return str(job.error) if job.state == Job.FAILED else job.message or None
+        if role != Qt.ItemDataRole.DisplayRole: return None
+        column = index.column()
+        if column == 0: return job.title
+        if column == 1: return Job.PRIORITY_NAMES.get(job.priority, str(job.priority))
+        if column == 2: return job.state
+        if job.state == Job.RUNNING and job.total:
+            return f"{job.done}/{job.total}  {job.message}"
+        return job.message
+
+
+class JobsDialog(QDialog):
+    """Non-modal panel listing background jobs, with cancellation."""
+    def __init__(self, editor, parent=None):
+        super().__init__(parent)
+        self.editor = editor
+        self.setWindowTitle("Jobs")
+        self.resize(700, 320)
+        layout = QVBoxLayout(self)
+        self.model = JobListModel(editor.jobs, self)
+        self.table_view = QTableView()
+        self.table_view.setModel(self.model)
+        self.table_view.setSelectionBehavior(QAbstractItemView.SelectionBehavior.SelectRows)
+        self.table_view.verticalHeader().hide()
+        self.table_view.horizontalHeader().setStretchLastSection(True)
+        self.table_view.horizontalHeader().setDefaultSectionSize(140)
+        self.table_view.setColumnWidth(0, 260)
+        layout.addWidget(self.table_view)
+
+        button_layout = QHBoxLayout()
+        self.cancel_button = QPushButton("Cancel Job")
+        self.cancel_all_button = QPushButton("Cancel All")
+        self.clear_button = QPushButton("Clear Finished")
+        button_layout.addWidget(self.cancel_button)
+        button_layout.addWidget(self.cancel_all_button)
+        button_layout.addStretch()
+        button_layout.addWidget(self.clear_button)
+        layout.addLayout(button_layout)
+
+        self.cancel_button.clicked.connect(self.cancel_selected)
+        self.cancel_all_button.clicked.connect(lambda: editor.jobs.cancel_all())
+        self.clear_button.clicked.connect(self.clear_finished)
+
+    def cancel_selected(self):
+        for index in self.table_view.selectionModel().selectedRows():
+            self.editor.jobs.cancel(self.model.jobs[index.row()])
+
+    def clear_finished(self):
+        self.editor.jobs.clear_finished()
+        self.model.reload()
+
+
+# --- Bulk Edit ---
+class BulkEditDialog(QDialog):
+    """Collects one operation (set/add/remove/rename) to apply to every selected entry."""
+    OPERATIONS = [("set", "Set"), ("add", "Add (only where missing)"), ("remove", "Remove"), ("rename", "Rename")]
+    TARGETS = [("attribute", "Attribute (name or property.attribute)"), ("property", "Property (child element)")]
+
+    def __init__(self, editor, entry_type, entry_count, parent=None):
+        super().__init__(parent)
+        self.editor = editor
+        self.entry_type = entry_type
+        self.setWindowTitle(f"Bulk Edit - {entry_count} {'abilities' if entry_type == TAG_ABILITY else 'items'}")
+        layout = QGridLayout(self)
+
+        self.operation_combo = QComboBox()
+        for key, text in self.OPERATIONS: self.operation_combo.addItem(text, key)
+        self.target_combo = QComboBox()
+        for key, text in self.TARGETS: self.target_combo.addItem(text, key)
+        self.field_input = QLineEdit()
+        self.field_input.setPlaceholderText("e.g. equip_template or attack_power.max")
+        self.value_input = QLineEdit()
+        self.new_name_input = QLineEdit()
+
+        layout.addWidget(QLabel("Operation:"), 0, 0); layout.addWidget(self.operation_combo, 0, 1)
+        layout.addWidget(QLabel("Target:"), 1, 0); layout.addWidget(self.target_combo, 1, 1)
+        layout.addWidget(QLabel("Name:"), 2, 0); layout.addWidget(self.field_input, 2, 1)
+        layout.addWidget(QLabel("Value:"), 3, 0); layout.addWidget(self.value_input, 3, 1)
+        layout.addWidget(QLabel("New name:"), 4, 0); layout.addWidget(self.new_name_input, 4, 1)
+
+        button_box = QDialogButtonBox(QDialogButtonBox.StandardButton.Ok | QDialogButtonBox.StandardButton.Cancel)
+        button_box.accepted.connect(self._validate_and_accept)
+        button_box.rejected.connect(self.reject)
+        layout.addWidget(button_box, 5, 0, 1, 2)
+
+        self.operation_combo.currentIndexChanged.connect(self._update_enabled_inputs)
+        self.target_combo.currentIndexChanged.connect(self._update_enabled_inputs)
+        self._update_enabled_inputs()
+
+    def _update_enabled_inputs(self):
+        operation = self.operation_combo.currentData()
+        is_attribute = self.target_combo.currentData() == "attribute"
+        self.value_input.setEnabled(is_attribute and operation in ("set", "add"))
+        self.new_name_input.setEnabled(operation == "rename")
+        name_path = f"{self.entry_type}/*" if not is_attribute else ("item@*" if self.entry_type == TAG_ITEM else "ability/*@*")
+        self.editor._attach_field_completer(self.field_input, name_path, "Bulk Edit Name")
+
+    def _validate_and_accept(self):
+        operation, target, field, _value, new_name = self.values()
+        if not field:
+            QMessageBox.warning(self, "Error", "Name cannot be empty.")
+            return
+        if operation == "rename" and not new_name:
+            QMessageBox.warning(self, "Error", "New name cannot be empty.")
+            return
+        names = [part for part in split_field(field) if part is not None] if target == "attribute" else [field]
+        if operation == "rename": names.append(new_name)
+        invalid = [part for part in names if not is_valid_xml_name(part)]
+        if invalid:
+            QMessageBox.warning(self, "Error", f"'{invalid[0]}' is not a valid XML name "
+                                "(letters, digits, '_', '-' and '.', not starting with a digit).")
+            return
+        if target == "attribute" and "name" in (field, new_name):
+            QMessageBox.warning(self, "Error", "The 'name' attribute identifies entries and cannot be bulk edited.")
+            return
+        structural_tags = self.editor.KNOWN_ITEM_CHILD_TAGS | self.editor.KNOWN_ABILITY_CHILD_TAGS
+        if target == "property" and (field in structural_tags or new_name in structural_tags):
+            QMessageBox.warning(self, "Error", "Structural sections (tags, variants, ...) cannot be bulk edited as properties.")
+            return
+        self.accept()
+
+    def values(self):
+        """Returns (operation, target, field, value, new_name)."""
+        return (self.operation_combo.currentData(), self.target_combo.currentData(),
+                self.field_input.text().strip().replace(" ", "_"), self.value_input.text().strip(),
+                self.new_name_input.text().strip().replace(" ", "_"))
+
+
+# --- Numeric Scaling ---
+class ChangePreviewModel(QAbstractTableModel):
+    """Table of pending changes (one tuple per row), shown before applying batch tools.
+
+    With checkable=True the first column carries a check box per row (all checked initially).
+    """
+    def __init__(self, headers, parent=None, checkable=False):
+        super().__init__(parent)
+        self.headers = headers
+        self.rows = []
+        self.checkable = checkable
+        self.checked = bytearray()
+
+    def set_rows(self, rows):
+        self.beginResetModel()
+        self.rows = rows
+        self.checked = bytearray(b"\x01" * len(rows))
+        self.endResetModel()
+
+    def checked_rows(self):
+        return [i for i, flag in enumerate(self.checked) if flag]
+
+    def set_all_checked(self, checked):
+        if not self.rows: return
+        self.checked = bytearray((b"\x01" if checked else b"\x00") * len(self.rows))
+        self.dataChanged.emit(self.index(0, 0), self.index(len(self.rows) - 1, 0), [Qt.ItemDataRole.CheckStateRole])
+
+    def flags(self, index):
+        flags = super().flags(index)
+        if self.checkable and index.isValid() and index.column() == 0:
+            flags |= Qt.ItemFlag.ItemIsUserCheckable
+        return flags
+
+    def setData(self, index, value, role=Qt.ItemDataRole.EditRole):
+        if self.checkable and index.isValid() and index.column() == 0 and role == Qt.ItemDataRole.CheckStateRole:
+            self.checked[index.row()] = 1 if Qt.CheckState(value) == Qt.CheckState.Checked else 0
+            self.dataChanged.emit(index, index, [Qt.ItemDataRole.CheckStateRole])
+            return True
+        return False
+
+    def rowCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else len(self.rows)
+
+    def columnCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else len(self.headers)
+
+    def data(self, index, role=Qt.ItemDataRole.DisplayRole):
+        if not index.isValid(): return None
+        if role == Qt.ItemDataRole.DisplayRole:
+            return str(self.rows[index.row()][index.column()])
+        if role == Qt.ItemDataRole.CheckStateRole and self.checkable and index.column() == 0:
+            return Qt.CheckState.Checked if self.checked[index.row()] else Qt.CheckState.Unchecked
+        return None
+
+    def headerData(self, section, orientation, role=Qt.ItemDataRole.DisplayRole):
+        if role == Qt.ItemDataRole.DisplayRole and orientation == Qt.Orientation.Horizontal:
+            return self.headers[section]
+        return None
+
+
+class ScaleValuesDialog(QDialog):
+    """Applies a numeric formula to one field of many entries, with a before/after preview."""
+    def __init__(self, editor, entry_type, parent=None):
+        super().__init__(parent)
+        self.editor = editor
+        self.entry_type = entry_type
+        self.pending_changes = [] # [(file_path, holder_element, attribute, new_text)]
+        self.setWindowTitle(f"Scale Numeric Values - {'Abilities' if entry_type == TAG_ABILITY else 'Items'}")
+        self.resize(800, 550)
+        layout = QVBoxLayout(self)
+
+        form_layout = QGridLayout()
+        self.query_input = QLineEdit()
+        self.query_input.setPlaceholderText("e.g. tag:Tier3 (empty = all entries)")
+        self.selected_only_checkbox = QCheckBox("Only selected entries")
+        self.field_input = QLineEdit()
+        self.field_input.setPlaceholderText("e.g. price or attack_power.max")
+        self.formula_input = QLineEdit("x * 1.15")
+        self.formula_input.setToolTip("Formula of x (the current value). Functions: " + ", ".join(sorted(FORMULA_FUNCTIONS)))
+        self.decimals_spin = QSpinBox()
+        self.decimals_spin.setRange(-1, 6)
+        self.decimals_spin.setValue(2)
+        self.decimals_spin.setSpecialValueText("No rounding")
+        form_layout.addWidget(QLabel("Query:"), 0, 0); form_layout.addWidget(self.query_input, 0, 1)
+        form_layout.addWidget(self.selected_only_checkbox, 0, 2)
+        form_layout.addWidget(QLabel("Field:"), 1, 0); form_layout.addWidget(self.field_input, 1, 1, 1, 2)
+        form_layout.addWidget(QLabel("Formula:"), 2, 0); form_layout.addWidget(self.formula_input, 2, 1, 1, 2)
+        form_layout.addWidget(QLabel("Round to decimals:"), 3, 0); form_layout.addWidget(self.decimals_spin, 3, 1)
+        layout.addLayout(form_layout)
+
+        self.preview_model = ChangePreviewModel(["Entry", "Field", "Before", "After"], self)
+        self.preview_view = QTableView()
+        self.preview_view.setModel(self.preview_model)
+        self.preview_view.verticalHeader().setSectionResizeMode(QHeaderView.ResizeMode.Fixed)
+        self.preview_view.verticalHeader().setDefaultSectionSize(22)
+        self.preview_view.horizontalHeader().setStretchLastSection(True)
+        layout.addWidget(self.preview_view)
+
+        self.summary_label = QLabel("Press Preview to compute the changes.")
+        layout.addWidget(self.summary_label)
+
+        button_layout = QHBoxLayout()
+        self.preview_button = QPushButton("Preview")
+        self.apply_button = QPushButton("Apply")
+        self.apply_button.setEnabled(False)
+        close_button = QPushButton("Close")
+        button_layout.addStretch(1)
+        button_layout.addWidget(self.preview_button)
+        button_layout.addWidget(self.apply_button)
+        button_layout.addWidget(close_button)
+        layout.addLayout(button_layout)
+
+        self.preview_button.clicked.connect(self.preview)
+        self.apply_button.clicked.connect(self.apply)
+        close_button.clicked.connect(self.reject)
+        for widget in (self.query_input, self.field_input, self.formula_input):
+            widget.textChanged.connect(self._invalidate_preview)
+        self.decimals_spin.valueChanged.connect(self._invalidate_preview)
+        self.selected_only_checkbox.toggled.connect(self._invalidate_preview)
+
+    def _invalidate_preview(self):
+        self.pending_changes = []
+        self.apply_button.setEnabled(False)
+
+    def preview(self):
+        field = self.field_input.text().strip()
+        if not field:
+            QMessageBox.warning(self, "Error", "Field cannot be empty.")
+            return
+        try:
+            code = compile_formula(self.formula_input.text().strip())
+        except ValueError as e:
+            QMessageBox.warning(self, "Invalid Formula", str(e))
+            return
+
+        if self.selected_only_checkbox.isChecked():
+            entries = self.editor.selected_entries(self.entry_type)
+        else:
+            entries = self.editor.query_entries(self.entry_type, EntryQuery(self.query_input.text()))
+        targets, values, skipped = self.editor.gather_numeric_field(entries, field)
+        try:
+            results = evaluate_formula(code, values) if values else []
+        except Exception as e:
+            logging.error(f"Formula evaluation failed: {e}", exc_info=True)
+            QMessageBox.warning(self, "Formula Error", f"Could not evaluate the formula:\n{e}")
+            return
+
+        decimals = self.decimals_spin.value()
+        rows = []
+        self.pending_changes = []
+        for (name, file_path, holder, attr, old_text), result in zip(targets, results):
+            if not math.isfinite(result): continue # Skip division by zero etc.
+            new_text = format_number(result, decimals)
+            if new_text != old_text and float(new_text) != float(old_text): # "1" for "1.00" is no change
+                rows.append((name, field, old_text, new_text))
+                self.pending_changes.append((file_path, holder, attr, new_text))
+        self.preview_model.set_rows(rows)
+        summary = f"{len(values)} numeric value(s) found, {len(rows)} would change."
+        if skipped: summary += f" {skipped} non-numeric value(s) skipped."
+        self.summary_label.setText(summary)
+        self.apply_button.setEnabled(bool(self.pending_changes))
+
+    def apply(self):
+        if not self.pending_changes: return
+        changed = self.editor.apply_field_values(self.pending_changes)
+        self.summary_label.setText(f"Applied {changed} change(s).")
+        self.editor.statusBar.showMessage(f"Scaled {changed} value(s).", 5000)
+        self._invalidate_preview()
+        self.preview_model.set_rows([])
+
+
+# --- Find and Replace ---
+FIND_TARGET_TAGS = "tag"
+FIND_TARGET_ATTR_NAMES = "attr_name"
+FIND_TARGET_ATTR_VALUES = "attr_value"
+FIND_TARGET_TEXT = "text"
+
+def scan_for_matches(file_path, elements, pattern, targets):
+    """Finds pattern matches in the given element subtrees (runs in worker threads, read-only).
+
+    Returns hits as (file_path, entry_label, element, target, attribute_or_None, old_string).
+    """
+    hits = []
+    entry_containers = (TAG_ABILITIES, TAG_ITEMS)
+
+    def visit(element, entry_label):
+        if not ET.iselement(element) or not isinstance(element.tag, str): return
+        parent = element.getparent()
+        if element.tag in (TAG_ABILITY, TAG_ITEM) and parent is not None and parent.tag in entry_containers:
+            entry_label = f"{element.tag} '{element.get('name', '?')}'"
+        if FIND_TARGET_TAGS in targets and pattern.search(element.tag):
+            hits.append((file_path, entry_label, element, FIND_TARGET_TAGS, None, element.tag))
+        for key, value in element.attrib.items():
+            if FIND_TARGET_ATTR_NAMES in targets and pattern.search(key):
+                hits.append((file_path, entry_label, element, FIND_TARGET_ATTR_NAMES, key, key))
+            if FIND_TARGET_ATTR_VALUES in targets and pattern.search(value):
+                hits.append((file_path, entry_label, element, FIND_TARGET_ATTR_VALUES, key, value))
+        if FIND_TARGET_TEXT in targets and element.text and element.text.strip() and pattern.search(element.text):
+            hits.append((file_path, entry_label, element, FIND_TARGET_TEXT, None, element.text))
+        for child in element:
+            visit(child, entry_label)
+
+    for element in elements:
+        visit(element, "(file)")
+    return hits
+
+
+class FindReplaceDialog(QDialog):
+    """Find (and optionally replace) in tags, attribute names/values and text, with a checkable preview."""
+    SCOPES = [("entry", "Current entry"), ("selected", "Selected entries"), ("file", "Current file"), ("workspace", "Whole workspace")]
+
+    def __init__(self, editor, parent=None):
+        super().__init__(parent)
+        self.editor = editor
+        self.hits = []
+        self.setWindowTitle("Find and Replace")
+        self.resize(950, 600)
+        layout = QVBoxLayout(self)
+
+        form_layout = QGridLayout()
+        self.find_input = QLineEdit()
+        self.replace_input = QLineEdit()
+        self.regex_checkbox = QCheckBox("Regular expression")
+        self.case_checkbox = QCheckBox("Match case")
+        self.scope_combo = QComboBox()
+        for key, text in self.SCOPES: self.scope_combo.addItem(text, key)
+        self.scope_combo.setCurrentIndex(len(self.SCOPES) - 1)
+        form_layout.addWidget(QLabel("Find:"), 0, 0); form_layout.addWidget(self.find_input, 0, 1)
+        form_layout.addWidget(self.regex_checkbox, 0, 2); form_layout.addWidget(self.case_checkbox, 0, 3)
+        form_layout.addWidget(QLabel("Replace with:"), 1, 0); form_layout.addWidget(self.replace_input, 1, 1)
+        form_layout.addWidget(QLabel("Scope:"), 1, 2); form_layout.addWidget(self.scope_combo, 1, 3)
+        layout.addLayout(form_layout)
+
+        targets_layout = QHBoxLayout()
+        targets_layout.addWidget(QLabel("Search in:"))
+        self.target_checkboxes = {}
+        for key, text in ((FIND_TARGET_TAGS, "Element tags"), (FIND_TARGET_ATTR_NAMES, "Attribute names"),
+                          (FIND_TARGET_ATTR_VALUES, "Attribute values"), (FIND_TARGET_TEXT, "Text")):
+            checkbox = QCheckBox(text)
+            checkbox.setChecked(key in (FIND_TARGET_ATTR_VALUES, FIND_TARGET_TEXT))
+            self.target_checkboxes[key] = checkbox
+            targets_layout.addWidget(checkbox)
+        targets_layout.addStretch(1)
+        layout.addLayout(targets_layout)
+
+        self.preview_model = ChangePreviewModel(["File", "Entry", "Location", "Before", "After"], self, checkable=True)
+        self.preview_view = QTableView()
+        self.preview_view.setModel(self.preview_model)
+        self.preview_view.verticalHeader().setSectionResizeMode(QHeaderView.ResizeMode.Fixed)
+        self.preview_view.verticalHeader().setDefaultSectionSize(22)
+        self.preview_view.horizontalHeader().setStretchLastSection(True)
+        layout.addWidget(self.preview_view)
+
+        self.summary_label = QLabel()
+        layout.addWidget(self.summary_label)
+
+        button_layout = QHBoxLayout()
+        self.find_button = QPushButton(QIcon.fromTheme("edit-find"), "Find All")
+        self.check_all_button = QPushButton("Check All")
+        self.uncheck_all_button = QPushButton("Uncheck All")
+        self.replace_button = QPushButton(QIcon.fromTheme("edit-find-replace"), "Replace Checked")
+        self.replace_button.setEnabled(False)
+        close_button = QPushButton("Close")
+        button_layout.addWidget(self.check_all_button)
+        button_layout.addWidget(self.uncheck_all_button)
+        button_layout.addStretch(1)
+        button_layout.addWidget(self.find_button)
+        button_layout.addWidget(self.replace_button)
+        button_layout.addWidget(close_button)
+        layout.addLayout(button_layout)
+
+        self.find_button.clicked.connect(self.find_all)
+        self.find_input.returnPressed.connect(self.find_all)
+        self.replace_button.clicked.connect(self.replace_checked)
+        self.check_all_button.clicked.connect(lambda: self.preview_model.set_all_checked(True))
+        self.uncheck_all_button.clicked.connect(lambda: self.preview_model.set_all_checked(False))
+        close_button.clicked.connect(self.reject)
+        # Any change to the search invalidates the hits
+        for widget in (self.find_input, self.replace_input):
+            widget.textChanged.connect(self._invalidate_hits)
+        for checkbox in [self.regex_checkbox, self.case_checkbox, *self.target_checkboxes.values()]:
+            checkbox.toggled.connect(self._invalidate_hits)
+        self.scope_combo.currentIndexChanged.connect(self._invalidate_hits)
+
+    def _invalidate_hits(self):
+        self.replace_button.setEnabled(False)
+
+    def _compile_pattern(self):
+        text = self.find_input.text()
+        if not text:
+            QMessageBox.warning(self, "Error", "Search text cannot be empty.")
+            return None
+        flags = 0 if self.case_checkbox.isChecked() else re.IGNORECASE
+        try:
+            return re.compile(text if self.regex_checkbox.isChecked() else re.escape(text), flags)
+        except re.error as e:
+            QMessageBox.warning(self, "Invalid Regular Expression", str(e))
+            return None
+
+    def _replacement_for(self, pattern, old):
+        replace_text = self.replace_input.text()
+        if self.regex_checkbox.isChecked():
+            return pattern.sub(replace_text, old) # Allows \1 group references
+        return pattern.sub(lambda _match: replace_text, old)
+
+    def find_all(self):
+        pattern = self._compile_pattern()
+        if pattern is None: return
+        targets = {key for key, checkbox in self.target_checkboxes.items() if checkbox.isChecked()}
+        if not targets:
+            QMessageBox.warning(self, "Error", "Select at least one place to search in.")
+            return
+        try:
+            hits = self.editor.find_matches(pattern, targets, self.scope_combo.currentData())
+            rows = []
+            self.hits = []
+            for hit in hits:
+                file_path, entry_label, element, target, key, old = hit
+                try:
+                    new = self._replacement_for(pattern, old)
+                except re.error as e:
+                    QMessageBox.warning(self, "Invalid Replacement", str(e))
+                    return
+                location = f"<{element.tag}>" + (f" @{key}" if key is not None else "") + f" [{target.replace('_', ' ')}]"
+                rows.append((os.path.basename(file_path), entry_label, location, old.strip(), new.strip()))
+                self.hits.append((hit, new))
+        except Exception as e:
+            logging.error(f"Find failed: {e}", exc_info=True)
+            QMessageBox.critical(self, "Find Error", f"An error occurred while searching:\n{e}")
+            return
+        self.preview_model.set_rows(rows)
+        self.summary_label.setText(f"{len(rows)} match(es) found.")
+        self.replace_button.setEnabled(bool(rows))
+
+    def replace_checked(self):
+        selected = [self.hits[i] for i in self.preview_model.checked_rows()]
+        if not selected: return
+        applied, skipped = self.editor.apply_replacements(selected)
+        message = f"Replaced {applied} match(es)."
+        if skipped: message += f" {skipped} skipped (changed since search, invalid or clashing names)."
+        self.summary_label.setText(message)
+        self.editor.statusBar.showMessage(message, 5000)
+        self.hits = []
+        self.preview_model.set_rows([])
+        self.replace_button.setEnabled(False)
+
+
+# --- Tier Generator ---
+class TierGeneratorDialog(QDialog):
+    """Generates N scaled copies of a template entry (e.g. Sword_T1..T10) in one batch."""
+    DEFAULT_RULES = "# field = formula of x (template value) and t (tier)\nprice = x * 1.25 ** (t - 1)\n"
+
+    def __init__(self, editor, entry_type, template_name, parent=None):
+        super().__init__(parent)
+        self.editor = editor
+        self.entry_type = entry_type
+        self.template_name = template_name
+        self.setWindowTitle(f"Generate Tiers from '{template_name}'")
+        self.resize(560, 460)
+        layout = QGridLayout(self)
+
+        self.pattern_input = QLineEdit("{name}_T{tier}")
+        self.pattern_input.setToolTip("Placeholders: {name} (template name), {tier} (tier number)")
+        self.first_tier_spin = QSpinBox(); self.first_tier_spin.setRange(0, 9999); self.first_tier_spin.setValue(1)
+        self.count_spin = QSpinBox(); self.count_spin.setRange(1, 10000); self.count_spin.setValue(10)
+        self.rules_input = QPlainTextEdit(self.DEFAULT_RULES if entry_type == TAG_ITEM else
+                                          "# field = formula of x (template value) and t (tier)\nattack_power.max = x * (1 + 0.1 * (t - 1))\n")
+        self.rules_input.setToolTip("Rules apply to every generated entry that has the field. Functions: " + ", ".join(sorted(FORMULA_FUNCTIONS)))
+        self.decimals_spin = QSpinBox(); self.decimals_spin.setRange(-1, 6); self.decimals_spin.setValue(2)
+        self.decimals_spin.setSpecialValueText("No rounding")
+        self.abilities_checkbox = QCheckBox("Also generate matching base abilities (same pattern, same rules)")
+        self.abilities_checkbox.setChecked(entry_type == TAG_ITEM)
+        self.abilities_checkbox.setVisible(entry_type == TAG_ITEM)
+
+        layout.addWidget(QLabel("Naming pattern:"), 0, 0); layout.addWidget(self.pattern_input, 0, 1, 1, 3)
+        layout.addWidget(QLabel("First tier:"), 1, 0); layout.addWidget(self.first_tier_spin, 1, 1)
+        layout.addWidget(QLabel("Count:"), 1, 2); layout.addWidget(self.count_spin, 1, 3)
+        layout.addWidget(QLabel("Scaling rules:"), 2, 0, Qt.AlignmentFlag.AlignTop); layout.addWidget(self.rules_input, 2, 1, 1, 3)
+        layout.addWidget(QLabel("Round to decimals:"), 3, 0); layout.addWidget(self.decimals_spin, 3, 1)
+        layout.addWidget(self.abilities_checkbox, 4, 0, 1, 4)
+
+        button_box = QDialogButtonBox(QDialogButtonBox.StandardButton.Ok | QDialogButtonBox.StandardButton.Cancel)
+        button_box.button(QDialogButtonBox.StandardButton.Ok).setText("Generate")
+        button_box.accepted.connect(self._validate_and_accept)
+        button_box.rejected.connect(self.reject)
+        layout.addWidget(button_box, 5, 0, 1, 4)
+
+    def _validate_and_accept(self):
+        try:
+            self.rules = parse_formula_rules(self.rules_input.toPlainText(), ("x", "t"))
+            first = self.first_tier_spin.value()
+            self.tiers = list(range(first, first + self.count_spin.value()))
+            self.pattern = self.pattern_input.text().strip()
+            if self.pattern.format(name=self.template_name, tier=first) == self.pattern.format(name=self.template_name, tier=first + 1):
+                raise ValueError("The naming pattern must contain {tier}.")
+        except (ValueError, KeyError, IndexError) as e:
+            QMessageBox.warning(self, "Invalid Input", f"{e}")
+            return
+        self.accept()
 
 
 class WitcherXMLEditor(QMainWindow):
@@ -194,6 +4110,9 @@ class WitcherXMLEditor(QMainWindow):
     # Define sets for known child tags to differentiate properties from structure
     KNOWN_ITEM_CHILD_TAGS = {TAG_TAGS, TAG_BASE_ABILITIES, TAG_RECYCLING_PARTS, TAG_VARIANTS}
     KNOWN_ABILITY_CHILD_TAGS = {TAG_TAGS} # Example, adjust if abilities have other standard sections
+    VARIANT_FIELD_PATH = f"{TAG_ITEM}/{TAG_VARIANTS}/{TAG_VARIANT}" # Completion registry path of <variant>
+    PROPERTY_TABLE_MAX_ROWS = 20 # Rows the property table grows to before scrolling
+    PREFETCH_NEIGHBOURS = 2 # Visible list entries above and below the selection prepared while idle
 
     def __init__(self):
         super().__init__()
@@ -209,42 +4128,58 @@ class WitcherXMLEditor(QMainWindow):
             self.base_path = Path(__file__).parent
         self.config_file = self.base_path / "editor_config.ini"
         self.last_folder = ""
+        self.workspace_folder = ""  # Folder the loaded files come from
+        self.utf8_workspaces = set() # Folders whose files are saved as UTF-8; [Workspace <folder>] NormalizeToUTF8 in the config
         logging.info(f"Base path: {self.base_path}, Config file: {self.config_file}")
 
         # --- Data Storage ---
-        self.loaded_files = {}      # {filepath: {'tree': ET.ElementTree, 'root': ET.Element}}
+        self.loaded_files = {}      # {filepath: {'tree': ET.ElementTree, 'root': ET.Element, 'source': FileSource, 'baseline': EntryBaseline, 'stamp': DiskStamp}}
         self.abilities_map = {}     # {ability_name: {'filepath': str, 'element': ET.Element}}
         self.items_map = {}         # {item_name: {'filepath': str, 'element': ET.Element}}
         self.modified_files = set() # {filepath}
-
-        # --- Autocompletion Data Sets ---
-        self.all_property_names = set()
-        self.all_item_attribute_names = set()
-        self.all_variant_attribute_names = set()
-        self.all_property_attribute_names = set()
-        self.all_tags = set()
-        self.all_ability_names = set()
-        self.all_item_names = set()
-        self.all_recycling_part_names = set()
-        self.all_item_categories = set()
-        self.all_ability_modes = set()
-        self.all_variant_nested_tags = set()
-        self.all_equip_templates = set()
-        self.all_loc_keys = set()
-        self.all_icon_paths = set()
-        self.all_prop_attr_types = set()
-        self.all_equip_slots = set()
-        self.all_hold_slots = set()
-        self.all_hands = set()
-        self.all_sound_ids = set()
-        self.all_events = set()
-        self.all_anim_actions = set() # Combined for draw/holster act/deact
+        self.file_generations = {}  # {filepath: serial of its latest edit}, tells snapshots and saves whether a file changed
+        self._edit_serials = itertools.count(1)
+        self.snapshots = SnapshotStore() # Copy-on-write versions of the files and entry index, see snapshot()
+        self.preserve_formatting = True # Saves splice edited entries into the file's text; [Settings] PreserveFormatting
+        self._source_serial = 0     # Counts change_bus batches, orders FileSource dirty marks against saves
+        self.journal = None         # EditJournal of the loaded folder's unsaved edits, see _open_journal()
+        self._entry_status = {}     # {(entry_type, name): ENTRY_* or None} of listed entries, filled as rows are painted
+        self._deleted_rows = {}     # {(entry_type, name): QListWidgetItem} rows of deleted baseline entries
+        self._baseline_roots = None # {root: EntryBaseline} while a batch is applied
+
+        # --- Background Jobs (loading and saving run off the GUI thread) ---
+        self.jobs = JobScheduler(parent=self)
+
+        # --- Change Bus (every tree mutation is published here; indexes subscribe) ---
+        self.change_bus = ChangeBus(self)
+
+        # --- Undo/Redo ---
+        self.undo_limit = 10000     # Steps kept; [Settings] UndoLimit in the config, 0 = unlimited
+        self.undo_stack = QUndoStack(self)
+        self._clean_marks = {}      # {filepath: command on top of undo_stack when the file matched the disk, None = bottom}
+
+        # --- Ability Properties View ---
+        self.property_table_threshold = 30 # Abilities with this many properties open as a table; [Settings] PropertyTableThreshold, 0 = never automatically
+        self._property_table_active = False # Shown ability's properties are in the table instead of PropertyWidget rows
 
         # --- Menu Action References ---
         self.open_action = None
         self.save_action = None
         self.save_all_action = None
         self.save_as_action = None
+        self.utf8_action = None
+        self.grid_view_action = None
+        self.bulk_edit_action = None
+        self.scale_values_action = None
+        self.find_replace_action = None
+        self.generate_tiers_action = None
+        self.xml_tree_action = None
+        self.jobs_action = None
+        self.property_table_action = None
+        self.undo_action = None
+        self.redo_action = None
+        self.revert_entry_action = None
+        self.revert_file_action = None
         # self.exit_action = None # Usually handled by window close
         self.author_action = None
 
@@ -254,31 +4189,77 @@ class WitcherXMLEditor(QMainWindow):
         self.current_selection_element = None   # lxml element of selection
         self.current_selection_filepath = None  # File path of selection
         self._populating_details = False        # Flag to prevent signals during UI updates
+        self.expanded_variants = {}             # {item name: [<variant> elements shown expanded]}
 
         # --- Autocompletion Models ---
-        self.item_attribute_name_model = QStringListModel(self)
-        self.variant_attribute_name_model = QStringListModel(self)
-        self.property_attribute_name_model = QStringListModel(self)
-        self.ability_name_model = QStringListModel(self)
-        self.item_name_model = QStringListModel(self)
-        self.recycling_part_name_model = QStringListModel(self)
-        self.item_category_model = QStringListModel(self)
-        self.ability_mode_model = QStringListModel(self)
-        self.variant_nested_tag_model = QStringListModel(self)
-        self.tag_model = QStringListModel(self)
-        self.property_name_model = QStringListModel(self) # Generic property tags
-        self.equip_template_model = QStringListModel(self)
-        self.localisation_key_model = QStringListModel(self)
-        self.icon_path_model = QStringListModel(self)
-        self.property_attr_type_model = QStringListModel(self)
-        self.equip_slot_model = QStringListModel(self)
+        self.item_attribute_name_model = SortedStringListModel(self)
+        self.variant_attribute_name_model = SortedStringListModel(self)
+        self.property_attribute_name_model = SortedStringListModel(self)
+        self.ability_name_model = SortedStringListModel(self)
+        self.item_name_model = SortedStringListModel(self)
+        self.recycling_part_name_model = SortedStringListModel(self)
+        self.item_category_model = SortedStringListModel(self)
+        self.ability_mode_model = SortedStringListModel(self)
+        self.variant_nested_tag_model = SortedStringListModel(self)
+        self.tag_model = SortedStringListModel(self)
+        self.property_name_model = SortedStringListModel(self) # Generic property tags
+        self.equip_template_model = SortedStringListModel(self)
+        self.localisation_key_model = SortedStringListModel(self)
+        self.icon_path_model = SortedStringListModel(self)
+        self.property_attr_type_model = SortedStringListModel(self)
+        self.equip_slot_model = SortedStringListModel(self)
         self.boolean_value_model = QStringListModel(["true", "false"], self) # Static
-        self.hold_slot_model = QStringListModel(self)
-        self.hand_model = QStringListModel(self)
-        self.sound_id_model = QStringListModel(self)
-        self.event_model = QStringListModel(self)
-        self.anim_action_model = QStringListModel(self) # Combined model
+        self.boolean_value_model.setObjectName("booleans")
+        self.hold_slot_model = SortedStringListModel(self)
+        self.hand_model = SortedStringListModel(self)
+        self.sound_id_model = SortedStringListModel(self)
+        self.event_model = SortedStringListModel(self)
+        self.anim_action_model = SortedStringListModel(self) # Combined model
         self.enhancement_slots_model = QStringListModel(["0", "1", "2", "3"], self) # Static
+        self.enhancement_slots_model.setObjectName("enhancement_slots")
+        self.static_completion_models = {"booleans": self.boolean_value_model, "enhancement_slots": self.enhancement_slots_model}
+
+        # --- Autocompletion Index (reference-counted values behind the models above) ---
+        self.completion_index = CompletionIndex({
+            "prop_names": self.property_name_model,
+            "item_attr_names": self.item_attribute_name_model,
+            "variant_attr_names": self.variant_attribute_name_model,
+            "prop_attr_names": self.property_attribute_name_model,
+            "tags": self.tag_model,
+            "ability_names": self.ability_name_model,
+            "item_names": self.item_name_model,
+            "recycling_parts": self.recycling_part_name_model,
+            "item_categories": self.item_category_model,
+            "ability_modes": self.ability_mode_model,
+            "variant_nested_tags": self.variant_nested_tag_model,
+            "equip_templates": self.equip_template_model,
+            "loc_keys": self.localisation_key_model,
+            "icon_paths": self.icon_path_model,
+            "prop_attr_types": self.property_attr_type_model,
+            "equip_slots": self.equip_slot_model,
+            "hold_slots": self.hold_slot_model,
+            "hands": self.hand_model,
+            "sound_ids": self.sound_id_model,
+            "events": self.event_model,
+            "anim_actions": self.anim_action_model,
+        }, self._entry_completions)
+        self.completion_fields = {} # Registry: {field path: domain}, see COMPLETION_FIELDS
+        self.register_completion_fields(COMPLETION_FIELDS)
+        self.completer_pool = CompleterPool(self.completion_index.materialize, self)
+        self.change_bus.about_to_apply.connect(self.completion_index.before_op)
+        self.change_bus.applied.connect(self._on_ops_applied)
+        self.change_bus.aborted.connect(self.completion_index.abort)
+
+        # --- Details Prefetch (view-models of neighbouring/recent entries, built while idle) ---
+        self.details_prefetcher = DetailsPrefetcher(self.build_entry_details, self)
+        self.change_bus.applied.connect(self._evict_entry_details)
+        self.change_bus.reset.connect(self.details_prefetcher.clear)
+        self.change_bus.about_to_apply.connect(self.snapshots.before_change)
+        self.change_bus.applied.connect(self._track_source_changes)
+        self.change_bus.about_to_apply.connect(self._copy_changed_baselines)
+        self.change_bus.applied.connect(self._update_entry_markers)
+        self.change_bus.aborted.connect(self._forget_baseline_roots)
+        self.change_bus.reset.connect(self._entry_status.clear)
 
         # --- Initialize UI and Connect Signals ---
         self._init_ui()
@@ -290,11 +4271,25 @@ class WitcherXMLEditor(QMainWindow):
         self.statusBar = QStatusBar()
         self.setStatusBar(self.statusBar)
         self.statusBar.showMessage("Ready.")
+        self.job_progress = QProgressBar() # Progress of the most urgent running job
+        self.job_progress.setMaximumWidth(260)
+        self.job_progress.setTextVisible(True)
+        self.job_progress.hide()
+        self.statusBar.addPermanentWidget(self.job_progress)
+        self.jobs_button = QToolButton()
+        self.jobs_button.setToolTip("Show background jobs")
+        self.jobs_button.setAutoRaise(True)
+        self.jobs_button.hide()
+        self.jobs_button.clicked.connect(self.open_jobs_panel)
+        self.statusBar.addPermanentWidget(self.jobs_button)
+        self.jobs.job_added.connect(self._update_job_status)
+        self.jobs.job_changed.connect(self._update_job_status)
         self.author_label = QLabel("Gerwant 2025") # Keep author credit
         self.statusBar.addPermanentWidget(self.author_label)
 
         # --- Load Config and Attempt Startup Load ---
         self.load_config()
+        self.undo_stack.setUndoLimit(self.undo_limit) # Only allowed while the stack is empty
         if self.last_folder and Path(self.last_folder).is_dir():
             logging.info(f"Last used folder found in config: {self.last_folder}")
             self.load_folder_on_startup(self.last_folder)
@@ -348,6 +4343,11 @@ class WitcherXMLEditor(QMainWindow):
         self.save_all_action.setToolTip("Save all modified files (Ctrl+Shift+S)")
         file_menu.addAction(self.save_all_action)
 
+        self.utf8_action = QAction("Save Folder as &UTF-8", self)
+        self.utf8_action.setToolTip("Save the files of this folder as UTF-8 instead of their own encoding (remembered per folder)")
+        self.utf8_action.setCheckable(True)
+        file_menu.addAction(self.utf8_action)
+
         file_menu.addSeparator()
 
         # Use standard exit action
@@ -356,6 +4356,68 @@ class WitcherXMLEditor(QMainWindow):
         exit_action.triggered.connect(self.close) # Connect directly to close
         file_menu.addAction(exit_action)
 
+        edit_menu = menu_bar.addMenu("&Edit")
+        self.undo_action = self.undo_stack.createUndoAction(self, "&Undo")
+        self.undo_action.setIcon(QIcon.fromTheme("edit-undo"))
+        self.undo_action.setShortcut(QKeySequence.StandardKey.Undo)
+        edit_menu.addAction(self.undo_action)
+
+        self.redo_action = self.undo_stack.createRedoAction(self, "&Redo")
+        self.redo_action.setIcon(QIcon.fromTheme("edit-redo"))
+        self.redo_action.setShortcuts([QKeySequence.StandardKey.Redo, QKeySequence("Ctrl+Y")])
+        edit_menu.addAction(self.redo_action)
+        edit_menu.addSeparator()
+
+        self.revert_entry_action = QAction(QIcon.fromTheme("document-revert"), "Revert &Entry", self)
+        self.revert_entry_action.setToolTip("Restore the selected ability/item as it was when its file was loaded or last saved")
+        edit_menu.addAction(self.revert_entry_action)
+
+        self.revert_file_action = QAction("Revert F&ile", self)
+        self.revert_file_action.setToolTip("Restore all abilities/items of the selected entry's file as they were when it was loaded or last saved")
+        edit_menu.addAction(self.revert_file_action)
+        edit_menu.addSeparator()
+
+        self.find_replace_action = QAction(QIcon.fromTheme("edit-find-replace"), "&Find and Replace...", self)
+        self.find_replace_action.setToolTip("Find and replace in tags, attributes and text across entries, files or the workspace (Ctrl+H)")
+        self.find_replace_action.setShortcut(QKeySequence("Ctrl+H"))
+        edit_menu.addAction(self.find_replace_action)
+
+        view_menu = menu_bar.addMenu("&View")
+        self.property_table_action = QAction("Ability Properties as &Table", self)
+        self.property_table_action.setToolTip("Always edit ability properties in a table (large abilities use it automatically)")
+        self.property_table_action.setCheckable(True)
+        view_menu.addAction(self.property_table_action)
+        view_menu.addSeparator()
+
+        self.jobs_action = QAction("&Jobs...", self)
+        self.jobs_action.setToolTip("Show loading/saving jobs running in the background, with their progress, and cancel them")
+        view_menu.addAction(self.jobs_action)
+
+        tools_menu = menu_bar.addMenu("&Tools")
+        self.grid_view_action = QAction(QIcon.fromTheme("view-grid"), "&Grid View...", self)
+        self.grid_view_action.setToolTip("Edit fields of many abilities/items at once in a table (Ctrl+G)")
+        self.grid_view_action.setShortcut(QKeySequence("Ctrl+G"))
+        tools_menu.addAction(self.grid_view_action)
+
+        self.bulk_edit_action = QAction("&Bulk Edit Selected...", self)
+        self.bulk_edit_action.setToolTip("Set, add, remove or rename a field on all selected entries (Ctrl+B)")
+        self.bulk_edit_action.setShortcut(QKeySequence("Ctrl+B"))
+        tools_menu.addAction(self.bulk_edit_action)
+
+        self.scale_values_action = QAction("&Scale Numeric Values...", self)
+        self.scale_values_action.setToolTip("Apply a formula (e.g. x * 1.15) to a numeric field of many entries")
+        tools_menu.addAction(self.scale_values_action)
+
+        self.generate_tiers_action = QAction("&Generate Tiers from Selection...", self)
+        self.generate_tiers_action.setToolTip("Create N scaled copies of the selected item/ability (e.g. Sword_T1..T10)")
+        tools_menu.addAction(self.generate_tiers_action)
+        tools_menu.addSeparator()
+
+        self.xml_tree_action = QAction("&XML Tree...", self)
+        self.xml_tree_action.setToolTip("Browse and edit the raw XML of a loaded file, including parts the detail sections do not show (Ctrl+Shift+X)")
+        self.xml_tree_action.setShortcut(QKeySequence("Ctrl+Shift+X"))
+        tools_menu.addAction(self.xml_tree_action)
+
         help_menu = menu_bar.addMenu("&Help")
         self.author_action = QAction("&About...", self) # Changed text slightly
         self.author_action.setToolTip("Show information about the editor")
@@ -389,6 +4451,8 @@ class WitcherXMLEditor(QMainWindow):
         self.ability_filter.setPlaceholderText("Filter abilities by name...")
         self.ability_list = QListWidget()
         self.ability_list.setObjectName("AbilityList")
+        self.ability_list.setItemDelegate(EntryListDelegate(self, TAG_ABILITY, self.ability_list))
+        self.ability_list.setSelectionMode(QAbstractItemView.SelectionMode.ExtendedSelection) # Ctrl/Shift for bulk edits
          # ---- vvv ADDED vvv ----
         self.ability_list.setContextMenuPolicy(Qt.ContextMenuPolicy.CustomContextMenu)
         # ---- ^^^ ADDED ^^^ ----
@@ -403,6 +4467,8 @@ class WitcherXMLEditor(QMainWindow):
         self.item_filter.setPlaceholderText("Filter items by name...")
         self.item_list = QListWidget()
         self.item_list.setObjectName("ItemList")
+        self.item_list.setItemDelegate(EntryListDelegate(self, TAG_ITEM, self.item_list))
+        self.item_list.setSelectionMode(QAbstractItemView.SelectionMode.ExtendedSelection)
         # ---- vvv ADDED vvv ----
         self.item_list.setContextMenuPolicy(Qt.ContextMenuPolicy.CustomContextMenu)
         # ---- ^^^ ADDED ^^^ ----
@@ -465,7 +4531,13 @@ class WitcherXMLEditor(QMainWindow):
         self.item_attributes_layout.setAlignment(Qt.AlignmentFlag.AlignTop)
         self.right_layout.addWidget(self.item_attributes_header)
         self.right_layout.addWidget(self.item_attributes_section)
-        # Button to add item attribute is added *inside* _populate_item_attributes
+        self.item_attribute_rows = RowPool(self.item_attributes_layout,
+                                           lambda: FieldRow(self, lambda row: self.item_attribute_changed(row.key, row.input.text())),
+                                           FieldRow.grid_placer(self.item_attributes_layout))
+        # Button to add item attribute sits below the attribute rows (moved by _populate_item_attributes)
+        self.add_item_attr_button = QPushButton(QIcon.fromTheme("list-add"), "Add Item Attribute")
+        self.add_item_attr_button.setToolTip("Add a new attribute to this item")
+        self.item_attributes_layout.addWidget(self.add_item_attr_button, 0, 0, 1, 2, Qt.AlignmentFlag.AlignLeft)
 
         self.base_abilities_header = self._create_section_header("Base Abilities")
         self.base_abilities_section = QWidget()
@@ -474,6 +4546,7 @@ class WitcherXMLEditor(QMainWindow):
         self.base_abilities_layout.setAlignment(Qt.AlignmentFlag.AlignTop)
         self.right_layout.addWidget(self.base_abilities_header)
         self.right_layout.addWidget(self.base_abilities_section)
+        self.base_ability_rows = RowPool(self.base_abilities_layout, lambda: BaseAbilityRow(self))
         self.add_base_ability_button = QPushButton(QIcon.fromTheme("list-add"), "Add Base Ability")
         self.add_base_ability_button.setToolTip("Add an ability reference required by this item")
         self.right_layout.addWidget(self.add_base_ability_button, alignment=Qt.AlignmentFlag.AlignLeft)
@@ -485,6 +4558,7 @@ class WitcherXMLEditor(QMainWindow):
         self.recycling_parts_layout.setAlignment(Qt.AlignmentFlag.AlignTop)
         self.right_layout.addWidget(self.recycling_parts_header)
         self.right_layout.addWidget(self.recycling_parts_section)
+        self.recycling_part_rows = RowPool(self.recycling_parts_layout, lambda: RecyclingPartRow(self))
         self.add_recycling_part_button = QPushButton(QIcon.fromTheme("list-add"), "Add Recycling Part")
         self.add_recycling_part_button.setToolTip("Add an item obtained when dismantling this item")
         self.right_layout.addWidget(self.add_recycling_part_button, alignment=Qt.AlignmentFlag.AlignLeft)
@@ -496,6 +4570,7 @@ class WitcherXMLEditor(QMainWindow):
         self.variants_layout.setAlignment(Qt.AlignmentFlag.AlignTop)
         self.right_layout.addWidget(self.variants_header)
         self.right_layout.addWidget(self.variants_section)
+        self.variant_rows = RowPool(self.variants_layout, lambda: VariantRow(self))
         self.add_variant_button = QPushButton(QIcon.fromTheme("list-add"), "Add Variant")
         self.add_variant_button.setToolTip("Add a visual or stat variant for this item")
         self.right_layout.addWidget(self.add_variant_button, alignment=Qt.AlignmentFlag.AlignLeft)
@@ -509,6 +4584,19 @@ class WitcherXMLEditor(QMainWindow):
         self.properties_layout.setAlignment(Qt.AlignmentFlag.AlignTop)
         self.right_layout.addWidget(self.properties_header)
         self.right_layout.addWidget(self.properties_section)
+        self.property_rows = RowPool(self.properties_layout, lambda: PropertyWidget(None, None, self))
+        # Table alternative for abilities with many properties (cell editors are created on demand)
+        self.property_model = AbilityPropertyModel(self, self)
+        self.property_table = QTableView()
+        self.property_table.setObjectName("PropertyTable")
+        self.property_table.setModel(self.property_model)
+        self.property_table.setItemDelegate(AbilityPropertyDelegate(self, self.property_table))
+        self.property_table.setSelectionBehavior(QAbstractItemView.SelectionBehavior.SelectRows)
+        self.property_table.setEditTriggers(QAbstractItemView.EditTrigger.DoubleClicked | QAbstractItemView.EditTrigger.EditKeyPressed | QAbstractItemView.EditTrigger.AnyKeyPressed)
+        self.property_table.setContextMenuPolicy(Qt.ContextMenuPolicy.CustomContextMenu)
+        self.property_table.verticalHeader().setVisible(False)
+        self.property_table.horizontalHeader().setStretchLastSection(True)
+        self.right_layout.addWidget(self.property_table)
         self.add_property_button = QPushButton(QIcon.fromTheme("list-add"), "Add Property")
         self.add_property_button.setToolTip("Add a generic property (stat modifier, effect, etc.) to this ability")
         self.right_layout.addWidget(self.add_property_button, alignment=Qt.AlignmentFlag.AlignLeft)
@@ -557,7 +4645,8 @@ class WitcherXMLEditor(QMainWindow):
         """Shows/hides ability-specific (generic properties) section."""
         logging.debug(f"Setting ability-specific section visibility to: {visible}")
         self.properties_header.setVisible(visible)
-        self.properties_section.setVisible(visible)
+        self.properties_section.setVisible(visible and not self._property_table_active)
+        self.property_table.setVisible(visible and self._property_table_active)
         self.add_property_button.setVisible(visible)
 
     def _connect_signals(self):
@@ -586,6 +4675,34 @@ class WitcherXMLEditor(QMainWindow):
         if self.save_as_action: self.save_as_action.triggered.connect(self.save_as_current_file)
         else: logging.warning("self.save_as_action not initialized.")
 
+        if self.grid_view_action: self.grid_view_action.triggered.connect(self.open_grid_view)
+        else: logging.warning("self.grid_view_action not initialized.")
+
+        if self.bulk_edit_action: self.bulk_edit_action.triggered.connect(self.open_bulk_edit)
+        else: logging.warning("self.bulk_edit_action not initialized.")
+
+        if self.scale_values_action: self.scale_values_action.triggered.connect(self.open_scale_values)
+        else: logging.warning("self.scale_values_action not initialized.")
+
+        if self.find_replace_action: self.find_replace_action.triggered.connect(self.open_find_replace)
+        if self.revert_entry_action: self.revert_entry_action.triggered.connect(lambda: self.revert_entry())
+        if self.revert_file_action: self.revert_file_action.triggered.connect(lambda: self.revert_file())
+        else: logging.warning("self.find_replace_action not initialized.")
+
+        if self.generate_tiers_action: self.generate_tiers_action.triggered.connect(self.open_tier_generator)
+        else: logging.warning("self.generate_tiers_action not initialized.")
+
+        if self.xml_tree_action: self.xml_tree_action.triggered.connect(self.open_xml_tree)
+        else: logging.warning("self.xml_tree_action not initialized.")
+        if self.jobs_action: self.jobs_action.triggered.connect(self.open_jobs_panel)
+        else: logging.warning("self.jobs_action not initialized.")
+
+        if self.utf8_action: self.utf8_action.toggled.connect(self._utf8_toggled)
+        else: logging.warning("self.utf8_action not initialized.")
+
+        if self.property_table_action: self.property_table_action.toggled.connect(self._property_view_toggled)
+        else: logging.warning("self.property_table_action not initialized.")
+
         if self.author_action: self.author_action.triggered.connect(self.show_author_info)
         else: logging.warning("self.author_action not initialized.")
 
@@ -595,11 +4712,12 @@ class WitcherXMLEditor(QMainWindow):
         # Common fields
         self.tags_input.editingFinished.connect(self.tags_changed)
         # Completer attached here for tags_input as it's always visible
-        self._attach_completer(self.tags_input, self.tag_model, "Tags")
+        self._attach_field_completer(self.tags_input, f"{TAG_ABILITY}/{TAG_TAGS}#tags", "Tags")
 
         # Section-specific add buttons
         self.add_property_button.clicked.connect(self.add_property)
         self.add_base_ability_button.clicked.connect(self.add_base_ability)
+        self.add_item_attr_button.clicked.connect(self.add_item_attribute)
         self.add_recycling_part_button.clicked.connect(self.add_recycling_part)
         self.add_variant_button.clicked.connect(self.add_variant)
 
@@ -617,6 +4735,7 @@ class WitcherXMLEditor(QMainWindow):
         self.item_list.customContextMenuRequested.connect(
             lambda pos: self._show_list_context_menu(self.item_list, pos)
         )
+        self.property_table.customContextMenuRequested.connect(self._show_property_table_menu)
         logging.debug("Context menu signal connections complete.")
 
 # --- Context Menu Handling ---
@@ -624,6 +4743,29 @@ class WitcherXMLEditor(QMainWindow):
     def _show_list_context_menu(self, list_widget: QListWidget, pos: QPoint):
         """Creates and displays a context menu for the ability/item lists."""
         item = list_widget.itemAt(pos)
+        # Several entries selected: offer batch actions for the selection
+        selected_count = len(list_widget.selectedItems())
+        if item is not None and item.isSelected() and selected_count > 1:
+            menu = QMenu(self)
+            bulk_action = QAction(f"Bulk Edit {selected_count} Selected...", self)
+            bulk_action.triggered.connect(self.open_bulk_edit)
+            menu.addAction(bulk_action)
+            menu.exec(list_widget.mapToGlobal(pos))
+            return
+
+        if item is not None and item.data(Qt.ItemDataRole.UserRole): # Row of a deleted entry
+            entry_type = TAG_ABILITY if list_widget is self.ability_list else TAG_ITEM
+            file_path = item.data(Qt.ItemDataRole.UserRole)
+            menu = QMenu(self)
+            restore_action = QAction(QIcon.fromTheme("document-revert"), "Restore Deleted Entry", self)
+            restore_action.triggered.connect(lambda: self.revert_entry(entry_type, item.text(), file_path))
+            menu.addAction(restore_action)
+            revert_file_action = QAction(f"Revert {os.path.basename(file_path)}...", self)
+            revert_file_action.triggered.connect(lambda: self.revert_file(file_path))
+            menu.addAction(revert_file_action)
+            menu.exec(list_widget.mapToGlobal(pos))
+            return
+
         # Only show menu if clicking on an item that matches the current selection
         if item is None or item.text() != self.current_selection_name:
             logging.debug("Context menu requested but not on the currently selected item, ignoring.")
@@ -648,6 +4790,15 @@ class WitcherXMLEditor(QMainWindow):
         open_action.setEnabled(is_enabled)
 
         menu.addAction(open_action)
+        menu.addSeparator()
+        revert_action = QAction(QIcon.fromTheme("document-revert"), "Revert Entry", self)
+        revert_action.setEnabled(self.entry_status(self.current_selection_type, self.current_selection_name) is not None)
+        revert_action.triggered.connect(lambda: self.revert_entry(self.current_selection_type, self.current_selection_name))
+        menu.addAction(revert_action)
+        file_path = self.current_selection_filepath
+        revert_file_action = QAction(f"Revert {os.path.basename(file_path)}...", self)
+        revert_file_action.triggered.connect(lambda: self.revert_file(file_path))
+        menu.addAction(revert_file_action)
         # Add other actions here if needed in the future (e.g., copy name, etc.)
 
         # Show the menu at the cursor position
@@ -734,7 +4885,7 @@ class WitcherXMLEditor(QMainWindow):
 
     def load_config(self):
         """Loads configuration (last folder) from the ini file."""
-        config = configparser.ConfigParser()
+        config = EditorConfigParser()
         self.last_folder = "" # Reset before loading
         if not self.config_file.exists():
             logging.warning(f"Config file {self.config_file} not found. Will be created on save.")
@@ -753,14 +4904,48 @@ class WitcherXMLEditor(QMainWindow):
                     logging.info("Config 'LastFolder' entry is empty.")
             else:
                 logging.warning("Config file missing [Settings] section or 'LastFolder' key.")
+            if 'Settings' in config and 'UndoLimit' in config['Settings']:
+                try:
+                    self.undo_limit = max(0, config['Settings'].getint('UndoLimit'))
+                    logging.info(f"Loaded undo limit from config: {self.undo_limit}")
+                except ValueError:
+                    logging.warning(f"UndoLimit in config ('{config['Settings']['UndoLimit']}') is not a number. Using {self.undo_limit}.")
+            if 'Settings' in config and 'PropertyTableThreshold' in config['Settings']:
+                try:
+                    self.property_table_threshold = max(0, config['Settings'].getint('PropertyTableThreshold'))
+                    logging.info(f"Loaded property table threshold from config: {self.property_table_threshold}")
+                except ValueError:
+                    logging.warning(f"PropertyTableThreshold in config ('{config['Settings']['PropertyTableThreshold']}') is not a number. Using {self.property_table_threshold}.")
+            if 'Settings' in config and 'PreserveFormatting' in config['Settings']:
+                try:
+                    self.preserve_formatting = config['Settings'].getboolean('PreserveFormatting')
+                    logging.info(f"Loaded preserve formatting from config: {self.preserve_formatting}")
+                except ValueError:
+                    logging.warning(f"PreserveFormatting in config ('{config['Settings']['PreserveFormatting']}') is not a boolean. Using {self.preserve_formatting}.")
+            for section in config.sections():
+                if not section.startswith('Workspace '): continue
+                try:
+                    if config[section].getboolean('NormalizeToUTF8', fallback=False): self.utf8_workspaces.add(section[len('Workspace '):])
+                except ValueError:
+                    logging.warning(f"NormalizeToUTF8 in config section [{section}] is not a boolean. Ignoring it.")
+            if 'Completions' in config: # Extra completion fields: <field path> = <domain>[, <domain>...]
+                fields = {}
+                for path, domains in config['Completions'].items():
+                    domains = tuple(d.strip() for d in domains.split(',') if d.strip())
+                    if not re.fullmatch(r'(ability|item)(/[^/@#]+)*(@[^/@#]+|#text|#tags)?', path, re.IGNORECASE) or not domains:
+                        logging.warning(f"Ignoring completion field '{path} = {config['Completions'][path]}' in config.")
+                        continue
+                    fields[path] = domains if len(domains) > 1 else domains[0]
+                self.register_completion_fields(fields)
+                logging.info(f"Loaded {len(fields)} completion field(s) from config.")
         except configparser.Error as e:
             logging.error(f"Error reading config file {self.config_file}: {e}", exc_info=True)
         except Exception as e:
             logging.error(f"Unexpected error loading config: {e}", exc_info=True)
 
     def save_config(self):
-        """Saves the current configuration (last folder) to the ini file."""
-        config = configparser.ConfigParser()
+        """Saves the current configuration (last folder, per-folder options) to the ini file."""
+        config = EditorConfigParser()
         try:
             # Read existing file first to preserve other settings (if any)
             if self.config_file.exists():
@@ -768,13 +4953,17 @@ class WitcherXMLEditor(QMainWindow):
                     config.read(self.config_file, encoding='utf-8')
                 except configparser.Error as e:
                     logging.warning(f"Could not read existing config file {self.config_file} before saving: {e}. Overwriting.")
-                    config = configparser.ConfigParser() # Start fresh if read fails
+                    config = EditorConfigParser() # Start fresh if read fails
 
             if 'Settings' not in config:
                 config['Settings'] = {}
 
             config['Settings']['LastFolder'] = self.last_folder if self.last_folder else ""
             logging.info(f"Saving config: LastFolder = '{config['Settings']['LastFolder']}'")
+            for folder in self.utf8_workspaces | {s[len('Workspace '):] for s in config.sections() if s.startswith('Workspace ')}:
+                section = f'Workspace {folder}'
+                if section not in config: config[section] = {}
+                config[section]['NormalizeToUTF8'] = 'true' if folder in self.utf8_workspaces else 'false'
 
             with open(self.config_file, 'w', encoding='utf-8') as configfile:
                 config.write(configfile)
@@ -787,24 +4976,16 @@ class WitcherXMLEditor(QMainWindow):
             logging.error(f"Unexpected error saving config: {e}", exc_info=True)
 
     def load_folder_on_startup(self, folder_path):
-        """Attempts to load XML files from the given folder on startup."""
+        """Starts loading XML files from the given folder on startup."""
         self.statusBar.showMessage(f"Auto-loading files from: {folder_path}...")
-        QApplication.processEvents() # Update UI to show message
-        try:
-            success = self.load_xml_files(folder_path)
+        def loaded(success):
             if success:
-                self.populate_lists()
                 self.statusBar.showMessage(f"Loaded files from: {folder_path}. Select an element.", 5000)
             else:
                 # load_xml_files should have logged errors
                 self.statusBar.showMessage("Failed to load files automatically. See logs.", 5000)
                 self.last_folder = "" # Clear invalid folder
-        except Exception as e:
-             error_msg = f"Unexpected error during auto-load from {folder_path}:\n{e}"
-             logging.error(error_msg, exc_info=True)
-             QMessageBox.critical(self, "Auto-load Error", error_msg)
-             self.statusBar.showMessage("Error during automatic file loading.", 5000)
-             self.last_folder = "" # Clear invalid folder
+        self.load_xml_files(folder_path, loaded)
 
     # --- File Operations ---
 
@@ -839,24 +5020,14 @@ class WitcherXMLEditor(QMainWindow):
                      self.last_folder = new_last_folder
                      self.save_config() # Save the newly selected folder
 
-                 self.statusBar.showMessage(f"Loading files from: {selected_path}..."); QApplication.processEvents()
-                 try:
-                     success = self.load_xml_files(selected_path) # Pass Path object
+                 self.statusBar.showMessage(f"Loading files from: {selected_path}...")
+                 def loaded(success):
                      if success:
-                         self.populate_lists()
                          self.statusBar.showMessage(f"Loaded files from: {selected_path}. Select an element.", 5000)
                      else:
                          self.statusBar.showMessage("Failed to load some files. Check logs.", 5000)
                          # Don't clear last_folder here, loading might have partially succeeded
-                 except Exception as e:
-                      error_msg = f"Unexpected error occurred while loading files from {selected_path}:\n{e}"
-                      logging.error(error_msg, exc_info=True)
-                      QMessageBox.critical(self, "Loading Error", error_msg)
-                      self.statusBar.showMessage("Error during file loading.", 5000)
-                      # If a major error occurred during load, maybe clear the last folder
-                      # if self.last_folder == new_last_folder:
-                      #     self.last_folder = ""
-                      #     self.save_config()
+                 self.load_xml_files(selected_path, loaded) # Pass Path object
             else:
                  # Should not happen with getExistingDirectory, but check anyway
                  logging.warning(f"QFileDialog returned a path that is not a directory: {selected_path}")
@@ -865,64 +5036,136 @@ class WitcherXMLEditor(QMainWindow):
              logging.info("Folder selection cancelled by user.")
              self.statusBar.showMessage("Folder opening cancelled.", 3000)
 
-    def load_xml_files(self, folder_path):
-        """Loads all XML files from the specified folder path (Path object)."""
+    def load_xml_files(self, folder_path, on_loaded=None):
+        """Clears the workspace and loads all XML files under folder_path (Path or str) as a background job.
+
+        Parsing and indexing run on job threads; the GUI thread only adopts the finished
+        index and fills the lists. on_loaded(success) is called afterwards unless
+        the job was cancelled (a newer load cancels an older one). Returns the Job.
+        """
+        self.jobs.cancel_all(key="load")
         self.clear_data() # Clear previous data first
+        self.workspace_folder = str(Path(folder_path))
+        if self.utf8_action:
+            self.utf8_action.blockSignals(True)
+            self.utf8_action.setChecked(self.workspace_folder in self.utf8_workspaces)
+            self.utf8_action.blockSignals(False)
         logging.info(f"Starting XML file loading from: {folder_path}")
-        file_count = 0
-        ability_count = 0
-        item_count = 0
-        processed_files = 0
-        errors_occurred = False
-
-        # Use temporary sets to collect data during parsing
-        temp_sets = {
-            "prop_names": set(), "item_attr_names": set(), "variant_attr_names": set(),
-            "prop_attr_names": set(), "tags": set(), "ability_names": set(), "item_names": set(),
-            "recycling_parts": set(), "item_categories": set(), "ability_modes": set(),
-            "variant_nested_tags": set(), "equip_templates": set(), "loc_keys": set(),
-            "icon_paths": set(), "prop_attr_types": set(), "equip_slots": set(),
-            "hold_slots": set(), "hands": set(), "sound_ids": set(), "events": set(),
-            "anim_actions": set()
-        }
 
-        try:
+        def load(job):
+            file_paths = []
             for root_dir, _, files in os.walk(folder_path):
+                job.token.check()
                 for filename in files:
                     if filename.lower().endswith(".xml"):
-                        file_path = Path(root_dir) / filename
-                        file_count += 1
-                        tree, root = self._parse_xml_file(str(file_path)) # Pass string path to helper
-                        if tree and root:
-                            processed_files += 1
-                            self.loaded_files[str(file_path)] = {'tree': tree, 'root': root}
-                            a_added, i_added = self._process_xml_root(root, str(file_path), temp_sets)
-                            ability_count += a_added
-                            item_count += i_added
-                        else:
-                            errors_occurred = True # Mark error if parsing failed
-
-            self._update_internal_sets(temp_sets)
-            self._update_all_completer_models()
-
-            logging.info(f"Finished loading. Parsed {processed_files}/{file_count} XML files.")
-            logging.info(f"  Found {ability_count} unique abilities ({len(self.all_ability_names)} total names).")
-            logging.info(f"  Found {item_count} unique items ({len(self.all_item_names)} total names).")
-            # Add more summary logs if needed
+                        file_paths.append(str(Path(root_dir) / filename))
+            file_count = len(file_paths)
+            job.report(0, file_count, "Parsing files")
 
-        except Exception as e:
-            logging.error(f"Critical error during file walking or processing in {folder_path}: {e}", exc_info=True)
-            QMessageBox.critical(self, "Loading Error", f"A critical error occurred during file loading:\n{e}")
-            errors_occurred = True
+            # Parse files, collect their entries and count their completion values in parallel; index them in walk order
+            def parse_and_count(file_path):
+                if job.token.cancelled: return None, None, None
+                try:
+                    data = Path(file_path).read_bytes() # Kept as the FileSource saves splice edits into
+                    file_data = self._file_data(file_path, data)
+                except OSError as e:
+                    logging.error(f"Could not read {file_path}: {e}")
+                    return None, None, None
+                if file_data is None: return None, None, None
+                entries = collect_root_entries(file_data['root'])
+                counts = self.completion_index.count((entry_type, element) for entry_type, _name, element in entries)
+                file_data['baseline'] = EntryBaseline(entries)
+                return file_data, entries, counts
+            results = []
+            with ThreadPoolExecutor(max_workers=max(1, min(file_count, os.cpu_count() or 4))) as executor:
+                futures = [executor.submit(parse_and_count, fp) for fp in file_paths]
+                for file_path, future in zip(file_paths, futures):
+                    results.append(future.result())
+                    job.token.check()
+                    job.report(len(results), file_count, os.path.basename(file_path))
+            job.report(file_count, file_count, "Indexing entries")
+            return self._index_loaded_files(file_paths, results)
+
+        def loaded(job):
+            if job.state == Job.CANCELLED:
+                self.statusBar.showMessage("Loading cancelled.", 3000)
+                return
+            if job.state == Job.FAILED:
+                logging.error(f"Critical error during file walking or processing in {folder_path}: {job.error}")
+                QMessageBox.critical(self, "Loading Error", f"A critical error occurred during file loading:\n{job.error}")
+                if on_loaded: on_loaded(False)
+                return
+            success = self._adopt_loaded_files(job.result)
+            self._reset_clean_marks()
+            self.populate_lists()
+            self._open_journal()
+            if on_loaded: on_loaded(success)
 
-        return not errors_occurred # Return True if successful (no errors)
+        return self.jobs.submit(f"Load {os.path.basename(str(folder_path)) or folder_path}", load,
+                                JobScheduler.PRIORITY_NORMAL, key="load", on_done=loaded)
 
-    def _parse_xml_file(self, file_path_str):
-        """Parses a single XML file, returns (tree, root) or (None, None)."""
+    def _index_loaded_files(self, file_paths, results):
+        """Builds the workspace index of parsed files on the load job's thread, without touching the editor.
+
+        Returns {'files', 'abilities', 'items', 'completions', 'success'} for _adopt_loaded_files().
+        """
+        file_count = len(file_paths)
+        ability_count = 0
+        item_count = 0
+        processed_files = 0
+        errors_occurred = False
+
+        loaded_files, abilities_map, items_map = {}, {}, {}
+        completion_counts = []
+        for file_path, (file_data, entries, counts) in zip(file_paths, results):
+            if file_data is not None:
+                processed_files += 1
+                loaded_files[file_path] = file_data
+                a_added, i_added = self._process_xml_root(file_data['root'], file_path, entries, (abilities_map, items_map))
+                ability_count += a_added
+                item_count += i_added
+                completion_counts.append(counts)
+            else:
+                errors_occurred = True # Mark error if parsing failed
+        completions = self.completion_index.merge(completion_counts)
+
+        logging.info(f"Finished loading. Parsed {processed_files}/{file_count} XML files.")
+        logging.info(f"  Found {ability_count} unique abilities ({len(completions.get('ability_names', ()))} total names).")
+        logging.info(f"  Found {item_count} unique items ({len(completions.get('item_names', ()))} total names).")
+        # Add more summary logs if needed
+        return {'files': loaded_files, 'abilities': abilities_map, 'items': items_map,
+                'completions': completions, 'success': not errors_occurred}
+
+    def _adopt_loaded_files(self, index):
+        """Installs an _index_loaded_files() result into the (cleared) workspace (GUI thread). Returns True if every file parsed."""
+        self.loaded_files.update(index['files'])
+        self.abilities_map.update(index['abilities'])
+        self.items_map.update(index['items'])
+        self.completion_index.set_counts(index['completions'])
+        self.change_bus.reset.emit()
+        return index['success']
+
+    def _file_data(self, file_path, data):
+        """loaded_files value for a file's bytes (any thread): tree, root, FileSource and DiskStamp,
+        or None if it does not parse. The caller adds the 'baseline'. Raises OSError if the file cannot be stat'ed."""
+        tree, root = self._parse_xml_file(file_path, data)
+        if not tree or root is None: return None
+        try:
+            source = FileSource(data, root)
+        except (LookupError, UnicodeError) as e: # Encoding lxml reads but Python does not: saved as UTF-16
+            logging.warning(f"Cannot keep the encoding of {file_path}: {e}")
+            source = None
+        return {'tree': tree, 'root': root, 'source': source, 'stamp': DiskStamp.of_data(file_path, data)}
+
+    def _parse_xml_file(self, file_path_str, data=None):
+        """Parses a single XML file (or its already read bytes), returns (tree, root) or (None, None)."""
         try:
             # Remove comments during parsing, keep processing instructions
             parser = ET.XMLParser(remove_comments=True, remove_pis=False, resolve_entities=False)
-            tree = ET.parse(file_path_str, parser=parser)
+            if data is None:
+                tree = ET.parse(file_path_str, parser=parser)
+            else:
+                tree = ET.fromstring(data, parser, base_url=file_path_str).getroottree()
             root = tree.getroot()
             if root is None:
                 logging.warning(f"Empty root element in file: {file_path_str}")
@@ -936,226 +5179,497 @@ class WitcherXMLEditor(QMainWindow):
             logging.error(f"Unexpected error parsing {file_path_str}: {e}", exc_info=True)
             return None, None
 
-    def _process_xml_root(self, root, file_path, temp_sets):
-        """Processes abilities and items within a single XML root."""
-        abilities_added = 0
-        items_added = 0
-        # Use findall with XPath to be slightly more robust to structure variations
-        for abilities_node in root.findall(f'.//{TAG_ABILITIES}'):
-             abilities_added += self._process_abilities_node(abilities_node, file_path, temp_sets)
-        for items_node in root.findall(f'.//{TAG_ITEMS}'):
-             items_added += self._process_items_node(items_node, file_path, temp_sets)
-        return abilities_added, items_added
-
-    def _process_abilities_node(self, abilities_node, file_path, temp_sets):
-        """Processes <ability> elements and collects data."""
-        count = 0
-        for ability in abilities_node.findall(TAG_ABILITY):
-            name = ability.get('name')
-            if name:
-                if name not in self.abilities_map:
-                    self.abilities_map[name] = {'filepath': file_path, 'element': ability}
-                    count += 1
-                else:
-                    # Handle duplicates? Log warning? Overwrite? For now, log.
-                    logging.warning(f"Duplicate ability name '{name}' found. Using entry from {self.abilities_map[name]['filepath']}. Ignoring entry from {file_path}")
-
-                temp_sets["ability_names"].add(name)
-                # Collect tags, property names, attribute names etc. from ability children
-                for prop in ability:
-                    if ET.iselement(prop): # Check if it's an element (not comment, etc.)
-                        tag = prop.tag
-                        if tag == TAG_TAGS:
-                             if prop.text: temp_sets["tags"].update(t.strip() for t in prop.text.split(',') if t.strip())
-                        elif tag not in self.KNOWN_ABILITY_CHILD_TAGS: # Treat unknown tags as properties
-                             temp_sets["prop_names"].add(tag)
-                             temp_sets["prop_attr_names"].update(prop.attrib.keys())
-                             prop_type = prop.get('type')
-                             if prop_type: temp_sets["prop_attr_types"].add(prop_type)
-        return count
-
-    def _process_items_node(self, items_node, file_path, temp_sets):
-        """Processes <item> elements and collects data."""
-        count = 0
-        for item in items_node.findall(TAG_ITEM):
-             name = item.get('name')
-             if name:
-                 if name not in self.items_map:
-                     self.items_map[name] = {'filepath': file_path, 'element': item}
-                     count += 1
-                 else:
-                     logging.warning(f"Duplicate item name '{name}' found. Using entry from {self.items_map[name]['filepath']}. Ignoring entry from {file_path}")
-
-                 temp_sets["item_names"].add(name)
-                 temp_sets["item_attr_names"].update(item.attrib.keys())
-
-                 # Collect specific attribute values for completers
-                 self._collect_item_attribute_values(item, temp_sets)
-
-                 # Process known children (tags, variants, etc.)
-                 for child in item:
-                     if ET.iselement(child):
-                         tag = child.tag
-                         if tag == TAG_TAGS:
-                             if child.text: temp_sets["tags"].update(t.strip() for t in child.text.split(',') if t.strip())
-                         elif tag == TAG_RECYCLING_PARTS:
-                             for part in child.findall(TAG_PARTS):
-                                 if part.text: temp_sets["recycling_parts"].add(part.text.strip())
-                         elif tag == TAG_VARIANTS:
-                             for variant in child.findall(TAG_VARIANT):
-                                 temp_sets["variant_attr_names"].update(variant.attrib.keys())
-                                 var_eq_tmpl = variant.get('equip_template')
-                                 if var_eq_tmpl: temp_sets["equip_templates"].add(var_eq_tmpl)
-                                 for nested in variant:
-                                     if ET.iselement(nested): temp_sets["variant_nested_tags"].add(nested.tag)
-                         elif tag not in self.KNOWN_ITEM_CHILD_TAGS: # Treat as generic property if not known structure
-                              logging.debug(f"Found potentially generic property '{tag}' under item '{name}'")
-                              temp_sets["prop_names"].add(tag)
-                              temp_sets["prop_attr_names"].update(child.attrib.keys())
-                              # Could also collect property types here if needed
-        return count
-
-    def _collect_item_attribute_values(self, item_element, temp_sets):
-        """Helper to collect specific attribute values from an <item> element."""
-        # Helper to safely add if value exists
-        def add_if_present(attr_name, target_set):
-            value = item_element.get(attr_name)
-            if value: target_set.add(value)
-
-        add_if_present('category', temp_sets["item_categories"])
-        add_if_present('ability_mode', temp_sets["ability_modes"])
-        add_if_present('equip_template', temp_sets["equip_templates"])
-        add_if_present('equip_slot', temp_sets["equip_slots"])
-        add_if_present('hold_slot', temp_sets["hold_slots"])
-        add_if_present('hand', temp_sets["hands"])
-        add_if_present('sound_identification', temp_sets["sound_ids"])
-        add_if_present('draw_event', temp_sets["events"])
-        add_if_present('holster_event', temp_sets["events"])
-        add_if_present('draw_act', temp_sets["anim_actions"])
-        add_if_present('draw_deact', temp_sets["anim_actions"])
-        add_if_present('holster_act', temp_sets["anim_actions"])
-        add_if_present('holster_deact', temp_sets["anim_actions"])
-        add_if_present('localisation_key_name', temp_sets["loc_keys"])
-        add_if_present('localisation_key_description', temp_sets["loc_keys"])
-        add_if_present('icon_path', temp_sets["icon_paths"])
-
-    def _update_internal_sets(self, temp_sets):
-        """Updates the main self.all_* sets from the temporary collection."""
-        logging.debug("Updating internal autocompletion sets...")
-        self.all_property_names = temp_sets["prop_names"]
-        self.all_item_attribute_names = temp_sets["item_attr_names"]
-        self.all_variant_attribute_names = temp_sets["variant_attr_names"]
-        self.all_property_attribute_names = temp_sets["prop_attr_names"]
-        self.all_tags = temp_sets["tags"]
-        self.all_ability_names = temp_sets["ability_names"]
-        self.all_item_names = temp_sets["item_names"]
-        self.all_recycling_part_names = temp_sets["recycling_parts"]
-        self.all_item_categories = temp_sets["item_categories"]
-        self.all_ability_modes = temp_sets["ability_modes"]
-        self.all_variant_nested_tags = temp_sets["variant_nested_tags"]
-        self.all_equip_templates = temp_sets["equip_templates"]
-        self.all_loc_keys = temp_sets["loc_keys"]
-        self.all_icon_paths = temp_sets["icon_paths"]
-        self.all_prop_attr_types = temp_sets["prop_attr_types"]
-        self.all_equip_slots = temp_sets["equip_slots"]
-        self.all_hold_slots = temp_sets["hold_slots"]
-        self.all_hands = temp_sets["hands"]
-        self.all_sound_ids = temp_sets["sound_ids"]
-        self.all_events = temp_sets["events"]
-        self.all_anim_actions = temp_sets["anim_actions"]
-        logging.debug("Internal sets updated.")
-
-    def _safe_sorted_string_list(self, data_set, set_name="unknown"):
-        """Safely converts a set to a sorted list of strings, logging non-strings."""
-        string_list = []
-        invalid_items_count = 0
-        for item in data_set:
-            if isinstance(item, str):
-                string_list.append(item)
+    def _process_xml_root(self, root, file_path, entries=None, maps=None):
+        """Indexes abilities and items within a single XML root (entries: its collect_root_entries(), if already read).
+
+        maps is the (abilities_map, items_map) pair to fill, the editor's own by default.
+        """
+        if entries is None: entries = collect_root_entries(root)
+        abilities_map, items_map = maps or (self.abilities_map, self.items_map)
+        added = {TAG_ABILITY: 0, TAG_ITEM: 0}
+        for entry_type, name, element in entries:
+            if not name: continue
+            data_map = abilities_map if entry_type == TAG_ABILITY else items_map
+            if name not in data_map:
+                data_map[name] = {'filepath': file_path, 'element': element}
+                added[entry_type] += 1
             else:
-                if invalid_items_count < 10: # Log first few offenders
-                   logging.warning(f"Non-string item found in completer set '{set_name}': {repr(item)} (type: {type(item).__name__}). Skipping.")
-                invalid_items_count += 1
-        if invalid_items_count > 10:
-            logging.warning(f"Found {invalid_items_count} total non-string items in completer set '{set_name}'.")
-
-        try:
-            return sorted(string_list)
-        except TypeError as e_sort:
-            logging.error(f"Sorting error for completer set '{set_name}' (even after filtering strings!): {e_sort}. List: {string_list}", exc_info=True)
-            return string_list # Return unsorted on error
-
-    def _update_single_completer_model(self, model, data_set, model_name):
-        """Updates a single QStringListModel safely."""
+                # Handle duplicates? Log warning? Overwrite? For now, log.
+                logging.warning(f"Duplicate {entry_type} name '{name}' found. Using entry from {data_map[name]['filepath']}. Ignoring entry from {file_path}")
+        return added[TAG_ABILITY], added[TAG_ITEM]
+
+    def _entry_completions(self, entry_type, entry):
+        """Yields (domain, value) for every completion value one ability/item contributes (per the registry).
+
+        Everything the editor can type into an entry is covered (including referenced
+        ability/item names), so the index after any sequence of edits equals a fresh load.
+        """
+        node = self.completion_schema.get(entry_type)
+        return collect_completions(node, entry) if node is not None else ()
+
+    def _iter_entries(self):
+        """Yields (entry_type, element) for every ability/item in the loaded trees, duplicates included."""
+        for data in self.loaded_files.values():
+            yield from iter_root_entries(data['root'])
+
+    def register_completion_fields(self, fields):
+        """Adds/overrides registry paths ({path: domain}); unknown domains get a model of their own."""
+        fields = {completion_field_key(path): domain for path, domain in fields.items()}
+        self.completion_fields.update(fields)
+        for path, domain in fields.items():
+            for name in completion_domains(domain):
+                if name not in self.completion_index.models and name not in self.static_completion_models:
+                    self.completion_index.add_domain(name, SortedStringListModel(self))
+                    logging.info(f"Added completion domain '{name}' for field '{path}'.")
+        self.completion_schema = compile_completion_fields(
+            self.completion_fields, self.static_completion_models,
+            {TAG_ABILITY: self.KNOWN_ABILITY_CHILD_TAGS, TAG_ITEM: self.KNOWN_ITEM_CHILD_TAGS})
+
+    def completion_model_for(self, path):
+        """Returns the model fields at this registry path complete from, or None."""
+        domain = self.completion_fields.get(completion_field_key(path))
+        if domain is None: return None
+        domain = completion_domains(domain)[0]
+        return self.static_completion_models.get(domain) or self.completion_index.models.get(domain)
+
+    def _attach_field_completer(self, line_edit, path, field_context_name=None):
+        """Attaches the completer registered for a field path (see COMPLETION_FIELDS), if any."""
+        model = self.completion_model_for(path)
+        if model is not None:
+            self._attach_completer(line_edit, model, field_context_name or path)
+        else:
+            self.completer_pool.detach(line_edit)
+
+    def _rebuild_completion_index(self):
+        self.completion_index.rebuild(self._iter_entries())
+        self.change_bus.reset.emit()
+
+    def snapshot(self, file_paths=None):
+        """Current WorkspaceSnapshot of the given loaded files, all if None (GUI thread). Hand it to
+        jobs that read the workspace while editing goes on; they release() it when done."""
+        return self.snapshots.take(self.loaded_files, self.file_generations, file_paths)
+
+    def save_files(self, file_paths, title, on_saved=None):
+        """Writes the given loaded files as one background job and returns it.
+
+        The files are written from a snapshot, so editing can go on meanwhile; a file
+        stays marked modified if it was edited after the snapshot was taken. Edited
+        entries are spliced into each file's own text where possible, keeping comments
+        and formatting elsewhere (see _minimal_save_plan), else the whole tree is
+        written, which loses the file's comments (the user is asked first). Files are written in parallel, each atomically (see save_xml_file).
+        Save jobs run one after another. on_saved(saved_paths, failures) runs on the
+        GUI thread afterwards, failures being [(file_path, error)].
+
+        Files changed on disk since they were loaded or saved are not overwritten
+        unless the user says so (see _check_disk_changes); one changed while the job
+        waited fails with ExternalChangeError.
+        """
+        file_paths, overwrite = self._check_disk_changes(file_paths)
+        plans = {fp: self._minimal_save_plan(fp) for fp in file_paths if fp in self.loaded_files}
+        file_paths = self._confirm_comment_loss(plans)
+        plans = {fp: plans[fp] for fp in file_paths}
+        workspace = self.snapshot(file_paths) # Only the files written are serialized
+        snapshots = list(workspace.files.values())
+        expected = {fp: None if fp in overwrite else self.loaded_files[fp].get('stamp') for fp in plans}
+        written = {} # {file_path: save_xml_file() result} for the FileSources, filled by the job
+        stamps = {}  # {file_path: DiskStamp of the written file}
+        journal = self.journal
+        journal_seq = journal.seq if journal is not None else 0 # The files are saved with the edits journaled so far
+        clean_mark = self._top_command() # Undoing back to it returns a saved file to what was written
+
+        def save(job):
+            def save_one(file_snapshot):
+                if job.token.cancelled: return False # Not started; files already written stay saved
+                file_path = file_snapshot.file_path
+                plan = plans[file_path]
+                logging.info(f"Saving file: {file_path}")
+                report = None
+                if len(snapshots) == 1: # Show how far a big file got
+                    report = lambda done, total: job.report(done, total, f"Writing {os.path.basename(file_path)}")
+                written_source, stamps[file_path] = save_xml_file(file_snapshot, plan, file_path, report, expected[file_path])
+                if plan is not None: written[file_path] = written_source
+                return True
+
+            saved, failures = [], []
+            job.report(0, len(snapshots))
+            # Waiting for fsync releases the GIL, so a few more threads than cores keep the disk busy
+            with ThreadPoolExecutor(max_workers=max(1, min(len(snapshots), 32, (os.cpu_count() or 1) + 4))) as executor:
+                futures = {executor.submit(save_one, fs): fs.file_path for fs in snapshots}
+                for future in as_completed(futures):
+                    file_path = futures[future]
+                    try:
+                        if future.result():
+                            saved.append(file_path)
+                            logging.info(f"Successfully saved: {file_path}")
+                    except Exception as e:
+                        logging.error(f"Error saving file {file_path}: {e}", exc_info=not isinstance(e, ExternalChangeError))
+                        failures.append((file_path, e))
+                    job.report(len(saved) + len(failures), len(snapshots), os.path.basename(file_path))
+            return saved, failures
+
+        def saved(job):
+            self.snapshots.release(workspace)
+            saved_paths, failures = job.result or ([], [])
+            if job.state == Job.FAILED: failures = [(fs.file_path, job.error) for fs in snapshots]
+            saved_set = set(saved_paths)
+            for file_snapshot in snapshots:
+                file_path = file_snapshot.file_path
+                if file_path in saved_set and self.file_generations.get(file_path) == file_snapshot.generation:
+                    self.modified_files.discard(file_path)
+            for file_path, written_source in written.items():
+                plan = plans[file_path]
+                if self.loaded_files.get(file_path, {}).get('source') is plan.source: # Not reloaded meanwhile
+                    plan.source.update(*written_source, plan)
+            if journal is not None and journal is self.journal: self._journal_saved(saved_paths, journal_seq)
+            for file_snapshot in snapshots:
+                file_path = file_snapshot.file_path
+                if file_path in saved_set and self.loaded_files.get(file_path, {}).get('tree') is file_snapshot.source:
+                    self._clean_marks[file_path] = clean_mark
+                    self.loaded_files[file_path]['stamp'] = stamps[file_path]
+                    self._rebase_entries(file_path, file_snapshot if file_path in self.modified_files else None)
+            self.update_window_title()
+            if on_saved: on_saved(saved_paths, failures)
+
+        return self.jobs.submit(title, save, JobScheduler.PRIORITY_HIGH, key="save", on_done=saved)
+
+    def _check_disk_changes(self, file_paths):
+        """Asks what to do with files changed on disk since the editor loaded or saved them (GUI thread, before a save).
+
+        Checking costs one stat per file (see DiskStamp). For each changed file the user
+        can overwrite it, reload it (dropping the editor's changes to it), merge the two
+        versions (see _merge_from_disk) or skip it. Returns (file paths to save, the
+        set of those to write without checking again).
+        """
+        changed = []
+        for file_path in file_paths:
+            stamp = self.loaded_files.get(file_path, {}).get('stamp')
+            if stamp is not None and stamp.changed(file_path): changed.append(file_path)
+        if not changed: return list(file_paths), set()
+        skipped, overwrite, merge_notes, dropped_notes = set(), set(), [], []
+        choice, for_all = None, False
+        for i, file_path in enumerate(changed):
+            if not for_all:
+                choice, for_all = self._ask_disk_change(file_path, len(changed) - i - 1)
+            logging.info(f"{file_path} changed on disk; user chose: {choice}")
+            if choice == "overwrite":
+                overwrite.add(file_path)
+                continue
+            if choice not in ("reload", "merge"):
+                skipped.add(file_path)
+                continue
+            try:
+                if choice == "reload":
+                    self._reload_file(file_path)
+                    skipped.add(file_path) # Nothing left to save
+                else:
+                    kept, dropped = self._merge_from_disk(file_path)
+                    if kept: merge_notes.append(f"{os.path.basename(file_path)}: {', '.join(kept)}")
+                    if dropped: dropped_notes.append(f"{os.path.basename(file_path)}: {', '.join(dropped)}")
+            except (OSError, LookupError, ValueError) as e:
+                logging.error(f"Could not {choice} {file_path}: {e}")
+                reloaded = choice == "merge" and file_path not in self.modified_files # Failed after reloading
+                note = " It now holds the version on disk; your changes to it were dropped." if reloaded else ""
+                QMessageBox.warning(self, "File Changed on Disk", f"Could not {choice} {file_path}; it was not saved.{note}\n\n{e}")
+                skipped.add(file_path)
+        if merge_notes:
+            QMessageBox.information(self, "Merge", "These abilities/items were changed both here and on disk; "
+                                    "your version was kept:\n\n" + "\n".join(merge_notes))
+        if dropped_notes:
+            QMessageBox.warning(self, "Merge", "These changes of yours could not be merged into the version on disk "
+                                "and were dropped:\n\n" + "\n".join(dropped_notes))
+        return [fp for fp in file_paths if fp not in skipped], overwrite
+
+    def _ask_disk_change(self, file_path, others):
+        """Asks about one file changed on disk. Returns ('overwrite' | 'reload' | 'merge' | 'skip', apply to the other files)."""
+        box = QMessageBox(QMessageBox.Icon.Warning, "File Changed on Disk",
+                          f"'{os.path.basename(file_path)}' was changed by another program since it was loaded or last saved.\n\n"
+                          "Overwrite: save your version; the changes on disk are lost.\n"
+                          "Reload: load the version on disk; your unsaved changes to this file are lost.\n"
+                          "Merge: load the version on disk and apply the abilities/items you changed to it, "
+                          "keeping yours where both changed the same one.", parent=self)
+        box.setDetailedText(file_path)
+        overwrite_button = box.addButton("Overwrite", QMessageBox.ButtonRole.DestructiveRole)
+        reload_button = box.addButton("Reload", QMessageBox.ButtonRole.ResetRole)
+        merge_button = box.addButton("Merge", QMessageBox.ButtonRole.AcceptRole)
+        box.addButton("Skip", QMessageBox.ButtonRole.RejectRole)
+        box.setDefaultButton(merge_button)
+        for_all = None
+        if others:
+            for_all = QCheckBox(f"Do the same for the other {others} changed file(s)")
+            box.setCheckBox(for_all)
+        box.exec()
+        clicked = box.clickedButton()
+        if clicked is overwrite_button: choice = "overwrite"
+        elif clicked is reload_button: choice = "reload"
+        elif clicked is merge_button: choice = "merge"
+        else: choice = "skip"
+        return choice, for_all is not None and for_all.isChecked()
+
+    def _reload_file(self, file_path):
+        """Replaces a loaded file by its content on disk (GUI thread), dropping the editor's changes to it.
+
+        The file's ops leave the undo history, as they refer to the replaced tree; the
+        other files' edits stay undoable (see _forget_file_history). The journal records
+        the file as saved. Raises OSError, or ValueError if the file does not parse.
+        """
+        file_data = self._file_data(file_path, Path(file_path).read_bytes())
+        if file_data is None: raise ValueError(f"{os.path.basename(file_path)} is not valid XML")
+        file_data['baseline'] = EntryBaseline(collect_root_entries(file_data['root']))
+        self.loaded_files[file_path] = file_data
+        self._forget_file_history(file_path)
+        if self.journal is not None: self.journal.mark_saved([file_path], self.journal.seq)
+        self.modified_files.discard(file_path)
+        self._clean_marks[file_path] = self._top_command()
+        self.file_generations[file_path] = next(self._edit_serials)
+        self._rebuild_indexes()
+        self.update_window_title()
+        logging.info(f"Reloaded {file_path} from disk.")
+
+    def _merge_from_disk(self, file_path):
+        """Three-way merge of a file changed on disk, by entry: reloads it, then re-applies the
+        editor's changed abilities/items (against the baseline) as one undo step.
+
+        Entries changed on disk only keep the disk version; entries the editor changed
+        replace, add or remove theirs. Changes outside abilities and items are not merged.
+        Returns (names changed on both sides differently, where the editor's version was
+        kept; what of the editor's changes was dropped: new entries whose container is
+        gone from the disk version, and a note if anything outside entries had changed).
+        The merged file stays modified. If applying the changes fails, they are rolled
+        back and the error is raised; the file then holds the disk version.
+        """
+        baseline = self.loaded_files[file_path]['baseline']
+        source = self.loaded_files[file_path].get('source')
+        changes = [(key, self._live_entry(key[0], key[1], file_path)) for key in self._changed_entry_keys(file_path)]
+        dropped = []
+        if source is not None and (source.rewrite is not None or source.retagged):
+            dropped.append("changes outside abilities and items")
+        self._reload_file(file_path)
+        theirs = self.loaded_files[file_path]['baseline'].entries
+        root = self.loaded_files[file_path]['root']
+        batch = self.begin_edit()
+        kept = []
         try:
-            sorted_list = self._safe_sorted_string_list(data_set, model_name)
-            model.setStringList(sorted_list)
-            # logging.debug(f"Updated completer model '{model_name}' with {len(sorted_list)} items.")
-        except Exception as e:
-            logging.error(f"Failed to update completer model '{model_name}': {e}", exc_info=True)
-
-    def _update_all_completer_models(self):
-        """Updates all QStringListModels from the self.all_* sets."""
-        logging.info("Updating all completer models...")
-        self._update_single_completer_model(self.item_attribute_name_model, self.all_item_attribute_names, "item_attribute_name")
-        self._update_single_completer_model(self.variant_attribute_name_model, self.all_variant_attribute_names, "variant_attribute_name")
-        self._update_single_completer_model(self.property_attribute_name_model, self.all_property_attribute_names, "property_attribute_name")
-        self._update_single_completer_model(self.ability_name_model, self.all_ability_names, "ability_name")
-        self._update_single_completer_model(self.item_name_model, self.all_item_names, "item_name")
-        self._update_single_completer_model(self.recycling_part_name_model, self.all_recycling_part_names, "recycling_part_name")
-        self._update_single_completer_model(self.item_category_model, self.all_item_categories, "item_category")
-        self._update_single_completer_model(self.ability_mode_model, self.all_ability_modes, "ability_mode")
-        self._update_single_completer_model(self.variant_nested_tag_model, self.all_variant_nested_tags, "variant_nested_tag")
-        self._update_single_completer_model(self.tag_model, self.all_tags, "tag")
-        self._update_single_completer_model(self.property_name_model, self.all_property_names, "property_name")
-        self._update_single_completer_model(self.equip_template_model, self.all_equip_templates, "equip_template")
-        self._update_single_completer_model(self.localisation_key_model, self.all_loc_keys, "localisation_key")
-        self._update_single_completer_model(self.icon_path_model, self.all_icon_paths, "icon_path")
-        self._update_single_completer_model(self.property_attr_type_model, self.all_prop_attr_types, "property_attr_type")
-        self._update_single_completer_model(self.equip_slot_model, self.all_equip_slots, "equip_slot")
-        self._update_single_completer_model(self.hold_slot_model, self.all_hold_slots, "hold_slot")
-        self._update_single_completer_model(self.hand_model, self.all_hands, "hand")
-        self._update_single_completer_model(self.sound_id_model, self.all_sound_ids, "sound_id")
-        self._update_single_completer_model(self.event_model, self.all_events, "event")
-        self._update_single_completer_model(self.anim_action_model, self.all_anim_actions, "anim_action")
-        # Static models (boolean, enhancement_slots) don't need updating
-        logging.info("Completer models update finished.")
+            for key, live in changes:
+                base = baseline.entries.get(key)
+                theirs_element = theirs.get(key)
+                theirs_digest = entry_digest(theirs_element) if theirs_element is not None else None
+                if theirs_digest == (entry_digest(live) if live is not None else None): continue # Same change on both sides
+                if live is None:
+                    batch.remove(theirs_element)
+                elif theirs_element is not None:
+                    revert_entry_element(batch, theirs_element, live)
+                else:
+                    previous = live.getprevious()
+                    while previous is not None and not entry_type_of(previous, previous.getparent()): previous = previous.getprevious()
+                    after = theirs.get((key[0], previous.get('name'))) if previous is not None else None
+                    if after is not None and after.getparent() is not None:
+                        position = (after.getparent(), after.getparent().index(after) + 1)
+                    else:
+                        try:
+                            position = self._baseline_position(root, key[0], None)
+                        except LookupError: # The disk version has no container for it
+                            dropped.append(key[1])
+                            continue
+                    batch.insert(position[0], position[1], copy.deepcopy(live))
+                if theirs_digest != (baseline.digest(base) if base is not None else None): kept.append(key[1])
+        except Exception:
+            self.abort_edit(batch)
+            raise
+        self.commit_edit(batch, f"Merge {os.path.basename(file_path)} with changes on disk")
+        logging.info(f"Merged {file_path}: {len(batch)} op(s), {len(kept)} entr(ies) changed on both sides, {len(dropped)} dropped.")
+        return kept, dropped
+
+    def _minimal_save_plan(self, file_path):
+        """MinimalSavePlan for a loaded file (GUI thread), or None if it has no FileSource.
+
+        Dirty entries are replaced. If entries were added or removed, the containers'
+        entries are matched to the FileSource's by identity: new ones are inserted
+        after their preceding entry, missing ones deleted. Start tags of retagged
+        elements are replaced. The plan's changes stay None (rewrite the file) if
+        formatting is not preserved, something else outside entries changed or
+        entries moved.
+        """
+        file_data = self.loaded_files[file_path]
+        source = file_data.get('source')
+        if source is None: return None
+        plan = MinimalSavePlan(source, file_path, self._source_serial)
+        plan.to_utf8 = self.workspace_folder in self.utf8_workspaces
+        index = source.index()
+        if source.rewrite is None and source.restructured is None: # Same containers and entries as the text
+            plan.entries, plan.containers, plan.new_layout = source.entries, source.containers, source.layout
+            if self.preserve_formatting:
+                plan.changes = sorted(('replace', index[entry], copy.deepcopy(entry)) for entry in source.dirty if entry in index)
+                plan.changes.extend(self._retag_changes(file_data['root'], source))
+            return plan
+
+        plan.containers = entry_containers_of(file_data['root'])
+        plan.origins = []
+        diffable = self.preserve_formatting and source.rewrite is None
+        entry_containers = source.entry_containers()
+        changes, kept, last = [], set(), -1
+        for container_index, container in enumerate(plan.containers):
+            count, after, other_children = 0, None, False
+            for child in container:
+                if not entry_type_of(child, container):
+                    other_children = True
+                    continue
+                i = index.get(child)
+                plan.entries.append(child)
+                plan.origins.append(i)
+                count += 1
+                if not diffable: continue
+                if i is None:
+                    if other_children: diffable = False # Its place among other markup is unknown
+                    else: changes.append(('insert', container_index, after, copy.deepcopy(child)))
+                elif i <= last or entry_containers[i] != container_index:
+                    diffable = False # Moved
+                else:
+                    kept.add(i)
+                    last = after = i
+                    if child in source.dirty: changes.append(('replace', i, copy.deepcopy(child)))
+            plan.new_layout.append(count)
+        if diffable:
+            changes.extend(('delete', i) for i in range(len(source.entries)) if i not in kept)
+            changes.extend(self._retag_changes(file_data['root'], source))
+            plan.changes = changes
+        return plan
+
+    @staticmethod
+    def _retag_changes(root, source):
+        """'retag' changes of a MinimalSavePlan for the FileSource's retagged elements still in the tree."""
+        changes = []
+        for element in source.retagged:
+            if not is_within(element, root): continue
+            shallow = ET.Element(element.tag, nsmap=element.nsmap if element is root else None)
+            for key, value in element.attrib.items(): shallow.set(key, value)
+            changes.append(('retag', element_path(element), shallow))
+        return changes
+
+    def _confirm_comment_loss(self, plans):
+        """Asks before a save rewrites whole files whose text has comments, which the
+        editor's trees do not keep (GUI thread). Returns the file paths to save."""
+        losing = [fp for fp, plan in plans.items()
+                  if plan is not None and plan.changes is None and plan.text is not None and '<!--' in plan.text]
+        if not losing or not self.preserve_formatting: return list(plans) # Without it every save rewrites
+        names = "\n".join(os.path.basename(fp) for fp in losing[:10]) + ("\n..." if len(losing) > 10 else "")
+        reply = QMessageBox.question(self, "Comments Will Be Lost",
+                                     f"{len(losing)} file(s) changed outside abilities and items in a way that needs "
+                                     f"the whole file to be rewritten. Their comments will be lost:\n\n{names}\n\n"
+                                     f"Save these files anyway?",
+                                     QMessageBox.StandardButton.Yes | QMessageBox.StandardButton.No,
+                                     QMessageBox.StandardButton.No)
+        if reply == QMessageBox.StandardButton.Yes: return list(plans)
+        logging.info(f"Save of {len(losing)} file(s) skipped to keep their comments.")
+        return [fp for fp in plans if fp not in losing]
+
+    def _journal_saved(self, file_paths, upto):
+        """Records saved files in the journal, whose edits up to record upto are on disk now.
+        Once no file is modified, the journal is deleted."""
+        if not self.modified_files: self.journal.clear()
+        else: self.journal.mark_saved(file_paths, upto)
+
+    def _open_journal(self):
+        """Starts journaling the edits of the loaded folder (GUI thread, after loading).
+
+        If the editor did not close cleanly last time, the folder's journal still
+        holds the unsaved edits then; the user is offered to replay them.
+        """
+        self._close_journal()
+        journal = EditJournal(journal_path(self.base_path, self.workspace_folder), self.workspace_folder,
+                              lambda: {data['root']: fp for fp, data in self.loaded_files.items()})
+        recovered = journal.recoverable_ops()
+        self.change_bus.about_to_apply.connect(journal.before_op)
+        self.change_bus.applied.connect(journal.after_ops)
+        self.change_bus.aborted.connect(journal.abort)
+        self.change_bus.reset.connect(journal.reset_positions)
+        self.journal = journal
+        if recovered: self._recover_journal(recovered)
+
+    def _close_journal(self):
+        """Stops journaling and deletes the journal (its edits were saved or discarded)."""
+        journal, self.journal = self.journal, None
+        if journal is None: return
+        self.change_bus.about_to_apply.disconnect(journal.before_op)
+        self.change_bus.applied.disconnect(journal.after_ops)
+        self.change_bus.aborted.disconnect(journal.abort)
+        self.change_bus.reset.disconnect(journal.reset_positions)
+        journal.close()
+
+    def _recover_journal(self, recovered):
+        """Offers to replay a journal left by a crash ([(file_path, op)]) as one undo step.
+
+        The journal is replaced by the replayed edits, or deleted if the user declines.
+        Ops of a file stop at the first one that does not fit its tree (e.g. the file
+        was changed outside the editor); the others still apply.
+        """
+        file_count = len({file_path for file_path, _op in recovered})
+        reply = QMessageBox.question(self, "Recover Unsaved Changes",
+                                     f"The editor was not closed properly and {file_count} file(s) in this folder "
+                                     f"had unsaved changes.\n\nDo you want to recover them?",
+                                     QMessageBox.StandardButton.Yes | QMessageBox.StandardButton.No,
+                                     QMessageBox.StandardButton.Yes)
+        if reply != QMessageBox.StandardButton.Yes:
+            logging.info("Unsaved changes from the edit journal discarded.")
+            self.journal.clear()
+            return
+        batch = self.begin_edit()
+        failed = {}
+        for file_path, op in recovered:
+            if file_path in failed: continue
+            try:
+                data = self.loaded_files.get(file_path)
+                if data is None: raise LookupError("the file is not loaded")
+                replay_journal_op(batch, data['root'], op)
+            except (LookupError, ValueError, ET.XMLSyntaxError) as e:
+                logging.warning(f"Recovery of {file_path} stopped at {op[0]} {op[1]}: {e}")
+                failed[file_path] = e
+        if not self.commit_edit(batch, "Recover Unsaved Changes"): self.journal.clear()
+        logging.info(f"Recovered {len(batch)} change(s) from the edit journal.")
+        if failed:
+            QMessageBox.warning(self, "Recover Unsaved Changes",
+                                "Some changes could not be recovered because the file no longer matches them:\n\n"
+                                + "\n".join(f"{file_path}: {error}" for file_path, error in failed.items()))
+        self.statusBar.showMessage(f"Recovered {len(batch)} unsaved change(s).", 5000)
+
+    def _track_source_changes(self, ops):
+        """change_bus.applied subscriber: marks the entries the ops edited dirty in their file's FileSource.
+
+        Entries added to or removed from a container only mark it restructured, they
+        are found at save time; attribute changes of other elements mark them retagged,
+        unless they sit inside a container (whose entry count changes their position).
+        Any other change makes the next save rewrite the whole file.
+        """
+        self._source_serial += 1
+        root_sources = {data['root']: data.get('source') for data in self.loaded_files.values()}
+        for op in ops:
+            element = op[1] # Parent for inserts/removes
+            source = root_sources.get(element.getroottree().getroot())
+            if source is None: continue
+            if op[0] in (OP_INSERT, OP_REMOVE) and entry_type_of(op[3], element):
+                source.restructured = self._source_serial
+                continue
+            entry = enclosing_entry(element)
+            if entry: source.dirty[entry[1]] = self._source_serial
+            elif op[0] in (OP_SET_ATTR, OP_SET_ATTRIB) and (element.getparent() is None or (not element.nsmap and
+                    isinstance(element.tag, str) and not any(a in source.containers for a in element.iterancestors()))):
+                source.retagged[element] = self._source_serial
+            else: source.rewrite = self._source_serial
 
     def save_file(self, file_path):
-        """Saves the XML tree associated with the given file path."""
+        """Saves the XML tree associated with the given file path in the background. Returns the Job (or None)."""
         if file_path not in self.loaded_files:
             logging.warning(f"Attempted to save non-loaded file: {file_path}")
-            return False
+            return None
         if file_path not in self.modified_files:
             # logging.debug(f"File not modified, skipping save: {file_path}")
-            return True # Not an error, just nothing to save
+            return None # Not an error, just nothing to save
 
-        tree = self.loaded_files[file_path]['tree']
-        logging.info(f"Saving file: {file_path}")
-        try:
-            # Ensure parent directory exists
-            parent_dir = Path(file_path).parent
-            parent_dir.mkdir(parents=True, exist_ok=True)
-
-            tree.write(file_path,
-                       pretty_print=True,         # Indentation and newlines
-                       encoding='utf-16',         # Preserve original encoding
-                       xml_declaration=True)      # Include <?xml ...?>
-            self.modified_files.remove(file_path)
-            self.statusBar.showMessage(f"Saved: {os.path.basename(file_path)}", 3000)
-            logging.info(f"Successfully saved: {file_path}")
-            # Update window title if this was the current file
-            if file_path == self.current_selection_filepath:
-                self.update_window_title()
-            return True
-        except IOError as e:
-             logging.error(f"IOError saving file {file_path}: {e}", exc_info=True)
-             QMessageBox.critical(self, "Save Error", f"Could not write to file:\n{file_path}\n\nError: {e}")
-             return False
-        except Exception as e:
-             logging.error(f"Unexpected error saving file {file_path}: {e}", exc_info=True)
-             QMessageBox.critical(self, "Save Error", f"An unexpected error occurred while saving:\n{file_path}\n\nError: {e}")
-             return False
+        def saved(saved_paths, failures):
+            if saved_paths:
+                self.statusBar.showMessage(f"Saved: {os.path.basename(file_path)}", 3000)
+            for failed_path, error in failures:
+                QMessageBox.critical(self, "Save Error", f"Could not write to file:\n{failed_path}\n\nError: {error}")
+        return self.save_files([file_path], f"Save {os.path.basename(file_path)}", saved)
 
     def save_current_file(self):
         """Saves the currently selected file."""
@@ -1168,43 +5682,55 @@ class WitcherXMLEditor(QMainWindow):
             QMessageBox.information(self, "Save", "No item or ability is currently selected.")
 
     def save_all_files(self):
-        """Saves all files marked as modified."""
+        """Saves all files marked as modified in the background. Returns the Job, or None if nothing is saved."""
         logging.debug("Save All Files action triggered.")
         if not self.modified_files:
             logging.info("Save All: No modified files to save.")
             QMessageBox.information(self, "Save All", "There are no unsaved changes.")
-            return
+            return None
 
         modified_count = len(self.modified_files)
         reply = QMessageBox.question(self, "Save All", f"Save changes to {modified_count} file(s)?",
                                      QMessageBox.StandardButton.Yes | QMessageBox.StandardButton.No,
                                      QMessageBox.StandardButton.Yes)
 
-        if reply == QMessageBox.StandardButton.Yes:
-            logging.info(f"Saving {modified_count} modified files...")
-            saved_count = 0
-            failed_count = 0
-            # Iterate over a copy of the set, as save_file modifies it
-            for file_path in list(self.modified_files):
-                if self.save_file(file_path):
-                    saved_count += 1
-                else:
-                    failed_count += 1
+        if reply != QMessageBox.StandardButton.Yes:
+            logging.info("Save All cancelled by user.")
+            return None
 
-            msg = f"Saved {saved_count} file(s)."
-            if failed_count > 0:
-                msg += f" Failed to save {failed_count} file(s). Check logs."
-                QMessageBox.warning(self, "Save All Warning", f"Failed to save {failed_count} file(s). Please check the logs for details.")
+        logging.info(f"Saving {modified_count} modified files...")
+        file_paths = sorted(self.modified_files)
+        def saved(saved_paths, failures):
+            msg = f"Saved {len(saved_paths)} file(s)."
+            if failures:
+                msg += f" Failed to save {len(failures)} file(s). Check logs."
+                summary = QMessageBox(QMessageBox.Icon.Warning, "Save All Warning",
+                                      f"Failed to save {len(failures)} of {len(file_paths)} file(s). "
+                                      f"Failed files were left unchanged on disk.", QMessageBox.StandardButton.Ok, self)
+                summary.setDetailedText(self._save_summary_text(file_paths, saved_paths, failures))
+                summary.exec()
+            elif len(saved_paths) < modified_count:
+                msg += " Saving was cancelled."
             else:
                 msg += " All changes saved successfully."
             self.statusBar.showMessage(msg, 5000)
             logging.info(msg)
-            self.update_window_title() # Update title in case markers change
-        else:
-            logging.info("Save All cancelled by user.")
+        return self.save_files(file_paths, f"Save all ({modified_count} files)", saved)
+
+    @staticmethod
+    def _save_summary_text(file_paths, saved_paths, failures):
+        """One line per file: saved, failed (with the error) or not saved (cancelled)."""
+        saved_set = set(saved_paths)
+        errors = dict(failures)
+        lines = []
+        for file_path in file_paths:
+            if file_path in errors: lines.append(f"FAILED  {file_path}: {errors[file_path]}")
+            elif file_path in saved_set: lines.append(f"Saved   {file_path}")
+            else: lines.append(f"Skipped {file_path} (cancelled)")
+        return "\n".join(lines)
 
     def save_as_current_file(self):
-        """Saves the current file's content to a new location and updates state."""
+        """Saves the current file's content to a new location (background job) and updates state. Returns the Job or None."""
         logging.info("Save As action triggered...")
 
         if not self.current_selection_filepath or self.current_selection_filepath not in self.loaded_files:
@@ -1220,7 +5746,6 @@ class WitcherXMLEditor(QMainWindow):
             logging.error(f"Save As: Current file path '{original_filepath}' not found in loaded_files.")
             QMessageBox.critical(self, "Internal Error", "Cannot find the data for the selected file.")
             return
-        tree = self.loaded_files[original_filepath]['tree']
 
         # Suggest a new filename
         original_path_obj = Path(original_filepath)
@@ -1245,40 +5770,83 @@ class WitcherXMLEditor(QMainWindow):
             new_filepath = new_filepath.with_suffix(".xml")
             logging.debug(f"Added .xml suffix. New path: {new_filepath}")
 
-        # --- Save the tree to the new path ---
+        # --- Save a copy of the tree to the new path in the background ---
         logging.info(f"Attempting to save copy to: {new_filepath}")
-        try:
-            # Ensure parent directory exists
-            new_filepath.parent.mkdir(parents=True, exist_ok=True)
-            # Use the same writing parameters as save_file
-            tree.write(str(new_filepath), pretty_print=True, encoding='utf-16', xml_declaration=True)
+        expected_stamp = None # A different existing file was confirmed in the dialog
+        if new_filepath == original_path_obj:
+            to_save, overwrite = self._check_disk_changes([original_filepath])
+            if not to_save:
+                self.statusBar.showMessage("Save As cancelled.", 3000)
+                return
+            if original_filepath not in overwrite: expected_stamp = self.loaded_files[original_filepath].get('stamp')
+        workspace = self.snapshot([original_filepath]) # Editing may go on while it is written
+        file_snapshot = workspace.files[original_filepath]
+        generation = file_snapshot.generation
+        plan = self._minimal_save_plan(original_filepath) # The copy keeps the original's formatting too
+        journal = self.journal
+        journal_seq = journal.seq if journal is not None else 0
+        clean_mark = self._top_command()
+        new_filepath_str = str(new_filepath) # Use string for dict keys
+
+        def save_as(job):
+            job.report(0, 2, new_filepath.name)
+            written_source, stamp = save_xml_file(file_snapshot, plan, new_filepath_str,
+                                                  lambda done, total: job.report(done, total, f"Writing {new_filepath.name}"),
+                                                  expected_stamp)
             logging.info(f"Successfully saved copy as: {new_filepath}")
+            if new_filepath == original_path_obj:
+                return written_source, stamp
+            # Parse the *saved* file to get new element references for the new path
+            job.report(1, 2, "Reading back the saved file")
+            saved_data = self._file_data(new_filepath_str, Path(new_filepath_str).read_bytes())
+            if saved_data is not None: saved_data['baseline'] = EntryBaseline(collect_root_entries(saved_data['root']))
+            return saved_data
+
+        def saved_as(job):
+            self.snapshots.release(workspace)
+            if job.state == Job.CANCELLED:
+                self.statusBar.showMessage("Save As cancelled.", 3000)
+                return
+            if job.state == Job.FAILED:
+                error_msg = f"Could not write file '{new_filepath}':\n{job.error}"
+                logging.error(f"Save As Error: {error_msg}")
+                QMessageBox.critical(self, "Save As Error", error_msg)
+                self.statusBar.showMessage("Error during Save As.", 4000)
+                return
             self.statusBar.showMessage(f"Saved as: {new_filepath.name}", 4000)
+            edited_since = self.file_generations.get(original_filepath) != generation
+            if original_filepath not in self.loaded_files:
+                logging.info("Save As: the workspace was reloaded while saving; editor state left as is.")
+                return
 
             # --- Update editor state if saved to a DIFFERENT path ---
             if new_filepath != original_path_obj:
+                if edited_since:
+                    # Rebinding to the re-read copy would drop the edits made while it was written
+                    logging.warning(f"'{original_filepath}' was edited during Save As; keeping entries in the original file.")
+                    self.statusBar.showMessage(f"Saved as: {new_filepath.name} (edits made while saving are not in the copy)", 6000)
+                    return
                 logging.info(f"Updating editor state for new file: {new_filepath}")
-                new_filepath_str = str(new_filepath) # Use string for dict keys
-
-                # Add the new file to loaded_files (shares the tree object initially)
-                # Important: Parse the *saved* file to get potentially new element references
-                # (though deepcopy might be safer if elements were modified *before* save as)
-                saved_tree, saved_root = self._parse_xml_file(new_filepath_str)
-                if not saved_tree or not saved_root:
+                saved_data = job.result
+                if saved_data is None:
                      logging.error(f"Failed to re-parse the newly saved file '{new_filepath_str}'. State update aborted.")
                      QMessageBox.critical(self, "Save As Error", "Could not re-read the saved file. Editor state might be inconsistent.")
                      return
+                saved_root = saved_data['root']
 
-                self.loaded_files[new_filepath_str] = {'tree': saved_tree, 'root': saved_root}
+                self.loaded_files[new_filepath_str] = saved_data
 
                 # Update maps (abilities_map, items_map)
                 # This assumes the *entire content* of the saved file now belongs to the new path
                 self._update_maps_for_new_path(original_filepath, new_filepath_str, saved_root, original_type)
+                # Entries now live in the re-parsed tree; older history would edit the detached one
+                self.undo_stack.clear()
 
                 # Remove the *new* file path from modified set (it was just saved)
                 if new_filepath_str in self.modified_files:
                     self.modified_files.remove(new_filepath_str)
                     logging.debug(f"Removed new file '{new_filepath_str}' from modified set.")
+                self._reset_clean_marks()
 
                 # Refresh UI lists (might contain elements now pointing to the new file)
                 self.populate_lists()
@@ -1298,21 +5866,20 @@ class WitcherXMLEditor(QMainWindow):
             else:
                 # User saved over the original file
                 logging.info(f"Overwrote original file: {original_filepath}")
-                # Remove from modified set as it was just saved
-                if original_filepath in self.modified_files:
+                # Remove from modified set as it was just saved (unless edited while saving)
+                if original_filepath in self.modified_files and not edited_since:
                     self.modified_files.remove(original_filepath)
+                written_source, stamp = job.result
+                if plan is not None and self.loaded_files[original_filepath].get('source') is plan.source:
+                    plan.source.update(*written_source, plan)
+                if journal is not None and journal is self.journal: self._journal_saved([original_filepath], journal_seq)
+                if self.loaded_files[original_filepath]['tree'] is file_snapshot.source:
+                    self._clean_marks[original_filepath] = clean_mark
+                    self.loaded_files[original_filepath]['stamp'] = stamp
+                    self._rebase_entries(original_filepath, file_snapshot if edited_since else None)
                 self.update_window_title() # Update title (remove asterisk)
 
-        except IOError as e:
-             error_msg = f"Could not write file '{new_filepath}':\n{e}"
-             logging.error(f"Save As IO Error: {error_msg}", exc_info=True)
-             QMessageBox.critical(self, "Save As Error", error_msg)
-             self.statusBar.showMessage("Error during Save As.", 4000)
-        except Exception as e:
-             error_msg = f"An unexpected error occurred during Save As for '{new_filepath}':\n{e}"
-             logging.error(f"Save As Unexpected Error: {error_msg}", exc_info=True)
-             QMessageBox.critical(self, "Save As Error", error_msg)
-             self.statusBar.showMessage("Error during Save As.", 4000)
+        return self.jobs.submit(f"Save as {new_filepath.name}", save_as, JobScheduler.PRIORITY_HIGH, key="save", on_done=saved_as)
 
     def _update_maps_for_new_path(self, old_filepath, new_filepath, new_root_element, entry_type):
         """Updates abilities_map or items_map to point elements to the new file path."""
@@ -1362,12 +5929,507 @@ class WitcherXMLEditor(QMainWindow):
         logging.info(f"Updated map paths/elements for {updated_count} {entry_type}(s) to '{new_filepath}'.")
 
 
-    def mark_file_modified(self, file_path):
-        """Marks a file as modified and updates the window title."""
-        if file_path and file_path not in self.modified_files:
-            logging.debug(f"Marking file as modified: {file_path}")
-            self.modified_files.add(file_path)
-            self.update_window_title() # Update title immediately
+    def mark_files_modified(self, file_paths):
+        """Marks several files as modified with a single window title update."""
+        for fp in file_paths:
+            if fp: self.file_generations[fp] = next(self._edit_serials)
+        new_paths = {fp for fp in file_paths if fp} - self.modified_files
+        if new_paths:
+            logging.debug(f"Marking {len(new_paths)} file(s) as modified.")
+            self.modified_files.update(new_paths)
+            self.update_window_title()
+
+    # --- Undo/Redo ---
+
+    def begin_edit(self):
+        """Returns a new XmlEditBatch publishing to the change bus. Finish it with commit_edit()."""
+        return XmlEditBatch(self.change_bus)
+
+    def commit_edit(self, batch, description):
+        """Pushes an applied XmlEditBatch as one undo step, publishes it and marks the touched files modified.
+
+        Subscribers of change_bus.applied (entry maps/lists, completions) update from
+        the ops. Returns False for an empty batch.
+        """
+        if not batch.ops:
+            return False
+        op_files = self._files_of_ops(batch.ops)
+        command = XmlEditCommand(self, description, batch.ops, op_files,
+                                 (self.current_selection_type, self.current_selection_name))
+        file_paths = command.file_paths
+        limit = self.undo_stack.undoLimit()
+        if limit and self.undo_stack.index() >= limit: self._drop_clean_mark_base()
+        self.undo_stack.push(command)
+        logging.debug(f"Committed edit '{description}': {len(batch.ops)} op(s) in {len(file_paths)} file(s).")
+        self.change_bus.applied.emit(batch.ops)
+        self.mark_files_modified(file_paths)
+        return True
+
+    def abort_edit(self, batch):
+        """Rolls back an uncommitted XmlEditBatch, e.g. when an error interrupted it; nothing reaches the undo stack."""
+        if batch.ops: logging.warning(f"Rolling back {len(batch.ops)} uncommitted op(s).")
+        batch.rollback()
+
+    def _on_ops_applied(self, ops):
+        """change_bus.applied subscriber: brings completions, entry maps and lists up to date."""
+        live_roots = {data['root'] for data in self.loaded_files.values()}
+        changed = self.completion_index.after_ops(ops, live_roots)
+        if changed: logging.debug(f"Completion index: {changed} value count(s) changed.")
+        self._sync_entry_indexes(ops)
+
+    def edit_attribute(self, element, key, value, description):
+        """Sets (or with value None, removes) one attribute as its own undo step."""
+        batch = self.begin_edit()
+        batch.set_attr(element, key, value)
+        return self.commit_edit(batch, description)
+
+    def edit_text(self, element, text, description):
+        """Sets the text of one element as its own undo step."""
+        batch = self.begin_edit()
+        batch.set_text(element, text)
+        return self.commit_edit(batch, description)
+
+    def _files_of_ops(self, ops):
+        """Loaded file each op touched (None if not found), through the root of the op's element."""
+        root_files = {data['root']: file_path for file_path, data in self.loaded_files.items()}
+        # Parent for inserts/removes, so detached children still resolve
+        return [root_files.get(op[1].getroottree().getroot()) for op in ops]
+
+    def _sync_entry_indexes(self, ops):
+        """Updates entry maps and lists for entries the ops inserted, removed or renamed.
+
+        Structural changes the maps cannot follow cheaply (containers added/removed,
+        entry tags changed) fall back to a full _rebuild_indexes().
+        """
+        changed_lists = set()
+        root_files = None
+        for op in ops:
+            kind = op[0]
+            if kind in (OP_INSERT, OP_REMOVE):
+                _, parent, _index, child = op
+                entry_type = entry_type_of(child, parent)
+                if entry_type is None:
+                    if not ET.iselement(child) or not isinstance(child.tag, str): continue
+                    if child.tag in (TAG_ABILITIES, TAG_ITEMS) or child.find(f".//{TAG_ABILITIES}") is not None \
+                            or child.find(f".//{TAG_ITEMS}") is not None:
+                        self._rebuild_indexes()
+                        return
+                    continue
+                name = child.get('name')
+                if not name: continue
+                data_map = self.abilities_map if entry_type == TAG_ABILITY else self.items_map
+                if kind == OP_INSERT:
+                    if name in data_map and data_map[name]['element'] is not child:
+                        logging.warning(f"Duplicate {entry_type} name '{name}' inserted; keeping the existing map entry.")
+                        continue
+                    if root_files is None:
+                        root_files = {data['root']: fp for fp, data in self.loaded_files.items()}
+                    data_map[name] = {'filepath': root_files.get(parent.getroottree().getroot()), 'element': child}
+                    self._add_list_entry(entry_type, name)
+                elif name in data_map and data_map[name]['element'] is child:
+                    del data_map[name]
+                    self._remove_list_entry(entry_type, name)
+                    if entry_type == TAG_ITEM: self.expanded_variants.pop(name, None)
+                changed_lists.add(entry_type)
+            elif kind == OP_SET_ATTR and op[2] == 'name':
+                _, element, _key, old_name, new_name = op
+                entry_type = entry_type_of(element, element.getparent())
+                if entry_type is None: continue
+                data_map = self.abilities_map if entry_type == TAG_ABILITY else self.items_map
+                entry = data_map.get(old_name)
+                if entry is not None and entry['element'] is element:
+                    del data_map[old_name]
+                    self._remove_list_entry(entry_type, old_name)
+                    if entry_type == TAG_ITEM: self.expanded_variants.pop(old_name, None)
+                    if new_name and new_name not in data_map:
+                        data_map[new_name] = entry
+                        self._add_list_entry(entry_type, new_name)
+                    changed_lists.add(entry_type)
+            elif kind == OP_SET_TAG:
+                if {op[2], op[3]} & {TAG_ABILITY, TAG_ITEM, TAG_ABILITIES, TAG_ITEMS}:
+                    self._rebuild_indexes()
+                    return
+            elif kind == OP_SET_ATTRIB:
+                if dict(op[2]).get('name') != dict(op[3]).get('name') \
+                        and entry_type_of(op[1], op[1].getparent()) is not None:
+                    self._rebuild_indexes()
+                    return
+        for entry_type in changed_lists:
+            list_widget = self.ability_list if entry_type == TAG_ABILITY else self.item_list
+            list_widget.sortItems()
+            self.filter_list((self.ability_filter if entry_type == TAG_ABILITY else self.item_filter).text(), list_widget)
+
+    def _add_list_entry(self, entry_type, name):
+        list_widget = self.ability_list if entry_type == TAG_ABILITY else self.item_list
+        list_widget.blockSignals(True)
+        try:
+            list_widget.addItem(QListWidgetItem(name))
+        finally:
+            list_widget.blockSignals(False)
+
+    def _remove_list_entry(self, entry_type, name):
+        list_widget = self.ability_list if entry_type == TAG_ABILITY else self.item_list
+        list_widget.blockSignals(True)
+        try:
+            for list_item in list_widget.findItems(name, Qt.MatchFlag.MatchExactly):
+                if list_item.data(Qt.ItemDataRole.UserRole): continue # Row of a deleted entry, see _set_deleted_row()
+                list_widget.takeItem(list_widget.row(list_item))
+        finally:
+            list_widget.blockSignals(False)
+
+    # --- Entry Baselines (change markers, revert) ---
+
+    def _live_entry(self, entry_type, name, file_path):
+        """The listed element of that name if it is in file_path, else None."""
+        entry = (self.abilities_map if entry_type == TAG_ABILITY else self.items_map).get(name)
+        return entry['element'] if entry is not None and entry['filepath'] == file_path else None
+
+    def entry_status(self, entry_type, name):
+        """ENTRY_MODIFIED, ENTRY_NEW or None for a listed entry, against its file's EntryBaseline (cached until it is edited)."""
+        key = (entry_type, name)
+        try:
+            return self._entry_status[key]
+        except KeyError:
+            pass
+        entry = (self.abilities_map if entry_type == TAG_ABILITY else self.items_map).get(name)
+        baseline = self.loaded_files.get(entry['filepath'], {}).get('baseline') if entry is not None else None
+        status = baseline.status(key, entry['element']) if baseline is not None else None
+        self._entry_status[key] = status
+        return status
+
+    def _copy_changed_baselines(self, op):
+        """change_bus.about_to_apply subscriber: has the file's EntryBaseline copy the entries the op is about to change or remove."""
+        element = op[1] # Parent for inserts/removes
+        if self._baseline_roots is None:
+            self._baseline_roots = {data['root']: data.get('baseline') for data in self.loaded_files.values()}
+        baseline = self._baseline_roots.get(element.getroottree().getroot())
+        if baseline is None: return
+        entry = enclosing_entry(element)
+        if entry is not None:
+            baseline.before_change(entry[1])
+        elif op[0] == OP_REMOVE:
+            child = op[3]
+            removed = [child] if entry_type_of(child, element) else [e for _entry_type, e in entries_within(child)]
+            for e in removed: baseline.before_change(e, (e.getparent(), e.getprevious()))
+
+    def _forget_baseline_roots(self):
+        """change_bus.aborted subscriber: the entry copies taken for a rolled back batch stay, they equal the originals."""
+        self._baseline_roots = None
+
+    def _update_entry_markers(self, ops):
+        """change_bus.applied subscriber: forgets the status of the entries the ops touched and
+        lists deleted baseline entries (or drops their rows once they are back)."""
+        self._baseline_roots = None
+        keys = set()
+        for op in ops:
+            kind, element = op[0], op[1]
+            if kind in (OP_INSERT, OP_REMOVE):
+                child = op[3]
+                entry_type = entry_type_of(child, element)
+                if entry_type:
+                    keys.add((entry_type, child.get('name')))
+                    continue
+                if enclosing_entry(element) is None:
+                    keys.update((entry_type, e.get('name')) for entry_type, e in entries_within(child))
+                    continue
+            elif (kind == OP_SET_ATTR and op[2] == 'name') or kind == OP_SET_ATTRIB:
+                entry_type = entry_type_of(element, element.getparent())
+                if entry_type: keys.add((entry_type, op[3] if kind == OP_SET_ATTR else dict(op[2]).get('name')))
+            entry = enclosing_entry(element)
+            if entry is not None: keys.add((entry[0], entry[1].get('name')))
+        changed_lists = set()
+        for key in keys:
+            self._entry_status.pop(key, None)
+            entry_type, name = key
+            if not name: continue
+            deleted_in = None
+            if name not in (self.abilities_map if entry_type == TAG_ABILITY else self.items_map):
+                deleted_in = next((fp for fp, data in self.loaded_files.items()
+                                   if data.get('baseline') is not None and key in data['baseline'].entries), None)
+            if self._set_deleted_row(key, deleted_in): changed_lists.add(entry_type)
+        self._refresh_entry_lists(changed_lists)
+
+    def _set_deleted_row(self, key, file_path):
+        """Shows the deleted baseline entry key of file_path as a row (file_path None: removes its row). Returns True if a row was added."""
+        entry_type, name = key
+        list_widget = self.ability_list if entry_type == TAG_ABILITY else self.item_list
+        row = self._deleted_rows.get(key)
+        if file_path is None:
+            if row is not None:
+                del self._deleted_rows[key]
+                list_widget.takeItem(list_widget.row(row))
+            return False
+        added = row is None
+        if added:
+            row = self._deleted_rows[key] = QListWidgetItem(name)
+            row.setToolTip("Deleted since the file was loaded or saved. Right-click to restore it.")
+            list_widget.blockSignals(True)
+            try:
+                list_widget.addItem(row)
+            finally:
+                list_widget.blockSignals(False)
+        row.setData(Qt.ItemDataRole.UserRole, file_path)
+        return added
+
+    def _add_deleted_rows(self):
+        """Adds rows for every deleted baseline entry (after the lists were refilled). Returns the entry types that got rows."""
+        self._deleted_rows.clear()
+        added = set()
+        for file_path, data in self.loaded_files.items():
+            baseline = data.get('baseline')
+            if baseline is None: continue
+            for entry_type, name in baseline.changed_keys():
+                if name and name not in (self.abilities_map if entry_type == TAG_ABILITY else self.items_map):
+                    if self._set_deleted_row((entry_type, name), file_path): added.add(entry_type)
+        return added
+
+    def _refresh_entry_lists(self, changed_lists=()):
+        """Re-sorts and re-filters lists that got rows and repaints both lists' markers."""
+        for entry_type in changed_lists:
+            list_widget = self.ability_list if entry_type == TAG_ABILITY else self.item_list
+            list_widget.sortItems()
+            self.filter_list((self.ability_filter if entry_type == TAG_ABILITY else self.item_filter).text(), list_widget)
+        self.ability_list.viewport().update()
+        self.item_list.viewport().update()
+
+    def _rebase_entries(self, file_path, file_snapshot=None):
+        """Makes a saved file's entries its new baseline: the live ones, or those of the
+        FileSnapshot that was written if the file was edited while it was saved."""
+        data = self.loaded_files[file_path]
+        if file_snapshot is None:
+            data['baseline'] = EntryBaseline(collect_root_entries(data['root']))
+        else:
+            data['baseline'] = EntryBaseline(file_snapshot.entries)
+        self._entry_status.clear()
+        for key, row in list(self._deleted_rows.items()):
+            if row.data(Qt.ItemDataRole.UserRole) == file_path: self._set_deleted_row(key, None)
+        changed_lists = set()
+        if file_snapshot is not None: # Entries deleted after the snapshot are deleted against it
+            for key in data['baseline'].entries:
+                if key[1] not in (self.abilities_map if key[0] == TAG_ABILITY else self.items_map):
+                    if self._set_deleted_row(key, file_path): changed_lists.add(key[0])
+        self._refresh_entry_lists(changed_lists)
+
+    def _revert_entry_ops(self, batch, file_path, entry_type, name):
+        """Adds the ops restoring entry name of file_path to its baseline to batch. Returns False if it is unchanged.
+
+        A modified entry is reverted in place; a deleted one is put back where it was
+        removed from (or at the end of its container); a new one is removed, unless it
+        is a renamed baseline entry, which gets its old name and content back.
+        """
+        data = self.loaded_files.get(file_path)
+        baseline = data.get('baseline') if data is not None else None
+        if baseline is None: return False
+        key = (entry_type, name)
+        live = self._live_entry(entry_type, name, file_path)
+        if baseline.status(key, live) is None: return False
+        element = baseline.entries.get(key)
+        position = None
+        if live is not None and live is not element:
+            if baseline.key_of(live) is not None: # Another baseline entry renamed to this name
+                revert_entry_element(batch, live, baseline.original(live))
+            else:
+                position = (live.getparent(), live.getparent().index(live))
+                batch.remove(live, position[0])
+        if element is None: return True
+        if not is_within(element, data['root']): # Removed: put it back
+            record = baseline.copies.get(element)
+            if position is None: position = self._baseline_position(data['root'], entry_type, record[2] if record else None)
+            batch.insert(position[0], position[1], element)
+        revert_entry_element(batch, element, baseline.original(element))
+        return True
+
+    @staticmethod
+    def _baseline_position(root, entry_type, removed_from):
+        """(container, index) to put a removed entry back at: after the sibling it followed, else at the end of its container."""
+        container, previous = removed_from or (None, None)
+        if container is not None and is_within(container, root):
+            if previous is None: return container, 0
+            if previous.getparent() is container: return container, container.index(previous) + 1
+            return container, len(container)
+        container_tag = TAG_ABILITIES if entry_type == TAG_ABILITY else TAG_ITEMS
+        for container in entry_containers_of(root):
+            if container.tag == container_tag: return container, len(container)
+        raise LookupError(f"No <{container_tag}> to restore the entry into")
+
+    def _list_target(self):
+        """(entry_type, name, file_path) of the current list row: a listed entry or a deleted one, or None."""
+        entry_type = TAG_ABILITY if self.tab_widget.currentIndex() == 0 else TAG_ITEM
+        list_item = (self.ability_list if entry_type == TAG_ABILITY else self.item_list).currentItem()
+        if list_item is None: return None
+        name = list_item.text()
+        file_path = list_item.data(Qt.ItemDataRole.UserRole)
+        if not file_path:
+            entry = (self.abilities_map if entry_type == TAG_ABILITY else self.items_map).get(name)
+            if entry is None: return None
+            file_path = entry['filepath']
+        return entry_type, name, file_path
+
+    def revert_entry(self, entry_type=None, name=None, file_path=None):
+        """Restores an ability/item (default: the current list row) to how it was when its file was loaded or last saved, as one undo step."""
+        if self._populating_details: return False
+        if name is None:
+            target = self._list_target()
+            if target is None:
+                QMessageBox.information(self, "Revert Entry", "Please select an ability or item first.")
+                return False
+            entry_type, name, file_path = target
+        elif file_path is None:
+            entry = (self.abilities_map if entry_type == TAG_ABILITY else self.items_map).get(name)
+            file_path = entry['filepath'] if entry is not None else None
+        batch = self.begin_edit()
+        try:
+            changed = self._revert_entry_ops(batch, file_path, entry_type, name)
+        except (LookupError, ValueError) as e:
+            self.abort_edit(batch) # Half a revert is no undo step
+            logging.error(f"Could not revert {entry_type} '{name}': {e}")
+            QMessageBox.warning(self, "Revert Entry", f"Could not revert '{name}':\n{e}")
+            return False
+        if not changed and not batch.ops:
+            self.statusBar.showMessage(f"'{name}' has no changes to revert.", 3000)
+            return False
+        self.commit_edit(batch, f"Revert {entry_type} '{name}'")
+        self._mark_clean_if_reverted(file_path)
+        self._restore_selection((entry_type, name))
+        self.statusBar.showMessage(f"Reverted '{name}'.", 3000)
+        return True
+
+    def _changed_entry_keys(self, file_path):
+        """(entry_type, name) of every ability/item of a loaded file that is modified, new or deleted against its baseline."""
+        data = self.loaded_files[file_path]
+        baseline = data['baseline']
+        keys = [(entry_type, name) for entry_type, name, element in collect_root_entries(data['root'])
+                if name and self._live_entry(entry_type, name, file_path) is element
+                and baseline.status((entry_type, name), element) is not None]
+        listed = set(keys)
+        keys.extend(key for key in baseline.changed_keys() if key not in listed # Copied ones may be back as they were
+                    and baseline.status(key, self._live_entry(*key, file_path)) is not None)
+        return keys
+
+    def revert_file(self, file_path=None):
+        """Restores every ability/item of a file (default: the current entry's) to how it was when the file was loaded
+        or last saved, as one undo step. Changes outside abilities and items are kept. Nothing is reverted if
+        one of the entries cannot be."""
+        if self._populating_details: return False
+        if file_path is None:
+            target = self._list_target()
+            file_path = target[2] if target is not None else self.current_selection_filepath
+        data = self.loaded_files.get(file_path) if file_path else None
+        if data is None or data.get('baseline') is None:
+            QMessageBox.information(self, "Revert File", "Please select an ability or item of the file to revert.")
+            return False
+        keys = self._changed_entry_keys(file_path)
+        file_name = os.path.basename(file_path)
+        if not keys:
+            self.statusBar.showMessage(f"No abilities or items changed in {file_name}.", 3000)
+            return False
+        reply = QMessageBox.question(self, "Revert File",
+                                     f"Revert {len(keys)} changed abilit(ies)/item(s) in {file_name} to how they were "
+                                     f"when the file was loaded or last saved?\n\nThis can be undone.",
+                                     QMessageBox.StandardButton.Yes | QMessageBox.StandardButton.No,
+                                     QMessageBox.StandardButton.Yes)
+        if reply != QMessageBox.StandardButton.Yes: return False
+        batch = self.begin_edit()
+        for entry_type, name in keys:
+            try:
+                self._revert_entry_ops(batch, file_path, entry_type, name)
+            except (LookupError, ValueError) as e:
+                self.abort_edit(batch) # The entries reverted so far come back too
+                logging.error(f"Could not revert {file_path}: {entry_type} '{name}': {e}")
+                QMessageBox.warning(self, "Revert File", f"Could not revert '{name}', so {file_name} was left unchanged:\n{e}")
+                return False
+        self.commit_edit(batch, f"Revert {file_name}")
+        self._mark_clean_if_reverted(file_path)
+        self._restore_selection((self.current_selection_type, self.current_selection_name))
+        self.statusBar.showMessage(f"Reverted {len(keys)} entr(ies) in {file_name}.", 4000)
+        return True
+
+    def _mark_clean_if_reverted(self, file_path):
+        """After a revert: if no entry of the file differs from its baseline and nothing changed outside
+        entries, the file is as loaded or saved again, so it is no longer modified and undoing leaves that state."""
+        source = self.loaded_files[file_path].get('source')
+        if source is None or source.rewrite is not None or source.retagged or self._changed_entry_keys(file_path): return
+        self.modified_files.discard(file_path)
+        self._clean_marks[file_path] = self._top_command()
+        if self.journal is not None: self._journal_saved([file_path], self.journal.seq)
+        self.update_window_title()
+
+    def _after_history_change(self, command, ops, index):
+        """Called by XmlEditCommand after undo/redo re-applied (and published) ops; index is the stack's new index."""
+        logging.info(f"Undo/redo: '{command.text()}' ({len(ops)} op(s)).")
+        self.mark_files_modified(command.file_paths)
+        cleaned = self._files_at_clean_mark(command.file_paths, index)
+        if cleaned:
+            logging.debug(f"Back at the saved state: {len(cleaned)} file(s).")
+            self.modified_files -= cleaned
+            if self.journal is not None: self._journal_saved(cleaned, self.journal.seq)
+            self.update_window_title()
+        self._restore_selection(command.selection)
+
+    def _top_command(self):
+        """The undo command whose state the trees are in, or None at the bottom of the stack (for _clean_marks).
+        Obsolete commands are skipped: they have no ops, and the stack drops them when it reaches them."""
+        index = self.undo_stack.index()
+        while index and self.undo_stack.command(index - 1).isObsolete(): index -= 1
+        return self.undo_stack.command(index - 1) if index else None
+
+    def _forget_file_history(self, file_path):
+        """Drops a replaced file's ops from every undo command (see XmlEditCommand.drop_file), keeping
+        the other files' history. Clean marks on commands left empty move to the command below."""
+        below, moved = None, {} # {id(obsolete command): nearest command with ops below it, or None}
+        for i in range(self.undo_stack.count()):
+            command = self.undo_stack.command(i)
+            command.drop_file(file_path)
+            if command.isObsolete(): moved[id(command)] = below
+            else: below = command
+        for fp, mark in list(self._clean_marks.items()):
+            if mark is not None and id(mark) in moved: self._clean_marks[fp] = moved[id(mark)]
+
+    def _reset_clean_marks(self):
+        """After undo_stack.clear(): unmodified files are clean at the bottom, modified ones cannot get back by undoing."""
+        self._clean_marks = {fp: None for fp in self.loaded_files if fp not in self.modified_files}
+
+    def _files_at_clean_mark(self, file_paths, index):
+        """Those of file_paths whose state equals the one last saved: no command between their clean mark
+        and index (position in the undo stack) touches them."""
+        stack = self.undo_stack
+        commands = None
+        cleaned = set()
+        for file_path in file_paths:
+            if file_path not in self._clean_marks: continue
+            if commands is None: commands = [stack.command(i) for i in range(stack.count())]
+            mark = self._clean_marks[file_path]
+            position = 0 if mark is None else next((i + 1 for i, c in enumerate(commands) if c is mark), None)
+            if position is None: # Its command was discarded (new edit after undoing it)
+                del self._clean_marks[file_path]
+                continue
+            low, high = sorted((position, index))
+            if not any(file_path in commands[i].file_paths for i in range(low, high)): cleaned.add(file_path)
+        return cleaned
+
+    def _drop_clean_mark_base(self):
+        """Before a push makes the undo limit drop the oldest command: marks at the bottom of the stack become
+        unreachable for the files it touched, marks on it move to the new bottom."""
+        oldest = self.undo_stack.command(0)
+        for file_path, mark in list(self._clean_marks.items()):
+            if mark is None and file_path in oldest.file_paths: del self._clean_marks[file_path]
+            elif mark is oldest: self._clean_marks[file_path] = None
+
+    def _restore_selection(self, selection):
+        """Re-selects the entry that was shown when an edit was made and refreshes its details."""
+        entry_type, name = selection
+        data_map = self.abilities_map if entry_type == TAG_ABILITY else self.items_map
+        if name is None or name not in data_map:
+            if self.current_selection_name is not None and self.current_selection_name not in \
+                    (self.abilities_map if self.current_selection_type == TAG_ABILITY else self.items_map):
+                self.clear_details_pane() # The shown entry was removed
+            elif self.current_selection_name is not None:
+                self.populate_details(self.current_selection_name, self.current_selection_type)
+            return
+        if (entry_type, name) != (self.current_selection_type, self.current_selection_name):
+            self.select_entry(entry_type, name) # Populates details through the list signal
+        else:
+            self.populate_details(name, entry_type)
 
     def update_window_title(self):
         """Updates the main window title based on selection and modification status."""
@@ -1427,13 +6489,10 @@ class WitcherXMLEditor(QMainWindow):
              self.name_input.clear()
              self.tags_input.clear()
 
-             # --- Clear dynamic layouts ---
-             # Use object names for clarity if set previously
-             self.clear_layout(self.item_attributes_layout)
-             self.clear_layout(self.base_abilities_layout)
-             self.clear_layout(self.recycling_parts_layout)
-             self.clear_layout(self.variants_layout)
-             self.clear_layout(self.properties_layout) # For abilities
+             # --- Hide the pooled rows (kept for the next selection) ---
+             for pool in self._detail_row_pools():
+                 self._release_rows(pool)
+             self.property_model.reset_contents([], None)
 
              # --- Hide specific sections ---
              self.set_item_specific_visibility(False)
@@ -1453,27 +6512,24 @@ class WitcherXMLEditor(QMainWindow):
              self._populating_details = False # Re-enable signals
 
 
+    def _detail_row_pools(self):
+        return (self.item_attribute_rows, self.base_ability_rows, self.recycling_part_rows, self.variant_rows, self.property_rows)
+
+    def _release_rows(self, pool):
+        """Unbinds and hides every row of a details section."""
+        pool.reset()
+        pool.trim()
+
     def _attach_completer(self, line_edit, model, field_context_name="Unknown Field"):
-        """Creates and attaches a QCompleter to a QLineEdit."""
+        """Assigns a completion model to a QLineEdit; the shared completer is attached on focus."""
         if not isinstance(line_edit, QLineEdit):
             logging.warning(f"Cannot attach completer: Provided widget is not a QLineEdit ({type(line_edit)}). Context: {field_context_name}")
             return
-        if not isinstance(model, QStringListModel):
-            logging.warning(f"Cannot attach completer: Provided model is not a QStringListModel ({type(model)}). Context: {field_context_name}")
-            return
-        if model.rowCount() == 0:
-            # logging.debug(f"Skipping completer for '{field_context_name}': Model is empty.")
-            # Still remove any existing completer in case the model was emptied
-            line_edit.setCompleter(None)
+        if not isinstance(model, (QStringListModel, SortedStringListModel)):
+            logging.warning(f"Cannot attach completer: Provided model is not a string list model ({type(model)}). Context: {field_context_name}")
             return
-
-        # logging.debug(f"Attaching completer to '{field_context_name}' (LineEdit: {line_edit.objectName()}) with {model.rowCount()} items.")
-        completer = QCompleter(model, line_edit) # Parent is the line edit
-        completer.setCaseSensitivity(Qt.CaseSensitivity.CaseInsensitive)
-        completer.setFilterMode(Qt.MatchFlag.MatchContains) # Contains matching
-        completer.setCompletionMode(QCompleter.CompletionMode.PopupCompletion) # Standard popup
-        line_edit.setCompleter(completer)
-        # logging.debug(f"Completer attached successfully for '{field_context_name}'.")
+        # logging.debug(f"Assigning completion model '{model.objectName()}' to '{field_context_name}' (LineEdit: {line_edit.objectName()}).")
+        self.completer_pool.attach(line_edit, model)
 
 
     def clear_data(self):
@@ -1487,20 +6543,18 @@ class WitcherXMLEditor(QMainWindow):
             self.abilities_map.clear()
             self.items_map.clear()
             self.modified_files.clear()
-
-            # 2. Clear all autocompletion data sets
-            self.all_property_names.clear()
-            self.all_item_attribute_names.clear()
-            # ... (clear all other self.all_* sets) ...
-            self.all_anim_actions.clear()
-            logging.debug("Cleared data sets.")
-
-            # 3. Clear models (setStringList([]) is efficient)
-            self.item_attribute_name_model.setStringList([])
-            self.variant_attribute_name_model.setStringList([])
-            # ... (clear all other models) ...
-            self.anim_action_model.setStringList([])
-            logging.debug("Cleared completer models.")
+            self.file_generations.clear()
+            self.undo_stack.clear() # History refers to elements of the old trees
+            self._clean_marks.clear()
+            self._close_journal()
+            self._entry_status.clear()
+            self._deleted_rows.clear()
+            self._baseline_roots = None
+            self.expanded_variants.clear() # Holds elements of the old trees
+
+            # 2-3. Clear all autocompletion counts and their models
+            self.completion_index.clear()
+            logging.debug("Cleared completion index and models.")
 
             # 4. Clear UI lists
             self.ability_list.clear()
@@ -1533,10 +6587,12 @@ class WitcherXMLEditor(QMainWindow):
             ability_names = sorted(self.abilities_map.keys())
             item_names = sorted(self.items_map.keys())
 
-            for name in ability_names:
-                self.ability_list.addItem(QListWidgetItem(name))
-            for name in item_names:
-                self.item_list.addItem(QListWidgetItem(name))
+            # One call per list: items are created on the C++ side, not one Python round trip each
+            self.ability_list.addItems(ability_names)
+            self.item_list.addItems(item_names)
+            self._entry_status.clear()
+            for entry_type in self._add_deleted_rows():
+                (self.ability_list if entry_type == TAG_ABILITY else self.item_list).sortItems()
 
             logging.info(f"Populated lists: {len(ability_names)} abilities, {len(item_names)} items.")
         finally:
@@ -1554,6 +6610,10 @@ class WitcherXMLEditor(QMainWindow):
             return
 
         name = current_item.text()
+        if current_item.data(Qt.ItemDataRole.UserRole): # Row of a deleted entry
+            self.clear_details_pane()
+            self.statusBar.showMessage(f"'{name}' was deleted. Use Edit -> Revert Entry (or right-click) to restore it.", 5000)
+            return
         # Avoid unnecessary reloads if the same item is clicked again
         if name == self.current_selection_name and item_type == self.current_selection_type:
             # logging.debug(f"Selection unchanged: {item_type} '{name}'. Skipping reload.")
@@ -1570,14 +6630,17 @@ class WitcherXMLEditor(QMainWindow):
             logging.warning("populate_details called while already populating. Skipping.")
             return
 
-        self.clear_details_pane() # Clear existing details first
+        data_map = self.abilities_map if item_type == TAG_ABILITY else self.items_map
+        if name not in data_map:
+            logging.error(f"Cannot populate details: {item_type} '{name}' not found in map.")
+            self.clear_details_pane()
+            QMessageBox.critical(self, "Internal Error", f"Data for '{name}' could not be found.")
+            return # Exit early
+
+        # Existing rows are rebound in place (no clear first); repaint once at the end
         self._populating_details = True # Prevent signals during this population phase
+        self.right_widget.setUpdatesEnabled(False)
         try:
-            data_map = self.abilities_map if item_type == TAG_ABILITY else self.items_map
-            if name not in data_map:
-                logging.error(f"Cannot populate details: {item_type} '{name}' not found in map.")
-                QMessageBox.critical(self, "Internal Error", f"Data for '{name}' could not be found.")
-                return # Exit early
 
             item_data = data_map[name]
             element = item_data['element']
@@ -1590,24 +6653,28 @@ class WitcherXMLEditor(QMainWindow):
             self.current_selection_filepath = file_path
             logging.debug(f"Current selection set: {item_type} '{name}' from file '{os.path.basename(file_path)}'")
 
+            details = self.details_prefetcher.get(item_type, name, element)
+
             # --- Populate Common Fields ---
             self.name_input.setText(name)
-            tags_element = element.find(TAG_TAGS)
-            tags_text = tags_element.text.strip() if tags_element is not None and tags_element.text else ""
-            self.tags_input.setText(tags_text)
+            self.tags_input.setText(details.tags_text)
             # Ensure completer is attached for tags (might have been cleared)
-            self._attach_completer(self.tags_input, self.tag_model, "Tags")
+            self._attach_field_completer(self.tags_input, f"{item_type}/{TAG_TAGS}#tags", "Tags")
 
 
             # --- Populate Specific Sections ---
             if item_type == TAG_ITEM:
                 logging.debug("Populating item-specific sections...")
-                self._populate_item_details(element, file_path)
+                self._populate_item_details(details, file_path)
+                self._release_rows(self.property_rows)
+                self.property_model.reset_contents([], None)
                 self.set_item_specific_visibility(True)
                 self.set_ability_specific_visibility(False)
             elif item_type == TAG_ABILITY:
                 logging.debug("Populating ability-specific sections...")
-                self._populate_ability_details(element, file_path)
+                self._populate_ability_details(details, file_path)
+                for pool in (self.item_attribute_rows, self.base_ability_rows, self.recycling_part_rows, self.variant_rows):
+                    self._release_rows(pool)
                 self.set_item_specific_visibility(False)
                 self.set_ability_specific_visibility(True)
             else:
@@ -1621,390 +6688,206 @@ class WitcherXMLEditor(QMainWindow):
              QMessageBox.critical(self, "Population Error", f"An error occurred while displaying details for '{name}':\n{e}")
         finally:
              self._populating_details = False # Re-enable signals
+             self.right_widget.setUpdatesEnabled(True)
+        self._schedule_details_prefetch(item_type, name)
+
 
+    def build_entry_details(self, entry_type, name, warm=False):
+        """EntryDetails of an entry (None if it no longer exists); warm=True also builds its completers."""
+        data_map = self.abilities_map if entry_type == TAG_ABILITY else self.items_map
+        entry = data_map.get(name)
+        if entry is None: return None
+        details = EntryDetails(entry_type, entry['element'], self.KNOWN_ABILITY_CHILD_TAGS)
+        if warm:
+            for path in details.completion_paths:
+                model = self.completion_model_for(path)
+                if model is not None: self.completer_pool.warm(model)
+        return details
+
+    def _schedule_details_prefetch(self, entry_type, name):
+        """Queues the list neighbours of the shown entry, then recent history, for idle-time prefetch."""
+        list_widget = self.ability_list if entry_type == TAG_ABILITY else self.item_list
+        current = list_widget.currentRow()
+        keys = []
+        for direction in (1, -1): # Next entries first: the usual browsing direction
+            row, found = current + direction, 0
+            while 0 <= row < list_widget.count() and found < self.PREFETCH_NEIGHBOURS:
+                item = list_widget.item(row)
+                if not item.isHidden():
+                    keys.append((entry_type, item.text()))
+                    found += 1
+                row += direction
+        keys.extend(reversed(self.details_prefetcher.history))
+        self.details_prefetcher.schedule(key for key in keys if key != (entry_type, name))
+
+    def _evict_entry_details(self, ops):
+        """change_bus.applied subscriber: drops prepared details of the entries the ops changed."""
+        entries = []
+        for op in ops:
+            entry = enclosing_entry(op[1])
+            if entry is None: # Containers or detached subtrees: no telling which entries changed
+                self.details_prefetcher.clear()
+                return
+            entries.append(entry[1])
+        self.details_prefetcher.evict(entries)
 
-    def _populate_item_details(self, element, file_path):
+    def _populate_item_details(self, details, file_path):
         """Populates the right pane sections specific to Items."""
         # Called by populate_details, _populating_details flag is already True
-        self._populate_item_attributes(element)
-        self._populate_item_list_section(element, TAG_BASE_ABILITIES, TAG_ABILITY_REF, self.base_abilities_layout, self.add_base_ability_widget)
-        self._populate_item_list_section(element, TAG_RECYCLING_PARTS, TAG_PARTS, self.recycling_parts_layout, self.add_recycling_part_widget)
-        self._populate_item_list_section(element, TAG_VARIANTS, TAG_VARIANT, self.variants_layout, self.add_variant_widget)
+        self._populate_item_attributes(details.element, details.attribute_keys)
+        self._populate_item_list_section(details, TAG_BASE_ABILITIES, self.base_ability_rows, self.add_base_ability_widget)
+        self._populate_item_list_section(details, TAG_RECYCLING_PARTS, self.recycling_part_rows, self.add_recycling_part_widget)
+        self._populate_item_list_section(details, TAG_VARIANTS, self.variant_rows, self.add_variant_widget, details.variant_summaries)
 
-    def _populate_ability_details(self, element, file_path):
+    def _populate_ability_details(self, details, file_path):
         """Populates the right pane sections specific to Abilities (Properties)."""
         # Called by populate_details, _populating_details flag is already True
+        element = details.element
         logging.debug(f"Populating Ability properties for: {element.get('name')}")
-        self.clear_layout(self.properties_layout) # Clear previous properties first
-        prop_count = 0
-        for child in element:
-            # Display direct children that are elements and *not* known structural tags
-            if ET.iselement(child) and child.tag not in self.KNOWN_ABILITY_CHILD_TAGS:
-                try:
-                    prop_widget = PropertyWidget(child, file_path, self)
-                    self.properties_layout.addWidget(prop_widget)
-                    prop_count += 1
-                except Exception as e:
-                    logging.error(f"Failed to create PropertyWidget for child <{child.tag}> of ability '{element.get('name')}': {e}", exc_info=True)
-        logging.debug(f"Added {prop_count} property widgets for ability '{element.get('name')}'.")
+        # Direct children that are elements and *not* known structural tags (see EntryDetails)
+        properties = details.properties
+        self._property_table_active = self._use_property_table(len(properties))
+        if self._property_table_active:
+            self._release_rows(self.property_rows)
+            self.property_model.reset_contents(list(properties), file_path) # The model appends/removes in place
+            self._fit_property_table()
+            logging.debug(f"Showing {len(properties)} properties of ability '{element.get('name')}' in the table.")
+            return
+        self.property_model.reset_contents([], None)
+        self.property_rows.reset() # Rebind the pooled rows in order
+        for child in properties:
+            try:
+                self.property_rows.acquire().bind(child, file_path)
+            except Exception as e:
+                logging.error(f"Failed to bind PropertyWidget for child <{child.tag}> of ability '{element.get('name')}': {e}", exc_info=True)
+        self.property_rows.trim()
+        logging.debug(f"Bound {self.property_rows.used} property widgets for ability '{element.get('name')}'.")
 
-    def _populate_item_attributes(self, element):
-        """Populates the Item Attributes grid layout."""
+    def _use_property_table(self, property_count):
+        """Whether an ability with this many properties is shown in the table rather than as rows."""
+        if self.property_table_action is not None and self.property_table_action.isChecked():
+            return True
+        return 0 < self.property_table_threshold <= property_count
+
+    def _fit_property_table(self):
+        """Sizes the property table to its rows, up to PROPERTY_TABLE_MAX_ROWS (the rest scrolls inside it)."""
+        rows = min(max(self.property_model.rowCount(), 1), self.PROPERTY_TABLE_MAX_ROWS)
+        height = (self.property_table.horizontalHeader().sizeHint().height()
+                  + rows * self.property_table.verticalHeader().defaultSectionSize()
+                  + 2 * self.property_table.frameWidth())
+        self.property_table.setFixedHeight(height)
+
+    def _utf8_toggled(self, checked):
+        """Saves this folder's files as UTF-8 from now on (or in their own encoding again); offers to convert them now."""
+        if not self.workspace_folder: return
+        if checked: self.utf8_workspaces.add(self.workspace_folder)
+        else: self.utf8_workspaces.discard(self.workspace_folder)
+        logging.info(f"Save as UTF-8 for '{self.workspace_folder}': {checked}")
+        self.save_config()
+        if not checked: return
+        file_paths = sorted(fp for fp, data in self.loaded_files.items() if data.get('source') and not data['source'].is_utf8())
+        if not file_paths: return
+        reply = QMessageBox.question(self, "Save Folder as UTF-8",
+                                     f"{len(file_paths)} file(s) of this folder are not UTF-8. Convert them now?\n\n"
+                                     "Otherwise they are converted when they are next saved.",
+                                     QMessageBox.StandardButton.Yes | QMessageBox.StandardButton.No, QMessageBox.StandardButton.No)
+        if reply != QMessageBox.StandardButton.Yes: return
+        def converted(saved_paths, failures):
+            self.statusBar.showMessage(f"Converted {len(saved_paths)} file(s) to UTF-8." +
+                                       (f" Failed to convert {len(failures)} file(s). Check logs." if failures else ""), 5000)
+        self.save_files(file_paths, f"Convert to UTF-8 ({len(file_paths)} files)", converted)
+
+    def _property_view_toggled(self, checked):
+        logging.info(f"Ability properties as table: {checked}")
+        if self.current_selection_type == TAG_ABILITY and self.current_selection_name is not None:
+            self.populate_details(self.current_selection_name, self.current_selection_type)
+
+    def _show_property_table_menu(self, pos):
+        """Context menu of the property table: add an attribute to / remove the clicked property."""
+        index = self.property_table.indexAt(pos)
+        if not index.isValid() or self._populating_details: return
+        element = self.property_model.elements[index.row()]
+        menu = QMenu(self)
+        add_attr_action = menu.addAction(QIcon.fromTheme("list-add"), f"Add Attribute to '{element.tag}'...")
+        remove_action = menu.addAction(QIcon.fromTheme("list-remove"), f"Remove Property '{element.tag}'")
+        chosen = menu.exec(self.property_table.viewport().mapToGlobal(pos))
+        if chosen is add_attr_action:
+            if self.add_property_attribute(element):
+                self.property_model.refresh_columns()
+        elif chosen is remove_action:
+            if self.remove_property(element, self.property_model.file_path):
+                self.property_model.remove_element(element)
+                self._fit_property_table()
+
+    def _populate_item_attributes(self, element, keys=None):
+        """Populates the Item Attributes grid layout (keys: sorted attribute names without 'name')."""
         logging.debug("Populating Item Attributes section...")
-        self.clear_layout(self.item_attributes_layout)
-        row = 0
+        self.item_attribute_rows.reset()
         # Sort attributes alphabetically for consistent order
-        for key, value in sorted(element.attrib.items()):
-             if key == 'name': continue # Skip name attribute, shown in common field
-
-             logging.debug(f"  Adding attribute widget: {key} = '{value}'")
-             attr_label = QLabel(f"{key}:")
-             attr_label.setTextInteractionFlags(Qt.TextInteractionFlag.TextSelectableByMouse | Qt.TextInteractionFlag.TextSelectableByKeyboard)
-             attr_input = QLineEdit(value)
-             attr_input.setObjectName(f"input_item_attr_{key}") # Object name for debugging/styling
-
-             # Add widgets to layout FIRST
-             self.item_attributes_layout.addWidget(attr_label, row, 0)
-             self.item_attributes_layout.addWidget(attr_input, row, 1)
-
-             # Attach completer AFTER adding to layout
-             self._attach_completer_for_item_attribute(key, attr_input)
-
-             # Connect signal
-             # Use lambda with default arguments to capture current key and input
-             attr_input.editingFinished.connect(
-                 lambda k=key, i=attr_input: self.item_attribute_changed(k, i.text())
-             )
-             row += 1
-
-        # Add the "+ Item Attribute" button at the end
-        add_item_attr_button = QPushButton(QIcon.fromTheme("list-add"), "Add Item Attribute")
-        add_item_attr_button.setToolTip("Add a new attribute to this item")
-        add_item_attr_button.clicked.connect(self.add_item_attribute)
-        self.item_attributes_layout.addWidget(add_item_attr_button, row, 0, 1, 2, Qt.AlignmentFlag.AlignLeft) # Span 2 cols, align left
+        if keys is None: keys = sorted(key for key in element.attrib.keys() if key != 'name') # Name is shown in common field
+        for key in keys:
+             # logging.debug(f"  Binding attribute row: {key}")
+             self.item_attribute_rows.acquire().bind(element, key, f"{TAG_ITEM}@{key}")
+        self.item_attribute_rows.trim()
+        # Keep the "+ Item Attribute" button right below the rows
+        place_after_rows(self.item_attributes_layout, self.item_attribute_rows, self.add_item_attr_button)
         logging.debug("Finished Item Attributes section.")
 
 
-    def _attach_completer_for_item_attribute(self, key, line_edit):
-         """Attaches the appropriate completer based on the item attribute key."""
-         context_name = f"Item Attribute '{key}'"
-         if key == 'category': self._attach_completer(line_edit, self.item_category_model, context_name)
-         elif key == 'ability_mode': self._attach_completer(line_edit, self.ability_mode_model, context_name)
-         elif key == 'equip_template': self._attach_completer(line_edit, self.equip_template_model, context_name)
-         elif key == 'equip_slot': self._attach_completer(line_edit, self.equip_slot_model, context_name)
-         elif key == 'hold_slot': self._attach_completer(line_edit, self.hold_slot_model, context_name)
-         elif key == 'hand': self._attach_completer(line_edit, self.hand_model, context_name)
-         elif key == 'sound_identification': self._attach_completer(line_edit, self.sound_id_model, context_name)
-         elif key in ['draw_event', 'holster_event']: self._attach_completer(line_edit, self.event_model, context_name)
-         elif key in ['draw_act', 'draw_deact', 'holster_act', 'holster_deact']: self._attach_completer(line_edit, self.anim_action_model, context_name)
-         elif key == 'enhancement_slots': self._attach_completer(line_edit, self.enhancement_slots_model, context_name)
-         elif key in ['weapon', 'lethal', 'quest', 'indestructible']: self._attach_completer(line_edit, self.boolean_value_model, context_name) # Add more booleans
-         elif key.startswith('localisation_key'): self._attach_completer(line_edit, self.localisation_key_model, context_name)
-         elif key == 'icon_path': self._attach_completer(line_edit, self.icon_path_model, context_name)
-         # Add more specific completers as needed
-         # else: No specific completer for this attribute key
-
-    def _populate_item_list_section(self, parent_element, section_tag, child_tag, layout, add_widget_func):
-        """Generic function to populate list-like sections (Base Abilities, Recycling, Variants)."""
+    def _populate_item_list_section(self, details, section_tag, pool, add_widget_func, extras=None):
+        """Generic function to populate list-like sections (Base Abilities, Recycling, Variants) from pooled rows.
+
+        extras: optional per-child values prepared in the EntryDetails, passed on to add_widget_func.
+        """
         logging.debug(f"Populating item section: <{section_tag}>")
-        self.clear_layout(layout)
-        section_node = parent_element.find(section_tag)
+        pool.reset()
         count = 0
-        if section_node is not None:
-            for child_element in section_node.findall(child_tag):
-                if ET.iselement(child_element): # Ensure it's an element
-                    try:
-                        add_widget_func(child_element) # Call the specific widget creation function
-                        count += 1
-                    except Exception as e:
-                        logging.error(f"Failed to add widget for <{child_tag}> in <{section_tag}>: {e}", exc_info=True)
-        # else: No section node found
+        for i, child_element in enumerate(details.sections[section_tag]):
+            try:
+                if extras is None: add_widget_func(child_element) # Call the specific widget creation function
+                else: add_widget_func(child_element, extras[i])
+                count += 1
+            except Exception as e:
+                logging.error(f"Failed to add widget for <{child_element.tag}> in <{section_tag}>: {e}", exc_info=True)
+        pool.trim()
         logging.debug(f"Finished populating <{section_tag}> section. Added {count} widgets.")
 
 
     # --- Widget Add/Remove Helpers for Item Sections ---
 
     def add_base_ability_widget(self, ab_element):
-        """Adds a widget row for a <base_abilities> -> <a> element."""
-        # Ensure _populating_details is checked by the caller (_populate_item_list_section)
-        ability_text = ab_element.text.strip() if ab_element.text else ""
-        logging.debug(f"  Adding Base Ability widget for: '{ability_text}'")
-
-        widget = QWidget()
-        layout = QHBoxLayout(widget)
-        layout.setContentsMargins(0, 0, 0, 0)
-
-        ab_input = QLineEdit(ability_text)
-        ab_input.setPlaceholderText("Ability Name")
-        ab_input.setObjectName(f"input_base_ability_{id(ab_element)}") # Use id for uniqueness
-
-        remove_button = QPushButton("X")
-        remove_button.setFixedWidth(30)
-        remove_button.setToolTip("Remove this base ability reference")
-
-        # Add widgets to layout FIRST
-        layout.addWidget(ab_input)
-        layout.addWidget(remove_button)
-        self.base_abilities_layout.addWidget(widget) # Add row widget to the section layout
-
-        # Attach completer AFTER adding to layout
-        self._attach_completer(ab_input, self.ability_name_model, "Base Ability Name")
-
-        # Connect signals
-        # Disconnect first to prevent duplicates if re-populating
-        try: ab_input.editingFinished.disconnect()
-        except RuntimeError: pass
-        ab_input.editingFinished.connect(lambda elem=ab_element, inp=ab_input: self.base_ability_text_changed(elem, inp.text()))
-
-        try: remove_button.clicked.disconnect()
-        except RuntimeError: pass
-        remove_button.clicked.connect(lambda w=widget, elem=ab_element: self.remove_list_widget(
-            w, elem, TAG_BASE_ABILITIES, self.base_abilities_layout, "Base Ability"
-        ))
+        """Binds the next pooled row to a <base_abilities> -> <a> element."""
+        # logging.debug(f"  Binding Base Ability row for: '{ab_element.text}'")
+        row = self.base_ability_rows.acquire()
+        row.bind(ab_element)
+        return row
 
     def add_recycling_part_widget(self, part_element):
-        """Adds a widget row for a <recycling_parts> -> <parts> element."""
-        count_value = part_element.get('count', '1') # Default to 1 if count missing
-        part_text = part_element.text.strip() if part_element.text else ""
-        logging.debug(f"  Adding Recycling Part widget: Count='{count_value}', Name='{part_text}'")
-
-        widget = QWidget()
-        layout = QHBoxLayout(widget)
-        layout.setContentsMargins(0, 0, 0, 0)
-        layout.setSpacing(5)
-
-        label_count = QLabel("Count:")
-        count_input = QLineEdit(count_value)
-        count_input.setFixedWidth(50)
-        count_input.setPlaceholderText("Qty")
-        count_input.setObjectName(f"input_recycling_count_{id(part_element)}")
-
-        label_name = QLabel(" Name:") # Add space for visual separation
-        name_input = QLineEdit(part_text)
-        name_input.setPlaceholderText("Part Item Name")
-        name_input.setObjectName(f"input_recycling_name_{id(part_element)}")
-
-        remove_button = QPushButton("X")
-        remove_button.setFixedWidth(30)
-        remove_button.setToolTip("Remove this recycling part")
-
-        # Add widgets to layout FIRST
-        layout.addWidget(label_count)
-        layout.addWidget(count_input)
-        layout.addWidget(label_name)
-        layout.addWidget(name_input)
-        layout.addStretch(1) # Push button to the right
-        layout.addWidget(remove_button)
-        self.recycling_parts_layout.addWidget(widget)
-
-        # Attach completer to name input AFTER adding to layout
-        self._attach_completer(name_input, self.item_name_model, "Recycling Part Name") # Parts are items
-
-        # Connect signals
-        try: count_input.editingFinished.disconnect()
-        except RuntimeError: pass
-        count_input.editingFinished.connect(lambda elem=part_element, inp=count_input: self.part_attribute_changed(elem, 'count', inp.text()))
-
-        try: name_input.editingFinished.disconnect()
-        except RuntimeError: pass
-        name_input.editingFinished.connect(lambda elem=part_element, inp=name_input: self.part_text_changed(elem, inp.text()))
-
-        try: remove_button.clicked.disconnect()
-        except RuntimeError: pass
-        remove_button.clicked.connect(lambda w=widget, elem=part_element: self.remove_list_widget(
-             w, elem, TAG_RECYCLING_PARTS, self.recycling_parts_layout, "Recycling Part"
-        ))
-
-    def add_variant_widget(self, var_element):
-        """Adds a widget structure for a <variants> -> <variant> element."""
-        logging.debug(f"  Adding Variant widget for variant with attrs: {var_element.attrib}")
-
-        # Main container for the whole variant row (allows complex internal layout)
-        variant_row_widget = QWidget()
-        variant_row_widget.setObjectName(f"VariantRow_{id(var_element)}")
-        # Use a border for visual separation of variants
-        variant_row_widget.setStyleSheet("QWidget#VariantRow_" + str(id(var_element)) + " { border: 1px solid gray; margin-bottom: 5px; }")
-
-        # Main layout: Details on the left, Remove button on the right
-        row_layout = QHBoxLayout(variant_row_widget)
-        row_layout.setContentsMargins(5, 5, 5, 5)
-        row_layout.setSpacing(10)
-
-        # Left side layout (vertical: attributes, then nested items)
-        details_layout = QVBoxLayout()
-        details_layout.setContentsMargins(0, 0, 0, 0)
-        details_layout.setSpacing(5)
-        row_layout.addLayout(details_layout)
-
-        # --- Variant Attributes ---
-        attributes_layout = QGridLayout()
-        attributes_layout.setObjectName(f"VariantAttributesLayout_{id(var_element)}")
-        attributes_layout.setContentsMargins(0, 0, 0, 5)
-        details_layout.addLayout(attributes_layout)
-        attr_row = 0
-        attribute_widgets = {} # Keep track if needed
-
-        if var_element.attrib:
-            for key, value in sorted(var_element.attrib.items()):
-                attr_label = QLabel(f"{key}:")
-                attr_label.setTextInteractionFlags(Qt.TextInteractionFlag.TextSelectableByMouse | Qt.TextInteractionFlag.TextSelectableByKeyboard)
-                attr_input = QLineEdit(value)
-                attr_input.setObjectName(f"input_variant_attr_{key}_{id(var_element)}")
-
-                # Add widgets FIRST
-                attributes_layout.addWidget(attr_label, attr_row, 0)
-                attributes_layout.addWidget(attr_input, attr_row, 1)
-                attribute_widgets[key] = attr_input
-
-                # Attach completer AFTER
-                self._attach_completer_for_variant_attribute(key, attr_input)
-
-                # Connect signal
-                try: attr_input.editingFinished.disconnect()
-                except RuntimeError: pass
-                attr_input.editingFinished.connect(
-                    lambda k=key, i=attr_input, elem=var_element: self.variant_attribute_changed(elem, k, i.text()))
-                attr_row += 1
-        else:
-            # Add a placeholder label if no attributes initially
-             no_attr_label = QLabel("<i>No attributes defined for this variant.</i>")
-             attributes_layout.addWidget(no_attr_label, attr_row, 0, 1, 2)
-             attr_row +=1
-
-        # Button to add attributes to *this* variant
-        add_variant_attr_button = QPushButton(QIcon.fromTheme("list-add"), "+ Variant Attribute")
-        add_variant_attr_button.setToolTip("Add a new attribute to this specific variant")
-        try: add_variant_attr_button.clicked.disconnect()
-        except RuntimeError: pass
-        # Pass necessary context to the add function
-        add_variant_attr_button.clicked.connect(
-            lambda elem=var_element, layout=attributes_layout, button=add_variant_attr_button:
-            self.add_variant_attribute(elem, layout, button) # Pass layout and button itself
-        )
-        # Place the button below existing attributes
-        attributes_layout.addWidget(add_variant_attr_button, attr_row, 0, 1, 2, Qt.AlignmentFlag.AlignLeft)
-        # --- End Variant Attributes ---
-
-
-        # --- Nested Elements (e.g., <item>, <ability>) ---
-        nested_container = QWidget() # Container for nested items + add button
-        nested_container_layout = QVBoxLayout(nested_container)
-        nested_container_layout.setContentsMargins(15, 5, 0, 5) # Indent nested items
-        nested_container_layout.setSpacing(3)
-        details_layout.addWidget(nested_container) # Add nested container to the main details layout
-
-        nested_items_layout = QVBoxLayout() # Layout *just* for the nested item widgets
-        nested_items_layout.setObjectName(f"NestedItemsLayout_{id(var_element)}")
-        nested_items_layout.setContentsMargins(0,0,0,0)
-        nested_items_layout.setSpacing(1)
-        nested_container_layout.addLayout(nested_items_layout) # Add item layout to container
-
-        nested_element_found = False
-        for child_node in var_element: # Iterate through all children
-            if ET.iselement(child_node): # Process only elements
-                nested_element_found = True
-                self.add_nested_variant_item_widget(child_node, var_element, nested_items_layout)
-            # else: Ignore comments, PIs etc.
-
-        if not nested_element_found:
-             no_nested_label = QLabel("<i>No nested elements (e.g., <item>, <ability>) found.</i>")
-             nested_items_layout.addWidget(no_nested_label)
-
-
-        # Button to add nested items (place inside the nested container)
-        add_nested_item_button = QPushButton(QIcon.fromTheme("list-add"), "+ Nested Element")
-        add_nested_item_button.setToolTip("Add a new element (e.g., <item>, <ability>) inside this variant")
-        try: add_nested_item_button.clicked.disconnect()
-        except RuntimeError: pass
-        # nested_items_layout is the target layout for *new* item widgets
-        add_nested_item_button.clicked.connect(
-            lambda v_elem=var_element, layout=nested_items_layout: self.add_nested_variant_item(v_elem, layout)
-        )
-        nested_container_layout.addWidget(add_nested_item_button, alignment=Qt.AlignmentFlag.AlignLeft)
-        # --- End Nested Elements ---
-
-
-        # --- Remove Button for the whole variant ---
-        remove_button = QPushButton("X")
-        remove_button.setFixedWidth(30)
-        remove_button.setSizePolicy(QSizePolicy.Policy.Fixed, QSizePolicy.Policy.Fixed)
-        remove_button.setToolTip(f"Remove this entire variant")
-        try: remove_button.clicked.disconnect()
-        except RuntimeError: pass
-        # Pass the main row widget to remove
-        remove_button.clicked.connect(lambda w=variant_row_widget, elem=var_element: self.remove_list_widget(
-            w, elem, TAG_VARIANTS, self.variants_layout, "Variant"
-        ))
-        # Add remove button to the main horizontal layout, aligned top-right
-        row_layout.addWidget(remove_button, 0, Qt.AlignmentFlag.AlignTop) # Add with stretch factor 0
-
-
-        # Add the complete variant row widget to the main variants section layout
-        self.variants_layout.addWidget(variant_row_widget)
-
-
-    def _attach_completer_for_variant_attribute(self, key, line_edit):
-         """Attaches the appropriate completer based on the variant attribute key."""
-         context_name = f"Variant Attribute '{key}'"
-         # Add known variant attributes here
-         if key == 'category': self._attach_completer(line_edit, self.item_category_model, context_name)
-         elif key == 'equip_template': self._attach_completer(line_edit, self.equip_template_model, context_name)
-         elif key == 'required_build': self._attach_completer(line_edit, self.boolean_value_model, context_name) # Example
-         # Add more specific completers as needed
-
-
-    def add_nested_variant_item_widget(self, child_element, variant_element, target_layout):
-        """Adds a widget for a nested element within a <variant> (e.g., <item>, <ability>)."""
-        # Caller should ensure child_element is valid
-        child_tag = child_element.tag
-        child_text = child_element.text.strip() if child_element.text else ""
-        logging.debug(f"    Adding Nested Variant Item widget: Tag='{child_tag}', Text='{child_text}'")
-
-        nested_widget = QWidget()
-        nested_layout = QHBoxLayout(nested_widget)
-        nested_layout.setContentsMargins(0, 0, 0, 0)
-        nested_layout.setSpacing(5)
-
-        # Simple label for the tag
-        tag_label = QLabel(f"{child_tag}:")
-        tag_label.setFixedWidth(50) # Adjust width as needed
-        tag_label.setTextInteractionFlags(Qt.TextInteractionFlag.TextSelectableByMouse | Qt.TextInteractionFlag.TextSelectableByKeyboard)
-        nested_layout.addWidget(tag_label)
-
-        text_input = QLineEdit(child_text)
-        text_input.setObjectName(f"input_nested_{child_tag}_{id(child_element)}")
-
-        nested_layout.addWidget(text_input) # Add input FIRST
-
-        # Attach completer AFTER adding to layout
-        context_name = f"Nested Variant Element '{child_tag}'"
-        tag_lower = child_tag.lower()
-        if tag_lower == TAG_ITEM:
-            self._attach_completer(text_input, self.item_name_model, context_name)
-        elif tag_lower == TAG_ABILITY:
-             self._attach_completer(text_input, self.ability_name_model, context_name)
-        # Add other potential nested tags here
+        """Binds the next pooled row to a <recycling_parts> -> <parts> element."""
+        row = self.recycling_part_rows.acquire()
+        row.bind(part_element)
+        return row
+
+    def add_variant_widget(self, var_element, summary=None):
+        """Binds the next pooled variant row (attributes + nested elements) to a <variant> element."""
+        # logging.debug(f"  Binding Variant row for variant with attrs: {var_element.attrib}")
+        row = self.variant_rows.acquire()
+        expanded = any(v is var_element for v in self.expanded_variants.get(self.current_selection_name, ()))
+        row.bind(var_element, expanded, summary) # Collapsed rows only build their header
+        return row
+
+    def variant_expanded_changed(self, var_element, expanded):
+        """Remembers which variants of the current item are expanded (restored when it is shown again)."""
+        if self.current_selection_type != TAG_ITEM or self.current_selection_name is None: return
+        remembered = [v for v in self.expanded_variants.get(self.current_selection_name, ()) if v is not var_element]
+        if expanded: remembered.append(var_element)
+        if remembered:
+            self.expanded_variants[self.current_selection_name] = remembered
         else:
-             logging.debug(f"No specific completer defined for nested tag '{child_tag}'.")
-
-        remove_nested_button = QPushButton("x") # Smaller button
-        remove_nested_button.setFixedWidth(25)
-        remove_nested_button.setToolTip(f"Remove this <{child_tag}> element")
-        nested_layout.addWidget(remove_nested_button) # Add button
-
-        target_layout.addWidget(nested_widget) # Add the whole row to the passed layout
+            self.expanded_variants.pop(self.current_selection_name, None)
 
-        # Connect signals
-        try: text_input.editingFinished.disconnect()
-        except RuntimeError: pass
-        text_input.editingFinished.connect(lambda elem=child_element, inp=text_input: self.nested_variant_item_text_changed(elem, inp.text()))
 
-        try: remove_nested_button.clicked.disconnect()
-        except RuntimeError: pass
-        remove_nested_button.clicked.connect(lambda w=nested_widget, elem=child_element, p_elem=variant_element: self.remove_nested_variant_item(w, elem, p_elem))
-
-
-    def remove_list_widget(self, widget_to_remove, element_to_remove, parent_tag_constant, layout, item_description="item"):
+    def remove_list_widget(self, widget_to_remove, element_to_remove, parent_tag_constant, pool, item_description="item"):
         """Removes a widget and its corresponding XML element from a list section (e.g., base ability, part, variant)."""
         if self._populating_details:
             logging.debug(f"Remove {item_description} skipped: Populating details.")
@@ -2018,8 +6901,8 @@ class WitcherXMLEditor(QMainWindow):
             # This might happen if the parent node (e.g., <base_abilities>) was empty and removed previously.
             logging.warning(f"Cannot remove {item_description} <{element_to_remove.tag}>: Parent node <{parent_tag_constant}> not found.")
             # If the parent node is gone, the element should be gone too, just remove the widget.
-            widget_to_remove.deleteLater()
-            logging.debug("Removed orphan widget as parent node was missing.")
+            pool.release(widget_to_remove)
+            logging.debug("Released orphan row as parent node was missing.")
             return
 
         # Confirmation (optional, uncomment if desired)
@@ -2030,10 +6913,11 @@ class WitcherXMLEditor(QMainWindow):
 
         try:
             logging.info(f"Removing {item_description} element <{element_to_remove.tag}> from <{parent_tag_constant}>")
-            parent_node.remove(element_to_remove)
-            self.mark_file_modified(self.current_selection_filepath)
-            widget_to_remove.deleteLater() # Remove the UI widget
-            logging.debug(f"Successfully removed {item_description} and its widget.")
+            batch = self.begin_edit()
+            batch.remove(element_to_remove, parent_node)
+            self.commit_edit(batch, f"Remove {item_description}")
+            pool.release(widget_to_remove) # Hide the row for reuse
+            logging.debug(f"Successfully removed {item_description} and released its row.")
 
             # Optional: Remove the parent node (e.g., <base_abilities>) if it becomes empty
             # if not list(parent_node) and not parent_node.attrib and not parent_node.text:
@@ -2045,8 +6929,8 @@ class WitcherXMLEditor(QMainWindow):
 
         except ValueError:
             logging.error(f"Element <{element_to_remove.tag}> not found in <{parent_tag_constant}> during removal (ValueError).", exc_info=True)
-            # Element might already be removed, still delete the widget
-            widget_to_remove.deleteLater()
+            # Element might already be removed, still release the row
+            pool.release(widget_to_remove)
         except Exception as e:
             logging.error(f"Error removing {item_description} list widget: {e}", exc_info=True)
             QMessageBox.critical(self, "Removal Error", f"An error occurred while removing the {item_description}:\n{e}")
@@ -2063,30 +6947,21 @@ class WitcherXMLEditor(QMainWindow):
 
         if new_tags_text == current_text: return # No change
 
+        batch = self.begin_edit()
         if tags_element is None:
             if new_tags_text: # Only add element if there's text
                 logging.info(f"Adding <{TAG_TAGS}> element with text: {new_tags_text}")
-                tags_element = ET.SubElement(self.current_selection_element, TAG_TAGS)
-                tags_element.text = new_tags_text
-                self.mark_file_modified(self.current_selection_filepath)
+                batch.sub_element(self.current_selection_element, TAG_TAGS, text=new_tags_text)
         elif new_tags_text: # Element exists, update text
             logging.info(f"Updating <{TAG_TAGS}> text from '{current_text}' to '{new_tags_text}'")
-            tags_element.text = new_tags_text
-            self.mark_file_modified(self.current_selection_filepath)
+            batch.set_text(tags_element, new_tags_text)
         else: # Element exists, but new text is empty -> remove element
             logging.info(f"Removing empty <{TAG_TAGS}> element.")
             try:
-                self.current_selection_element.remove(tags_element)
-                self.mark_file_modified(self.current_selection_filepath)
+                batch.remove(tags_element, self.current_selection_element)
             except ValueError:
                  logging.warning(f"Could not remove <{TAG_TAGS}> element, possibly already removed.")
-
-        # Update tag completer model if new tags were added
-        added_tags = {t.strip() for t in new_tags_text.split(',') if t.strip() and t.strip() not in self.all_tags}
-        if added_tags:
-            logging.debug(f"Adding new tags to completer model: {added_tags}")
-            self.all_tags.update(added_tags)
-            self._update_single_completer_model(self.tag_model, self.all_tags, "tag")
+        self.commit_edit(batch, "Edit tags")
 
     def item_attribute_changed(self, attr_name, new_value):
         """Handles changes in the main Item Attribute QLineEdits."""
@@ -2103,10 +6978,7 @@ class WitcherXMLEditor(QMainWindow):
             # if not new_value_norm and attr_name in self.current_selection_element.attrib:
             #     del self.current_selection_element.attrib[attr_name]
             # else:
-            self.current_selection_element.set(attr_name, new_value_norm)
-            self.mark_file_modified(self.current_selection_filepath)
-            # Optional: Update relevant completer model if the value came from one (e.g., category)
-            self._update_completer_set_and_model_from_value(attr_name, new_value_norm)
+            self.edit_attribute(self.current_selection_element, attr_name, new_value_norm, f"Change {attr_name}")
 
 
     def base_ability_text_changed(self, ab_element, new_text):
@@ -2116,12 +6988,7 @@ class WitcherXMLEditor(QMainWindow):
         current_text = ab_element.text.strip() if ab_element.text else ""
         if current_text != new_text_stripped:
             logging.info(f"Base ability text changed from '{current_text}' to '{new_text_stripped}'")
-            ab_element.text = new_text_stripped
-            self.mark_file_modified(self.current_selection_filepath)
-            # Update ability name model if it's a new name
-            if new_text_stripped and new_text_stripped not in self.all_ability_names:
-                self.all_ability_names.add(new_text_stripped)
-                self._update_single_completer_model(self.ability_name_model, self.all_ability_names, "ability_name")
+            self.edit_text(ab_element, new_text_stripped, "Change base ability")
 
 
     def part_attribute_changed(self, part_element, attr_name, new_value):
@@ -2140,8 +7007,7 @@ class WitcherXMLEditor(QMainWindow):
         old_value = part_element.get(attr_name)
         if old_value != new_value_stripped:
             logging.info(f"Recycling part attribute '{attr_name}' changed from '{old_value}' to '{new_value_stripped}'")
-            part_element.set(attr_name, new_value_stripped)
-            self.mark_file_modified(self.current_selection_filepath)
+            self.edit_attribute(part_element, attr_name, new_value_stripped, f"Change recycling part {attr_name}")
 
     def part_text_changed(self, part_element, new_text):
         """Handles text change (item name) for a Recycling Part."""
@@ -2150,16 +7016,7 @@ class WitcherXMLEditor(QMainWindow):
         current_text = part_element.text.strip() if part_element.text else ""
         if current_text != new_text_stripped:
             logging.info(f"Recycling part name changed from '{current_text}' to '{new_text_stripped}'")
-            part_element.text = new_text_stripped
-            self.mark_file_modified(self.current_selection_filepath)
-            # Update item name model if it's a new name
-            if new_text_stripped and new_text_stripped not in self.all_item_names:
-                self.all_item_names.add(new_text_stripped)
-                self._update_single_completer_model(self.item_name_model, self.all_item_names, "item_name")
-            # Also update recycling part name model
-            if new_text_stripped and new_text_stripped not in self.all_recycling_part_names:
-                self.all_recycling_part_names.add(new_text_stripped)
-                self._update_single_completer_model(self.recycling_part_name_model, self.all_recycling_part_names, "recycling_part_name")
+            self.edit_text(part_element, new_text_stripped, "Change recycling part")
 
 
     def variant_attribute_changed(self, var_element, attr_name, new_value):
@@ -2171,10 +7028,7 @@ class WitcherXMLEditor(QMainWindow):
 
         if old_value_norm != new_value_stripped:
              logging.info(f"Variant attribute '{attr_name}' changed from '{old_value_norm}' to '{new_value_stripped}'")
-             var_element.set(attr_name, new_value_stripped)
-             self.mark_file_modified(self.current_selection_filepath)
-             # Optional: Update relevant completer model if the value came from one
-             self._update_completer_set_and_model_from_value(attr_name, new_value_stripped)
+             self.edit_attribute(var_element, attr_name, new_value_stripped, f"Change variant {attr_name}")
 
 
     def nested_variant_item_text_changed(self, child_element, new_text):
@@ -2184,65 +7038,59 @@ class WitcherXMLEditor(QMainWindow):
         current_text = child_element.text.strip() if child_element.text else ""
         if current_text != new_text_stripped:
             logging.info(f"Nested variant element <{child_element.tag}> text changed from '{current_text}' to '{new_text_stripped}'")
-            child_element.text = new_text_stripped
-            self.mark_file_modified(self.current_selection_filepath)
-            # Update relevant name model if it's a new name
-            tag_lower = child_element.tag.lower()
-            if tag_lower == TAG_ITEM and new_text_stripped and new_text_stripped not in self.all_item_names:
-                 self.all_item_names.add(new_text_stripped)
-                 self._update_single_completer_model(self.item_name_model, self.all_item_names, "item_name")
-            elif tag_lower == TAG_ABILITY and new_text_stripped and new_text_stripped not in self.all_ability_names:
-                 self.all_ability_names.add(new_text_stripped)
-                 self._update_single_completer_model(self.ability_name_model, self.all_ability_names, "ability_name")
-
-
-    def _update_completer_set_and_model_from_value(self, attr_name, new_value):
-         """Checks if an attribute corresponds to a known completer set and updates if value is new."""
-         if not new_value: return # Don't add empty strings
-
-         target_set = None
-         target_model = None
-         model_name = ""
-
-         if attr_name == 'category':
-             target_set, target_model, model_name = self.all_item_categories, self.item_category_model, "item_category"
-         elif attr_name == 'ability_mode':
-              target_set, target_model, model_name = self.all_ability_modes, self.ability_mode_model, "ability_mode"
-         elif attr_name == 'equip_template':
-              target_set, target_model, model_name = self.all_equip_templates, self.equip_template_model, "equip_template"
-         # Add other attribute -> set/model mappings here...
-         elif attr_name == 'equip_slot':
-              target_set, target_model, model_name = self.all_equip_slots, self.equip_slot_model, "equip_slot"
-         elif attr_name == 'hold_slot':
-              target_set, target_model, model_name = self.all_hold_slots, self.hold_slot_model, "hold_slot"
-         # ... etc.
-
-         if target_set is not None and new_value not in target_set:
-              logging.debug(f"Adding new value '{new_value}' to set/model for '{model_name}' (from attribute '{attr_name}')")
-              target_set.add(new_value)
-              self._update_single_completer_model(target_model, target_set, model_name)
+            self.edit_text(child_element, new_text_stripped, f"Change variant {child_element.tag}")
+
+
+    def set_entry_field(self, element, file_path, field, value):
+        """Sets an entry attribute or a 'property.attribute' field, creating the property if missing."""
+        prop, attr = split_field(field)
+        batch = self.begin_edit()
+        target = element
+        if prop is not None:
+            target = element.find(prop)
+            if target is None:
+                logging.info(f"Creating property <{prop}> on '{element.get('name')}' for field '{field}'")
+                target = batch.sub_element(element, prop)
+        logging.debug(f"Setting field '{field}' = '{value}' on '{element.get('name')}'")
+        batch.set_attr(target, attr, value)
+        self.commit_edit(batch, f"Set {field} of '{element.get('name')}'")
+
+    def _entry_field_names(self, entry_type, element):
+        """Returns the editable fields of an entry: its attributes plus 'property.attribute' pairs."""
+        known_tags = self.KNOWN_ABILITY_CHILD_TAGS if entry_type == TAG_ABILITY else self.KNOWN_ITEM_CHILD_TAGS
+        fields = [key for key in element.attrib.keys() if key != 'name']
+        for child in element:
+            if ET.iselement(child) and child.tag not in known_tags:
+                fields.extend(f"{child.tag}{FIELD_SEPARATOR}{key}" for key in child.attrib.keys())
+        return fields
+
+    def _refresh_details_if_showing(self, elements):
+        """Re-populates the details pane if it currently shows one of the given entry elements."""
+        if self.current_selection_element is not None and any(e is self.current_selection_element for e in elements):
+            self.populate_details(self.current_selection_name, self.current_selection_type)
 
 
     # --- Add Buttons for Sections ---
 
-    def _find_or_create_section_node(self, parent_element, section_tag):
-        """Finds a direct child node or creates it if it doesn't exist."""
+    def _find_or_create_section_node(self, parent_element, section_tag, batch):
+        """Finds a direct child node or creates it (as part of batch) if it doesn't exist."""
         node = parent_element.find(section_tag)
         if node is None:
              logging.info(f"Creating missing section node <{section_tag}> under <{parent_element.tag}>")
-             node = ET.SubElement(parent_element, section_tag)
-             # Mark modified? Assume caller handles it after adding child.
+             node = batch.sub_element(parent_element, section_tag)
+             # Committed by the caller together with the child it adds.
         return node
 
     def add_base_ability(self):
         """Adds a new, empty base ability reference to the item."""
         if self._populating_details or not self.current_selection_element or self.current_selection_type != TAG_ITEM: return
         logging.info("Adding new base ability reference...")
-        parent_node = self._find_or_create_section_node(self.current_selection_element, TAG_BASE_ABILITIES)
+        batch = self.begin_edit()
+        parent_node = self._find_or_create_section_node(self.current_selection_element, TAG_BASE_ABILITIES, batch)
         if parent_node is not None:
-            new_child = ET.SubElement(parent_node, TAG_ABILITY_REF) # Creates <a></a>
-            self.add_base_ability_widget(new_child) # Add the UI widget for it
-            self.mark_file_modified(self.current_selection_filepath)
+            new_child = batch.sub_element(parent_node, TAG_ABILITY_REF) # Creates <a></a>
+            self.add_base_ability_widget(new_child) # Bind a row for it
+            self.commit_edit(batch, "Add base ability")
             logging.debug(f"Added new <{TAG_ABILITY_REF}> to <{TAG_BASE_ABILITIES}>")
             # Ensure the section is visible if it was hidden
             if not self.base_abilities_section.isVisible():
@@ -2255,13 +7103,14 @@ class WitcherXMLEditor(QMainWindow):
         """Adds a new, default recycling part to the item."""
         if self._populating_details or not self.current_selection_element or self.current_selection_type != TAG_ITEM: return
         logging.info("Adding new recycling part...")
-        parent_node = self._find_or_create_section_node(self.current_selection_element, TAG_RECYCLING_PARTS)
+        batch = self.begin_edit()
+        parent_node = self._find_or_create_section_node(self.current_selection_element, TAG_RECYCLING_PARTS, batch)
         if parent_node is not None:
-            new_child = ET.SubElement(parent_node, TAG_PARTS)
-            new_child.set('count', '1') # Default count
-            new_child.text = "New_Part_Name" # Default placeholder text
+            new_child = batch.sub_element(parent_node, TAG_PARTS,
+                                          {'count': '1'}, # Default count
+                                          "New_Part_Name") # Default placeholder text
             self.add_recycling_part_widget(new_child)
-            self.mark_file_modified(self.current_selection_filepath)
+            self.commit_edit(batch, "Add recycling part")
             logging.debug(f"Added new <{TAG_PARTS}> to <{TAG_RECYCLING_PARTS}>")
             if not self.recycling_parts_section.isVisible():
                  self.set_item_specific_visibility(True)
@@ -2272,14 +7121,17 @@ class WitcherXMLEditor(QMainWindow):
         """Adds a new, default variant to the item."""
         if self._populating_details or not self.current_selection_element or self.current_selection_type != TAG_ITEM: return
         logging.info("Adding new variant...")
-        parent_node = self._find_or_create_section_node(self.current_selection_element, TAG_VARIANTS)
+        batch = self.begin_edit()
+        parent_node = self._find_or_create_section_node(self.current_selection_element, TAG_VARIANTS, batch)
         if parent_node is not None:
-            new_child = ET.SubElement(parent_node, TAG_VARIANT)
             # Add some default attributes to make it useful
-            new_child.set('category', self.current_selection_element.get('category', 'DefaultCategory')) # Inherit category?
-            new_child.set('equip_template', 'DefaultTemplate') # Add default template
+            new_child = batch.sub_element(parent_node, TAG_VARIANT, {
+                'category': self.current_selection_element.get('category', 'DefaultCategory'), # Inherit category?
+                'equip_template': 'DefaultTemplate', # Add default template
+            })
+            self.variant_expanded_changed(new_child, True) # Open the new variant for editing
             self.add_variant_widget(new_child)
-            self.mark_file_modified(self.current_selection_filepath)
+            self.commit_edit(batch, "Add variant")
             logging.debug(f"Added new <{TAG_VARIANT}> to <{TAG_VARIANTS}>")
             if not self.variants_section.isVisible():
                  self.set_item_specific_visibility(True)
@@ -2296,7 +7148,7 @@ class WitcherXMLEditor(QMainWindow):
          dialog.setLabelText("Name of the new attribute for <item>:")
          line_edit = dialog.findChild(QLineEdit)
          if line_edit:
-             self._attach_completer(line_edit, self.item_attribute_name_model, "New Item Attribute Name")
+             self._attach_field_completer(line_edit, f"{TAG_ITEM}@*", "New Item Attribute Name")
 
          if dialog.exec() == QDialog.DialogCode.Accepted:
             attr_name = dialog.textValue().strip().replace(" ", "_")
@@ -2308,13 +7160,7 @@ class WitcherXMLEditor(QMainWindow):
                 return
 
             logging.info(f"Adding item attribute '{attr_name}' to '{self.current_selection_name}'")
-            self.current_selection_element.set(attr_name, "") # Add with empty value
-            self.mark_file_modified(self.current_selection_filepath)
-
-            # Update completer model if it's a new attribute name
-            if attr_name not in self.all_item_attribute_names:
-                self.all_item_attribute_names.add(attr_name)
-                self._update_single_completer_model(self.item_attribute_name_model, self.all_item_attribute_names, "item_attribute_name")
+            self.edit_attribute(self.current_selection_element, attr_name, "", f"Add attribute {attr_name}") # Add with empty value
 
             # Refresh the item attributes section UI to show the new attribute
             # Set flag temporarily to avoid triggering change signals during refresh
@@ -2328,9 +7174,10 @@ class WitcherXMLEditor(QMainWindow):
             logging.debug(f"Added item attribute '{attr_name}' and refreshed UI section.")
 
 
-    def add_variant_attribute(self, variant_element, attributes_layout, add_button_widget):
-         """Adds a new attribute to a specific <variant> element and updates its UI."""
+    def add_variant_attribute(self, variant_row):
+         """Adds a new attribute to the <variant> element of a variant row and updates the row."""
          if self._populating_details: return
+         variant_element = variant_row.element
 
          dialog = QInputDialog(self)
          dialog.setWindowTitle("Add Variant Attribute")
@@ -2338,7 +7185,7 @@ class WitcherXMLEditor(QMainWindow):
          line_edit = dialog.findChild(QLineEdit)
          if line_edit:
              # Suggest existing variant attribute names
-             self._attach_completer(line_edit, self.variant_attribute_name_model, "New Variant Attribute Name")
+             self._attach_field_completer(line_edit, f"{self.VARIANT_FIELD_PATH}@*", "New Variant Attribute Name")
 
          if dialog.exec() == QDialog.DialogCode.Accepted:
             attr_name = dialog.textValue().strip().replace(" ", "_")
@@ -2350,57 +7197,17 @@ class WitcherXMLEditor(QMainWindow):
                 return
 
             logging.info(f"Adding variant attribute '{attr_name}'")
-            variant_element.set(attr_name, "") # Add with empty value
-            self.mark_file_modified(self.current_selection_filepath)
-
-            # Update global completer model if it's a new variant attribute name globally
-            if attr_name not in self.all_variant_attribute_names:
-                self.all_variant_attribute_names.add(attr_name)
-                self._update_single_completer_model(self.variant_attribute_name_model, self.all_variant_attribute_names, "variant_attribute_name")
-
-            # --- Dynamically update the variant's attribute UI ---
-            if not isinstance(attributes_layout, QGridLayout):
-                 logging.error("Cannot add variant attribute widget: Invalid layout passed.")
-                 return
-
-            # Find the row of the add button
-            button_index = attributes_layout.indexOf(add_button_widget)
-            if button_index == -1:
-                 logging.error("Cannot find Add Attribute button in variant layout to insert before.")
-                 # Fallback: just append? Might mess up layout. Better to log error.
-                 return
-
-            button_row, _, _, _ = attributes_layout.getItemPosition(button_index)
-
-            # Remove the button temporarily
-            attributes_layout.takeAt(button_index)
-            # add_button_widget.hide() # Hiding might be simpler than removing/re-adding
-
-            # Add the new label and input in the button's previous row
-            attr_label = QLabel(f"{attr_name}:")
-            attr_label.setTextInteractionFlags(Qt.TextInteractionFlag.TextSelectableByMouse | Qt.TextInteractionFlag.TextSelectableByKeyboard)
-            attr_input = QLineEdit("")
-            attr_input.setObjectName(f"input_variant_attr_{attr_name}_{id(variant_element)}")
-
-            attributes_layout.addWidget(attr_label, button_row, 0)
-            attributes_layout.addWidget(attr_input, button_row, 1)
-
-            # Attach completer and connect signal for the new input
-            self._attach_completer_for_variant_attribute(attr_name, attr_input)
-            attr_input.editingFinished.connect(
-                lambda k=attr_name, i=attr_input, elem=variant_element: self.variant_attribute_changed(elem, k, i.text()))
-
-            # Re-add the button in the next row
-            attributes_layout.addWidget(add_button_widget, button_row + 1, 0, 1, 2, Qt.AlignmentFlag.AlignLeft)
-            # add_button_widget.show()
+            self.edit_attribute(variant_element, attr_name, "", f"Add variant attribute {attr_name}") # Add with empty value
 
+            # --- Show the new attribute in the variant's row ---
+            variant_row.add_attribute_row(attr_name)
             logging.debug(f"Added attribute '{attr_name}' to variant UI layout.")
-            # --- End UI Update ---
 
 
-    def add_nested_variant_item(self, variant_element, nested_items_layout):
-        """Adds a new nested element (like <item>) inside a <variant>."""
+    def add_nested_variant_item(self, variant_row):
+        """Adds a new nested element (like <item>) inside the <variant> of a variant row."""
         if self._populating_details: return
+        variant_element = variant_row.element
 
         # --- Get Tag Name ---
         tag_dialog = QInputDialog(self)
@@ -2410,7 +7217,7 @@ class WitcherXMLEditor(QMainWindow):
         tag_dialog.setTextValue(TAG_ITEM) # Default to 'item'
         tag_line_edit = tag_dialog.findChild(QLineEdit)
         if tag_line_edit:
-             self._attach_completer(tag_line_edit, self.variant_nested_tag_model, "New Nested Element Tag")
+             self._attach_field_completer(tag_line_edit, f"{self.VARIANT_FIELD_PATH}/*", "New Nested Element Tag")
 
         if tag_dialog.exec() != QDialog.DialogCode.Accepted: return
         tag_name = tag_dialog.textValue().strip().replace(" ", "_")
@@ -2425,28 +7232,19 @@ class WitcherXMLEditor(QMainWindow):
         text_dialog.setInputMode(QInputDialog.InputMode.TextInput)
         text_line_edit = text_dialog.findChild(QLineEdit)
         if text_line_edit:
-             context_name = f"Nested <{tag_name}> Text"
-             tag_lower = tag_name.lower()
-             if tag_lower == TAG_ITEM: self._attach_completer(text_line_edit, self.item_name_model, context_name)
-             elif tag_lower == TAG_ABILITY: self._attach_completer(text_line_edit, self.ability_name_model, context_name)
-             # Add others if needed
+             self._attach_field_completer(text_line_edit, f"{self.VARIANT_FIELD_PATH}/{tag_name.lower()}#text", f"Nested <{tag_name}> Text")
 
         if text_dialog.exec() != QDialog.DialogCode.Accepted: return
         text_value = text_dialog.textValue().strip() # Allow empty text? Yes.
 
         # --- Add to XML and UI ---
         logging.info(f"Adding nested element <{tag_name}> with text '{text_value}' to variant.")
-        new_child = ET.SubElement(variant_element, tag_name)
-        new_child.text = text_value
-        self.mark_file_modified(self.current_selection_filepath)
-
-        # Add UI widget for the new element
-        self.add_nested_variant_item_widget(new_child, variant_element, nested_items_layout)
+        batch = self.begin_edit()
+        new_child = batch.sub_element(variant_element, tag_name, text=text_value)
+        self.commit_edit(batch, f"Add variant <{tag_name}>")
 
-        # Update model for nested tags if it's a new tag type
-        if tag_name not in self.all_variant_nested_tags:
-             self.all_variant_nested_tags.add(tag_name)
-             self._update_single_completer_model(self.variant_nested_tag_model, self.all_variant_nested_tags, "variant_nested_tag")
+        # Bind a row for the new element
+        variant_row.add_nested_row(new_child)
 
         logging.debug(f"Added nested element <{tag_name}> to variant and UI.")
 
@@ -2456,13 +7254,16 @@ class WitcherXMLEditor(QMainWindow):
         if self._populating_details: return
         logging.info(f"Removing nested element <{element_to_remove.tag}> from variant.")
         try:
-            parent_variant_element.remove(element_to_remove)
-            self.mark_file_modified(self.current_selection_filepath)
-            widget_to_remove.deleteLater()
-            logging.debug("Removed nested element and widget.")
+            batch = self.begin_edit()
+            batch.remove(element_to_remove, parent_variant_element)
+            self.commit_edit(batch, f"Remove variant <{element_to_remove.tag}>")
+            widget_to_remove.pool.release(widget_to_remove)
+            for variant_row in self.variant_rows.rows[:self.variant_rows.used]:
+                if variant_row.element is parent_variant_element: variant_row.update_summary()
+            logging.debug("Removed nested element and released its row.")
         except ValueError:
             logging.error(f"Element <{element_to_remove.tag}> not found in parent variant during removal (ValueError).", exc_info=True)
-            widget_to_remove.deleteLater() # Remove widget anyway
+            widget_to_remove.pool.release(widget_to_remove) # Release the row anyway
         except Exception as e:
             logging.error(f"Error removing nested variant item widget: {e}", exc_info=True)
             QMessageBox.critical(self, "Removal Error", f"An error occurred removing the nested <{element_to_remove.tag}> element:\n{e}")
@@ -2483,7 +7284,7 @@ class WitcherXMLEditor(QMainWindow):
         dialog.setInputMode(QInputDialog.InputMode.TextInput)
         line_edit = dialog.findChild(QLineEdit)
         if line_edit:
-            self._attach_completer(line_edit, self.property_name_model, "New Property Name")
+            self._attach_field_completer(line_edit, f"{TAG_ABILITY}/*", "New Property Name")
 
         if dialog.exec() == QDialog.DialogCode.Accepted:
             prop_name = dialog.textValue().strip().replace(" ", "_") # Basic cleanup
@@ -2500,33 +7301,73 @@ class WitcherXMLEditor(QMainWindow):
 
             # --- Add element and update UI ---
             logging.info(f"Adding property '{prop_name}' to ability '{self.current_selection_name}'")
-            new_element = ET.SubElement(self.current_selection_element, prop_name)
+            batch = self.begin_edit()
             # Add some sensible default attributes
-            new_element.set('type', 'add')
-            new_element.set('min', '0')
-            new_element.set('max', '0') # Add max as well?
-            self.mark_file_modified(self.current_selection_filepath)
-
-            # Update completer model for property *names* if new
-            if prop_name not in self.all_property_names:
-                self.all_property_names.add(prop_name)
-                self._update_single_completer_model(self.property_name_model, self.all_property_names, "property_name")
-
-            # Update completer model for property *attribute names* if defaults are new
-            added_attrs = {'type', 'min', 'max'}
-            new_global_attrs = added_attrs - self.all_property_attribute_names
-            if new_global_attrs:
-                 self.all_property_attribute_names.update(new_global_attrs)
-                 self._update_single_completer_model(self.property_attribute_name_model, self.all_property_attribute_names, "property_attribute_name")
-
-            # Add the UI widget for the new property
-            prop_widget = PropertyWidget(new_element, self.current_selection_filepath, self)
-            self.properties_layout.addWidget(prop_widget)
+            new_element = batch.sub_element(self.current_selection_element, prop_name,
+                                            {'type': 'add', 'min': '0', 'max': '0'}) # Add max as well?
+            self.commit_edit(batch, f"Add property '{prop_name}'") # Completion index follows via the change bus
+
+            # Show the new property in the table or a pooled row, whichever the ability uses
+            if self._property_table_active:
+                self.property_model.append_element(new_element)
+                self._fit_property_table()
+            else:
+                self.property_rows.acquire().bind(new_element, self.current_selection_filepath)
             if not self.properties_section.isVisible():
                  self.set_ability_specific_visibility(True)
             logging.debug(f"Added property UI widget for: {prop_name}")
 
 
+    def add_property_attribute(self, property_element, entry_type=TAG_ABILITY):
+        """Asks for a name and adds an empty attribute to a property element. Returns the name, or None."""
+        dialog = QInputDialog(self)
+        dialog.setWindowTitle("Add Property Attribute")
+        dialog.setLabelText("Name of new attribute:")
+        line_edit = dialog.findChild(QLineEdit)
+        if line_edit:
+            # Attach model with known property attribute names
+            self._attach_field_completer(line_edit, f"{entry_type}/*@*", "New Property Attribute Name")
+
+        if dialog.exec() != QDialog.DialogCode.Accepted:
+            return None
+        attr_name = dialog.textValue().strip().replace(" ", "_") # Basic cleanup
+        if not attr_name:
+            QMessageBox.warning(self, "Error", "Attribute name cannot be empty.")
+            return None
+        if attr_name in property_element.attrib:
+            QMessageBox.warning(self, "Error", f"Attribute '{attr_name}' already exists for this property.")
+            return None
+        default_value = "" # Can set a default like "0" or "false"
+        logging.info(f"Adding attribute '{attr_name}' to <{property_element.tag}> with default value '{default_value}'")
+        self.edit_attribute(property_element, attr_name, default_value, f"Add attribute {property_element.tag}.{attr_name}")
+        return attr_name
+
+    def remove_property(self, property_element, file_path):
+        """Asks for confirmation and removes a property element.
+
+        Returns True when the property's row should go away (removed, or its parent is already gone).
+        """
+        confirm = QMessageBox.question(self, "Remove Property", f"Are you sure you want to remove the entire property '{property_element.tag}'?")
+        if confirm != QMessageBox.StandardButton.Yes:
+            return False
+        # Find parent element using the editor's helper
+        parent_element = self.get_parent_element(property_element, file_path)
+        if parent_element is None:
+            logging.error(f"Could not find parent element for <{property_element.tag}> to remove.")
+            return True
+        try:
+            logging.info(f"Removing property element <{property_element.tag}> from parent <{parent_element.tag}> in file {os.path.basename(file_path)}")
+            batch = self.begin_edit()
+            batch.remove(property_element, parent_element)
+            self.commit_edit(batch, f"Remove property '{property_element.tag}'")
+            logging.info(f"Removed property element: {property_element.tag}")
+        except ValueError:
+            logging.error(f"Element {property_element.tag} not found in parent during remove_property.", exc_info=True)
+        except Exception as e:
+            logging.error(f"Error removing property element: {e}", exc_info=True)
+        return True
+
+
     # --- Add/Remove/Duplicate Main Entries ---
 
     def add_entry(self):
@@ -2541,7 +7382,6 @@ class WitcherXMLEditor(QMainWindow):
         entry_type = TAG_ABILITY if current_tab_index == 0 else TAG_ITEM
         entry_type_name = entry_type.capitalize() # For dialogs
         data_map = self.abilities_map if entry_type == TAG_ABILITY else self.items_map
-        list_widget = self.ability_list if entry_type == TAG_ABILITY else self.item_list
 
         new_name, ok = QInputDialog.getText(self, f"Add New {entry_type_name}", f"Enter the unique name for the new {entry_type}:")
 
@@ -2555,7 +7395,8 @@ class WitcherXMLEditor(QMainWindow):
                 return
 
             # --- Determine Target File and Parent Node ---
-            target_filepath, parent_node = self._find_or_create_target_node(entry_type)
+            batch = self.begin_edit()
+            target_filepath, parent_node = self._find_or_create_target_node(entry_type, batch)
 
             if parent_node is None or target_filepath is None:
                  QMessageBox.critical(self, "Critical Error", f"Could not find or create a suitable parent node (<{TAG_ABILITIES if entry_type == TAG_ABILITY else TAG_ITEMS}>) in any loaded XML file.")
@@ -2563,25 +7404,11 @@ class WitcherXMLEditor(QMainWindow):
 
             # --- Create New Element with Defaults ---
             logging.info(f"Adding new {entry_type} '{new_name}' to file '{os.path.basename(target_filepath)}'...")
-            new_element = self._create_default_element(entry_type, new_name, parent_node)
-
-            # --- Update Data Structures and UI ---
-            data_map[new_name] = {'filepath': target_filepath, 'element': new_element}
-            self.mark_file_modified(target_filepath)
-
-            # Add to list and select
-            list_item = QListWidgetItem(new_name)
-            list_widget.addItem(list_item)
-            list_widget.sortItems()
-            list_widget.setCurrentItem(list_item) # Selection triggers populate_details
+            self._create_default_element(entry_type, new_name, parent_node, batch)
 
-            # Update relevant name completer model
-            if entry_type == TAG_ABILITY:
-                self.all_ability_names.add(new_name)
-                self._update_single_completer_model(self.ability_name_model, self.all_ability_names, "ability_name")
-            else:
-                self.all_item_names.add(new_name)
-                self._update_single_completer_model(self.item_name_model, self.all_item_names, "item_name")
+            # --- Commit (adds it to the map and list) and select ---
+            self.commit_edit(batch, f"Add {entry_type} '{new_name}'")
+            self.select_entry(entry_type, new_name) # Selection triggers populate_details
 
             logging.info(f"Successfully added new {entry_type}: {new_name}")
             self.statusBar.showMessage(f"Added: {new_name}", 3000)
@@ -2591,8 +7418,8 @@ class WitcherXMLEditor(QMainWindow):
         # else: User cancelled dialog
 
 
-    def _find_or_create_target_node(self, entry_type):
-        """Finds the best file/parent node (<abilities> or <items>) to add a new entry to, creating if necessary."""
+    def _find_or_create_target_node(self, entry_type, batch):
+        """Finds the best file/parent node (<abilities> or <items>) to add a new entry to, creating it (in batch) if necessary."""
         parent_node_tag = TAG_ABILITIES if entry_type == TAG_ABILITY else TAG_ITEMS
         target_filepath = None
         parent_node = None
@@ -2615,9 +7442,9 @@ class WitcherXMLEditor(QMainWindow):
                 logging.warning(f"Node <{parent_node_tag}> not found in '{target_filepath}'. Creating structure...")
                 # Ensure <definitions> exists (common practice)
                 if definitions_node is None:
-                    definitions_node = ET.SubElement(root_to_modify, 'definitions')
+                    definitions_node = batch.sub_element(root_to_modify, 'definitions')
                     logging.debug("  Created <definitions> node.")
-                parent_node = ET.SubElement(definitions_node, parent_node_tag)
+                parent_node = batch.sub_element(definitions_node, parent_node_tag)
                 logging.debug(f"  Created <{parent_node_tag}> node inside <definitions>.")
             return target_filepath, parent_node
 
@@ -2644,18 +7471,18 @@ class WitcherXMLEditor(QMainWindow):
         root_to_modify = self.loaded_files[target_filepath]['root']
         definitions_node = root_to_modify.find('definitions')
         if definitions_node is None:
-            definitions_node = ET.SubElement(root_to_modify, 'definitions')
+            definitions_node = batch.sub_element(root_to_modify, 'definitions')
             logging.debug(f"  Created <definitions> node in {target_filepath}.")
         # Check again inside definitions just in case
         parent_node = definitions_node.find(parent_node_tag)
         if parent_node is None:
-            parent_node = ET.SubElement(definitions_node, parent_node_tag)
+            parent_node = batch.sub_element(definitions_node, parent_node_tag)
             logging.debug(f"  Created <{parent_node_tag}> node inside <definitions> in {target_filepath}.")
         return target_filepath, parent_node
 
-    def _create_default_element(self, entry_type, name, parent_node):
-        """Creates a new ability/item element with default children."""
-        new_element = ET.SubElement(parent_node, entry_type)
+    def _create_default_element(self, entry_type, name, parent_node, batch):
+        """Creates a new ability/item element with default children and appends it to parent_node in batch."""
+        new_element = ET.Element(entry_type)
         new_element.set('name', name)
         ET.SubElement(new_element, TAG_TAGS) # Add empty tags element
 
@@ -2671,6 +7498,7 @@ class WitcherXMLEditor(QMainWindow):
             # ET.SubElement(new_element, ...)
             pass
 
+        batch.insert(parent_node, len(parent_node), new_element)
         logging.debug(f"Created default structure for new {entry_type} '{name}'")
         return new_element
 
@@ -2686,8 +7514,6 @@ class WitcherXMLEditor(QMainWindow):
         element = self.current_selection_element
         file_path = self.current_selection_filepath
         entry_type_name = entry_type.capitalize()
-        data_map = self.abilities_map if entry_type == TAG_ABILITY else self.items_map
-        list_widget = self.ability_list if entry_type == TAG_ABILITY else self.item_list
 
         confirm = QMessageBox.question(self, f"Remove {entry_type_name}",
                                      f"Are you sure you want to permanently remove the {entry_type} '{name}'?\n\n(This action affects the XML file '{os.path.basename(file_path)}'.)",
@@ -2700,37 +7526,15 @@ class WitcherXMLEditor(QMainWindow):
 
             if parent_element is not None:
                 try:
-                    parent_element.remove(element)
-                    self.mark_file_modified(file_path)
+                    batch = self.begin_edit()
+                    batch.remove(element, parent_element)
+                    self.commit_edit(batch, f"Remove {entry_type} '{name}'") # Also drops it from the map and list
                     logging.info(f"Removed element <{entry_type}> '{name}' from XML.")
 
-                    # Remove from internal tracking
-                    if name in data_map:
-                        del data_map[name]
-                        logging.debug(f"Removed '{name}' from internal {entry_type} map.")
-
-                    # Remove from UI list
-                    items = list_widget.findItems(name, Qt.MatchFlag.MatchExactly)
-                    if items:
-                        row = list_widget.row(items[0])
-                        list_widget.takeItem(row)
-                        logging.debug(f"Removed '{name}' from UI list.")
-                    else:
-                        logging.warning(f"Could not find item '{name}' in UI list to remove.")
-
                     self.clear_details_pane() # Clear the right pane
                     self.statusBar.showMessage(f"Removed: {name}", 3000)
                     logging.info(f"Successfully removed {entry_type}: {name}")
 
-                    # Update name completer model
-                    if entry_type == TAG_ABILITY:
-                        if name in self.all_ability_names: self.all_ability_names.remove(name)
-                        self._update_single_completer_model(self.ability_name_model, self.all_ability_names, "ability_name")
-                    else:
-                        if name in self.all_item_names: self.all_item_names.remove(name)
-                        self._update_single_completer_model(self.item_name_model, self.all_item_names, "item_name")
-
-
                 except ValueError:
                     logging.error(f"Element '{name}' not found in parent <{parent_element.tag}> during remove attempt (ValueError).", exc_info=True)
                     QMessageBox.critical(self, "Internal Error", f"Could not find the element '{name}' in the XML structure to remove it.")
@@ -2756,7 +7560,6 @@ class WitcherXMLEditor(QMainWindow):
         entry_type = self.current_selection_type
         entry_type_name = entry_type.capitalize()
         data_map = self.abilities_map if entry_type == TAG_ABILITY else self.items_map
-        list_widget = self.ability_list if entry_type == TAG_ABILITY else self.item_list
 
         new_name_suggestion = f"{original_name}_copy"
         # Ensure suggestion is unique
@@ -2791,35 +7594,21 @@ class WitcherXMLEditor(QMainWindow):
                     new_element.set('name', new_name) # Set the new name
 
                     # Insert the new element immediately after the original one if possible
+                    batch = self.begin_edit()
                     try:
-                        parent_list = list(parent_element) # Get children as a list
-                        original_index = parent_list.index(original_element)
-                        parent_element.insert(original_index + 1, new_element)
+                        original_index = parent_element.index(original_element)
+                        batch.insert(parent_element, original_index + 1, new_element)
                         logging.debug(f"Inserted duplicate after original at index {original_index + 1}.")
                     except (ValueError, IndexError):
                         # Fallback if original not found or index issue
                         logging.warning("Could not find original element index. Appending duplicate to the end.")
-                        parent_element.append(new_element)
+                        batch.insert(parent_element, len(parent_element), new_element)
                     # --- End Insertion ---
 
-                    # Update data map and mark file modified
-                    data_map[new_name] = {'filepath': original_filepath, 'element': new_element}
-                    self.mark_file_modified(original_filepath)
+                    # Commit (adds it to the map/list and marks the file modified), then select
+                    self.commit_edit(batch, f"Duplicate {entry_type} '{original_name}'")
                     logging.info(f"Duplicated '{original_name}' as '{new_name}' in XML.")
-
-                    # Add to UI list and select
-                    list_item = QListWidgetItem(new_name)
-                    list_widget.addItem(list_item)
-                    list_widget.sortItems()
-                    list_widget.setCurrentItem(list_item) # Selection triggers populate_details
-
-                    # Update name completer model
-                    if entry_type == TAG_ABILITY:
-                        self.all_ability_names.add(new_name)
-                        self._update_single_completer_model(self.ability_name_model, self.all_ability_names, "ability_name")
-                    else:
-                        self.all_item_names.add(new_name)
-                        self._update_single_completer_model(self.item_name_model, self.all_item_names, "item_name")
+                    self.select_entry(entry_type, new_name) # Selection triggers populate_details
 
                     self.statusBar.showMessage(f"Duplicated as: {new_name}", 3000)
                     logging.info(f"Successfully duplicated '{original_name}' as '{new_name}'.")
@@ -2827,8 +7616,6 @@ class WitcherXMLEditor(QMainWindow):
                 except Exception as e:
                     logging.error(f"Error duplicating {entry_type} '{original_name}': {e}", exc_info=True)
                     QMessageBox.critical(self, "Duplication Error", f"An error occurred while duplicating '{original_name}':\n{e}")
-                    # Clean up potentially inconsistent state? Difficult.
-                    if new_name in data_map: del data_map[new_name] # Remove from map if added
 
             else:
                 # Parent not found - should not happen if selection is valid
@@ -2839,8 +7626,418 @@ class WitcherXMLEditor(QMainWindow):
              QMessageBox.warning(self, "Error", "The name cannot be empty.")
         # else: User cancelled dialog
 
+    # --- Tools ---
+
+    def open_grid_view(self):
+        """Opens a non-modal grid view for the entries of the current tab."""
+        if not self.loaded_files:
+            QMessageBox.warning(self, "Action Failed", "No XML files are loaded. Please open a folder first.")
+            return
+        entry_type = TAG_ABILITY if self.tab_widget.currentIndex() == 0 else TAG_ITEM
+        logging.info(f"Opening grid view for {entry_type} entries.")
+        dialog = EntryGridDialog(self, entry_type, self)
+        dialog.setAttribute(Qt.WidgetAttribute.WA_DeleteOnClose)
+        dialog.show()
+
+    def open_jobs_panel(self):
+        """Opens the non-modal list of background jobs."""
+        dialog = JobsDialog(self, self)
+        dialog.setAttribute(Qt.WidgetAttribute.WA_DeleteOnClose)
+        dialog.show()
+
+    def _update_job_status(self, *_):
+        """Shows the most urgent running job in the status bar progress (hidden when idle)."""
+        active = self.jobs.active_jobs()
+        running = [job for job in active if job.state == Job.RUNNING]
+        self.jobs_button.setText(f"Jobs ({len(active)})")
+        self.jobs_button.setVisible(bool(active))
+        if not running:
+            self.job_progress.hide()
+            return
+        job = min(running, key=lambda job: (job.priority, job.id))
+        if job.total:
+            self.job_progress.setRange(0, job.total)
+            self.job_progress.setValue(min(job.done, job.total))
+            self.job_progress.setFormat(f"{job.title}: {job.done}/{job.total}")
+        else:
+            self.job_progress.setRange(0, 0) # Busy indicator
+        self.job_progress.setToolTip(job.message)
+        self.job_progress.show()
+
+    def open_xml_tree(self):
+        """Opens a non-modal raw XML tree of a loaded file, expanded to the current entry."""
+        if not self.loaded_files:
+            QMessageBox.warning(self, "Action Failed", "No XML files are loaded. Please open a folder first.")
+            return
+        logging.info("Opening XML tree view.")
+        dialog = XmlTreeDialog(self, self)
+        dialog.setAttribute(Qt.WidgetAttribute.WA_DeleteOnClose)
+        dialog.show()
+
+    def selected_entries(self, entry_type):
+        """Returns [(name, entry_data)] for the visible selected entries of the given list."""
+        list_widget = self.ability_list if entry_type == TAG_ABILITY else self.item_list
+        data_map = self.abilities_map if entry_type == TAG_ABILITY else self.items_map
+        entries = []
+        for list_item in list_widget.selectedItems():
+            if list_item.isHidden(): continue
+            entry = data_map.get(list_item.text())
+            if entry is not None:
+                entries.append((list_item.text(), entry))
+        return entries
+
+    def open_bulk_edit(self):
+        """Opens the bulk edit dialog for the entries selected in the current tab."""
+        if self._populating_details: return
+        entry_type = TAG_ABILITY if self.tab_widget.currentIndex() == 0 else TAG_ITEM
+        entries = self.selected_entries(entry_type)
+        if not entries:
+            QMessageBox.information(self, "Bulk Edit", "Select one or more entries in the list first (Ctrl/Shift+Click).")
+            return
+        dialog = BulkEditDialog(self, entry_type, len(entries), self)
+        if dialog.exec() != QDialog.DialogCode.Accepted:
+            return
+        operation, target, field, value, new_name = dialog.values()
+        try:
+            changed = self.bulk_edit_entries(entry_type, entries, operation, target, field, value, new_name)
+        except ValueError as e:
+            logging.error(f"Bulk edit failed: {e}")
+            QMessageBox.warning(self, "Bulk Edit", f"The bulk edit could not be applied; nothing was changed.\n\n{e}")
+            return
+        self.statusBar.showMessage(f"Bulk edit: changed {changed} of {len(entries)} selected entries.", 5000)
+
+    def bulk_edit_entries(self, entry_type, entries, operation, target, field, value="", new_name=""):
+        """Applies one operation to many entries as a single batch (and a single undo step).
+
+        Files, completions, the window title and the details pane are updated
+        once at the end instead of once per element. Returns the number of changed entries.
+        """
+        logging.info(f"Bulk edit: {operation} {target} '{field}' on {len(entries)} {entry_type}(s)")
+        batch = self.begin_edit()
+        changed_elements = []
+        try:
+            for name, entry in entries:
+                element = entry['element']
+                if self._bulk_edit_element(batch, element, operation, target, field, value, new_name):
+                    changed_elements.append(element)
+        except Exception:
+            self.abort_edit(batch)
+            raise
+
+        if changed_elements:
+            self.commit_edit(batch, f"Bulk {operation} {field} on {len(changed_elements)} {entry_type}(s)")
+            self._refresh_details_if_showing(changed_elements)
+        logging.info(f"Bulk edit changed {len(changed_elements)} entries.")
+        return len(changed_elements)
+
+    def _bulk_edit_element(self, batch, element, operation, target, field, value, new_name):
+        """Applies a bulk operation to one entry element through batch. Returns True if it changed."""
+        if target == "property":
+            existing = element.findall(field)
+            if operation in ("set", "add"):
+                if existing: return False
+                batch.sub_element(element, field)
+                return True
+            if operation == "remove":
+                for child in existing: batch.remove(child, element)
+                return bool(existing)
+            if operation == "rename":
+                for child in existing: batch.set_tag(child, new_name)
+                return bool(existing)
+            return False
+
+        prop, attr = split_field(field)
+        holder = element if prop is None else element.find(prop)
+        if operation in ("set", "add"):
+            if holder is None:
+                holder = batch.sub_element(element, prop)
+            elif operation == "add" and attr in holder.attrib:
+                return False
+            return batch.set_attr(holder, attr, value)
+        if holder is None or attr not in holder.attrib:
+            return False
+        if operation == "remove":
+            return batch.set_attr(holder, attr, None)
+        if operation == "rename":
+            if new_name in holder.attrib: return False # Would overwrite an existing attribute
+            return batch.set_attrib(holder, [(new_name if k == attr else k, v) for k, v in holder.attrib.items()])
+        return False
+
+    def open_scale_values(self):
+        """Opens the numeric scaling tool for the entries of the current tab."""
+        if not self.loaded_files:
+            QMessageBox.warning(self, "Action Failed", "No XML files are loaded. Please open a folder first.")
+            return
+        entry_type = TAG_ABILITY if self.tab_widget.currentIndex() == 0 else TAG_ITEM
+        dialog = ScaleValuesDialog(self, entry_type, self)
+        dialog.setAttribute(Qt.WidgetAttribute.WA_DeleteOnClose)
+        dialog.show()
+
+    def query_entries(self, entry_type, query):
+        """Returns [(name, entry_data)] of all entries of a type matching an EntryQuery, sorted by name."""
+        data_map = self.abilities_map if entry_type == TAG_ABILITY else self.items_map
+        return [(name, data_map[name]) for name in sorted(data_map)
+                if query.matches(name, data_map[name]['element'], data_map[name]['filepath'])]
+
+    def gather_numeric_field(self, entries, field):
+        """Collects the numeric values of a field across entries.
+
+        Returns (targets, values, skipped) where targets[i] = (name, file_path, holder_element,
+        attribute, original_text) belongs to values[i]; missing fields are ignored and
+        non-numeric ones counted in skipped.
+        """
+        prop, attr = split_field(field)
+        targets, values, skipped = [], [], 0
+        for name, entry in entries:
+            holder = entry['element'] if prop is None else entry['element'].find(prop)
+            if holder is None: continue
+            text = holder.get(attr)
+            if text is None: continue
+            try:
+                values.append(parse_number(text))
+            except ValueError:
+                skipped += 1
+                continue
+            targets.append((name, entry['filepath'], holder, attr, text))
+        return targets, values, skipped
+
+    def apply_field_values(self, changes):
+        """Writes [(file_path, holder_element, attribute, new_text)] as one undo step. Returns the number written."""
+        batch = self.begin_edit()
+        changed_holders = [holder for file_path, holder, attr, new_text in changes if batch.set_attr(holder, attr, new_text)]
+        if changed_holders:
+            self.commit_edit(batch, f"Scale {len(changed_holders)} value(s)")
+            if self.current_selection_element is not None:
+                touched = {id(h) for h in changed_holders}
+                if id(self.current_selection_element) in touched or any(id(c) in touched for c in self.current_selection_element):
+                    self._refresh_details_if_showing([self.current_selection_element])
+        logging.info(f"Applied {len(changed_holders)} field value change(s).")
+        return len(changed_holders)
+
+    def open_find_replace(self):
+        """Opens the find and replace dialog."""
+        if not self.loaded_files:
+            QMessageBox.warning(self, "Action Failed", "No XML files are loaded. Please open a folder first.")
+            return
+        dialog = FindReplaceDialog(self, self)
+        dialog.setAttribute(Qt.WidgetAttribute.WA_DeleteOnClose)
+        dialog.show()
+
+    def find_matches(self, pattern, targets, scope):
+        """Scans the given scope for pattern matches, one worker per file. Returns hits in file order."""
+        work = {} # {file_path: [elements to scan]}
+        if scope == "workspace":
+            work = {fp: [data['root']] for fp, data in self.loaded_files.items()}
+        elif scope == "file":
+            if self.current_selection_filepath in self.loaded_files:
+                work = {self.current_selection_filepath: [self.loaded_files[self.current_selection_filepath]['root']]}
+        elif scope == "entry":
+            if self.current_selection_element is not None:
+                work = {self.current_selection_filepath: [self.current_selection_element]}
+        elif scope == "selected":
+            entry_type = TAG_ABILITY if self.tab_widget.currentIndex() == 0 else TAG_ITEM
+            for name, entry in self.selected_entries(entry_type):
+                work.setdefault(entry['filepath'], []).append(entry['element'])
+
+        logging.info(f"Find '{pattern.pattern}' in {len(work)} file(s), scope '{scope}', targets {sorted(targets)}")
+        if len(work) <= 1:
+            results = [scan_for_matches(fp, elements, pattern, targets) for fp, elements in work.items()]
+        else:
+            with ThreadPoolExecutor(max_workers=min(len(work), os.cpu_count() or 4)) as executor:
+                results = list(executor.map(lambda item: scan_for_matches(item[0], item[1], pattern, targets), work.items()))
+        return [hit for file_hits in results for hit in file_hits]
+
+    def apply_replacements(self, replacements):
+        """Applies [(hit, new_string)] from find_matches in one batch and refreshes the UI once.
+
+        Hits whose value changed since the search, invalid tag/attribute names and
+        attribute renames that would clash are skipped. Returns (applied, skipped).
+        """
+        # Apply values before names so attribute keys captured at search time stay valid
+        order = {FIND_TARGET_TEXT: 0, FIND_TARGET_ATTR_VALUES: 1, FIND_TARGET_ATTR_NAMES: 2, FIND_TARGET_TAGS: 3}
+        applied, skipped = 0, 0
+        batch = self.begin_edit()
+        for (file_path, entry_label, element, target, key, old), new in sorted(replacements, key=lambda r: order[r[0][3]]):
+            try:
+                if target == FIND_TARGET_TEXT:
+                    if element.text != old: raise LookupError
+                    batch.set_text(element, new)
+                elif target == FIND_TARGET_ATTR_VALUES:
+                    if element.get(key) != old: raise LookupError
+                    batch.set_attr(element, key, new)
+                elif target == FIND_TARGET_ATTR_NAMES:
+                    if key not in element.attrib or (new != key and new in element.attrib): raise LookupError
+                    ET.QName(new) # Validates the new attribute name
+                    batch.set_attrib(element, [(new if k == key else k, v) for k, v in element.attrib.items()]) # Keeps attribute order
+                elif target == FIND_TARGET_TAGS:
+                    if element.tag != old: raise LookupError
+                    ET.QName(new) # Validates the new tag
+                    batch.set_tag(element, new)
+            except (LookupError, ValueError):
+                skipped += 1
+                continue
+            applied += 1
+
+        if applied:
+            logging.info(f"Find/replace applied {applied} change(s).")
+            self.commit_edit(batch, f"Replace {applied} occurrence(s)") # Maps, lists and completions follow via the change bus
+            if self.current_selection_name in (self.abilities_map if self.current_selection_type == TAG_ABILITY else self.items_map):
+                self.populate_details(self.current_selection_name, self.current_selection_type)
+            else:
+                self.clear_details_pane() # The shown entry was renamed away
+        return applied, skipped
+
+    def _rebuild_indexes(self):
+        """Rebuilds entry maps and the completion index from the loaded trees, then refreshes lists and details once."""
+        selection = (self.current_selection_type, self.current_selection_name)
+        self.abilities_map.clear()
+        self.items_map.clear()
+        for file_path, data in self.loaded_files.items():
+            self._process_xml_root(data['root'], file_path)
+        self._rebuild_completion_index()
+        for name, variants in list(self.expanded_variants.items()): # Drop those of removed or replaced items
+            item = self.items_map.get(name)
+            variants = [v for v in variants if item is not None and is_within(v, item['element'])]
+            if variants: self.expanded_variants[name] = variants
+            else: del self.expanded_variants[name]
+
+        self.populate_lists()
+        self.filter_abilities(self.ability_filter.text())
+        self.filter_items(self.item_filter.text())
+        entry_type, name = selection
+        data_map = self.abilities_map if entry_type == TAG_ABILITY else self.items_map
+        if name is not None and name in data_map:
+            self.select_entry(entry_type, name)
+            self.populate_details(name, entry_type)
+        else:
+            self.clear_details_pane()
+
+    def open_tier_generator(self):
+        """Opens the tier generator for the currently selected entry."""
+        if self._populating_details: return
+        if self.current_selection_element is None:
+            QMessageBox.warning(self, "Action Failed", "Please select an item or ability to use as the template.")
+            return
+        dialog = TierGeneratorDialog(self, self.current_selection_type, self.current_selection_name, self)
+        if dialog.exec() != QDialog.DialogCode.Accepted:
+            return
+        try:
+            created = self.generate_tiered_entries(self.current_selection_type, self.current_selection_name, dialog.pattern,
+                                                   dialog.tiers, dialog.rules, dialog.decimals_spin.value(),
+                                                   dialog.abilities_checkbox.isChecked())
+        except ValueError as e:
+            QMessageBox.warning(self, "Generate Tiers", str(e))
+            return
+        except Exception as e:
+            logging.error(f"Error generating tiers: {e}", exc_info=True)
+            QMessageBox.critical(self, "Generate Tiers Error", f"An error occurred while generating entries:\n{e}")
+            return
+        self.statusBar.showMessage(f"Generated {created} entries.", 5000)
+
+    def generate_tiered_entries(self, entry_type, template_name, pattern, tiers, rules, decimals=-1, with_abilities=False):
+        """Creates one scaled copy of a template per tier, inserted after it in a single batch (one undo step).
+
+        With with_abilities, each base ability of an item template that exists in the
+        workspace is generated with the same pattern and rules, and the item copies
+        reference their tier's abilities. Returns the number of entries created.
+        Raises ValueError if a generated name already exists.
+        """
+        template_map = self.abilities_map if entry_type == TAG_ABILITY else self.items_map
+        template = template_map[template_name]
+        # (entry_type, template_name, template_entry) in generation order; abilities first so items can reference them
+        sources = []
+        if with_abilities and entry_type == TAG_ITEM:
+            base_node = template['element'].find(TAG_BASE_ABILITIES)
+            for ref in (base_node.findall(TAG_ABILITY_REF) if base_node is not None else []):
+                ability_name = ref.text.strip() if ref.text else ""
+                if ability_name in self.abilities_map and all(ability_name != src[1] for src in sources):
+                    sources.append((TAG_ABILITY, ability_name, self.abilities_map[ability_name]))
+        sources.append((entry_type, template_name, template))
+
+        # Resolve all names up front so nothing is inserted if any clashes
+        new_names = {} # {(entry_type, source_name, tier): new name}
+        taken = {TAG_ABILITY: set(), TAG_ITEM: set()} # Generated names per entry type
+        for source_type, source_name, _ in sources:
+            data_map = self.abilities_map if source_type == TAG_ABILITY else self.items_map
+            for tier in tiers:
+                new_name = pattern.format(name=source_name, tier=tier)
+                if new_name in data_map or new_name in taken[source_type]:
+                    raise ValueError(f"An entry named '{new_name}' already exists.")
+                taken[source_type].add(new_name)
+                new_names[(source_type, source_name, tier)] = new_name
+
+        created = {TAG_ABILITY: [], TAG_ITEM: []} # {type: [name]}
+        batch = self.begin_edit()
+        try:
+            for source_type, source_name, source in sources:
+                parent_element = self.get_parent_element(source['element'], source['filepath'])
+                if parent_element is None:
+                    raise ValueError(f"Could not locate the parent container of '{source_name}'.")
+                copies = []
+                for tier in tiers:
+                    new_element = copy.deepcopy(source['element'])
+                    new_element.set('name', new_names[(source_type, source_name, tier)])
+                    copies.append(new_element)
+                    if source_type == TAG_ITEM:
+                        self._retarget_base_abilities(new_element, tier, new_names)
+                self._apply_tier_rules(copies, tiers, rules, decimals) # Copies are still detached, so no ops needed
+                insert_index = parent_element.index(source['element']) + 1
+                for new_element in copies:
+                    batch.insert(parent_element, insert_index, new_element)
+                    insert_index += 1
+                    created[source_type].append(new_element.get('name'))
+        except Exception:
+            self.abort_edit(batch)
+            raise
+
+        # One undo step; the change bus adds the copies to the maps, lists and completions (one sort per list)
+        self.commit_edit(batch, f"Generate tiers of '{template_name}'")
+        total = sum(len(entries) for entries in created.values())
+        logging.info(f"Generated {total} tiered entries from '{template_name}' (tiers {tiers[0]}..{tiers[-1]}).")
+        return total
+
+    def _retarget_base_abilities(self, item_element, tier, new_names):
+        """Points an item copy's base ability references at the abilities generated for the same tier."""
+        base_node = item_element.find(TAG_BASE_ABILITIES)
+        if base_node is None: return
+        for ref in base_node.findall(TAG_ABILITY_REF):
+            ability_name = ref.text.strip() if ref.text else ""
+            if (TAG_ABILITY, ability_name, tier) in new_names:
+                ref.text = new_names[(TAG_ABILITY, ability_name, tier)]
+
+    def _apply_tier_rules(self, elements, tiers, rules, decimals):
+        """Applies 'field = formula(x, t)' rules to tier copies, evaluating each rule once for all tiers."""
+        for field, code in rules:
+            prop, attr = split_field(field)
+            holders, values, tier_values = [], [], []
+            for element, tier in zip(elements, tiers):
+                holder = element if prop is None else element.find(prop)
+                if holder is None or holder.get(attr) is None: continue
+                try:
+                    values.append(parse_number(holder.get(attr)))
+                except ValueError:
+                    continue # Non-numeric values are left as copied
+                holders.append(holder)
+                tier_values.append(tier)
+            if not values: continue
+            for holder, result in zip(holders, evaluate_formula(code, values, t=tier_values)):
+                if math.isfinite(result):
+                    holder.set(attr, format_number(result, decimals))
+
     # --- Helpers ---
 
+    def select_entry(self, entry_type, name):
+        """Switches to the right tab and selects an entry in its list. Returns True if found."""
+        list_widget = self.ability_list if entry_type == TAG_ABILITY else self.item_list
+        items = list_widget.findItems(name, Qt.MatchFlag.MatchExactly)
+        if not items:
+            logging.warning(f"Could not select {entry_type} '{name}': not found in list.")
+            return False
+        self.tab_widget.setCurrentIndex(0 if entry_type == TAG_ABILITY else 1)
+        list_widget.setCurrentItem(items[0])
+        list_widget.scrollToItem(items[0])
+        return True
+
     def get_parent_element(self, child_element, file_path):
         """Finds the direct parent of a given lxml element within its file's tree."""
         if file_path not in self.loaded_files:
@@ -2891,7 +8088,7 @@ class WitcherXMLEditor(QMainWindow):
 
         if reply == QMessageBox.StandardButton.Save:
             logging.info("User chose to Save changes before proceeding.")
-            self.save_all_files()
+            self.jobs.wait(self.save_all_files())
             # Check if saving failed (files still modified)
             if self.modified_files:
                 logging.warning("Save failed for some files. Action cancelled.")
@@ -2903,6 +8100,7 @@ class WitcherXMLEditor(QMainWindow):
             logging.info("User chose to Discard changes.")
             # Clear the modified flag for all files *without* saving
             self.modified_files.clear()
+            if self.journal is not None: self.journal.clear()
             self.update_window_title() # Update title bar
             return QMessageBox.StandardButton.Discard
         else: # Cancel
@@ -2922,6 +8120,8 @@ class WitcherXMLEditor(QMainWindow):
             logging.info("Window close accepted.")
             # Save config before exiting? Yes.
             self.save_config()
+            self._close_journal() # Nothing is unsaved anymore
+            self.jobs.shutdown() # Stops loads still running
             event.accept() # Allow window to close
 
 